@@ -157,3 +157,50 @@ MEDIA_URL = '/media/'
 # Configuración para Crispy Forms
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
+
+# --- REPORTES PDF EN SEGUNDO PLANO ---
+# Con REPORTES_PDF_ASINCRONOS=True las vistas de PDF encolan el trabajo y el
+# comando `manage.py procesar_reportes_pdf` lo renderiza. Los archivos quedan
+# en disco local, no en Cloudinary.
+REPORTES_PDF_ASINCRONOS = os.getenv('REPORTES_PDF_ASINCRONOS', 'False') == 'True'
+REPORTES_GENERADOS_DIR = Path(os.getenv('REPORTES_GENERADOS_DIR', BASE_DIR / 'reportes_generados'))
+
+# Boletines y sábanas de REPORTES_PDF_POR_PARTES_DESDE estudiantes o más se
+# renderizan por partes en REPORTES_PDF_PROCESOS procesos y se unen en un solo
+# PDF (ver notas/reportes/pdf_por_partes.py). 0 desactiva el modo por partes.
+REPORTES_PDF_POR_PARTES_DESDE = int(os.getenv('REPORTES_PDF_POR_PARTES_DESDE', '20'))
+REPORTES_PDF_PROCESOS = int(os.getenv('REPORTES_PDF_PROCESOS', '2'))
+
+# --- IMPORTACIONES MASIVAS ---
+# La importación de estudiantes se encola y la procesa el comando
+# `manage.py procesar_importaciones`, que debe estar en ejecución. Con
+# IMPORTACIONES_ASINCRONAS=False se procesa en la misma petición, en un solo
+# proceso. En ambos casos el usuario ve el avance y el reporte por fila.
+IMPORTACIONES_ASINCRONAS = os.getenv('IMPORTACIONES_ASINCRONAS', 'True') == 'True'
+
+# --- CACHÉS ---
+# 'estadisticas' guarda los cálculos del panel de estadísticas. Está en disco
+# para que la compartan los workers de gunicorn; se limita por antigüedad
+# (TIMEOUT, en segundos) y por número de entradas.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'estadisticas': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('ESTADISTICAS_CACHE_DIR', str(BASE_DIR / 'estadisticas_cache')),
+        'TIMEOUT': int(os.getenv('ESTADISTICAS_CACHE_TTL', '600')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('ESTADISTICAS_CACHE_MAX_ENTRADAS', '200'))},
+    },
+    # Compartida por todos los workers: escala de valoración, colegio por host y
+    # contadores de notificaciones, que se invalidan desde señales.
+    'compartida': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('COMPARTIDA_CACHE_DIR', str(BASE_DIR / 'cache_compartida')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('COMPARTIDA_CACHE_MAX_ENTRADAS', '5000'))},
+    },
+}
+
+# Caché en disco de boletines y sábanas ya generados (ver notas/reportes/cache_artefactos.py).
+REPORTES_CACHE_DIR = Path(os.getenv('REPORTES_CACHE_DIR', BASE_DIR / 'reportes_cache'))
+REPORTES_CACHE_MAX_MB = int(os.getenv('REPORTES_CACHE_MAX_MB', '500'))
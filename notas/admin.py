@@ -10,8 +10,10 @@ from .models import (
     Colegio, PeriodoAcademico, AreaConocimiento, Curso, Materia, Docente, Estudiante,
     AsignacionDocente, IndicadorLogroPeriodo, Calificacion, Asistencia,
     Observacion, PlanDeMejoramiento, ReporteParcial, InasistenciasManualesPeriodo,
-    ConfiguracionSistema, NotaDetallada, PonderacionAreaMateria
+    ConfiguracionSistema, NotaDetallada, PonderacionAreaMateria, TrabajoReporte,
+    TrabajoImportacion
 )
+from .boletin.lote import encolar_lote
 
 @admin.register(Colegio)
 class ColegioAdmin(admin.ModelAdmin):
@@ -56,6 +58,29 @@ class PeriodoAcademicoAdmin(BaseColegioAdmin):
     list_filter = ('colegio', 'ano_lectivo', 'esta_activo')
     search_fields = ('nombre', 'ano_lectivo__exact')
     ordering = ('-ano_lectivo', 'fecha_inicio')
+    actions = ['generar_boletines_periodo', 'generar_boletines_finales']
+
+    def _encolar_lotes(self, request, lotes):
+        for colegio, reporte_id, nombre_archivo in lotes:
+            trabajo = encolar_lote(colegio, request.user, reporte_id, nombre_archivo)
+            self.message_user(request, format_html(
+                'Lote encolado: <a href="{}">{}</a>. Lo procesa el comando <code>generar_boletines_colegio</code>.',
+                reverse('admin:notas_trabajoreporte_change', args=[trabajo.id]), nombre_archivo,
+            ))
+
+    @admin.action(description="Generar los boletines de todos los cursos (ZIP)")
+    def generar_boletines_periodo(self, request, queryset):
+        self._encolar_lotes(request, [
+            (p.colegio, p.id, f"boletines_{p.colegio.slug}_{p.get_nombre_display()}_{p.ano_lectivo}.zip")
+            for p in queryset.select_related('colegio')
+        ])
+
+    @admin.action(description="Generar los boletines finales del año de todos los cursos (ZIP)")
+    def generar_boletines_finales(self, request, queryset):
+        anos = {(p.colegio, p.ano_lectivo) for p in queryset.select_related('colegio')}
+        self._encolar_lotes(request, [
+            (colegio, f"FINAL_{ano}", f"boletines_finales_{colegio.slug}_{ano}.zip") for colegio, ano in anos
+        ])
 
 @admin.register(Curso)
 class CursoAdmin(BaseColegioAdmin):
@@ -127,6 +152,25 @@ class CalificacionAdmin(BaseColegioAdmin):
     list_filter = ('colegio', 'periodo', 'materia', 'tipo_nota')
     autocomplete_fields = ['estudiante', 'materia', 'docente', 'periodo']
 
+@admin.register(TrabajoReporte)
+class TrabajoReporteAdmin(BaseColegioAdmin):
+    list_display = ('nombre_archivo', 'tipo', 'estado', 'usuario', 'intentos', 'fecha_creacion', 'fecha_fin', 'colegio')
+    list_filter = ('colegio', 'tipo', 'estado')
+    exclude = ('html',)
+    readonly_fields = ('error', 'resumen', 'enlace_descarga')
+
+    @admin.display(description="Archivo")
+    def enlace_descarga(self, obj):
+        if obj.estado != 'TERMINADO':
+            return "-"
+        return format_html('<a href="{}">Descargar</a>', reverse('descargar_trabajo_reporte', args=[obj.id]))
+
+@admin.register(TrabajoImportacion)
+class TrabajoImportacionAdmin(BaseColegioAdmin):
+    list_display = ('nombre_archivo', 'tipo', 'estado', 'usuario', 'creados', 'omitidos', 'fecha_creacion', 'fecha_fin', 'colegio')
+    list_filter = ('colegio', 'tipo', 'estado')
+    readonly_fields = ('error', 'errores_filas')
+
 # --- Registros simples ---
 admin.site.register(Asistencia)
 admin.site.register(Observacion)
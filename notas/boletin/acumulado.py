@@ -0,0 +1,166 @@
+# notas/boletin/acumulado.py
+# Núcleo de cálculo de notas acumuladas que comparten la sábana y los boletines.
+# Las notas se pivotan una sola vez en un tensor estudiante × materia × periodo
+# y de ahí salen, sin recorrer nota por nota, las notas de área por periodo,
+# los acumulados de materias y áreas, los promedios y los puestos.
+#
+# Igual que en estadisticas_logic, se trabaja con enteros: las notas en
+# centésimas y los resultados redondeados en décimas (o centésimas para los
+# promedios por intensidad horaria). La división entera con redondeo hacia
+# arriba en el medio da exactamente el mismo resultado que quantize() con
+# ROUND_HALF_UP sobre Decimal.
+
+from decimal import Decimal
+
+import numpy as np
+
+# Marca de "sin nota" dentro de los arreglos (las notas nunca son negativas).
+AUSENTE = -1
+
+
+def _dividir(numerador, denominador):
+    """Cociente entero con ROUND_HALF_UP para valores no negativos; AUSENTE si el denominador es 0."""
+    seguro = np.maximum(denominador, 1)
+    return np.where(denominador > 0, (2 * numerador + seguro) // (2 * seguro), AUSENTE)
+
+
+def _ponderar(notas, pesos, subindices, divisor=1):
+    """Promedio ponderado de las notas presentes; `divisor` pasa de centésimas a décimas."""
+    presentes = notas >= 0
+    numerador = np.einsum(subindices, np.where(presentes, notas, 0), pesos)
+    denominador = np.einsum(subindices, presentes.astype(np.int64), pesos)
+    return _dividir(numerador, divisor * denominador)
+
+
+def _promedio(notas, eje):
+    """Promedio simple de las notas presentes a lo largo de `eje`, en las mismas unidades."""
+    presentes = notas >= 0
+    return _dividir(np.where(presentes, notas, 0).sum(axis=eje), presentes.sum(axis=eje))
+
+
+def pivotar_notas(filas, estudiante_ids, materia_ids, periodo_ids):
+    """
+    Arma el tensor de notas a partir de filas (estudiante_id, materia_id,
+    periodo_id, tipo_nota, valor_nota) de tipo PROM_PERIODO o NIVELACION.
+    Devuelve (prom, niv): arreglos de enteros en centésimas con forma
+    (estudiantes, materias, periodos) y AUSENTE donde no hay nota. Las filas
+    de estudiantes, materias o periodos que no están en las listas se ignoran.
+    """
+    indices = [{id_: i for i, id_ in enumerate(ids)} for ids in (estudiante_ids, materia_ids, periodo_ids)]
+    forma = tuple(len(ids) for ids in (estudiante_ids, materia_ids, periodo_ids))
+    prom, niv = np.full(forma, AUSENTE, dtype=np.int64), np.full(forma, AUSENTE, dtype=np.int64)
+    for estudiante_id, materia_id, periodo_id, tipo_nota, valor in filas:
+        posicion = tuple(indice.get(id_) for indice, id_ in zip(indices, (estudiante_id, materia_id, periodo_id)))
+        if None in posicion or valor is None:
+            continue
+        (niv if tipo_nota == 'NIVELACION' else prom)[posicion] = int(valor * 100)
+    return prom, niv
+
+
+def matriz_pesos(pesos_por_par, materia_ids, area_ids):
+    """Matriz materias × áreas con el peso porcentual (en centésimas) de cada materia en su área."""
+    pesos = np.zeros((len(materia_ids), len(area_ids)), dtype=np.int64)
+    columnas = {area_id: k for k, area_id in enumerate(area_ids)}
+    for j, materia_id in enumerate(materia_ids):
+        for area_id, k in columnas.items():
+            peso = pesos_por_par.get((area_id, materia_id))
+            if peso is not None:
+                pesos[j, k] = int(peso * 100)
+    return pesos
+
+
+def calcular_acumulado(prom, niv, pesos, ih=None):
+    """
+    Calcula en una pasada todas las notas derivadas del tensor. Cada resultado
+    existe en dos versiones: la original (solo PROM_PERIODO) y la recuperada
+    (sufijo `_rec`, donde la nivelación reemplaza a la nota del periodo):
+
+    - area_periodo: (estudiantes, áreas, periodos), décimas.
+    - promedio_periodo: (estudiantes, periodos), promedio de las áreas, décimas.
+    - materia_acumulada: (estudiantes, materias), promedio de los periodos, décimas.
+    - area_acumulada: (estudiantes, áreas), ponderada con el acumulado de las materias, décimas.
+    - promedio_acumulado: (estudiantes,), promedio de las áreas acumuladas, décimas.
+
+    Si se da `ih` (intensidad horaria por materia, 0 para las que no cuentan)
+    también se calculan los promedios generales ponderados por intensidad, en
+    centésimas: promedio_ih_periodo (con las notas originales de cada periodo)
+    y promedio_ih_acumulado_rec (con el acumulado recuperado de cada materia).
+    """
+    final = np.where(niv > 0, niv, prom)
+    resultado = {}
+    for sufijo, notas in (('', prom), ('_rec', final)):
+        area_periodo = _ponderar(notas, pesos, 'emp,ma->eap', divisor=10)
+        materia_acumulada = _dividir(np.where(notas >= 0, notas, 0).sum(axis=2), 10 * (notas >= 0).sum(axis=2))
+        area_acumulada = _ponderar(materia_acumulada, pesos, 'em,ma->ea')
+        resultado.update({
+            f'area_periodo{sufijo}': area_periodo,
+            f'promedio_periodo{sufijo}': _promedio(area_periodo, eje=1),
+            f'materia_acumulada{sufijo}': materia_acumulada,
+            f'area_acumulada{sufijo}': area_acumulada,
+            f'promedio_acumulado{sufijo}': _promedio(area_acumulada, eje=1),
+        })
+
+    if ih is not None:
+        ih = np.asarray(ih, dtype=np.int64)
+        resultado['promedio_ih_periodo'] = _ponderar(prom, ih, 'emp,m->ep')
+        acumulada = resultado['materia_acumulada_rec']
+        presentes = acumulada >= 0
+        resultado['promedio_ih_acumulado_rec'] = _dividir(10 * (np.where(presentes, acumulada, 0) @ ih), presentes.astype(np.int64) @ ih)
+    return resultado
+
+
+def a_decimal(valor, decimales=1):
+    """Convierte un entero en décimas (o centésimas con decimales=2) en Decimal; None si es AUSENTE."""
+    valor = int(valor)
+    return None if valor < 0 else Decimal(valor).scaleb(-decimales)
+
+
+def puestos(valores, compartidos=False):
+    """
+    Puesto de cada valor, de mayor a menor. Con `compartidos` los empates
+    comparten puesto (1, 2, 2, 4); si no, el empate se resuelve por el orden
+    en que vienen los valores (normalmente el alfabético del curso).
+    """
+    orden = sorted(range(len(valores)), key=lambda i: valores[i], reverse=True)
+    resultado = [0] * len(valores)
+    for posicion, i in enumerate(orden):
+        empata = compartidos and posicion > 0 and valores[orden[posicion - 1]] == valores[i]
+        resultado[i] = resultado[orden[posicion - 1]] if empata else posicion + 1
+    return resultado
+
+
+def desempenos_por_decima(funcion_desempeno, maximo=100):
+    """Tabla décima -> desempeño (de 0.0 a `maximo`/10) para clasificar arreglos sin llamar a la escala nota por nota."""
+    return [funcion_desempeno(Decimal(t).scaleb(-1)) for t in range(maximo + 1)]
+
+
+def contar_desempenos(decimas, tabla):
+    """Diccionario desempeño -> cantidad de notas (en décimas) de un arreglo; se omiten las ausentes."""
+    decimas = np.asarray(decimas).ravel()
+    por_valor = np.bincount(decimas[decimas >= 0], minlength=len(tabla))
+    conteo = {}
+    for valor in np.flatnonzero(por_valor):
+        nombre = tabla[valor] if valor < len(tabla) else None
+        if nombre:
+            conteo[nombre] = conteo.get(nombre, 0) + int(por_valor[valor])
+    return conteo
+
+
+def resumen_columnas(decimas, tabla, nombres):
+    """
+    Resumen de cada columna de una matriz estudiantes × columnas en décimas:
+    promedio exacto de las notas presentes y cantidad y porcentaje por desempeño.
+    """
+    resumen = []
+    for columna in np.asarray(decimas).T:
+        validas = columna[columna >= 0]
+        total = validas.size
+        conteo = contar_desempenos(validas, tabla)
+        resumen.append({
+            'promedio': Decimal(int(validas.sum())) / Decimal(10 * total) if total else Decimal('0.0'),
+            'desempenos': {
+                nombre: {'count': conteo.get(nombre, 0), 'percentage': (conteo.get(nombre, 0) / total) * 100 if total else 0.0}
+                for nombre in nombres
+            },
+        })
+    return resumen
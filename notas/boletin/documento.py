@@ -0,0 +1,91 @@
+# notas/boletin/documento.py
+# Arma el documento de un boletín (plantilla, contexto y nombre de archivo) sin
+# depender de la petición, para usarlo desde la vista y desde los comandos que
+# generan boletines por lotes.
+
+from ..models import PeriodoAcademico, Curso
+from ..reportes.cache_artefactos import sello_datos, clave_artefacto
+from .logic import get_datos_boletin_curso, get_datos_boletin_final
+
+
+class BoletinNoDisponible(Exception):
+    """El boletín no se puede generar; `status` es el código HTTP a devolver."""
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+
+
+def nombre_archivo_boletin(curso, periodo=None, ano_lectivo=None):
+    """Nombre del PDF: boletín de `periodo` o, si no se indica, boletín final de `ano_lectivo`."""
+    sufijo = '_pre' if curso.nivel == 'PRE' else ''
+    if periodo is not None:
+        return f'boletines{sufijo}_{curso.nombre}_{periodo.get_nombre_display()}.pdf'
+    return f'boletin_final{sufijo}_{curso.nombre}_{ano_lectivo}.pdf'
+
+
+def identificar_reporte(colegio, curso, reporte_id):
+    """(año lectivo, nombre del PDF) del boletín pedido, o (None, None) si no es válido."""
+    reporte_id = str(reporte_id)
+    if reporte_id.startswith('FINAL_'):
+        try:
+            ano_lectivo = int(reporte_id.split('_')[1])
+        except (ValueError, IndexError):
+            return None, None
+        return ano_lectivo, nombre_archivo_boletin(curso, ano_lectivo=ano_lectivo)
+    try:
+        periodo = PeriodoAcademico.objects.filter(id=reporte_id, colegio=colegio).first()
+    except ValueError:
+        return None, None
+    if periodo is None:
+        return None, None
+    return periodo.ano_lectivo, nombre_archivo_boletin(curso, periodo=periodo)
+
+
+def clave_cache_boletin(colegio, curso, reporte_id, ano_lectivo, estudiante=None):
+    """Clave del boletín en la caché de reportes (la misma para la vista y el precalentado)."""
+    parametros = {'curso_id': curso.id, 'reporte_id': str(reporte_id), 'estudiante_id': getattr(estudiante, 'id', None)}
+    return clave_artefacto('BOLETIN', parametros, sello_datos(colegio, curso, ano_lectivo))
+
+
+def preparar_boletin(colegio, curso, reporte_id, estudiante_especifico=None):
+    """
+    Devuelve (template_path, context, pdf_filename) del boletín de periodo o
+    final (`reporte_id` = id del periodo o 'FINAL_<año>'), eligiendo la
+    plantilla según el nivel del curso. Los datos ya traen todo lo que leen
+    las plantillas, así que renderizarlas no hace consultas.
+    """
+    prefijo = 'boletin_prescolar' if curso.nivel == 'PRE' else 'boletin'
+    # La firma del director de grado se lee en la plantilla.
+    curso = Curso.objects.select_related('director_grado__user').get(pk=curso.pk)
+
+    if str(reporte_id).startswith('FINAL_'):
+        try:
+            ano_lectivo = int(str(reporte_id).split('_')[1])
+        except (ValueError, IndexError):
+            raise BoletinNoDisponible("Error: Formato de reporte final no válido.")
+
+        boletines_data, nombres_periodos = get_datos_boletin_final(colegio, curso, ano_lectivo, estudiante_especifico)
+        if not boletines_data:
+            raise BoletinNoDisponible("No se encontraron datos para generar el boletín final de este curso y año.", status=200)
+
+        template_path = f'notas/boletin/{prefijo}_final_pdf.html'
+        pdf_filename = nombre_archivo_boletin(curso, ano_lectivo=ano_lectivo)
+        context = {"boletines": boletines_data, "nombres_periodos": nombres_periodos, "curso": curso, "ano_lectivo": ano_lectivo, "colegio": colegio}
+    else:
+        try:
+            periodo = PeriodoAcademico.objects.get(id=reporte_id, colegio=colegio)
+        except ValueError:
+            raise BoletinNoDisponible("Error: El periodo seleccionado no es válido.")
+        except PeriodoAcademico.DoesNotExist:
+            raise BoletinNoDisponible("Error: El periodo seleccionado no es válido.", status=404)
+
+        boletines_data = get_datos_boletin_curso(colegio, curso, periodo, estudiante_especifico)
+        if not boletines_data:
+            raise BoletinNoDisponible("No se encontraron datos para generar el boletín de este periodo.", status=200)
+
+        template_path = f'notas/boletin/{prefijo}_pdf.html'
+        pdf_filename = nombre_archivo_boletin(curso, periodo=periodo)
+        context = {"boletines": boletines_data, "curso": curso, "periodo": periodo, "colegio": colegio}
+
+    return template_path, context, pdf_filename
@@ -7,84 +7,127 @@ from decimal import Decimal, ROUND_HALF_UP
 from ..models import (
     Estudiante, Calificacion, IndicadorLogroPeriodo, Asistencia,
     AsignacionDocente, AreaConocimiento, Materia, ConfiguracionSistema,
-    PeriodoAcademico, FichaEstudiante, PonderacionAreaMateria, EscalaValoracion
+    PeriodoAcademico, FichaEstudiante, PonderacionAreaMateria, ResumenNotasPeriodo
 )
-from django.db.models import Prefetch
+from django.db.models import Prefetch, Count, OuterRef, Subquery, Exists, Value, F, Window, DecimalField
+from django.db.models.functions import Coalesce, RowNumber
 
-def _get_valoracion(colegio, nota):
+from ..resumen_logic import asignaciones_con_area
+from ..utils.escala_valoracion import get_escala_compilada
+from .acumulado import pivotar_notas, matriz_pesos, calcular_acumulado, a_decimal, puestos
+
+def _estudiantes_del_boletin(colegio, curso, estudiante_especifico=None):
     """
-    Devuelve la valoración cualitativa según la escala configurada para el colegio.
+    Estudiantes del boletín con el usuario y la ficha ya cargados, para que el
+    encabezado (nombre e identificación) no genere consultas al renderizar.
     """
-    if nota is None:
-        return ""
-    nota_decimal = Decimal(nota)
+    estudiantes = Estudiante.objects.filter(curso=curso, colegio=colegio).select_related('user', 'ficha')
+    if estudiante_especifico:
+        return list(estudiantes.filter(pk=estudiante_especifico.pk)) or [estudiante_especifico]
+    return list(estudiantes.filter(is_active=True).order_by('user__last_name', 'user__first_name'))
+
 
+def _identificacion(estudiante):
+    """Número de documento de la ficha o, si no lo tiene, el usuario."""
     try:
-        escala = EscalaValoracion.objects.get(
-            colegio=colegio,
-            valor_minimo__lte=nota_decimal,
-            valor_maximo__gte=nota_decimal
-        )
-        return escala.nombre_desempeno.upper()
-    except (EscalaValoracion.DoesNotExist, EscalaValoracion.MultipleObjectsReturned):
-        if nota_decimal >= Decimal('4.6'): return "SUPERIOR"
-        if nota_decimal >= Decimal('4.0'): return "ALTO"
-        if nota_decimal >= Decimal('3.0'): return "BASICO"
-        return "BAJO"
+        return estudiante.ficha.numero_documento or estudiante.user.username
+    except FichaEstudiante.DoesNotExist:
+        return estudiante.user.username
+
+
+def _calcular_acumulado_curso(colegio, estudiante_ids, materia_ids, areas, ponderaciones_map, ih_por_materia, periodos):
+    """
+    Pivota las definitivas y nivelaciones de los estudiantes en los periodos
+    dados y las pasa por el núcleo de acumulados. `areas` (objetos o ids) son
+    las áreas en el orden de las columnas del resultado; `ih_por_materia` trae
+    la intensidad horaria de las materias que cuentan para el promedio general.
+    El resultado incluye también el tensor en 'tensor' = (prom, niv).
+    """
+    filas = Calificacion.objects.filter(
+        colegio=colegio, estudiante_id__in=estudiante_ids, materia_id__in=materia_ids,
+        periodo__in=periodos, tipo_nota__in=['PROM_PERIODO', 'NIVELACION']
+    ).values_list('estudiante_id', 'materia_id', 'periodo_id', 'tipo_nota', 'valor_nota')
+    prom, niv = pivotar_notas(filas, estudiante_ids, materia_ids, [p.id for p in periodos])
+    pesos = matriz_pesos(ponderaciones_map, materia_ids, [getattr(area, 'id', area) for area in areas])
+    calculo = calcular_acumulado(prom, niv, pesos, ih=[ih_por_materia.get(materia_id, 0) for materia_id in materia_ids])
+    calculo['tensor'] = (prom, niv)
+    return calculo
+
 
 def get_datos_boletin_curso(colegio, curso, periodo, estudiante_especifico=None):
     """
     Calcula los datos de los boletines para un curso y periodo, incluyendo
     el promedio acumulado por materia y por área.
+
+    Todas las consultas se hacen por conjuntos (una por tipo de dato para todo
+    el curso) y luego se cruzan en memoria, por lo que el número de consultas
+    no depende de la cantidad de estudiantes ni de materias.
     """
-    if estudiante_especifico:
-        estudiantes = [estudiante_especifico]
-    else:
-        estudiantes = Estudiante.objects.filter(
-            curso=curso, colegio=colegio, is_active=True
-        ).select_related('user').order_by('user__last_name', 'user__first_name')
+    estudiantes = _estudiantes_del_boletin(colegio, curso, estudiante_especifico)
+    estudiante_ids = [e.id for e in estudiantes]
 
-    materias_del_curso_ids = AsignacionDocente.objects.filter(curso=curso, colegio=colegio).values_list('materia_id', flat=True).distinct()
+    asignaciones = list(AsignacionDocente.objects.filter(curso=curso, colegio=colegio).select_related('docente__user'))
+    asignaciones_map = {a.materia_id: a for a in asignaciones}
+    materias_del_curso_ids = list(asignaciones_map.keys())
     materias_del_curso = Materia.objects.filter(id__in=materias_del_curso_ids, colegio=colegio)
-    asignaciones_map = {a.materia_id: a for a in AsignacionDocente.objects.filter(curso=curso, colegio=colegio)}
 
     areas = AreaConocimiento.objects.filter(colegio=colegio, materias__in=materias_del_curso).distinct().prefetch_related(
         Prefetch('materias', queryset=materias_del_curso.order_by('nombre'), to_attr='materias_del_area_ordenadas')
     ).order_by('nombre')
 
-    ponderaciones_map = {(p.area_id, p.materia_id): p.peso_porcentual for p in PonderacionAreaMateria.objects.filter(colegio=colegio, materia__in=materias_del_curso)}
+    ponderaciones_map = {(p.area_id, p.materia_id): p.peso_porcentual for p in PonderacionAreaMateria.objects.filter(colegio=colegio, materia_id__in=materias_del_curso_ids)}
 
-    periodos_transcurridos = PeriodoAcademico.objects.filter(
+    periodos_transcurridos = list(PeriodoAcademico.objects.filter(
         colegio=colegio, ano_lectivo=periodo.ano_lectivo, fecha_inicio__lte=periodo.fecha_inicio
-    ).order_by('fecha_inicio')
-
-    calificaciones_acumuladas = Calificacion.objects.filter(
-        colegio=colegio, estudiante__in=estudiantes, materia_id__in=materias_del_curso_ids,
-        periodo__in=periodos_transcurridos, tipo_nota__in=['PROM_PERIODO', 'NIVELACION']
-    ).values('estudiante_id', 'materia_id', 'periodo_id', 'valor_nota', 'tipo_nota')
-
-    calificaciones_pivot_acum = defaultdict(lambda: defaultdict(dict))
-    for cal in calificaciones_acumuladas:
-        key = (cal['estudiante_id'], cal['materia_id'], cal['periodo_id'])
-        if cal['tipo_nota'] == 'PROM_PERIODO':
-            calificaciones_pivot_acum[key]['prom'] = cal['valor_nota']
-        elif cal['tipo_nota'] == 'NIVELACION':
-            calificaciones_pivot_acum[key]['niv'] = cal['valor_nota']
-    
+    ).order_by('fecha_inicio'))
+
+    # Notas de área y acumulados con el núcleo compartido con la sábana.
+    areas = list(areas)
+    calculo = _calcular_acumulado_curso(
+        colegio, estudiante_ids, materias_del_curso_ids, areas, ponderaciones_map,
+        {materia.id: asignaciones_map[materia.id].intensidad_horaria_semanal for area in areas for materia in area.materias_del_area_ordenadas},
+        periodos_transcurridos,
+    )
+    k_periodo = next(k for k, p in enumerate(periodos_transcurridos) if p.id == periodo.id)
+    area_periodo = calculo['area_periodo'][:, :, k_periodo].tolist()
+    materia_acumulada, area_acumulada = calculo['materia_acumulada_rec'].tolist(), calculo['area_acumulada_rec'].tolist()
+    promedio_ih = calculo['promedio_ih_periodo'][:, k_periodo].tolist()
+    indice_materia = {materia_id: j for j, materia_id in enumerate(materias_del_curso_ids)}
+
+    # Notas del periodo actual: (estudiante, materia) -> {tipo_nota: Calificacion}
+    calificaciones_periodo = defaultdict(dict)
+    for cal in Calificacion.objects.filter(
+        colegio=colegio, estudiante_id__in=estudiante_ids, materia_id__in=materias_del_curso_ids,
+        periodo=periodo, tipo_nota__in=['SER', 'SABER', 'HACER', 'PROM_PERIODO']
+    ).order_by('pk'):
+        calificaciones_periodo[(cal.estudiante_id, cal.materia_id)].setdefault(cal.tipo_nota, cal)
+
+    inasistencias_map = {
+        (r['estudiante_id'], r['asignacion_id']): r['total']
+        for r in Asistencia.objects.filter(
+            colegio=colegio, estudiante_id__in=estudiante_ids, asignacion__in=asignaciones,
+            estado='A', fecha__range=(periodo.fecha_inicio, periodo.fecha_fin)
+        ).order_by().values('estudiante_id', 'asignacion_id').annotate(total=Count('id'))
+    }
+
+    logros_map = defaultdict(list)
+    for indicador in IndicadorLogroPeriodo.objects.filter(asignacion__in=asignaciones, periodo=periodo, colegio=colegio).order_by('id'):
+        logros_map[indicador.asignacion_id].append(indicador)
+
+    valorar = get_escala_compilada(colegio).valoracion
+
     datos_completos_estudiantes = []
     UMBRAL_APROBACION = Decimal('3.0')
 
-    for estudiante in estudiantes:
+    for i, estudiante in enumerate(estudiantes):
         datos_estudiante = {
-            'estudiante': estudiante, 'promedio_general': Decimal('0.0'), 'total_ih': 0,
+            'estudiante': estudiante, 'identificacion': _identificacion(estudiante),
+            'promedio_general': a_decimal(promedio_ih[i], 2) or Decimal('0.0'), 'total_ih': 0,
             'areas': [], 'contador_rendimiento_areas': defaultdict(int), 'detalle_areas_reprobadas': {}
         }
-        suma_ponderada_periodo = Decimal('0.0')
 
-        for area in areas:
+        for k, area in enumerate(areas):
             datos_area = { 'nombre': area.nombre, 'materias': [], 'nota_final_area': None, 'desempeno_area': '', 'estado_color_css_class': '', 'nota_final_area_acumulada': None }
-            suma_ponderada_area_periodo, suma_pesos_area_periodo = Decimal('0.0'), Decimal('0.0')
-            suma_ponderada_area_acum, suma_pesos_area_acum = Decimal('0.0'), Decimal('0.0')
             materias_reprobadas_en_area = []
 
             for materia in area.materias_del_area_ordenadas:
@@ -92,53 +135,35 @@ def get_datos_boletin_curso(colegio, curso, periodo, estudiante_especifico=None)
                 if not asignacion: continue
 
                 # Lógica para el periodo actual
-                notas_materia_periodo = Calificacion.objects.filter(estudiante=estudiante, materia=materia, periodo=periodo, colegio=colegio)
-                definitiva_obj = notas_materia_periodo.filter(tipo_nota='PROM_PERIODO').first()
+                notas_materia_periodo = calificaciones_periodo.get((estudiante.id, materia.id), {})
+                definitiva_obj = notas_materia_periodo.get('PROM_PERIODO')
                 definitiva_valor_periodo = definitiva_obj.valor_nota if definitiva_obj else None
 
                 if definitiva_valor_periodo is not None and definitiva_valor_periodo < UMBRAL_APROBACION:
                     materias_reprobadas_en_area.append(materia.nombre)
 
-                peso = ponderaciones_map.get((area.id, materia.id))
-                if definitiva_valor_periodo is not None and peso is not None:
-                    suma_ponderada_area_periodo += (Decimal(definitiva_valor_periodo) * peso)
-                    suma_pesos_area_periodo += peso
-                
-                # Lógica para el acumulado de la materia
-                notas_materia_acum = []
-                for p_acum in periodos_transcurridos:
-                    cal_data = calificaciones_pivot_acum.get((estudiante.id, materia.id, p_acum.id), {})
-                    nota_final = cal_data.get('niv') or cal_data.get('prom')
-                    if nota_final is not None:
-                        notas_materia_acum.append(Decimal(nota_final))
-                
-                definitiva_acumulada = (sum(notas_materia_acum) / len(notas_materia_acum)) if notas_materia_acum else None
-                if definitiva_acumulada is not None:
-                    definitiva_acumulada = definitiva_acumulada.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                    if peso is not None:
-                        suma_ponderada_area_acum += (definitiva_acumulada * peso)
-                        suma_pesos_area_acum += peso
-
-                valoracion_cualitativa = _get_valoracion(colegio, definitiva_valor_periodo)
-                inasistencias = Asistencia.objects.filter(estudiante=estudiante, asignacion=asignacion, estado='A', fecha__range=(periodo.fecha_inicio, periodo.fecha_fin), colegio=colegio).count()
+                # Acumulado de la materia: promedio de los periodos transcurridos con la nivelación.
+                definitiva_acumulada = a_decimal(materia_acumulada[i][indice_materia[materia.id]])
+
+                valoracion_cualitativa = valorar(definitiva_valor_periodo)
+                inasistencias = inasistencias_map.get((estudiante.id, asignacion.id), 0)
 
                 datos_materia = {
                     'nombre': materia.nombre, 'ih': asignacion.intensidad_horaria_semanal, 'docente': asignacion.docente,
-                    'ser': notas_materia_periodo.filter(tipo_nota='SER').first(), 'sab': notas_materia_periodo.filter(tipo_nota='SABER').first(),
-                    'hac': notas_materia_periodo.filter(tipo_nota='HACER').first(), 'def': definitiva_valor_periodo,
+                    'ser': notas_materia_periodo.get('SER'), 'sab': notas_materia_periodo.get('SABER'),
+                    'hac': notas_materia_periodo.get('HACER'), 'def': definitiva_valor_periodo,
                     'def_acumulada': definitiva_acumulada, # Nuevo campo
                     'v_n': valoracion_cualitativa, 'inasistencias': inasistencias,
-                    'logros': IndicadorLogroPeriodo.objects.filter(asignacion=asignacion, periodo=periodo, colegio=colegio)
+                    'logros': logros_map.get(asignacion.id, [])
                 }
                 datos_area['materias'].append(datos_materia)
 
                 if definitiva_valor_periodo is not None:
-                    suma_ponderada_periodo += (Decimal(definitiva_valor_periodo) * asignacion.intensidad_horaria_semanal)
                     datos_estudiante['total_ih'] += asignacion.intensidad_horaria_semanal
 
-            if suma_pesos_area_periodo > 0:
-                nota_area = (suma_ponderada_area_periodo / suma_pesos_area_periodo).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                desempeno_nombre = _get_valoracion(colegio, nota_area)
+            nota_area = a_decimal(area_periodo[i][k])
+            if nota_area is not None:
+                desempeno_nombre = valorar(nota_area)
                 datos_area.update({'nota_final_area': nota_area, 'desempeno_area': desempeno_nombre})
 
                 if desempeno_nombre:
@@ -149,27 +174,92 @@ def get_datos_boletin_curso(colegio, curso, periodo, estudiante_especifico=None)
                     else:
                         datos_area['estado_color_css_class'] = 'desempeno-aprobado'
             
-            if suma_pesos_area_acum > 0:
-                nota_area_acum = (suma_ponderada_area_acum / suma_pesos_area_acum).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                datos_area['nota_final_area_acumulada'] = nota_area_acum
+            datos_area['nota_final_area_acumulada'] = a_decimal(area_acumulada[i][k])
 
             if datos_area['materias']:
                 datos_estudiante['areas'].append(datos_area)
 
-        if datos_estudiante['total_ih'] > 0:
-            promedio = suma_ponderada_periodo / datos_estudiante['total_ih']
-            datos_estudiante['promedio_general'] = promedio.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        
         datos_completos_estudiantes.append(datos_estudiante)
 
     if not estudiante_especifico:
-        datos_completos_estudiantes.sort(key=lambda e: e['promedio_general'], reverse=True)
-        for i, estudiante_data in enumerate(datos_completos_estudiantes):
-            estudiante_data['puesto'] = i + 1
-        datos_completos_estudiantes.sort(key=lambda e: (e['estudiante'].user.last_name, e['estudiante'].user.first_name))
+        for estudiante_data, puesto in zip(datos_completos_estudiantes, puestos([e['promedio_general'] for e in datos_completos_estudiantes])):
+            estudiante_data['puesto'] = puesto
+    elif datos_completos_estudiantes:
+        datos_completos_estudiantes[0]['puesto'] = get_puesto_en_curso(colegio, curso, periodo, estudiante_especifico)
 
     return datos_completos_estudiantes
 
+
+def _asignar_puestos(promedios, ids_ordenados):
+    """
+    Puestos con el mismo criterio de los boletines del curso: mayor promedio
+    primero y, en empate, el orden alfabético (`ids_ordenados`).
+    """
+    return dict(zip(ids_ordenados, puestos([promedios.get(est_id, Decimal('0.0')) for est_id in ids_ordenados])))
+
+
+def _ids_del_curso_ordenados(colegio, curso):
+    return list(Estudiante.objects.filter(curso=curso, colegio=colegio, is_active=True).order_by('user__last_name', 'user__first_name').values_list('id', flat=True))
+
+
+def _ih_materias_con_area(colegio, curso):
+    """Intensidad horaria de las materias del curso que aparecen en el boletín (las que tienen área)."""
+    return dict(asignaciones_con_area(colegio, curso=curso).values_list('materia_id', 'intensidad_horaria_semanal'))
+
+
+def get_puesto_en_curso(colegio, curso, periodo, estudiante):
+    """
+    Puesto de un estudiante en su curso en el boletín de periodo, sin armar el
+    boletín de sus compañeros. Se toma de los resúmenes precalculados
+    (ResumenNotasPeriodo.promedio_general) con una sola consulta que numera
+    el curso con ROW_NUMBER(). Si algún estudiante con notas aún no tiene
+    resumen, se calcula a partir de las definitivas del periodo.
+    """
+    resumen = ResumenNotasPeriodo.objects.filter(estudiante=OuterRef('pk'), periodo=periodo, colegio=colegio)
+    filas = Estudiante.objects.filter(curso=curso, colegio=colegio, is_active=True).annotate(
+        promedio=Coalesce(Subquery(resumen.values('promedio_general')[:1]), Value(Decimal('0.0')), output_field=DecimalField(max_digits=4, decimal_places=2)),
+        tiene_resumen=Exists(resumen),
+        tiene_notas=Exists(Calificacion.objects.filter(estudiante=OuterRef('pk'), periodo=periodo, colegio=colegio, tipo_nota='PROM_PERIODO')),
+        puesto=Window(RowNumber(), order_by=[F('promedio').desc(), F('user__last_name').asc(), F('user__first_name').asc()]),
+    ).values_list('id', 'puesto', 'tiene_resumen', 'tiene_notas')
+
+    puestos = {}
+    for est_id, puesto, tiene_resumen, tiene_notas in filas:
+        if tiene_notas and not tiene_resumen:
+            break
+        puestos[est_id] = puesto
+    else:
+        return puestos.get(estudiante.id)
+
+    ih_por_materia = _ih_materias_con_area(colegio, curso)
+    sumas = defaultdict(lambda: [Decimal('0.0'), 0])
+    for est_id, materia_id, valor in Calificacion.objects.filter(
+        colegio=colegio, estudiante__curso=curso, periodo=periodo, tipo_nota='PROM_PERIODO', materia_id__in=list(ih_por_materia)
+    ).values_list('estudiante_id', 'materia_id', 'valor_nota'):
+        sumas[est_id][0] += Decimal(valor) * ih_por_materia[materia_id]
+        sumas[est_id][1] += ih_por_materia[materia_id]
+
+    promedios = {
+        est_id: (suma / total_ih).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        for est_id, (suma, total_ih) in sumas.items() if total_ih > 0
+    }
+    return _asignar_puestos(promedios, _ids_del_curso_ordenados(colegio, curso)).get(estudiante.id)
+
+
+def get_puesto_final_en_curso(colegio, curso, ano_lectivo, estudiante):
+    """
+    Puesto de un estudiante en el boletín final de su curso. Calcula solo el
+    promedio final de cada compañero (definitivas con nivelación ponderadas
+    por intensidad horaria) con el núcleo de acumulados.
+    """
+    ih_por_materia = _ih_materias_con_area(colegio, curso)
+    ids_ordenados = _ids_del_curso_ordenados(colegio, curso)
+    periodos = list(PeriodoAcademico.objects.filter(colegio=colegio, ano_lectivo=ano_lectivo))
+    calculo = _calcular_acumulado_curso(colegio, ids_ordenados, list(ih_por_materia), [], {}, ih_por_materia, periodos)
+    promedios = [max(valor, 0) for valor in calculo['promedio_ih_acumulado_rec'].tolist()]
+    return dict(zip(ids_ordenados, puestos(promedios))).get(estudiante.id)
+
+
 def get_datos_boletin_final(colegio, curso, ano_lectivo, estudiante_especifico=None):
     try:
         config = ConfiguracionSistema.objects.get(colegio=colegio)
@@ -179,12 +269,9 @@ def get_datos_boletin_final(colegio, curso, ano_lectivo, estudiante_especifico=N
 
     UMBRAL_APROBACION = Decimal('3.0')
 
-    if estudiante_especifico:
-        estudiantes = [estudiante_especifico]
-    else:
-        estudiantes = Estudiante.objects.filter(curso=curso, colegio=colegio, is_active=True).select_related('user').order_by('user__last_name', 'user__first_name')
+    estudiantes = _estudiantes_del_boletin(colegio, curso, estudiante_especifico)
 
-    asignaciones = AsignacionDocente.objects.filter(curso=curso, colegio=colegio).select_related('materia')
+    asignaciones = AsignacionDocente.objects.filter(curso=curso, colegio=colegio).select_related('materia', 'docente__user')
     materias_del_curso_ids = [a.materia_id for a in asignaciones]
     asignaciones_map = {a.materia_id: a for a in asignaciones}
 
@@ -199,106 +286,69 @@ def get_datos_boletin_final(colegio, curso, ano_lectivo, estudiante_especifico=N
 
     sorted_area_ids = sorted(areas_data.keys(), key=lambda k: areas_data[k]['nombre'])
 
-    periodos_del_ano = PeriodoAcademico.objects.filter(ano_lectivo=ano_lectivo, colegio=colegio).order_by('fecha_inicio')
+    periodos_del_ano = list(PeriodoAcademico.objects.filter(ano_lectivo=ano_lectivo, colegio=colegio).order_by('fecha_inicio'))
     nombres_periodos_ordenados = [p.get_nombre_display() for p in periodos_del_ano]
 
-    calificaciones = Calificacion.objects.filter(
-        colegio=colegio, estudiante__in=estudiantes, materia_id__in=materias_del_curso_ids,
-        periodo__in=periodos_del_ano, tipo_nota__in=['PROM_PERIODO', 'NIVELACION']
-    ).values('estudiante_id', 'materia_id', 'periodo_id', 'valor_nota', 'tipo_nota')
+    # Definitivas del año (originales y con nivelación) y notas de área con el núcleo compartido con la sábana.
+    estudiante_ids = [e.id for e in estudiantes]
+    ih_por_materia = {materia_id: asignaciones_map[materia_id].intensidad_horaria_semanal for area_id in sorted_area_ids for materia_id in areas_data[area_id]['materias']}
+    pesos_por_par = {(area_id, materia_id): peso for area_id in sorted_area_ids for materia_id, peso in areas_data[area_id]['pesos'].items()}
+    calculo = _calcular_acumulado_curso(colegio, estudiante_ids, materias_del_curso_ids, sorted_area_ids, pesos_por_par, ih_por_materia, periodos_del_ano)
+    prom, niv = calculo['tensor']
+    prom, niv = prom.tolist(), niv.tolist()
+    definitivas_orig, definitivas_rec = calculo['materia_acumulada'].tolist(), calculo['materia_acumulada_rec'].tolist()
+    notas_area, promedios_finales = calculo['area_acumulada_rec'].tolist(), calculo['promedio_ih_acumulado_rec'].tolist()
+    indice_materia = {materia_id: j for j, materia_id in enumerate(materias_del_curso_ids)}
 
-    calificaciones_pivot = defaultdict(lambda: defaultdict(dict))
-    for cal in calificaciones:
-        key = (cal['estudiante_id'], cal['materia_id'])
-        period_key = cal['periodo_id']
-        if cal['tipo_nota'] == 'PROM_PERIODO':
-            calificaciones_pivot[key][period_key]['prom'] = cal['valor_nota']
-        elif cal['tipo_nota'] == 'NIVELACION':
-            calificaciones_pivot[key][period_key]['niv'] = cal['valor_nota']
+    valorar = get_escala_compilada(colegio).valoracion
 
     boletines_finales = []
-    for estudiante in estudiantes:
+    for i, estudiante in enumerate(estudiantes):
         datos_estudiante = {
-            'estudiante': estudiante, 'areas': [],
+            'estudiante': estudiante, 'identificacion': _identificacion(estudiante), 'areas': [],
             'rendimiento_final_areas': defaultdict(int),
             'areas_reprobadas': 0,
             'detalle_areas_reprobadas': {},
             'promedio_general_final': Decimal('0.0')
         }
-        suma_ponderada_final = Decimal('0.0')
-        total_ih_anual = 0
 
-        for area_id in sorted_area_ids:
+        for k, area_id in enumerate(sorted_area_ids):
             area_info = areas_data[area_id]
             datos_area_actual = {'nombre': area_info['nombre'], 'materias': [], 'nota_final_area': None, 'desempeno_area': '', 'estado_color_css_class': ''}
-            suma_ponderada_area = Decimal('0.0')
-            suma_pesos_area = Decimal('0.0')
             materias_reprobadas_en_area = []
 
             for materia_id in area_info['materias']:
                 asignacion = asignaciones_map.get(materia_id)
                 if not asignacion: continue
+                j = indice_materia[materia_id]
 
-                ih = asignacion.intensidad_horaria_semanal
-                
                 notas_periodos_display = {}
-                notas_para_calculo_orig = []
-                notas_para_calculo_rec = []
-
-                for p in periodos_del_ano:
-                    cal_data = calificaciones_pivot.get((estudiante.id, materia_id), {}).get(p.id, {})
-                    nota_orig = cal_data.get('prom')
-                    nota_rec = cal_data.get('niv')
-                    
+                for p, periodo in enumerate(periodos_del_ano):
+                    nota_orig, nota_rec = a_decimal(prom[i][j][p], 2), a_decimal(niv[i][j][p], 2)
                     display_str = f"{nota_orig}" if nota_orig is not None else "-"
                     if nota_rec is not None:
                         display_str += f" ({nota_rec})"
-                    notas_periodos_display[p.get_nombre_display()] = display_str
-
-                    if nota_orig is not None:
-                        notas_para_calculo_orig.append(Decimal(nota_orig))
-                    
-                    nota_final_periodo = nota_rec or nota_orig
-                    if nota_final_periodo is not None:
-                        notas_para_calculo_rec.append(Decimal(nota_final_periodo))
-
-                definitiva_materia_orig = (sum(notas_para_calculo_orig) / len(notas_para_calculo_orig)) if notas_para_calculo_orig else None
-                definitiva_materia_rec = (sum(notas_para_calculo_rec) / len(notas_para_calculo_rec)) if notas_para_calculo_rec else None
-                
-                if definitiva_materia_orig is not None:
-                    definitiva_materia_orig = definitiva_materia_orig.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                if definitiva_materia_rec is not None:
-                    definitiva_materia_rec = definitiva_materia_rec.quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                
-                definitiva_para_calculo_area = definitiva_materia_rec
-
-                if definitiva_para_calculo_area is not None:
-                    suma_ponderada_final += (definitiva_para_calculo_area * ih)
-                    total_ih_anual += ih
-
-                    if definitiva_para_calculo_area < UMBRAL_APROBACION:
-                        materias_reprobadas_en_area.append(asignacion.materia.nombre)
-
-                    peso = area_info['pesos'].get(materia_id)
-                    if peso is not None:
-                        suma_ponderada_area += (definitiva_para_calculo_area * peso)
-                        suma_pesos_area += peso
-
-                valoracion = _get_valoracion(colegio, definitiva_para_calculo_area)
+                    notas_periodos_display[periodo.get_nombre_display()] = display_str
+
+                definitiva_materia_orig = a_decimal(definitivas_orig[i][j])
+                definitiva_materia_rec = a_decimal(definitivas_rec[i][j])
+
+                if definitiva_materia_rec is not None and definitiva_materia_rec < UMBRAL_APROBACION:
+                    materias_reprobadas_en_area.append(asignacion.materia.nombre)
 
                 datos_area_actual['materias'].append({
                     'nombre': asignacion.materia.nombre,
                     'docente': asignacion.docente,
-                    'ih': ih,
+                    'ih': asignacion.intensidad_horaria_semanal,
                     'notas_periodos': notas_periodos_display,
                     'definitiva_original': definitiva_materia_orig,
                     'definitiva_recuperada': definitiva_materia_rec if definitiva_materia_rec != definitiva_materia_orig else None,
-                    'valoracion': valoracion,
+                    'valoracion': valorar(definitiva_materia_rec),
                 })
 
-            if suma_pesos_area > 0:
-                nota_area = (suma_ponderada_area / suma_pesos_area).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                desempeno_nombre = _get_valoracion(colegio, nota_area)
+            nota_area = a_decimal(notas_area[i][k])
+            if nota_area is not None:
+                desempeno_nombre = valorar(nota_area)
                 datos_area_actual['nota_final_area'] = nota_area
                 datos_area_actual['desempeno_area'] = desempeno_nombre
 
@@ -314,7 +364,7 @@ def get_datos_boletin_final(colegio, curso, ano_lectivo, estudiante_especifico=N
             if datos_area_actual['materias']:
                 datos_estudiante['areas'].append(datos_area_actual)
 
-        promedio_general_final = (suma_ponderada_final / total_ih_anual).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if total_ih_anual > 0 else Decimal('0.0')
+        promedio_general_final = a_decimal(promedios_finales[i], 2) or Decimal('0.0')
 
         estado_promocion = "PROMOVIDO" if datos_estudiante['areas_reprobadas'] <= max_areas_reprobadas else "NO PROMOVIDO"
 
@@ -326,9 +376,9 @@ def get_datos_boletin_final(colegio, curso, ano_lectivo, estudiante_especifico=N
         boletines_finales.append(datos_estudiante)
 
     if not estudiante_especifico:
-        boletines_finales.sort(key=lambda e: e['promedio_general_final'], reverse=True)
-        for i, data in enumerate(boletines_finales):
-            data['puesto_final'] = i + 1
-        boletines_finales.sort(key=lambda e: (e['estudiante'].user.last_name, e['estudiante'].user.first_name))
+        for data, puesto in zip(boletines_finales, puestos([e['promedio_general_final'] for e in boletines_finales])):
+            data['puesto_final'] = puesto
+    elif boletines_finales:
+        boletines_finales[0]['puesto_final'] = get_puesto_final_en_curso(colegio, curso, ano_lectivo, estudiante_especifico)
 
     return boletines_finales, nombres_periodos_ordenados
@@ -0,0 +1,186 @@
+# notas/boletin/lote.py
+# Boletines de todos los cursos de un colegio en un solo paso (cierre de
+# periodo). Cada curso se renderiza en un proceso de un grupo de procesos, de
+# modo que el lote ocupa todos los núcleos de la máquina sin servicios
+# externos. Cada PDF queda en un directorio y al final se empaquetan en un ZIP.
+#
+# Los boletines que ya están en la caché de reportes con los datos actuales se
+# copian sin renderizar, y los que se renderizan quedan en la caché para la
+# vista `generar_boletin_vista` y el comando `precalentar_boletines`. Al
+# publicar un periodo se encola su lote (`precalentar_periodo`), así la caché
+# queda lista antes de que lleguen las descargas.
+
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from ..models import Colegio, Curso, TrabajoReporte
+from ..reportes.cache_artefactos import abrir_artefacto, copiar_a_cache
+from ..reportes.cola_pdf import latido
+from ..reportes.motor_pdf import renderizar_pdf
+from .documento import preparar_boletin, identificar_reporte, clave_cache_boletin, BoletinNoDisponible
+
+
+def _inicializar_proceso():
+    # Con el método 'spawn' (Windows, macOS) el proceso hijo arranca sin Django configurado.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    # Cada proceso abre su propia conexión; la heredada del padre no se comparte.
+    connections.close_all()
+
+
+def cursos_del_lote(colegio):
+    """Cursos del colegio, los de más estudiantes primero para repartir mejor la carga entre procesos."""
+    return list(
+        Curso.objects.filter(colegio=colegio)
+        .annotate(num_estudiantes=Count('estudiante', filter=Q(estudiante__is_active=True)))
+        .order_by('-num_estudiantes', 'nombre')
+    )
+
+
+def generar_boletin_curso(colegio_id, curso_id, reporte_id, directorio, base_url=None):
+    """
+    Escribe en `directorio` el boletín de un curso y devuelve su resultado:
+    {'curso', 'archivo', 'segundos', 'desde_cache', 'error'}. Recibe ids para
+    poder ejecutarse en otro proceso; los errores se devuelven, no se lanzan.
+    """
+    inicio = time.perf_counter()
+    colegio = Colegio.objects.get(id=colegio_id)
+    curso = Curso.objects.get(id=curso_id, colegio=colegio)
+    resultado = {'curso': curso.nombre, 'archivo': None, 'segundos': 0.0, 'desde_cache': False, 'error': ''}
+    try:
+        ano_lectivo, nombre_archivo = identificar_reporte(colegio, curso, reporte_id)
+        if ano_lectivo is None:
+            raise BoletinNoDisponible("Error: El periodo seleccionado no es válido.")
+        ruta = os.path.join(directorio, nombre_archivo)
+        clave = clave_cache_boletin(colegio, curso, reporte_id, ano_lectivo)
+
+        en_cache = abrir_artefacto(clave, 'pdf')
+        if en_cache is not None:
+            with en_cache, open(ruta, 'wb') as destino:
+                shutil.copyfileobj(en_cache, destino)
+            resultado['desde_cache'] = True
+        else:
+            template_path, context, _ = preparar_boletin(colegio, curso, reporte_id)
+            renderizar_pdf(render_to_string(template_path, context), base_url=base_url, target=ruta)
+            copiar_a_cache(clave, 'pdf', ruta)
+        resultado['archivo'] = nombre_archivo
+    except BoletinNoDisponible as e:
+        resultado['error'] = e.mensaje
+    except Exception as e:
+        resultado['error'] = str(e)
+    resultado['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resultado
+
+
+def generar_boletines_colegio(colegio, reporte_id, directorio, procesos=None, base_url=None, progreso=None):
+    """
+    Genera en `directorio` el boletín de periodo (`reporte_id` = id del
+    periodo) o final ('FINAL_<año>') de cada curso del colegio y los empaqueta
+    en `directorio`/boletines.zip. Después de cada curso llama a
+    progreso(resultado, terminados, total). Devuelve (ruta del ZIP, lista de
+    resultados por curso). Con procesos=1 todo se hace en este proceso.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    cursos = cursos_del_lote(colegio)
+    tareas = [(colegio.id, curso.id, str(reporte_id), directorio, base_url) for curso in cursos]
+    procesos = min(procesos or os.cpu_count() or 1, max(len(tareas), 1))
+
+    resultados = []
+
+    def registrar(resultado):
+        resultados.append(resultado)
+        if progreso:
+            progreso(resultado, len(resultados), len(tareas))
+
+    if procesos > 1:
+        # Los procesos hijos no deben heredar la conexión abierta del padre.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as grupo:
+            futuros = [grupo.submit(generar_boletin_curso, *tarea) for tarea in tareas]
+            for futuro in as_completed(futuros):
+                registrar(futuro.result())
+    else:
+        for tarea in tareas:
+            registrar(generar_boletin_curso(*tarea))
+
+    # Los PDF ya vienen comprimidos: guardarlos sin volver a comprimir ahorra tiempo sin aumentar el tamaño.
+    ruta_zip = os.path.join(directorio, 'boletines.zip')
+    orden = {curso.nombre: i for i, curso in enumerate(sorted(cursos, key=lambda c: c.nombre))}
+    with zipfile.ZipFile(ruta_zip, 'w', compression=zipfile.ZIP_STORED) as paquete:
+        for resultado in sorted(resultados, key=lambda r: orden[r['curso']]):
+            if resultado['archivo']:
+                paquete.write(os.path.join(directorio, resultado['archivo']), arcname=resultado['archivo'])
+    return ruta_zip, resultados
+
+
+# --- Lotes encolados desde el admin (TrabajoReporte de tipo BOLETINES_LOTE) ---
+
+def encolar_lote(colegio, usuario, reporte_id, nombre_archivo):
+    return TrabajoReporte.objects.create(
+        colegio=colegio, usuario=usuario, tipo='BOLETINES_LOTE', nombre_archivo=nombre_archivo,
+        parametros={'reporte_id': str(reporte_id)},
+    )
+
+
+def precalentar_periodo(periodo, usuario):
+    """
+    Encola el lote de boletines de un periodo recién publicado, para que los
+    estudiantes y acudientes los descarguen de la caché en lugar de esperar el
+    renderizado. Si ya hay un lote pendiente del mismo periodo no se repite y
+    se devuelve None.
+    """
+    reporte_id = str(periodo.id)
+    if TrabajoReporte.objects.filter(
+        colegio=periodo.colegio, tipo='BOLETINES_LOTE', estado__in=['PENDIENTE', 'PROCESANDO'],
+        parametros__reporte_id=reporte_id,
+    ).exists():
+        return None
+    nombre_archivo = f"boletines_{periodo.colegio.slug}_{periodo.get_nombre_display()}_{periodo.ano_lectivo}.zip"
+    return encolar_lote(periodo.colegio, usuario, reporte_id, nombre_archivo)
+
+
+def procesar_lote(trabajo, procesos=None):
+    """
+    Genera el ZIP de un lote ya reclamado. El resumen por curso se guarda a
+    medida que termina cada curso, así la página de estado muestra el avance.
+    """
+    directorio = os.path.join(settings.REPORTES_GENERADOS_DIR, str(trabajo.colegio_id), f"lote_{trabajo.id}")
+
+    def progreso(resultado, terminados, total):
+        trabajo.resumen.append(resultado)
+        TrabajoReporte.objects.filter(id=trabajo.id).update(resumen=trabajo.resumen)
+
+    trabajo.resumen = []
+    trabajo.parametros['total'] = Curso.objects.filter(colegio_id=trabajo.colegio_id).count()
+    TrabajoReporte.objects.filter(id=trabajo.id).update(resumen=[], parametros=trabajo.parametros)
+    try:
+        with latido(trabajo):
+            ruta_zip, resultados = generar_boletines_colegio(
+                trabajo.colegio, trabajo.parametros.get('reporte_id'), directorio,
+                procesos=procesos, base_url=trabajo.base_url, progreso=progreso,
+            )
+        ruta_relativa = os.path.join(str(trabajo.colegio_id), f"{trabajo.id}.zip")
+        os.replace(ruta_zip, os.path.join(settings.REPORTES_GENERADOS_DIR, ruta_relativa))
+    except Exception as e:
+        TrabajoReporte.objects.filter(id=trabajo.id).update(estado='ERROR', error=str(e), fecha_fin=timezone.now())
+        return False
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    errores = [f"{r['curso']}: {r['error']}" for r in resultados if r['error']]
+    TrabajoReporte.objects.filter(id=trabajo.id).update(
+        estado='TERMINADO', ruta_archivo=ruta_relativa, error='\n'.join(errores), fecha_fin=timezone.now()
+    )
+    return True
+
@@ -1,26 +1,27 @@
 # notas/context_processors.py
-from .models import Notificacion
+from django.utils.functional import SimpleLazyObject
+
+from .utils.notificaciones import contar_no_leidas, obtener_destacadas
+
+# Los valores de las notificaciones son perezosos: solo se calculan (desde la
+# caché o con una consulta) si la plantilla los usa.
 
 def contador_notificaciones(request):
     """
     Devuelve la cantidad de notificaciones no leídas para el usuario autenticado.
     Se incluye en el contexto de todas las plantillas que extienden base.html.
     """
-    if request.user.is_authenticated:
-        no_leidas = Notificacion.objects.filter(destinatario=request.user, leido=False).count()
-    else:
-        no_leidas = 0
-    return {'contador_notificaciones_no_leidas': no_leidas}
+    def calcular():
+        return contar_no_leidas(request.user.id) if request.user.is_authenticated else 0
+    return {'contador_notificaciones_no_leidas': SimpleLazyObject(calcular)}
 
 def notificaciones_destacadas(request):
     """
     Devuelve las notificaciones más importantes no leídas para el usuario.
     """
-    if request.user.is_authenticated:
-        return {
-            'notificaciones_destacadas': Notificacion.objects.filter(destinatario=request.user, leido=False, tipo__in=['OBSERVADOR', 'RENDIMIENTO'])[:1]
-        }
-    return {'notificaciones_destacadas': []}
+    def calcular():
+        return obtener_destacadas(request.user.id) if request.user.is_authenticated else []
+    return {'notificaciones_destacadas': SimpleLazyObject(calcular)}
 
 def colegio_context(request):
     """
@@ -1,16 +1,22 @@
 # Este archivo contiene toda la lógica para el panel de estadísticas,
 # unificando la lógica de cálculo de los boletines con las necesidades de las gráficas.
 
+import hashlib
+import json
 from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
-from django.db.models import Avg, Count, Case, When
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Case, When, Exists, F, Max, OuterRef, Q, Sum, Value
+from django.utils.functional import cached_property
 
 # Se usa un solo punto (.) porque este archivo y 'models.py' están en la misma carpeta ('notas/').
 from .models import (
-    Estudiante, Calificacion, AsignacionDocente, AreaConocimiento, Materia,
-    PeriodoAcademico, PonderacionAreaMateria, EscalaValoracion, Curso
+    Estudiante, Calificacion, AsignacionDocente,
+    PeriodoAcademico, PonderacionAreaMateria, Curso, ResumenNotasPeriodo, Docente
 )
-import statistics
+from .utils.escala_valoracion import get_escala_compilada
+import numpy as np
 import random
 
 # ===================================================================
@@ -19,22 +25,48 @@ import random
 
 def _get_escala_valoracion(colegio):
     """Obtiene la escala de valoración configurada para el colegio o una por defecto."""
-    escala = EscalaValoracion.objects.filter(colegio=colegio).order_by('valor_minimo')
-    if escala.exists():
-        colores_default = [
-            '#dc3545', '#ffc107', '#198754', '#0d6efd'
-        ]
-        return [{'nombre': e.nombre_desempeno, 'min': e.valor_minimo, 'max': e.valor_maximo, 'color': colores_default[i % len(colores_default)]} for i, e in enumerate(escala)]
+    return get_escala_compilada(colegio).niveles()
+
+# Las notas tienen dos decimales y los pesos también, así que los cálculos se
+# hacen con matrices de enteros (centésimas) y el redondeo ROUND_HALF_UP se
+# resuelve con división entera: el resultado es idéntico al de Decimal.
+
+def _centesimas(valores):
+    """Convierte notas Decimal (hasta dos decimales) en un arreglo de enteros en centésimas."""
+    return np.fromiter((int(v * 100) for v in valores), dtype=np.int64)
+
+def _dividir_redondeando(numerador, denominador):
+    """Cociente entero redondeado hacia arriba en el medio (ROUND_HALF_UP) para valores no negativos."""
+    denominador = np.maximum(denominador, 1)
+    return (2 * numerador + denominador) // (2 * denominador)
+
+def _contar_por_nivel(centesimas, escala):
+    """Cantidad de notas (en centésimas) dentro de cada nivel de la escala, con los extremos incluidos."""
     return [
-        {'nombre': 'BAJO', 'min': Decimal('1.0'), 'max': Decimal('2.9'), 'color': '#dc3545'},
-        {'nombre': 'BASICO', 'min': Decimal('3.0'), 'max': Decimal('3.9'), 'color': '#ffc107'},
-        {'nombre': 'ALTO', 'min': Decimal('4.0'), 'max': Decimal('4.5'), 'color': '#198754'},
-        {'nombre': 'SUPERIOR', 'min': Decimal('4.6'), 'max': Decimal('5.0'), 'color': '#0d6efd'}
+        int(np.count_nonzero((centesimas >= int(nivel['min'] * 100)) & (centesimas <= int(nivel['max'] * 100))))
+        for nivel in escala
     ]
 
+def _distribucion(centesimas, escala, con_color=False):
+    total = centesimas.size
+    distribucion = []
+    for nivel, total_nivel in zip(escala, _contar_por_nivel(centesimas, escala)):
+        item = {'nombre': nivel['nombre'], 'total': total_nivel}
+        if con_color:
+            item['color'] = nivel['color']
+        item['porcentaje'] = (total_nivel / total * 100) if total > 0 else 0
+        distribucion.append(item)
+    return distribucion
+
+def _promedio_exacto(suma_centesimas, cantidad, escala=100):
+    """Promedio como float, calculado igual que sum(Decimal) / cantidad."""
+    return float(Decimal(int(suma_centesimas)) / Decimal(escala * int(cantidad)))
+
 def _get_rendimiento_estudiantes_bulk(filtros):
     """
-    Función principal y optimizada que calcula el rendimiento de un grupo de estudiantes.
+    Calcula el rendimiento (promedio por área y general) de un grupo de
+    estudiantes con una matriz estudiante × materia de notas y una matriz
+    materia × área de pesos.
     """
     colegio = filtros.get('colegio')
 
@@ -42,10 +74,16 @@ def _get_rendimiento_estudiantes_bulk(filtros):
     if filtros.get('curso_ids'):
         estudiantes_qs = estudiantes_qs.filter(curso_id__in=filtros['curso_ids'])
 
-    if not estudiantes_qs.exists():
+    estudiantes = list(estudiantes_qs.select_related('user', 'curso'))
+    if not estudiantes:
         return {}
 
-    estudiante_ids = list(estudiantes_qs.values_list('id', flat=True))
+    estudiante_ids = [e.id for e in estudiantes]
+
+    if filtros.get('periodo_id'):
+        resultados = _get_rendimiento_desde_resumenes(colegio, estudiantes, estudiante_ids, filtros['periodo_id'])
+        if resultados is not None:
+            return resultados
 
     calificaciones_filter = {
         'colegio': colegio,
@@ -57,89 +95,186 @@ def _get_rendimiento_estudiantes_bulk(filtros):
     elif filtros.get('ano_lectivo'):
         calificaciones_filter['periodo__ano_lectivo'] = filtros['ano_lectivo']
 
-    calificaciones_qs = Calificacion.objects.filter(**calificaciones_filter)
-    calificaciones_map = {(c.estudiante_id, c.materia_id): c.valor_nota for c in calificaciones_qs}
+    # Si hay varias notas de la misma materia (varios periodos) queda la última, como antes.
+    calificaciones_map = {
+        (estudiante_id, materia_id): valor
+        for estudiante_id, materia_id, valor in Calificacion.objects.filter(**calificaciones_filter).values_list('estudiante_id', 'materia_id', 'valor_nota')
+    }
 
-    ponderaciones_qs = PonderacionAreaMateria.objects.filter(colegio=colegio).select_related('area')
-    ponderaciones_map = defaultdict(list)
-    areas_info = {}
-    for p in ponderaciones_qs:
-        ponderaciones_map[p.area_id].append({'materia_id': p.materia_id, 'peso': p.peso_porcentual})
-        if p.area_id not in areas_info:
-            areas_info[p.area_id] = p.area.nombre
+    ponderaciones = list(PonderacionAreaMateria.objects.filter(colegio=colegio).values_list('area_id', 'area__nombre', 'materia_id', 'peso_porcentual'))
+    indice_area = {}
+    nombres_areas = []
+    for area_id, area_nombre, _, _ in ponderaciones:
+        if area_id not in indice_area:
+            indice_area[area_id] = len(nombres_areas)
+            nombres_areas.append(area_nombre)
+    indice_materia = {materia_id: j for j, materia_id in enumerate(dict.fromkeys(p[2] for p in ponderaciones))}
+    indice_estudiante = {estudiante_id: i for i, estudiante_id in enumerate(estudiante_ids)}
+
+    pesos = np.zeros((len(indice_materia), len(indice_area)), dtype=np.int64)
+    for area_id, _, materia_id, peso in ponderaciones:
+        pesos[indice_materia[materia_id], indice_area[area_id]] += int(peso * 100)
+
+    notas = np.zeros((len(estudiantes), len(indice_materia)), dtype=np.int64)
+    tiene_nota = np.zeros(notas.shape, dtype=bool)
+    celdas = [
+        (indice_estudiante[estudiante_id], indice_materia[materia_id], valor)
+        for (estudiante_id, materia_id), valor in calificaciones_map.items() if materia_id in indice_materia
+    ]
+    if celdas:
+        filas, columnas, valores = zip(*celdas)
+        notas[filas, columnas] = _centesimas(valores)
+        tiene_nota[filas, columnas] = True
+
+    # Promedio de área en décimas: Σ(nota·peso) / Σ(pesos con nota), redondeado a 0.1.
+    suma_ponderada = notas @ pesos
+    suma_pesos = tiene_nota.astype(np.int64) @ pesos
+    tiene_area = suma_pesos > 0
+    decimas_area = np.where(tiene_area, _dividir_redondeando(suma_ponderada, suma_pesos * 10), 0)
+
+    # Promedio general en centésimas: media de los promedios de área, redondeada a 0.01.
+    cantidad_areas = tiene_area.sum(axis=1)
+    centesimas_general = np.where(cantidad_areas > 0, _dividir_redondeando(decimas_area.sum(axis=1) * 10, cantidad_areas), 0)
 
     resultados_finales = {}
-    for estudiante in estudiantes_qs.select_related('user', 'curso'):
-        promedios_area = {}
-        for area_id, materias_ponderadas in ponderaciones_map.items():
-            suma_ponderada_area = Decimal('0.0')
-            suma_pesos_area = Decimal('0.0')
-
-            for p_info in materias_ponderadas:
-                nota = calificaciones_map.get((estudiante.id, p_info['materia_id']))
-                if nota is not None:
-                    suma_ponderada_area += (nota * p_info['peso'])
-                    suma_pesos_area += p_info['peso']
-
-            if suma_pesos_area > 0:
-                promedio_area = (suma_ponderada_area / suma_pesos_area).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
-                promedios_area[areas_info[area_id]] = promedio_area
-
-        promedio_general = Decimal('0.0')
-        if promedios_area:
-            promedio_general = (sum(promedios_area.values()) / Decimal(len(promedios_area))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    for i, estudiante in enumerate(estudiantes):
+        promedios_area = {nombres_areas[j]: Decimal(int(decimas_area[i, j])).scaleb(-1) for j in np.flatnonzero(tiene_area[i])}
+        resultados_finales[estudiante.id] = {
+            'estudiante': estudiante,
+            'promedio_general': Decimal(int(centesimas_general[i])).scaleb(-2) if cantidad_areas[i] else Decimal('0.0'),
+            'promedios_area': promedios_area
+        }
+
+    return resultados_finales
 
+def _get_rendimiento_desde_resumenes(colegio, estudiantes, estudiante_ids, periodo_id):
+    """
+    Lee el rendimiento de un periodo desde ResumenNotasPeriodo. Devuelve None si
+    algún estudiante con notas en el periodo aún no tiene resumen, para que se
+    recalcule desde las calificaciones.
+    """
+    resumenes = {
+        r.estudiante_id: r for r in ResumenNotasPeriodo.objects.filter(
+            colegio=colegio, periodo_id=periodo_id, estudiante_id__in=estudiante_ids
+        )
+    }
+    con_notas = set(Calificacion.objects.filter(
+        colegio=colegio, periodo_id=periodo_id, estudiante_id__in=estudiante_ids, tipo_nota='PROM_PERIODO'
+    ).values_list('estudiante_id', flat=True).distinct())
+    if not con_notas.issubset(resumenes.keys()):
+        return None
+
+    resultados_finales = {}
+    for estudiante in estudiantes:
+        resumen = resumenes.get(estudiante.id)
+        promedios_area = {nombre: Decimal(valor) for nombre, valor in resumen.promedios_area.items()} if resumen else {}
+        promedio_general = resumen.promedio_areas if resumen and resumen.promedio_areas is not None else Decimal('0.0')
         resultados_finales[estudiante.id] = {
             'estudiante': estudiante,
             'promedio_general': promedio_general,
             'promedios_area': promedios_area
         }
-
     return resultados_finales
 
 # ===================================================================
 # FUNCIONES PÚBLICAS PARA LAS ESTADÍSTICAS
 # ===================================================================
 
-_cache_rendimiento = {}
+# Los resultados de `_get_rendimiento_estudiantes_bulk` se guardan en la caché
+# 'estadisticas' de Django (en disco por defecto, compartida por los workers de
+# gunicorn). La clave incluye un sello de las notas del colegio, así que un
+# cambio en las calificaciones nunca sirve un resultado viejo; el TTL y el
+# máximo de entradas se configuran en settings.CACHES.
 
-def _get_datos_rendimiento_cached(filtros):
-    """Función interna para usar una caché por petición y no recalcular."""
-    items_for_key = []
-    for key, value in filtros.items():
-        if isinstance(value, list):
-            items_for_key.append((key, tuple(sorted(value))))
-        else:
-            items_for_key.append((key, value))
+CACHE_ESTADISTICAS = 'estadisticas'
+VERSION_CALCULO = 1
+_CLAVE_ACIERTOS = 'estadisticas:aciertos'
+_CLAVE_FALLOS = 'estadisticas:fallos'
+
+def _cache_estadisticas():
+    return caches[CACHE_ESTADISTICAS] if CACHE_ESTADISTICAS in settings.CACHES else caches['default']
 
-    cache_key = tuple(sorted(items_for_key, key=lambda x: str(x[0])))
+def sello_calificaciones(colegio):
+    """
+    Huella de los datos de los que dependen las estadísticas de un colegio:
+    las definitivas de periodo, las ponderaciones y los estudiantes activos.
+    """
+    notas = Calificacion.objects.filter(colegio=colegio, tipo_nota='PROM_PERIODO').aggregate(
+        n=Count('id'), m=Max('id'), s=Sum(F('valor_nota') * F('id'))
+    )
+    ponderaciones = PonderacionAreaMateria.objects.filter(colegio=colegio).aggregate(n=Count('id'), s=Sum(F('peso_porcentual') * F('id')))
+    estudiantes = Estudiante.objects.filter(curso__colegio=colegio, is_active=True).aggregate(n=Count('id'), s=Sum(F('curso_id') * F('id')))
+    datos = [notas, ponderaciones, estudiantes]
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+
+def _clave_rendimiento(filtros):
+    colegio = filtros.get('colegio')
+    parametros = {
+        'colegio_id': getattr(colegio, 'pk', colegio),
+        'curso_ids': sorted(str(c) for c in filtros.get('curso_ids') or []),
+        'periodo_id': str(filtros.get('periodo_id') or ''),
+        'ano_lectivo': str(filtros.get('ano_lectivo') or ''),
+        'sello': sello_calificaciones(colegio),
+        'version': VERSION_CALCULO,
+    }
+    return 'estadisticas:rendimiento:' + hashlib.sha256(json.dumps(parametros, sort_keys=True).encode()).hexdigest()
+
+def _contar(clave):
+    cache_estadisticas = _cache_estadisticas()
+    cache_estadisticas.add(clave, 0, timeout=None)
+    try:
+        cache_estadisticas.incr(clave)
+    except ValueError:
+        # La caché descartó el contador entre el add y el incr.
+        cache_estadisticas.set(clave, 1, timeout=None)
+
+def info_cache_rendimiento():
+    """Aciertos y fallos acumulados de la caché de estadísticas (compartidos entre procesos)."""
+    valores = _cache_estadisticas().get_many([_CLAVE_ACIERTOS, _CLAVE_FALLOS])
+    return {'aciertos': valores.get(_CLAVE_ACIERTOS, 0), 'fallos': valores.get(_CLAVE_FALLOS, 0)}
 
-    if cache_key not in _cache_rendimiento:
-        _cache_rendimiento[cache_key] = _get_rendimiento_estudiantes_bulk(filtros)
-    return _cache_rendimiento[cache_key]
+def _get_datos_rendimiento_cached(filtros):
+    """Rendimiento de los estudiantes que cumplen los filtros, desde la caché si los datos no cambiaron."""
+    clave = _clave_rendimiento(filtros)
+    cache_estadisticas = _cache_estadisticas()
+    resultado = cache_estadisticas.get(clave)
+    if resultado is not None:
+        _contar(_CLAVE_ACIERTOS)
+        return resultado
+
+    _contar(_CLAVE_FALLOS)
+    resultado = _get_rendimiento_estudiantes_bulk(filtros)
+    cache_estadisticas.set(clave, resultado)
+    return resultado
+
+def _matriz_areas(datos_rendimiento):
+    """
+    Matriz estudiante × área (en décimas) de los promedios por área, con una
+    máscara de los estudiantes que tienen promedio en cada área.
+    """
+    nombres = sorted({nombre for data in datos_rendimiento.values() for nombre in data['promedios_area']})
+    columna = {nombre: j for j, nombre in enumerate(nombres)}
+    decimas = np.zeros((len(datos_rendimiento), len(nombres)), dtype=np.int64)
+    presente = np.zeros(decimas.shape, dtype=bool)
+    for i, data in enumerate(datos_rendimiento.values()):
+        for nombre, promedio in data['promedios_area'].items():
+            decimas[i, columna[nombre]] = int(promedio * 10)
+            presente[i, columna[nombre]] = True
+    return nombres, decimas, presente
 
 def get_rendimiento_general(filtros=None):
     if filtros is None: filtros = {}
     datos_rendimiento_crudo = _get_datos_rendimiento_cached(filtros)
 
-    promedios_finales = [data['promedio_general'] for data in datos_rendimiento_crudo.values() if data['promedio_general'] > 0]
-    total_estudiantes = len(promedios_finales)
+    centesimas = _centesimas(data['promedio_general'] for data in datos_rendimiento_crudo.values())
+    centesimas = centesimas[centesimas > 0]
 
     escala = _get_escala_valoracion(filtros.get('colegio'))
-    distribucion = []
-    for nivel in escala:
-        total_nivel = sum(1 for p in promedios_finales if nivel['min'] <= p <= nivel['max'])
-        porcentaje = (total_nivel / total_estudiantes * 100) if total_estudiantes > 0 else 0
-        distribucion.append({
-            'nombre': nivel['nombre'],
-            'total': total_nivel,
-            'color': nivel['color'],
-            'porcentaje': porcentaje
-        })
+    distribucion = _distribucion(centesimas, escala, con_color=True)
 
-    promedios_as_floats = [float(p) for p in promedios_finales]
-    promedio_general_grupo = statistics.mean(promedios_as_floats) if promedios_as_floats else 0.0
-    desviacion_estandar = statistics.stdev(promedios_as_floats) if len(promedios_as_floats) > 1 else 0.0
+    promedios = centesimas / 100
+    promedio_general_grupo = float(promedios.mean()) if promedios.size else 0.0
+    desviacion_estandar = float(promedios.std(ddof=1)) if promedios.size > 1 else 0.0
 
     return {
         'distribucion': distribucion,
@@ -153,64 +288,48 @@ def get_distribucion_por_area(filtros=None):
     if not datos_crudo: return []
 
     escala = _get_escala_valoracion(filtros.get('colegio'))
-    promedios_por_area = defaultdict(list)
+    nombres, decimas, presente = _matriz_areas(datos_crudo)
 
-    for data in datos_crudo.values():
-        for area_nombre, promedio in data.get('promedios_area', {}).items():
-            if promedio > 0:
-                promedios_por_area[area_nombre].append(promedio)
-    
     resultado_final = []
-    for area_nombre, promedios in sorted(promedios_por_area.items()):
-        total_estudiantes_area = len(promedios)
-        if total_estudiantes_area == 0: continue
-
-        distribucion_area = []
-        for nivel in escala:
-            total_nivel = sum(1 for p in promedios if nivel['min'] <= p <= nivel['max'])
-            porcentaje = (total_nivel / total_estudiantes_area * 100) if total_estudiantes_area > 0 else 0
-            distribucion_area.append({
-                'nombre': nivel['nombre'],
-                'total': total_nivel,
-                'porcentaje': porcentaje
-            })
-        
-        promedio_general_area = sum(promedios) / total_estudiantes_area
+    for j, area_nombre in enumerate(nombres):
+        promedios = decimas[presente[:, j] & (decimas[:, j] > 0), j]
+        if promedios.size == 0: continue
+
         resultado_final.append({
             'area_nombre': area_nombre,
-            'promedio': float(promedio_general_area),
-            'total_estudiantes': total_estudiantes_area,
-            'distribucion': distribucion_area
+            'promedio': _promedio_exacto(promedios.sum(), promedios.size, escala=10),
+            'total_estudiantes': int(promedios.size),
+            'distribucion': _distribucion(promedios * 10, escala)
         })
     return resultado_final
 
-def get_distribucion_por_materia(filtros=None):
+def get_distribucion_por_materia(filtros=None, notas=None):
     if filtros is None: filtros = {}
-    base_query = _get_base_query(filtros)
+    notas = _notas_filtradas(filtros, notas)
+    if not len(notas): return []
     escala = _get_escala_valoracion(filtros.get('colegio'))
-    
-    materias_qs = Materia.objects.filter(id__in=base_query.values_list('materia_id', flat=True).distinct()).order_by('nombre')
-    resultado_final = []
 
-    for materia in materias_qs:
-        notas_materia = list(base_query.filter(materia=materia).values_list('valor_nota', flat=True))
-        total_estudiantes_materia = len(notas_materia)
-        if total_estudiantes_materia == 0: continue
-
-        distribucion_materia = []
-        for nivel in escala:
-            total_nivel = sum(1 for nota in notas_materia if nivel['min'] <= nota <= nivel['max'])
-            porcentaje = (total_nivel / total_estudiantes_materia * 100) if total_estudiantes_materia > 0 else 0
-            distribucion_materia.append({
-                'nombre': nivel['nombre'],
-                'total': total_nivel,
-                'porcentaje': porcentaje
-            })
-        
-        promedio_materia = sum(notas_materia) / total_estudiantes_materia
+    ids_unicos, indice = np.unique(notas.materia_ids, return_inverse=True)
+    centesimas = notas.centesimas
+    nombre_por_id = notas.nombre_materia
+
+    totales = np.bincount(indice, minlength=ids_unicos.size)
+    sumas = np.bincount(indice, weights=centesimas, minlength=ids_unicos.size).astype(np.int64)
+    conteos_niveles = [
+        np.bincount(indice, weights=(centesimas >= int(nivel['min'] * 100)) & (centesimas <= int(nivel['max'] * 100)), minlength=ids_unicos.size).astype(np.int64)
+        for nivel in escala
+    ]
+
+    resultado_final = []
+    for k in sorted(range(ids_unicos.size), key=lambda k: (nombre_por_id[ids_unicos[k]], ids_unicos[k])):
+        total_estudiantes_materia = int(totales[k])
+        distribucion_materia = [
+            {'nombre': nivel['nombre'], 'total': int(conteos[k]), 'porcentaje': int(conteos[k]) / total_estudiantes_materia * 100}
+            for nivel, conteos in zip(escala, conteos_niveles)
+        ]
         resultado_final.append({
-            'materia_nombre': materia.nombre,
-            'promedio': float(promedio_materia),
+            'materia_nombre': nombre_por_id[ids_unicos[k]],
+            'promedio': _promedio_exacto(sumas[k], total_estudiantes_materia),
             'total_estudiantes': total_estudiantes_materia,
             'distribucion': distribucion_materia
         })
@@ -221,30 +340,37 @@ def get_cuadro_honor(filtros=None):
     if filtros is None or not filtros.get('curso_ids'): return []
     datos_rendimiento_crudo = _get_datos_rendimiento_cached(filtros)
 
-    ranking = [
-        {'nombre': f"{data['estudiante'].user.first_name} {data['estudiante'].user.last_name}".strip(),
-         'curso': data['estudiante'].curso.nombre,
-         'promedio': float(data['promedio_general'])}
-        for data in datos_rendimiento_crudo.values() if data['promedio_general'] > 0
+    datos = [data for data in datos_rendimiento_crudo.values() if data['promedio_general'] > 0]
+    centesimas = _centesimas(data['promedio_general'] for data in datos)
+    mejores = np.argsort(-centesimas, kind='stable')[:3]
+
+    return [
+        {'puesto': puesto + 1,
+         'nombre': f"{datos[k]['estudiante'].user.first_name} {datos[k]['estudiante'].user.last_name}".strip(),
+         'curso': datos[k]['estudiante'].curso.nombre,
+         'promedio': float(datos[k]['promedio_general'])}
+        for puesto, k in enumerate(mejores)
     ]
-    ranking.sort(key=lambda x: x['promedio'], reverse=True)
-    return [{'puesto': i + 1, **item} for i, item in enumerate(ranking[:3])]
 
 def get_ranking_cursos(filtros=None):
     if filtros is None: filtros = {}
     datos_rendimiento_crudo = _get_datos_rendimiento_cached(filtros)
 
-    promedios_por_curso = defaultdict(list)
-    for data in datos_rendimiento_crudo.values():
-        if data['promedio_general'] > 0:
-            promedios_por_curso[data['estudiante'].curso_id].append(data['promedio_general'])
+    datos = [data for data in datos_rendimiento_crudo.values() if data['promedio_general'] > 0]
+    if not datos:
+        return {}, 0
+    centesimas = _centesimas(data['promedio_general'] for data in datos)
+    curso_ids = np.array([data['estudiante'].curso_id for data in datos])
 
-    ranking_data = [
-        {'curso_id': curso_id, 'promedio': float(sum(promedios) / len(promedios))}
-        for curso_id, promedios in promedios_por_curso.items() if promedios
-    ]
-    ranking_data.sort(key=lambda x: x['promedio'], reverse=True)
-    return {r['curso_id']: i + 1 for i, r in enumerate(ranking_data)}, len(ranking_data)
+    # Cursos en el orden en que aparecen, para desempatar igual que antes.
+    ids_unicos, primera_aparicion, indice = np.unique(curso_ids, return_index=True, return_inverse=True)
+    sumas = np.bincount(indice, weights=centesimas).astype(np.int64)
+    totales = np.bincount(indice)
+    promedios = np.array([_promedio_exacto(suma, total) for suma, total in zip(sumas, totales)])
+
+    en_orden_de_aparicion = np.argsort(primera_aparicion)
+    ranking = en_orden_de_aparicion[np.argsort(-promedios[en_orden_de_aparicion], kind='stable')]
+    return {int(ids_unicos[k]): i + 1 for i, k in enumerate(ranking)}, len(ranking)
 
 # ===================================================================
 # FUNCIONES RESTANTES
@@ -264,39 +390,120 @@ def _get_base_query(filtros):
         base_query = base_query.filter(materia__areas_ponderadas__id=filtros['area_id'])
     return base_query
 
-def get_promedios_por_materia(filtros=None):
-    if filtros is None: filtros = {}
-    base_query = _get_base_query(filtros)
-    promedios = base_query.values('materia__nombre').annotate(promedio=Avg('valor_nota')).order_by('materia__nombre')
-    return [{'materia_nombre': r['materia__nombre'], 'promedio': float(r['promedio'] or 0)} for r in promedios]
+# Las gráficas de notas (promedios y reprobados por materia, docente y área,
+# histograma) salen todas de las mismas definitivas de periodo. NotasFiltradas
+# las lee una vez como arreglos y cada función las agrupa con numpy; la vista
+# del panel crea una sola instancia y la pasa a todas las funciones.
 
-def get_promedios_por_area_apilado(filtros=None):
-    if filtros is None: filtros = {}
-    base_query = _get_base_query(filtros)
+NOTA_MINIMA_APROBATORIA = 300  # En centésimas: por debajo de 3.0 la nota está reprobada.
 
-    materias_query = Materia.objects.filter(colegio=filtros.get('colegio'))
-    if filtros.get('curso_ids'):
-        materia_ids = AsignacionDocente.objects.filter(curso_id__in=filtros['curso_ids']).values_list('materia_id', flat=True).distinct()
-        materias_query = materias_query.filter(id__in=materia_ids)
+class NotasFiltradas:
+    """
+    Definitivas de periodo que cumplen los filtros, leídas con una sola
+    consulta: por fila, la materia, el docente (0 si no tiene) y la nota en
+    centésimas. Los nombres de los docentes y las ponderaciones de las
+    materias se consultan la primera vez que una gráfica los necesita.
+    """
 
-    materias_relevantes = list(materias_query.order_by('nombre'))
-    nombres_materias_relevantes = [m.nombre for m in materias_relevantes]
+    def __init__(self, filtros):
+        self.filtros = filtros
+        filas = list(_get_base_query(filtros).values_list('materia_id', 'materia__nombre', 'docente_id', 'valor_nota'))
+        self.nombre_materia = {materia_id: nombre for materia_id, nombre, _, _ in filas}
+        self.materia_ids = np.array([fila[0] for fila in filas], dtype=np.int64)
+        self.docente_ids = np.array([fila[2] or 0 for fila in filas], dtype=np.int64)
+        self.centesimas = _centesimas(fila[3] for fila in filas)
+
+        # Las gráficas agrupan por nombre de materia: `materias` es, por fila, la posición en `nombres_materias`.
+        self.nombres_materias = sorted(set(self.nombre_materia.values()))
+        posicion = {nombre: k for k, nombre in enumerate(self.nombres_materias)}
+        ids_unicos, indice = np.unique(self.materia_ids, return_inverse=True)
+        self.materias = np.array([posicion[self.nombre_materia[m]] for m in ids_unicos], dtype=np.int64)[indice] if filas else self.materia_ids
+
+    def __len__(self):
+        return self.centesimas.size
+
+    @cached_property
+    def reprobadas(self):
+        return self.centesimas < NOTA_MINIMA_APROBATORIA
+
+    def por_materia(self, mascara=None):
+        """Cantidad de notas y suma en centésimas por nombre de materia (en el orden de `nombres_materias`)."""
+        materias, centesimas = self.materias, self.centesimas
+        if mascara is not None:
+            materias, centesimas = materias[mascara], centesimas[mascara]
+        totales = np.bincount(materias, minlength=len(self.nombres_materias))
+        sumas = np.bincount(materias, weights=centesimas, minlength=len(self.nombres_materias)).astype(np.int64)
+        return totales, sumas
+
+    @cached_property
+    def docentes(self):
+        """Nombre y apellido de cada docente con notas; el 0 (sin docente) queda sin nombre."""
+        docente_ids = [int(d) for d in np.unique(self.docente_ids) if d]
+        docentes = {0: (None, None)}
+        if docente_ids:
+            for docente_id, nombre, apellido in Docente.objects.filter(id__in=docente_ids).values_list('id', 'user__first_name', 'user__last_name'):
+                docentes[docente_id] = (nombre, apellido)
+        return docentes
+
+    @cached_property
+    def ponderaciones(self):
+        """
+        Ponderaciones de las materias del colegio y de las materias con notas,
+        con el nombre del área y de la materia, el colegio del área y, si se
+        filtra por cursos, si la materia está asignada a alguno de ellos.
+        """
+        colegio = self.filtros.get('colegio')
+        ponderaciones = PonderacionAreaMateria.objects.filter(
+            Q(materia__colegio=colegio) | Q(materia_id__in=list(self.nombre_materia))
+        )
+        if self.filtros.get('curso_ids'):
+            ponderaciones = ponderaciones.annotate(asignada=Exists(AsignacionDocente.objects.filter(
+                curso_id__in=self.filtros['curso_ids'], materia_id=OuterRef('materia_id')
+            )))
+        else:
+            ponderaciones = ponderaciones.annotate(asignada=Value(True))
+        return list(ponderaciones.values(
+            'area_id', 'area__nombre', 'area__colegio_id', 'materia_id', 'materia__nombre', 'materia__colegio_id',
+            'colegio_id', 'peso_porcentual', 'asignada',
+        ))
 
-    areas_query = AreaConocimiento.objects.filter(colegio=filtros.get('colegio'), materias__in=materias_relevantes).distinct()
-    if filtros.get('area_id'):
-        areas_query = areas_query.filter(id=filtros['area_id'])
+def _notas_filtradas(filtros, notas):
+    return notas if notas is not None else NotasFiltradas(filtros or {})
+
+def _nombre_docente(nombre, apellido):
+    return f"{nombre or ''} {apellido or ''}".strip()
 
-    areas = areas_query.order_by('nombre')
-    area_nombres = [a.nombre for a in areas]
+def get_promedios_por_materia(filtros=None, notas=None):
+    notas = _notas_filtradas(filtros, notas)
+    totales, sumas = notas.por_materia()
+    return [
+        {'materia_nombre': nombre, 'promedio': _promedio_exacto(sumas[k], totales[k])}
+        for k, nombre in enumerate(notas.nombres_materias) if totales[k]
+    ]
 
-    if not area_nombres or not nombres_materias_relevantes:
+def get_promedios_por_area_apilado(filtros=None, notas=None):
+    if filtros is None: filtros = {}
+    notas = _notas_filtradas(filtros, notas)
+    colegio = getattr(filtros.get('colegio'), 'pk', filtros.get('colegio'))
+
+    # Materias del colegio (asignadas a los cursos filtrados) y sus áreas del colegio.
+    relevantes = [p for p in notas.ponderaciones if p['materia__colegio_id'] == colegio and p['asignada']]
+    area_nombres = sorted({
+        p['area__nombre'] for p in relevantes
+        if p['area__colegio_id'] == colegio and (not filtros.get('area_id') or str(p['area_id']) == str(filtros['area_id']))
+    })
+    if not area_nombres:
         return {'labels': [], 'datasets': []}
 
-    ponderaciones = PonderacionAreaMateria.objects.filter(colegio=filtros.get('colegio'), area__in=areas, materia__in=materias_relevantes)
-    ponderaciones_map = {(p.area.nombre, p.materia.nombre): float(p.peso_porcentual) for p in ponderaciones}
+    nombres_materias_relevantes = sorted({p['materia__nombre'] for p in relevantes})
+    ponderaciones_map = {
+        (p['area__nombre'], p['materia__nombre']): float(p['peso_porcentual'])
+        for p in relevantes if p['colegio_id'] == colegio and p['area__nombre'] in area_nombres
+    }
 
-    promedios_db = base_query.filter(materia__in=materias_relevantes).values('materia__nombre').annotate(prom=Avg('valor_nota'))
-    promedios_map_db = {p['materia__nombre']: float(p['prom'] or 0.0) for p in promedios_db}
+    materia_ids_relevantes = np.array(sorted({p['materia_id'] for p in relevantes}), dtype=np.int64)
+    totales, sumas = notas.por_materia(np.isin(notas.materia_ids, materia_ids_relevantes))
+    promedios_map_db = {nombre: _promedio_exacto(sumas[k], totales[k]) for k, nombre in enumerate(notas.nombres_materias) if totales[k]}
 
     datasets = []
     colores = [f'rgba({random.randint(30,220)},{random.randint(30,220)},{random.randint(30,220)},0.8)' for _ in nombres_materias_relevantes]
@@ -325,45 +532,51 @@ def get_promedios_por_area_apilado(filtros=None):
 
     return {'labels': area_nombres, 'datasets': datasets}
 
-def get_histograma_distribucion(filtros=None):
-    if filtros is None: filtros = {}
-    base_query = _get_base_query(filtros)
-    notas = [float(n) for n in base_query.values_list('valor_nota', flat=True)]
-    if not notas: return {'labels': [], 'data': [], 'colors': []}
+def get_histograma_distribucion(filtros=None, notas=None):
+    notas = _notas_filtradas(filtros, notas)
+    if not len(notas): return {'labels': [], 'data': [], 'colors': []}
 
     bins = [1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5.1]
-    hist = [0] * (len(bins) - 1)
-    for n in notas:
-        for i in range(len(bins) - 1):
-            if bins[i] <= n < bins[i+1]:
-                hist[i] += 1
-                break
+    hist, _ = np.histogram(notas.centesimas / 100, bins=bins)
     labels = [f"{bins[i]:.1f}-{bins[i+1]-0.1:.1f}" for i in range(len(hist))]
     colors = [f'rgba({random.randint(100,200)}, {random.randint(100,200)}, {random.randint(100,200)}, 0.8)' for _ in hist]
-    return {'labels': labels, 'data': hist, 'colors': colors}
-
-def get_reprobados_por_docente(filtros=None):
-    base_query = _get_base_query(filtros).filter(valor_nota__lt=3.0)
-    docentes = base_query.values('docente__user__first_name', 'docente__user__last_name').annotate(total=Count('id')).order_by('-total')
-    return [(f"{r['docente__user__first_name'] or ''} {r['docente__user__last_name'] or ''}".strip(), r['total']) for r in docentes if r['total'] > 0]
-
-def get_materias_reprobadas(filtros=None):
-    base_query = _get_base_query(filtros).filter(valor_nota__lt=3.0)
-    materias = base_query.values('materia__nombre').annotate(total_reprobados=Count('id')).order_by('-total_reprobados')
-    return [r for r in materias if r['total_reprobados'] > 0]
-
-def get_reprobados_por_area_materia(filtros=None):
-    reprobados = _get_base_query(filtros).filter(valor_nota__lt=3.0).values('materia__nombre', 'materia__areas_ponderadas__nombre').annotate(total=Count('id'))
-    if not reprobados: return {'labels': [], 'datasets': []}
-
-    areas = sorted(list(set(r['materia__areas_ponderadas__nombre'] for r in reprobados if r['materia__areas_ponderadas__nombre'])))
-    materias = sorted(list(set(r['materia__nombre'] for r in reprobados if r['materia__nombre'])))
-    if not areas or not materias: return {'labels': [], 'datasets': []}
-
-    data_map = {m: {a: 0 for a in areas} for m in materias}
-    for r in reprobados:
-        if r['materia__nombre'] in data_map and r['materia__areas_ponderadas__nombre'] in data_map[r['materia__nombre']]:
-            data_map[r['materia__nombre']][r['materia__areas_ponderadas__nombre']] = r['total']
+    return {'labels': labels, 'data': hist.tolist(), 'colors': colors}
+
+def get_reprobados_por_docente(filtros=None, notas=None):
+    notas = _notas_filtradas(filtros, notas)
+    docente_ids, totales = np.unique(notas.docente_ids[notas.reprobadas], return_counts=True)
+    # Se agrupa por nombre del docente, como en la consulta original.
+    por_nombre = defaultdict(int)
+    for docente_id, total in zip(docente_ids, totales):
+        por_nombre[_nombre_docente(*notas.docentes[int(docente_id)])] += int(total)
+    return sorted(por_nombre.items(), key=lambda item: (-item[1], item[0]))
+
+def get_materias_reprobadas(filtros=None, notas=None):
+    notas = _notas_filtradas(filtros, notas)
+    totales, _ = notas.por_materia(notas.reprobadas)
+    materias = [{'materia__nombre': nombre, 'total_reprobados': int(totales[k])} for k, nombre in enumerate(notas.nombres_materias) if totales[k]]
+    return sorted(materias, key=lambda r: -r['total_reprobados'])
+
+def get_reprobados_por_area_materia(filtros=None, notas=None):
+    notas = _notas_filtradas(filtros, notas)
+    materia_ids, totales = np.unique(notas.materia_ids[notas.reprobadas], return_counts=True)
+    if not materia_ids.size: return {'labels': [], 'datasets': []}
+
+    # Cada reprobado cuenta en todas las áreas de su materia (solo en la filtrada, si hay filtro de área).
+    area_id = (filtros or {}).get('area_id')
+    areas_por_materia = defaultdict(list)
+    for p in notas.ponderaciones:
+        if not area_id or str(p['area_id']) == str(area_id):
+            areas_por_materia[p['materia_id']].append(p['area__nombre'])
+
+    data_map = defaultdict(lambda: defaultdict(int))
+    for materia_id, total in zip(materia_ids.tolist(), totales.tolist()):
+        for area in areas_por_materia[materia_id]:
+            data_map[notas.nombre_materia[materia_id]][area] += total
+
+    areas = sorted({area for por_area in data_map.values() for area in por_area})
+    materias = sorted({notas.nombre_materia[m] for m in materia_ids.tolist()})
+    if not areas: return {'labels': [], 'datasets': []}
 
     datasets = []
     for mat in materias:
@@ -371,9 +584,15 @@ def get_reprobados_por_area_materia(filtros=None):
         datasets.append({'label': mat, 'data': [data_map[mat][area] for area in areas], 'backgroundColor': color, 'stack': 'Stack 0'})
     return {'labels': areas, 'datasets': datasets}
 
-def get_materias_reprobadas_por_docente(filtros=None):
-    reprobadas = _get_base_query(filtros).filter(valor_nota__lt=3.0).values('docente__user__first_name', 'docente__user__last_name', 'materia__nombre').annotate(total_reprobados=Count('id')).order_by('docente__user__last_name', 'materia__nombre')
-    return [{'docente': f"{r['docente__user__first_name'] or ''} {r['docente__user__last_name'] or ''}".strip(), 'materia': r['materia__nombre'], 'total_reprobados': r['total_reprobados']} for r in reprobadas if r['total_reprobados'] > 0]
+def get_materias_reprobadas_por_docente(filtros=None, notas=None):
+    notas = _notas_filtradas(filtros, notas)
+    reprobadas = notas.reprobadas
+    pares, totales = np.unique(np.stack([notas.docente_ids[reprobadas], notas.materias[reprobadas]], axis=1), axis=0, return_counts=True)
+    por_nombre = defaultdict(int)
+    for (docente_id, materia), total in zip(pares.tolist(), totales.tolist()):
+        por_nombre[(notas.docentes[docente_id], notas.nombres_materias[materia])] += total
+    orden = sorted(por_nombre, key=lambda clave: (clave[0][1] or '', clave[1]))
+    return [{'docente': _nombre_docente(*docente), 'materia': materia, 'total_reprobados': por_nombre[(docente, materia)]} for docente, materia in orden]
 
 def get_promedios_por_area(filtros=None):
     """Calcula el promedio general para cada área de conocimiento."""
@@ -382,15 +601,10 @@ def get_promedios_por_area(filtros=None):
     if not datos_crudo:
         return []
 
-    promedios_agregados = defaultdict(list)
-    for data in datos_crudo.values():
-        for area, promedio in data['promedios_area'].items():
-            promedios_agregados[area].append(promedio)
-
-    resultado_final = []
-    for area, promedios in promedios_agregados.items():
-        if promedios:
-            promedio_final = sum(promedios) / len(promedios)
-            resultado_final.append({'area_nombre': area, 'promedio': float(promedio_final)})
-
-    return sorted(resultado_final, key=lambda x: x['area_nombre'])
+    nombres, decimas, presente = _matriz_areas(datos_crudo)
+    sumas = np.where(presente, decimas, 0).sum(axis=0)
+    totales = presente.sum(axis=0)
+    return [
+        {'area_nombre': area, 'promedio': _promedio_exacto(sumas[j], totales[j], escala=10)}
+        for j, area in enumerate(nombres) if totales[j]
+    ]
@@ -0,0 +1,250 @@
+# notas/management/commands/benchmark_carga.py
+import datetime
+import io
+import json
+import platform
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from notas.models import AreaConocimiento, AsignacionDocente, Estudiante
+from notas.boletin.documento import preparar_boletin
+from notas.utils.datos_sinteticos import crear_colegio_sintetico
+from notas.views import portal_views
+from notas.views.estadisticas_views import datos_graficos_ajax
+from notas.views.importar_asistencia_views import importar_asistencia_excel_vista
+from notas.views.ingreso_notas_views import IngresoNotasView
+from notas.views.sabana_views import generar_sabana_vista
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# Sin caché: se mide el costo de calcular, no el de leer un resultado guardado.
+SIN_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'estadisticas': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def _tamanos(texto):
+    """'4x20,10x40' -> [(4, 20), (10, 40)] (cursos x estudiantes por curso)."""
+    try:
+        tamanos = [tuple(int(n) for n in parte.lower().split('x')) for parte in texto.split(',') if parte.strip()]
+    except ValueError:
+        tamanos = []
+    if not tamanos or any(len(t) != 2 or min(t) < 1 for t in tamanos):
+        raise CommandError(f"Tamaños no válidos: '{texto}'. Use el formato CURSOSxESTUDIANTES, por ejemplo 4x20,10x40.")
+    return tamanos
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea colegios sintéticos de varios tamaños dentro de una transacción, mide "
+        "tiempo y número de consultas de los flujos principales (boletines, sábana, "
+        "estadísticas, ingreso de notas, importación de asistencia y JSON del portal) "
+        "y revierte todo al terminar. Los resultados pueden guardarse en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='4x20,10x40', help="Lista CURSOSxESTUDIANTES_POR_CURSO separada por comas.")
+        parser.add_argument('--materias', type=int, default=10)
+        parser.add_argument('--periodos', type=int, default=2)
+        parser.add_argument('--notas-detalladas', type=int, default=2)
+        parser.add_argument('--dias-asistencia', type=int, default=5)
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--escenarios', help="Nombres de escenarios separados por comas. Si se omite, se miden todos.")
+        parser.add_argument('--json', dest='salida_json', help="Ruta donde guardar los resultados en JSON.")
+
+    # --- Peticiones ---
+
+    def _request(self, ctx, metodo, url, datos=None, **kwargs):
+        request = getattr(self.factory, metodo)(url, datos or {}, **kwargs)
+        request.user, request.colegio = ctx['usuario'], ctx['colegio']
+        request._messages = CookieStorage(request)
+        request._dont_enforce_csrf_checks = True
+        return request
+
+    def _verificar(self, response, esperado=200):
+        if response.status_code != esperado:
+            raise RuntimeError(f"respuesta {response.status_code}")
+        return response
+
+    # --- Escenarios: cada uno devuelve una función que ejecuta una repetición ---
+
+    def _boletin(self, ctx, estudiante=None):
+        def ejecutar(_):
+            template_path, context, _ = preparar_boletin(ctx['colegio'], ctx['curso'], ctx['periodo'].id, estudiante)
+            render_to_string(template_path, context)
+        return ejecutar
+
+    def _sabana(self, ctx):
+        def ejecutar(_):
+            request = self._request(ctx, 'get', '/sabana/generar/', {'curso_id': ctx['curso'].id, 'periodo_id': ctx['periodo'].id})
+            self._verificar(generar_sabana_vista(request))
+        return ejecutar
+
+    def _estadisticas(self, ctx, curso=None, area=None):
+        parametros = {'ano_lectivo': ctx['periodo'].ano_lectivo, 'periodo_id': ctx['periodo'].id}
+        if curso is not None:
+            parametros['curso_ids[]'] = [curso.id]
+        if area is not None:
+            parametros['area_id'] = area.id
+
+        def ejecutar(_):
+            self._verificar(datos_graficos_ajax(self._request(ctx, 'get', '/estadisticas/datos/', parametros)))
+        return ejecutar
+
+    def _cargar_notas(self, ctx):
+        parametros = {'docente_id': ctx['asignacion'].docente_id, 'asignacion_id': ctx['asignacion'].id, 'periodo_id': ctx['periodo'].id}
+
+        def ejecutar(_):
+            self._verificar(IngresoNotasView.as_view()(self._request(ctx, 'get', '/docente/ingresar-notas/', parametros)))
+        return ejecutar
+
+    def _guardar_notas(self, ctx):
+        def ejecutar(repeticion):
+            # Cada repetición cambia las notas para que siempre haya algo que escribir.
+            valor = f"{3 + repeticion % 2},{repeticion % 10}"
+            payload = {
+                'asignacion_id': ctx['asignacion'].id, 'periodo_id': ctx['periodo'].id,
+                'estudiantes': [
+                    {'id': e.id, 'notas': {'ser': [{'descripcion': 'Actitud', 'valor': valor}], 'saber': [{'descripcion': 'Examen', 'valor': valor}],
+                                           'hacer': [{'descripcion': 'Taller', 'valor': valor}]}, 'inasistencias': str(repeticion)}
+                    for e in ctx['estudiantes']
+                ],
+            }
+            request = self._request(ctx, 'post', '/docente/ingresar-notas/', json.dumps(payload), content_type='application/json')
+            self._verificar(IngresoNotasView.as_view()(request))
+        return ejecutar
+
+    def _plantilla_asistencia(self, ctx, dias=10):
+        """Archivo con el formato de la plantilla de asistencia: metadatos en la fila 9 y estudiantes desde la 12."""
+        libro = Workbook()
+        hoja = libro.active
+        inicio = ctx['periodo'].fecha_inicio
+        for columna in range(dias):
+            fecha = inicio + datetime.timedelta(days=columna)
+            hoja.cell(row=9, column=3 + columna, value=f"{ctx['asignacion'].id}|{fecha:%Y-%m-%d}")
+        for fila, estudiante in enumerate(ctx['estudiantes'], start=12):
+            hoja.cell(row=fila, column=2, value=estudiante.id)
+            for columna in range(dias):
+                hoja.cell(row=fila, column=3 + columna, value=('X', 'T', 'AJ', None)[(fila + columna) % 4])
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        return contenido.getvalue()
+
+    def _importar_asistencia(self, ctx):
+        contenido = self._plantilla_asistencia(ctx)
+
+        def ejecutar(_):
+            archivo = SimpleUploadedFile('asistencia.xlsx', contenido, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            request = self._request(ctx, 'post', '/asistencia/importar/', {'archivo_excel': archivo})
+            self._verificar(importar_asistencia_excel_vista(request), esperado=302)
+            errores = [m.message for m in request._messages if m.level_tag == 'error']
+            if errores:
+                raise RuntimeError(errores[0])
+        return ejecutar
+
+    def _portal(self, ctx, vista):
+        def ejecutar(_):
+            self._verificar(vista(self._request(ctx, 'get', '/portal/')))
+        return ejecutar
+
+    def _escenarios(self, ctx):
+        escenarios = {
+            'boletin_curso': self._boletin(ctx),
+            'boletin_estudiante': self._boletin(ctx, ctx['estudiantes'][0]),
+            'sabana': self._sabana(ctx),
+            'estadisticas_colegio': self._estadisticas(ctx),
+            'estadisticas_curso': self._estadisticas(ctx, ctx['curso']),
+            'estadisticas_area': self._estadisticas(ctx, area=ctx['area']),
+            'ingreso_notas_cargar': self._cargar_notas(ctx),
+            'ingreso_notas_guardar': self._guardar_notas(ctx),
+            'portal_directorio_docentes': self._portal(ctx, portal_views.directorio_docentes_json),
+            'portal_noticias': self._portal(ctx, portal_views.noticias_json),
+        }
+        if Workbook is not None:
+            escenarios['importar_asistencia'] = self._importar_asistencia(ctx)
+        return escenarios
+
+    # --- Medición ---
+
+    def _medir(self, ejecutar, repeticiones):
+        # La primera ejecución cuenta las consultas (y calienta plantillas e imports);
+        # las siguientes solo miden tiempo, sin el costo de registrar el SQL.
+        with CaptureQueriesContext(connection) as consultas:
+            ejecutar(0)
+        tiempos = []
+        for repeticion in range(1, repeticiones + 1):
+            inicio = time.perf_counter()
+            ejecutar(repeticion)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return {'consultas': len(consultas), 'ms_mediana': round(statistics.median(tiempos), 2), 'ms_min': round(min(tiempos), 2), 'ms_max': round(max(tiempos), 2)}
+
+    def _medir_tamano(self, cursos, por_curso, options, seleccion):
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            datos = crear_colegio_sintetico(
+                f'Benchmark Carga {cursos}x{por_curso} {int(time.time())}', cursos=cursos, estudiantes_por_curso=por_curso,
+                materias=options['materias'], periodos=options['periodos'], notas_detalladas=options['notas_detalladas'],
+                dias_asistencia=options['dias_asistencia'],
+            )
+            segundos_datos = round(time.perf_counter() - inicio, 2)
+            curso = datos['cursos'][len(datos['cursos']) // 2]
+            ctx = {
+                'colegio': datos['colegio'], 'curso': curso, 'periodo': datos['periodos'][-1],
+                'usuario': User.objects.create_superuser(f"benchmark_{datos['colegio'].pk}", password=None),
+                'asignacion': AsignacionDocente.objects.filter(curso=curso).select_related('docente').first(),
+                'area': AreaConocimiento.objects.filter(colegio=datos['colegio']).order_by('nombre').first(),
+                'estudiantes': list(Estudiante.objects.filter(curso=curso).select_related('user')),
+            }
+
+            resultados = {}
+            for nombre, ejecutar in self._escenarios(ctx).items():
+                if seleccion and nombre not in seleccion:
+                    continue
+                try:
+                    resultados[nombre] = self._medir(ejecutar, options['repeticiones'])
+                except Exception as e:
+                    resultados[nombre] = {'error': str(e)}
+                self.stdout.write(f"  {nombre:<28} {self._formato(resultados[nombre])}")
+            transaction.set_rollback(True)
+
+        return {'cursos': cursos, 'estudiantes_por_curso': por_curso, 'segundos_datos': segundos_datos, 'conteo': datos['conteo'], 'escenarios': resultados}
+
+    def _formato(self, medicion):
+        if 'error' in medicion:
+            return self.style.ERROR(f"error: {medicion['error']}")
+        return f"{medicion['ms_mediana']:>10.2f} ms (mín {medicion['ms_min']:.2f})  {medicion['consultas']:>5} consultas"
+
+    def handle(self, *args, **options):
+        tamanos = _tamanos(options['tamanos'])
+        seleccion = {s.strip() for s in options['escenarios'].split(',')} if options['escenarios'] else None
+
+        self.factory = RequestFactory()
+        resultados = []
+        with override_settings(CACHES=SIN_CACHE):
+            for cursos, por_curso in tamanos:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{cursos} cursos x {por_curso} estudiantes"))
+                resultados.append(self._medir_tamano(cursos, por_curso, options, seleccion))
+
+        if options['salida_json']:
+            salida = {
+                'fecha': timezone.now().isoformat(), 'vendor': connection.vendor, 'python': platform.python_version(),
+                'parametros': {k: options[k] for k in ('materias', 'periodos', 'notas_detalladas', 'dias_asistencia', 'repeticiones')},
+                'tamanos': resultados,
+            }
+            with open(options['salida_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(salida, archivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida_json']}."))
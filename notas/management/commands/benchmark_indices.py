@@ -0,0 +1,107 @@
+# notas/management/commands/benchmark_indices.py
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from notas.models import Calificacion, Asistencia, Estudiante, AsignacionDocente
+from notas.utils.datos_sinteticos import crear_colegio_sintetico
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea un colegio sintético dentro de una transacción, mide las consultas más "
+        "frecuentes sobre Calificacion y Asistencia con y sin los índices compuestos, "
+        "muestra los planes de ejecución y revierte todo al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=2000, help="Total de estudiantes del colegio sintético.")
+        parser.add_argument('--por-curso', type=int, default=40, help="Estudiantes por curso.")
+        parser.add_argument('--materias', type=int, default=10)
+        parser.add_argument('--periodos', type=int, default=2)
+        parser.add_argument('--dias-asistencia', type=int, default=4, help="Días con asistencia por asignación y periodo.")
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--json', dest='salida_json', help="Ruta donde guardar los resultados en JSON.")
+
+    def _indices(self):
+        return [indice for modelo in (Calificacion, Asistencia) for indice in modelo._meta.indexes]
+
+    def _consultas(self, datos):
+        colegio, periodo = datos['colegio'], datos['periodos'][-1]
+        curso = datos['cursos'][len(datos['cursos']) // 2]
+        estudiantes = Estudiante.objects.filter(curso=curso)
+        estudiante = estudiantes.first()
+        asignacion = AsignacionDocente.objects.filter(curso=curso).first()
+        dia = Asistencia.objects.filter(asignacion=asignacion).values_list('fecha', flat=True).first()
+        return {
+            'calificaciones_definitivas_periodo': Calificacion.objects.filter(colegio=colegio, tipo_nota='PROM_PERIODO', periodo=periodo),
+            'calificaciones_definitivas_materia': Calificacion.objects.filter(colegio=colegio, periodo=periodo, tipo_nota='PROM_PERIODO', materia_id=asignacion.materia_id),
+            'calificaciones_definitivas_curso': Calificacion.objects.filter(periodo=periodo, tipo_nota='PROM_PERIODO', estudiante__in=estudiantes),
+            'calificaciones_estudiante_periodo': Calificacion.objects.filter(estudiante=estudiante, periodo=periodo),
+            'asistencia_asignacion_dia': Asistencia.objects.filter(asignacion=asignacion, fecha=dia),
+            'asistencia_curso_dia': Asistencia.objects.filter(estudiante__in=estudiantes, fecha=dia),
+            'ausencias_periodo': Asistencia.objects.filter(
+                asignacion=asignacion, estado='A', fecha__range=(periodo.fecha_inicio, periodo.fecha_fin)
+            ).order_by().values('estudiante_id'),
+        }
+
+    def _medir(self, consultas, repeticiones):
+        resultados = {}
+        for nombre, consulta in consultas.items():
+            # Se mide solo la base de datos: el SQL de la consulta, sin construir los objetos del ORM.
+            sql, parametros = consulta.query.sql_with_params()
+            tiempos = []
+            with connection.cursor() as cursor:
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    cursor.execute(sql, parametros)
+                    filas = len(cursor.fetchall())
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nombre] = {'filas': filas, 'ms_mediana': round(statistics.median(tiempos), 3), 'ms_min': round(min(tiempos), 3), 'plan': consulta.explain()}
+        return resultados
+
+    def _analizar(self, cursor):
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"ANALYZE {Calificacion._meta.db_table}, {Asistencia._meta.db_table}")
+        elif connection.vendor == 'sqlite':
+            cursor.execute("ANALYZE")
+
+    def handle(self, *args, **options):
+        cursos = max(options['estudiantes'] // options['por_curso'], 1)
+        resultados = {}
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            datos = crear_colegio_sintetico(
+                f'Benchmark Indices {int(time.time())}', cursos=cursos, estudiantes_por_curso=options['por_curso'],
+                materias=options['materias'], periodos=options['periodos'], notas_detalladas=0,
+                dias_asistencia=options['dias_asistencia'],
+            )
+            self.stdout.write(f"Colegio sintético creado en {time.perf_counter() - inicio:.1f} s: {datos['conteo']}")
+            consultas = self._consultas(datos)
+
+            with connection.cursor() as cursor:
+                self._analizar(cursor)
+                resultados['con_indices'] = self._medir(consultas, options['repeticiones'])
+                # DROP INDEX dentro de la transacción: se revierte junto con los datos.
+                for indice in self._indices():
+                    cursor.execute(f"DROP INDEX {connection.ops.quote_name(indice.name)}")
+                self._analizar(cursor)
+                resultados['sin_indices'] = self._medir(consultas, options['repeticiones'])
+            transaction.set_rollback(True)
+
+        resultados['parametros'] = {'vendor': connection.vendor, **datos['conteo'], 'repeticiones': options['repeticiones']}
+        for nombre in resultados['con_indices']:
+            antes, despues = resultados['sin_indices'][nombre], resultados['con_indices'][nombre]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{nombre} ({despues['filas']} filas)"))
+            for etiqueta, medicion in (('sin índices', antes), ('con índices', despues)):
+                self.stdout.write(f"  {etiqueta}: {medicion['ms_mediana']:>9.3f} ms")
+                for linea in medicion['plan'].splitlines():
+                    self.stdout.write(f"      {linea}")
+
+        if options['salida_json']:
+            with open(options['salida_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultados, archivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida_json']}."))
@@ -0,0 +1,222 @@
+# notas/management/commands/benchmark_pdf.py
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import time
+
+from django.contrib.staticfiles import finders
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from notas.boletin.documento import preparar_boletin
+from notas.models import AsignacionDocente, Estudiante, FichaEstudiante, RegistroObservador
+from notas.reportes import logos, motor_pdf, pdf_por_partes
+from notas.reportes.certificado_generator import CertificadoPDFGenerator
+from notas.reportes.pdf_generator import AsistenciaPDFGenerator
+from notas.utils.datos_sinteticos import crear_colegio_sintetico
+from notas.views.sabana_views import _get_sabana_acumulada_data
+
+try:
+    from weasyprint import HTML
+except (ImportError, OSError):
+    HTML = None
+
+
+def _memoria_kb(campo):
+    """VmRSS (actual) o VmHWM (pico) de este proceso en KB, según /proc (Linux)."""
+    with open('/proc/self/status') as estado:
+        for linea in estado:
+            if linea.startswith(campo + ':'):
+                return int(linea.split()[1])
+    return 0
+
+
+def _medir_en_proceso(cola, modo, html_completo, htmls_partes, numeracion):
+    """
+    Se ejecuta en un proceso nuevo para que el pico de memoria sea solo el de
+    este render. En el modo por partes el pico es el mayor entre este proceso
+    (que une los PDF) y los procesos del grupo, que ya terminaron al medir.
+    """
+    base = _memoria_kb('VmRSS')
+    inicio = time.perf_counter()
+    if modo == 'unico':
+        pdf = motor_pdf.renderizar_pdf(html_completo)
+    else:
+        pdf = pdf_por_partes.renderizar_partes(htmls_partes, numeracion=numeracion)
+        pdf_por_partes.cerrar_grupo()
+    segundos = time.perf_counter() - inicio
+    pico_hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    cola.put({'segundos': segundos, 'kb_pdf': len(pdf) // 1024, 'mb_base': base / 1024, 'mb_pico': max(_memoria_kb('VmHWM'), pico_hijos) / 1024})
+
+
+def _medir_tipo_en_proceso(cola, modo, html_string, repeticiones):
+    """
+    Tiempos de renderizado y tamaño de un documento en un proceso nuevo:
+    'directo' es el PDF como se generaba antes (logos como Data URI en cada
+    página, WeasyPrint desde cero y con sus opciones por defecto); 'motor' usa
+    renderizar_pdf, cuyo primer render incluye armar el contexto.
+    """
+    tiempos = []
+    for _ in range(repeticiones + 1):
+        inicio = time.perf_counter()
+        if modo == 'directo':
+            pdf = HTML(string=html_string).write_pdf()
+        else:
+            pdf = motor_pdf.renderizar_pdf(html_string)
+        tiempos.append(time.perf_counter() - inicio)
+    cola.put({'primero': tiempos[0], 'siguientes': statistics.median(tiempos[1:]), 'kb_html': len(html_string) / 1024, 'kb_pdf': len(pdf) / 1024})
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el renderizado de un boletín y una sábana de un curso sintético en "
+        "un solo paso y por partes (pdf_por_partes): tiempo total, pico de memoria "
+        "(RSS) por proceso y tamaño del PDF. Además compara por tipo de documento el "
+        "tiempo de renderizado y el tamaño del PDF generado como antes y con motor_pdf. "
+        "Los datos se crean en una transacción que se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=45)
+        parser.add_argument('--materias', type=int, default=10)
+        parser.add_argument('--periodos', type=int, default=4)
+        parser.add_argument('--repeticiones', type=int, default=1)
+        parser.add_argument('--json', dest='salida_json', help="Ruta donde guardar los resultados en JSON.")
+
+    def _documentos(self, options):
+        """
+        HTML completo y por partes del boletín y la sábana, y HTML de cada tipo
+        de documento (como era antes y como es ahora), armados antes de medir
+        (con la base de datos). El colegio lleva como logos las imágenes de
+        static/img; sus archivos se borran del almacenamiento al terminar.
+        """
+        with transaction.atomic():
+            datos = crear_colegio_sintetico(
+                f'Benchmark PDF {int(time.time())}', cursos=1, estudiantes_por_curso=options['estudiantes'],
+                materias=options['materias'], periodos=options['periodos'], notas_detalladas=1, dias_asistencia=2,
+            )
+            colegio, curso, periodo = datos['colegio'], datos['cursos'][0], datos['periodos'][-1]
+            try:
+                return self._documentos_colegio(colegio, curso, periodo)
+            finally:
+                archivos = [getattr(colegio, campo) for campo in ('logo_izquierdo', 'logo_derecho')]
+                logos.invalidar_logos([archivo.name for archivo in archivos])
+                for archivo in archivos:
+                    if archivo:
+                        archivo.delete(save=False)
+                transaction.set_rollback(True)
+
+    def _documentos_colegio(self, colegio, curso, periodo):
+        """Los documentos de _documentos para el colegio sintético."""
+        for campo, imagen in (('logo_izquierdo', 'img/logo_colegio.png'), ('logo_derecho', 'img/Logo_govtolima.png')):
+            with open(finders.find(imagen), 'rb') as archivo:
+                getattr(colegio, campo).save(imagen.split('/')[-1], ContentFile(archivo.read()))
+        # Los procesos de medición no ven el colegio (la transacción se revierte): los logos quedan en la caché de motor_pdf.
+        for campo in ('logo_izquierdo', 'logo_derecho'):
+            motor_pdf.buscar_recurso(logos.url_logo(colegio, campo))
+
+        template_path, context, _ = preparar_boletin(colegio, curso, periodo.id)
+        boletin = (
+            render_to_string(template_path, context),
+            list(pdf_por_partes.partes_html(template_path, context, 'boletines', pdf_por_partes.TAMANO_PARTE_BOLETIN)),
+            "Página {pagina}",
+        )
+
+        sabana, areas, desempenos, mejores, resumen, _ = _get_sabana_acumulada_data(colegio, curso, periodo)
+        context = {
+            'curso': curso, 'periodo': periodo, 'colegio': colegio, 'is_final_report': False,
+            'sabana_data': sabana, 'areas_con_materias': areas, 'desempenos_headers': desempenos,
+            'mejores_estudiantes': mejores, 'resumen_final_celdas': resumen,
+        }
+        sabana_pdf = (
+            render_to_string('notas/sabana/sabana_pdf.html', context),
+            list(pdf_por_partes.partes_html('notas/sabana/sabana_pdf.html', context, 'sabana_data', pdf_por_partes.TAMANO_PARTE_SABANA)),
+            "Página {pagina} de {total}",
+        )
+
+        estudiante = Estudiante.objects.filter(curso=curso).select_related('user').first()
+        asignacion = AsignacionDocente.objects.filter(curso=curso).select_related('materia').first()
+        asistencia, _ = AsistenciaPDFGenerator(colegio).render_html(None, asignacion, periodo, 'todos')
+        tipos = {
+            'boletin': boletin[0],
+            'sabana': sabana_pdf[0],
+            'observador': render_to_string('notas/observador/observador_pdf.html', {
+                'colegio': colegio, 'estudiante': estudiante,
+                'ficha': FichaEstudiante.objects.get_or_create(estudiante=estudiante)[0],
+                'registros': RegistroObservador.objects.filter(estudiante=estudiante),
+            }),
+            'asistencia': asistencia,
+            'certificado': CertificadoPDFGenerator(colegio).render_html(None, estudiante),
+        }
+        return {'boletin': boletin, 'sabana': sabana_pdf}, {
+            nombre: {'directo': logos.incrustar_logos(html), 'motor': html} for nombre, html in tipos.items() if html
+        }
+
+    def _medir(self, documento, modo, repeticiones):
+        contexto = multiprocessing.get_context('fork')
+        mediciones = []
+        for _ in range(repeticiones):
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=_medir_en_proceso, args=(cola, modo, *documento))
+            proceso.start()
+            mediciones.append(cola.get())
+            proceso.join()
+        return {
+            'segundos': round(statistics.median(m['segundos'] for m in mediciones), 3),
+            'mb_pico': round(max(m['mb_pico'] for m in mediciones), 1),
+            'mb_sobre_base': round(max(m['mb_pico'] - m['mb_base'] for m in mediciones), 1),
+            'kb_pdf': mediciones[-1]['kb_pdf'],
+        }
+
+    def _medir_tipo(self, html_string, modo, repeticiones):
+        contexto = multiprocessing.get_context('fork')
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=_medir_tipo_en_proceso, args=(cola, modo, html_string, repeticiones))
+        proceso.start()
+        medicion = cola.get()
+        proceso.join()
+        return {clave: round(valor, 3) for clave, valor in medicion.items()}
+
+    def handle(self, *args, **options):
+        if not pdf_por_partes.disponible():
+            raise CommandError("Se necesitan WeasyPrint y pypdf para este benchmark.")
+
+        documentos, tipos = self._documentos(options)
+        connection.close()  # Los procesos de medición no deben compartir la conexión.
+
+        resultados = {}
+        for nombre, documento in documentos.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{nombre} ({options['estudiantes']} estudiantes, {len(documento[1])} partes)"))
+            for modo in ('unico', 'partes'):
+                medicion = self._medir(documento, modo, options['repeticiones'])
+                resultados.setdefault(nombre, {})[modo] = medicion
+                self.stdout.write(
+                    f"  {modo:<8} {medicion['segundos']:>8.2f} s  pico {medicion['mb_pico']:>7.1f} MB "
+                    f"(+{medicion['mb_sobre_base']:.1f} MB)  {medicion['kb_pdf']:>6} KB"
+                )
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nPor tipo de documento: render (primero / mediana de los siguientes), HTML y PDF"))
+        por_tipo = {}
+        for nombre, htmls in tipos.items():
+            por_tipo[nombre] = {modo: self._medir_tipo(htmls[modo], modo, options['repeticiones']) for modo in ('directo', 'motor')}
+            for modo, medicion in por_tipo[nombre].items():
+                self.stdout.write(
+                    f"  {nombre:<12} {modo:<8} {medicion['primero']:>6.2f} / {medicion['siguientes']:>6.2f} s   "
+                    f"HTML {medicion['kb_html']:>8.1f} KB   PDF {medicion['kb_pdf']:>8.1f} KB"
+                )
+
+        if options['salida_json']:
+            salida = {
+                'fecha': timezone.now().isoformat(), 'python': platform.python_version(),
+                'procesos': pdf_por_partes.numero_procesos(),
+                'parametros': {k: options[k] for k in ('estudiantes', 'materias', 'periodos', 'repeticiones')},
+                'documentos': resultados, 'por_tipo': por_tipo,
+            }
+            with open(options['salida_json'], 'w', encoding='utf-8') as archivo:
+                json.dump(salida, archivo, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida_json']}."))
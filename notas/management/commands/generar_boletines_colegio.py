@@ -0,0 +1,100 @@
+# notas/management/commands/generar_boletines_colegio.py
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from notas.models import Colegio, PeriodoAcademico
+from notas.boletin.lote import generar_boletines_colegio, procesar_lote
+from notas.reportes.cola_pdf import tomar_trabajo, recuperar_trabajos_colgados
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera los boletines de todos los cursos de un colegio (un PDF por curso "
+        "y un ZIP con todos) en un grupo de procesos. Sin --colegio, procesa los "
+        "lotes encolados desde el admin (TrabajoReporte de tipo BOLETINES_LOTE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colegio', help="Slug del colegio.")
+        parser.add_argument('--periodo', type=int, help="Id del periodo (boletín de periodo).")
+        parser.add_argument('--final', type=int, metavar='AÑO', help="Año lectivo del boletín final.")
+        parser.add_argument('--salida', help="Directorio de salida (por defecto REPORTES_GENERADOS_DIR/boletines/<colegio>/<reporte>).")
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos de renderizado (por defecto, uno por CPU).")
+        parser.add_argument('--base-url', default='', help="URL base para resolver recursos relativos en las plantillas.")
+        parser.add_argument('--intervalo', type=float, default=5.0, help="Segundos de espera cuando no hay lotes encolados.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa los lotes pendientes y termina.")
+
+    def handle(self, *args, **options):
+        if options['colegio']:
+            self._generar(options)
+        else:
+            self._procesar_cola(options)
+
+    def _generar(self, options):
+        try:
+            colegio = Colegio.objects.get(slug=options['colegio'])
+        except Colegio.DoesNotExist:
+            raise CommandError(f"No existe un colegio con el slug '{options['colegio']}'.")
+
+        if bool(options['periodo']) == bool(options['final']):
+            raise CommandError("Indique --periodo o --final (solo uno).")
+        if options['periodo']:
+            if not PeriodoAcademico.objects.filter(id=options['periodo'], colegio=colegio).exists():
+                raise CommandError(f"El periodo {options['periodo']} no es de este colegio.")
+            reporte_id = str(options['periodo'])
+        else:
+            reporte_id = f"FINAL_{options['final']}"
+
+        salida = options['salida'] or os.path.join(settings.REPORTES_GENERADOS_DIR, 'boletines', colegio.slug, reporte_id)
+
+        def progreso(resultado, terminados, total):
+            if resultado['error']:
+                self.stdout.write(self.style.WARNING(f"[{terminados}/{total}] {resultado['curso']}: {resultado['error']}"))
+            else:
+                origen = ' (caché)' if resultado['desde_cache'] else ''
+                self.stdout.write(f"[{terminados}/{total}] {resultado['curso']}: {resultado['segundos']:.2f} s{origen}")
+
+        inicio = time.perf_counter()
+        ruta_zip, resultados = generar_boletines_colegio(
+            colegio, reporte_id, salida, procesos=options['procesos'], base_url=options['base_url'], progreso=progreso,
+        )
+        total = time.perf_counter() - inicio
+
+        generados = [r for r in resultados if r['archivo']]
+        self.stdout.write("\nTiempo por curso (de mayor a menor):")
+        for resultado in sorted(generados, key=lambda r: r['segundos'], reverse=True):
+            self.stdout.write(f"  {resultado['curso']:<20} {resultado['segundos']:8.2f} s")
+        suma = sum(r['segundos'] for r in resultados)
+        self.stdout.write(
+            f"\nTiempo total: {total:.2f} s (suma de los cursos: {suma:.2f} s). "
+            f"Desde caché: {sum(r['desde_cache'] for r in resultados)}."
+        )
+        estilo = self.style.SUCCESS if len(generados) == len(resultados) else self.style.WARNING
+        self.stdout.write(estilo(f"Boletines generados: {len(generados)} de {len(resultados)}. ZIP: {ruta_zip}"))
+
+    def _procesar_cola(self, options):
+        recuperados = recuperar_trabajos_colgados(lotes=True)
+        if recuperados:
+            self.stdout.write(f"{recuperados} lotes interrumpidos devueltos a la cola.")
+
+        procesados = 0
+        try:
+            while True:
+                close_old_connections()
+                trabajo = tomar_trabajo(lotes=True)
+                if trabajo is None:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                ok = procesar_lote(trabajo, procesos=options['procesos'])
+                procesados += 1
+                estilo = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(estilo(f"Lote {trabajo.id} ({trabajo.nombre_archivo}): {'terminado' if ok else 'con error'}."))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"{procesados} lotes procesados.")
@@ -0,0 +1,47 @@
+# notas/management/commands/generar_datos_sinteticos.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from notas.models import Colegio
+from notas.utils.datos_sinteticos import crear_colegio_sintetico
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea uno o varios colegios con datos sintéticos (cursos, estudiantes, notas "
+        "por componente con notas detalladas y asistencia diaria) para pruebas de carga. "
+        "Los datos quedan guardados; para medir sin dejar rastro use benchmark_carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colegios', type=int, default=1, help="Cantidad de colegios a crear.")
+        parser.add_argument('--nombre', default='Colegio Sintético', help="Prefijo del nombre; se le agrega un número.")
+        parser.add_argument('--cursos', type=int, default=10)
+        parser.add_argument('--estudiantes-por-curso', type=int, default=30)
+        parser.add_argument('--materias', type=int, default=10)
+        parser.add_argument('--periodos', type=int, default=4)
+        parser.add_argument('--notas-detalladas', type=int, default=2, help="Notas detalladas por componente (SER, SABER, HACER).")
+        parser.add_argument('--dias-asistencia', type=int, default=5, help="Días con asistencia por asignación y periodo.")
+        parser.add_argument('--ano-lectivo', type=int, default=2025)
+        parser.add_argument('--semilla', type=int, default=0, help="Semilla del generador; cada colegio usa semilla + número.")
+
+    def handle(self, *args, **options):
+        nombres = [f"{options['nombre']} {numero}" for numero in range(1, options['colegios'] + 1)]
+        existentes = list(Colegio.objects.filter(nombre__in=nombres).values_list('nombre', flat=True))
+        if existentes:
+            raise CommandError(f"Ya existen colegios con estos nombres: {', '.join(existentes)}. Use otro --nombre.")
+
+        for numero, nombre in enumerate(nombres):
+            inicio = time.perf_counter()
+            with transaction.atomic():
+                datos = crear_colegio_sintetico(
+                    nombre, cursos=options['cursos'], estudiantes_por_curso=options['estudiantes_por_curso'],
+                    materias=options['materias'], periodos=options['periodos'], notas_detalladas=options['notas_detalladas'],
+                    dias_asistencia=options['dias_asistencia'], ano_lectivo=options['ano_lectivo'], semilla=options['semilla'] + numero,
+                )
+            conteo = ', '.join(f"{tabla}: {cantidad}" for tabla, cantidad in datos['conteo'].items())
+            self.stdout.write(f"{nombre} (slug '{datos['colegio'].slug}') creado en {time.perf_counter() - inicio:.1f} s. {conteo}")
+
+        self.stdout.write(self.style.SUCCESS(f"Colegios sintéticos creados: {len(nombres)}."))
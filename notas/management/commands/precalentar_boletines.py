@@ -0,0 +1,65 @@
+# notas/management/commands/precalentar_boletines.py
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from notas.models import Colegio, Curso, Estudiante, PeriodoAcademico, PublicacionBoletin
+from notas.boletin.documento import preparar_boletin, clave_cache_boletin, BoletinNoDisponible
+from notas.reportes.cache_artefactos import leer_artefacto, guardar_artefacto
+from notas.reportes.motor_pdf import renderizar_pdf, disponible as pdf_disponible
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera y guarda en la caché de reportes los boletines de todos los cursos "
+        "de los periodos publicados. Los que ya están en caché con los datos "
+        "actuales se omiten, así que puede ejecutarse periódicamente (cron). "
+        "Al publicar un periodo ya se encola su lote de boletines por curso; "
+        "este comando sirve para --por-estudiante y para reconstruir la caché."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colegio', help="Slug del colegio. Si se omite, se procesan todos.")
+        parser.add_argument('--periodo', type=int, help="Id de un periodo concreto (publicado o no).")
+        parser.add_argument('--por-estudiante', action='store_true', help="También genera el boletín individual de cada estudiante.")
+        parser.add_argument('--base-url', default='', help="URL base para resolver recursos relativos en las plantillas.")
+
+    def handle(self, *args, **options):
+        if not pdf_disponible():
+            raise CommandError("La librería WeasyPrint no está disponible.")
+
+        colegios = Colegio.objects.all()
+        if options['colegio']:
+            colegios = colegios.filter(slug=options['colegio'])
+            if not colegios.exists():
+                raise CommandError(f"No existe un colegio con el slug '{options['colegio']}'.")
+
+        generados = omitidos = 0
+        for colegio in colegios:
+            if options['periodo']:
+                periodos = PeriodoAcademico.objects.filter(colegio=colegio, id=options['periodo'])
+            else:
+                periodos = PeriodoAcademico.objects.filter(
+                    colegio=colegio, id__in=PublicacionBoletin.objects.filter(colegio=colegio, esta_visible=True).values('periodo_id')
+                )
+
+            for periodo in periodos:
+                for curso in Curso.objects.filter(colegio=colegio).order_by('nombre'):
+                    estudiantes = [None]
+                    if options['por_estudiante']:
+                        estudiantes += list(Estudiante.objects.filter(colegio=colegio, curso=curso, is_active=True).select_related('user'))
+
+                    for estudiante in estudiantes:
+                        clave = clave_cache_boletin(colegio, curso, periodo.id, periodo.ano_lectivo, estudiante)
+                        if leer_artefacto(clave, 'pdf') is not None:
+                            omitidos += 1
+                            continue
+                        try:
+                            template_path, context, _ = preparar_boletin(colegio, curso, periodo.id, estudiante)
+                        except BoletinNoDisponible:
+                            continue
+                        html_string = render_to_string(template_path, context)
+                        guardar_artefacto(clave, 'pdf', renderizar_pdf(html_string, base_url=options['base_url']))
+                        generados += 1
+                self.stdout.write(f"{colegio.nombre} - {periodo}: listo.")
+
+        self.stdout.write(self.style.SUCCESS(f"Boletines generados: {generados}. Ya estaban en caché: {omitidos}."))
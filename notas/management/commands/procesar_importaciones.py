@@ -0,0 +1,42 @@
+# notas/management/commands/procesar_importaciones.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notas.utils.importacion_estudiantes import tomar_trabajo, procesar_trabajo, recuperar_importaciones_colgadas
+
+
+class Command(BaseCommand):
+    help = (
+        "Procesa las importaciones masivas encoladas (TrabajoImportacion). Cada "
+        "importación calcula los hashes de las contraseñas en un grupo de procesos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos para los hashes de contraseñas (por defecto, uno por CPU).")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa lo pendiente y termina.")
+
+    def handle(self, *args, **options):
+        interrumpidas = recuperar_importaciones_colgadas()
+        if interrumpidas:
+            self.stdout.write(self.style.WARNING(f"{interrumpidas} importaciones interrumpidas marcadas con error."))
+        procesados = 0
+        try:
+            while True:
+                close_old_connections()
+                trabajo = tomar_trabajo()
+                if trabajo is None:
+                    recuperar_importaciones_colgadas()
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+                ok = procesar_trabajo(trabajo, procesos=options['procesos'])
+                procesados += 1
+                estilo = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(estilo(f"Importación {trabajo.id} ({trabajo.nombre_archivo}): {'terminada' if ok else 'con error'}."))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"{procesados} importaciones procesadas.")
@@ -0,0 +1,80 @@
+# notas/management/commands/procesar_reportes_pdf.py
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from notas.reportes.cola_pdf import (
+    tomar_trabajo, procesar_trabajo, recuperar_trabajos_colgados, limpiar_trabajos
+)
+
+
+def _bucle_worker(intervalo, detener):
+    """Ciclo de cada proceso hijo: toma trabajos de la cola hasta que se le pida parar."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Cada proceso abre su propia conexión; la heredada del padre no se comparte.
+    connections.close_all()
+    while not detener.is_set():
+        close_old_connections()
+        trabajo = tomar_trabajo()
+        if trabajo is None:
+            detener.wait(intervalo)
+            continue
+        procesar_trabajo(trabajo)
+
+
+class Command(BaseCommand):
+    help = "Renderiza en procesos aparte los reportes PDF encolados (TrabajoReporte)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=2, help="Número de procesos de renderizado.")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa lo pendiente en este proceso y termina.")
+        parser.add_argument('--limpiar-dias', type=int, default=7, help="Borra trabajos y archivos con más de N días (0 para no borrar).")
+
+    def handle(self, *args, **options):
+        recuperados = recuperar_trabajos_colgados()
+        if recuperados:
+            self.stdout.write(f"{recuperados} trabajos interrumpidos devueltos a la cola.")
+        if options['limpiar_dias']:
+            limpiar_trabajos(options['limpiar_dias'])
+
+        if options['una_vez']:
+            procesados = 0
+            while (trabajo := tomar_trabajo()) is not None:
+                procesar_trabajo(trabajo)
+                procesados += 1
+            self.stdout.write(self.style.SUCCESS(f"{procesados} trabajos procesados."))
+            return
+
+        detener = multiprocessing.Event()
+        signal.signal(signal.SIGTERM, lambda *_: detener.set())
+        connections.close_all()
+
+        procesos = []
+        for _ in range(max(1, options['procesos'])):
+            proceso = multiprocessing.Process(target=_bucle_worker, args=(options['intervalo'], detener), daemon=True)
+            proceso.start()
+            procesos.append(proceso)
+        self.stdout.write(self.style.SUCCESS(f"{len(procesos)} procesos de renderizado en ejecución."))
+
+        try:
+            while not detener.is_set():
+                # Un proceso que muere (p. ej. por memoria) se reemplaza.
+                for i, proceso in enumerate(procesos):
+                    if not proceso.is_alive():
+                        # Igual que al arrancar: el hijo no debe heredar la conexión que abrió
+                        # recuperar_trabajos_colgados (al cerrarla terminaría la sesión del padre).
+                        connections.close_all()
+                        procesos[i] = multiprocessing.Process(target=_bucle_worker, args=(options['intervalo'], detener), daemon=True)
+                        procesos[i].start()
+                recuperar_trabajos_colgados()
+                detener.wait(5)
+        except KeyboardInterrupt:
+            detener.set()
+
+        for proceso in procesos:
+            proceso.join(timeout=60)
+        self.stdout.write("Procesos de renderizado detenidos.")
@@ -0,0 +1,25 @@
+# notas/management/commands/reconstruir_resumenes_notas.py
+from django.core.management.base import BaseCommand, CommandError
+
+from notas.models import Colegio
+from notas.resumen_logic import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = "Reconstruye por completo la tabla de resúmenes de notas (ResumenNotasPeriodo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colegio', help="Slug del colegio. Si se omite, se procesan todos.")
+        parser.add_argument('--ano', type=int, help="Año lectivo a reconstruir. Si se omite, todos.")
+
+    def handle(self, *args, **options):
+        colegios = Colegio.objects.all()
+        if options['colegio']:
+            colegios = colegios.filter(slug=options['colegio'])
+            if not colegios.exists():
+                raise CommandError(f"No existe un colegio con el slug '{options['colegio']}'.")
+
+        for colegio in colegios:
+            total = reconstruir_resumenes(colegio, options['ano'])
+            self.stdout.write(f"{colegio.nombre}: {total} resúmenes generados.")
+        self.stdout.write(self.style.SUCCESS("Reconstrucción de resúmenes finalizada."))
@@ -1,5 +1,95 @@
 # notas/middleware.py
+import copy
+import time
+
+from django.core.exceptions import FieldError
+
 from .models import Colegio
+from .utils.cache_compartida import cache_compartida
+
+# El colegio de cada host se guarda en memoria del proceso (TTL corto, porque
+# los otros workers no se enteran de la invalidación: un cambio tarda hasta
+# CACHE_TIMEOUT_LOCAL en verse en ellos) y en la caché compartida por todos los
+# workers (TTL más largo, invalidada al guardar un colegio subiendo la versión
+# de las claves). También se guardan los hosts sin colegio.
+CACHE_TIMEOUT_LOCAL = 30
+CACHE_TIMEOUT_COMPARTIDA = 60 * 5
+_CLAVE_VERSION = 'colegio_por_host:version'
+_SIN_COLEGIO = 'SIN_COLEGIO'
+
+_colegios_por_host = {}
+
+
+def _clave_host(host, version):
+    return f"colegio_por_host:{version}:{host}"
+
+
+def _buscar_colegio(host):
+    """Busca el colegio de un host en la base de datos; None si no hay ninguno."""
+    # 1. Intenta encontrar el colegio por el dominio personalizado (para producción).
+    #    Ej: 'www.colegiobilinguesansebastian.com'
+    try:
+        return Colegio.objects.get(domain=host)
+    except Colegio.DoesNotExist:
+        pass
+
+    # 2. Si no lo encuentra y estamos en desarrollo (localhost),
+    #    intenta encontrarlo por el subdominio (slug).
+    if host.endswith('.localhost'):
+        # Extraemos el slug de 'colegio-bilingue-san-sebastian.localhost' -> 'colegio-bilingue-san-sebastian'
+        slug = host.split('.')[0]
+        try:
+            return Colegio.objects.get(slug=slug)
+        except Colegio.DoesNotExist:
+            # Si el slug tampoco existe, se pasará a la lógica de fallback.
+            pass
+
+    # 3. Lógica de Fallback: intenta encontrar un colegio marcado como principal.
+    # (Necesitarías añadir un campo booleano 'es_principal' a tu modelo Colegio para que esto funcione).
+    try:
+        return Colegio.objects.get(es_principal=True)
+    except (Colegio.DoesNotExist, AttributeError, FieldError):
+        # Si no hay principal, no hace nada y deja que la vista decida.
+        return None
+
+
+def colegio_para_host(host):
+    """
+    Devuelve una copia del colegio del host (o None), consultando la base de
+    datos solo si no está en ninguna de las dos cachés.
+    """
+    ahora = time.monotonic()
+    local = _colegios_por_host.get(host)
+    if local is not None and local[0] > ahora:
+        colegio = local[1]
+    else:
+        compartida = cache_compartida()
+        version = compartida.get_or_set(_CLAVE_VERSION, 1, timeout=None)
+        colegio = compartida.get(_clave_host(host, version))
+        if colegio is None:
+            colegio = _buscar_colegio(host) or _SIN_COLEGIO
+            compartida.set(_clave_host(host, version), colegio, CACHE_TIMEOUT_COMPARTIDA)
+        _colegios_por_host[host] = (ahora + CACHE_TIMEOUT_LOCAL, colegio)
+
+    if colegio == _SIN_COLEGIO:
+        return None
+    # Cada petición recibe su propia copia: las vistas pueden modificar request.colegio.
+    return copy.copy(colegio)
+
+
+def invalidar_colegios_por_host():
+    """
+    Descarta el colegio de todos los hosts (se llama al guardar o eliminar un
+    colegio): en este proceso de inmediato y, en los demás, cuando vence su
+    copia local.
+    """
+    _colegios_por_host.clear()
+    compartida = cache_compartida()
+    try:
+        compartida.incr(_CLAVE_VERSION)
+    except ValueError:
+        compartida.set(_CLAVE_VERSION, 1, timeout=None)
+
 
 class ColegioMiddleware:
     """
@@ -16,42 +106,15 @@ class ColegioMiddleware:
             return self.get_response(request)
 
         host = request.get_host().split(':')[0].lower()
-        
+
         request.colegio = None
-        
-        try:
-            # --- LÓGICA CORREGIDA Y MEJORADA ---
-
-            # 1. Intenta encontrar el colegio por el dominio personalizado (para producción).
-            #    Ej: 'www.colegiobilinguesansebastian.com'
-            try:
-                request.colegio = Colegio.objects.get(domain=host)
-            except Colegio.DoesNotExist:
-                # 2. Si no lo encuentra y estamos en desarrollo (localhost),
-                #    intenta encontrarlo por el subdominio (slug).
-                if host.endswith('.localhost'):
-                    # Extraemos el slug de 'colegio-bilingue-san-sebastian.localhost' -> 'colegio-bilingue-san-sebastian'
-                    slug = host.split('.')[0]
-                    try:
-                        request.colegio = Colegio.objects.get(slug=slug)
-                    except Colegio.DoesNotExist:
-                        # Si el slug tampoco existe, se pasará a la lógica de fallback.
-                        pass
-            
-            # 3. Lógica de Fallback: Si después de las búsquedas anteriores no se encontró un colegio.
-            if not request.colegio:
-                # Intenta encontrar un colegio marcado como principal.
-                # (Necesitarías añadir un campo booleano 'es_principal' a tu modelo Colegio para que esto funcione).
-                try:
-                    request.colegio = Colegio.objects.get(es_principal=True)
-                except (Colegio.DoesNotExist, AttributeError):
-                    # Si no hay principal, no hace nada y deja que la vista decida.
-                    pass
 
+        try:
+            request.colegio = colegio_para_host(host)
         except Exception:
             # Si ocurre cualquier otro error de base de datos (ej. durante migraciones),
             # se ignora para no romper el sitio. request.colegio seguirá siendo None.
             pass
-        
+
         response = self.get_response(request)
         return response
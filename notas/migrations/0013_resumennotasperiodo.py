@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0012_calificacion_es_recuperada_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenNotasPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('promedio_general', models.DecimalField(blank=True, decimal_places=2, help_text='Promedio del periodo ponderado por intensidad horaria.', max_digits=4, null=True)),
+                ('promedio_areas', models.DecimalField(blank=True, decimal_places=2, help_text='Promedio simple de los promedios de área del periodo.', max_digits=4, null=True)),
+                ('promedios_area', models.JSONField(default=dict, help_text='Promedio ponderado de cada área en el periodo, por nombre de área.')),
+                ('definitivas', models.JSONField(default=dict, help_text='Nota del periodo y de nivelación por materia.')),
+                ('acumuladas', models.JSONField(default=dict, help_text='Definitiva acumulada (con nivelaciones) por materia hasta este periodo.')),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('colegio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_notas', to='notas.colegio')),
+                ('curso', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='notas.curso')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_notas', to='notas.estudiante')),
+                ('periodo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_notas', to='notas.periodoacademico')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Notas por Periodo',
+                'verbose_name_plural': 'Resúmenes de Notas por Periodo',
+                'unique_together': {('estudiante', 'periodo', 'colegio')},
+            },
+        ),
+    ]
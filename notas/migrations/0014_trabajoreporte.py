@@ -0,0 +1,41 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0013_resumennotasperiodo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoReporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('BOLETIN', 'Boletín'), ('SABANA', 'Sábana de Notas'), ('ESTADISTICAS', 'Reporte Estadístico'), ('OBSERVADOR', 'Observador del Estudiante'), ('CERTIFICADO', 'Certificado de Estudio')], max_length=15)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('TERMINADO', 'Terminado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=12)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('html', models.TextField(blank=True, help_text='HTML a renderizar; se vacía al terminar.')),
+                ('base_url', models.CharField(blank=True, max_length=500)),
+                ('ruta_archivo', models.CharField(blank=True, help_text='Ruta relativa a REPORTES_GENERADOS_DIR.', max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('colegio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_reporte', to='notas.colegio')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_reporte', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Reporte',
+                'verbose_name_plural': 'Trabajos de Reportes',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='notas_traba_estado_2ea9d6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0014_trabajoreporte'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='clave_cache',
+            field=models.CharField(blank=True, help_text='Si se indica, el PDF también se guarda en la caché de reportes.', max_length=64),
+        ),
+    ]
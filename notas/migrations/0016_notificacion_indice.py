@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0015_trabajoreporte_clave_cache'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['destinatario', 'leido', 'tipo', 'fecha_creacion'], name='notas_notif_destina_813e1c_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0016_notificacion_indice'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['asignacion', 'fecha', 'estado'], name='notas_asist_asignac_d9543e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['estudiante', 'fecha'], name='notas_asist_estudia_f813f9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(condition=models.Q(('estado', 'A')), fields=['asignacion', 'estudiante', 'fecha'], name='asistencia_ausencias_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(fields=['colegio', 'tipo_nota', 'periodo', 'materia'], name='notas_calif_colegio_0faeb9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(fields=['estudiante', 'periodo', 'tipo_nota'], name='notas_calif_estudia_0991cd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='calificacion',
+            index=models.Index(condition=models.Q(('tipo_nota', 'PROM_PERIODO')), fields=['periodo', 'materia', 'estudiante'], name='calificacion_prom_periodo_idx'),
+        ),
+    ]
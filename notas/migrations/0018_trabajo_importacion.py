@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 14:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0017_indices_calificacion_asistencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ESTUDIANTES', 'Estudiantes')], default='ESTUDIANTES', max_length=15)),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('PROCESANDO', 'Procesando'), ('TERMINADO', 'Terminado'), ('ERROR', 'Error')], default='PENDIENTE', max_length=12)),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('ruta_archivo', models.CharField(blank=True, help_text='Archivo subido, relativo a REPORTES_GENERADOS_DIR; se borra al terminar.', max_length=500)),
+                ('total_filas', models.PositiveIntegerField(default=0)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('creados', models.PositiveIntegerField(default=0)),
+                ('omitidos', models.PositiveIntegerField(default=0)),
+                ('errores_filas', models.JSONField(blank=True, default=list, help_text="Lista de {'fila', 'error'} con las filas que no se importaron.")),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('colegio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_importacion', to='notas.colegio')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_importacion', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Importación',
+                'verbose_name_plural': 'Trabajos de Importación',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='notas_traba_estado_60468c_idx')],
+            },
+        ),
+    ]
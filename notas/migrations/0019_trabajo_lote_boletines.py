@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0018_trabajo_importacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='parametros',
+            field=models.JSONField(blank=True, default=dict, help_text="Datos de los lotes, p. ej. {'reporte_id': ..., 'total': ...}."),
+        ),
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='resumen',
+            field=models.JSONField(blank=True, default=list, help_text="Resultado por curso de los lotes: {'curso', 'archivo', 'segundos', 'desde_cache', 'error'}."),
+        ),
+        migrations.AlterField(
+            model_name='trabajoreporte',
+            name='tipo',
+            field=models.CharField(choices=[('BOLETIN', 'Boletín'), ('SABANA', 'Sábana de Notas'), ('ESTADISTICAS', 'Reporte Estadístico'), ('OBSERVADOR', 'Observador del Estudiante'), ('CERTIFICADO', 'Certificado de Estudio'), ('BOLETINES_LOTE', 'Boletines de todos los cursos')], max_length=15),
+        ),
+    ]
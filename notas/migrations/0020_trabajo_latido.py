@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0019_trabajo_lote_boletines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='fecha_latido',
+            field=models.DateTimeField(blank=True, help_text='Última señal de vida del proceso que lo renderiza.', null=True),
+        ),
+        migrations.AddField(
+            model_name='trabajoreporte',
+            name='trabajador',
+            field=models.CharField(blank=True, help_text="Proceso que lo está renderizando, como 'host:pid'.", max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notas', '0020_trabajo_latido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='fecha_latido',
+            field=models.DateTimeField(blank=True, help_text='Última señal de vida del proceso que la importa.', null=True),
+        ),
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='trabajador',
+            field=models.CharField(blank=True, help_text="Proceso que la está importando, como 'host:pid'.", max_length=255),
+        ),
+    ]
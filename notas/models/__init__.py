@@ -9,10 +9,12 @@ from .academicos import (
     AreaConocimiento, Materia, PeriodoAcademico, AsignacionDocente,
     Calificacion, NotaDetallada, IndicadorLogroPeriodo, ReporteParcial, Observacion,
     PlanDeMejoramiento, Asistencia, InasistenciasManualesPeriodo, EscalaValoracion, 
-    ConfiguracionSistema, PublicacionBoletin, PublicacionBoletinFinal,PonderacionAreaMateria
+    ConfiguracionSistema, PublicacionBoletin, PublicacionBoletinFinal,PonderacionAreaMateria,
+    ResumenNotasPeriodo
 )
 from .comunicaciones import Mensaje, RegistroObservador, Notificacion
 from .portal_models import DocumentoPublico, FotoGaleria, Noticia, ImagenCarrusel
+from .reportes import TrabajoReporte, TrabajoImportacion
 
 # La variable __all__ es una buena práctica que define qué nombres
 # se exportan cuando se hace 'from .models import *'.
@@ -22,7 +24,8 @@ __all__ = [
     'AreaConocimiento', 'Materia', 'PeriodoAcademico', 'AsignacionDocente', 'EscalaValoracion', 
     'Calificacion', 'NotaDetallada', 'IndicadorLogroPeriodo', 'ReporteParcial', 'Observacion',
     'PlanDeMejoramiento', 'Asistencia', 'InasistenciasManualesPeriodo','PonderacionAreaMateria',
-    'ConfiguracionSistema', 'PublicacionBoletin', 'PublicacionBoletinFinal',
+    'ConfiguracionSistema', 'PublicacionBoletin', 'PublicacionBoletinFinal', 'ResumenNotasPeriodo',
     'Mensaje', 'RegistroObservador', 'Notificacion',
     'DocumentoPublico', 'FotoGaleria', 'Noticia', 'ImagenCarrusel',
+    'TrabajoReporte', 'TrabajoImportacion',
 ]
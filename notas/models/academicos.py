@@ -98,6 +98,14 @@ class Calificacion(models.Model):
     class Meta:
         unique_together = ('estudiante', 'materia', 'periodo', 'tipo_nota', 'colegio')
         verbose_name = "Calificación (Promedio)"; verbose_name_plural = "Calificaciones (Promedios)"
+        indexes = [
+            # Reportes por colegio/periodo (estadísticas, sábana, sellos de caché).
+            models.Index(fields=['colegio', 'tipo_nota', 'periodo', 'materia']),
+            # Notas de un estudiante en un periodo (boletín individual, portal).
+            models.Index(fields=['estudiante', 'periodo', 'tipo_nota']),
+            # Solo las definitivas, que son la mayoría de las lecturas (PostgreSQL y SQLite).
+            models.Index(fields=['periodo', 'materia', 'estudiante'], condition=models.Q(tipo_nota='PROM_PERIODO'), name='calificacion_prom_periodo_idx'),
+        ]
     def __str__(self): return f"{self.estudiante} | {self.materia} | {self.periodo.nombre} - {self.get_tipo_nota_display()}: {self.valor_nota}"
 
 class NotaDetallada(models.Model):
@@ -162,6 +170,14 @@ class Asistencia(models.Model):
     class Meta:
         unique_together = ('estudiante', 'asignacion', 'fecha', 'colegio')
         verbose_name = "Registro de Asistencia"; verbose_name_plural = "Registros de Asistencia"; ordering = ['-fecha', 'estudiante__user__last_name']
+        indexes = [
+            # Lista del día y reportes mensuales de una asignación (kiosko, planillas).
+            models.Index(fields=['asignacion', 'fecha', 'estado']),
+            # Asistencia de un estudiante o un curso en una fecha (consultas, portal).
+            models.Index(fields=['estudiante', 'fecha']),
+            # Conteo de fallas por periodo (boletines, ingreso de notas).
+            models.Index(fields=['asignacion', 'estudiante', 'fecha'], condition=models.Q(estado='A'), name='asistencia_ausencias_idx'),
+        ]
 
 class InasistenciasManualesPeriodo(models.Model):
     colegio = models.ForeignKey(Colegio, on_delete=models.CASCADE, related_name="inasistencias_manuales", null=True)
@@ -257,3 +273,24 @@ class EscalaValoracion(models.Model):
         ordering = ['valor_minimo']
         verbose_name = "Escala de Valoración"
         verbose_name_plural = "Escalas de Valoración"
+
+class ResumenNotasPeriodo(models.Model):
+    """
+    Resumen desnormalizado de las notas de un estudiante en un periodo.
+    Se actualiza cada vez que se guardan calificaciones (ver `notas/resumen_logic.py`)
+    y se reconstruye con `manage.py reconstruir_resumenes_notas`.
+    """
+    colegio = models.ForeignKey(Colegio, on_delete=models.CASCADE, related_name="resumenes_notas")
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name="resumenes_notas")
+    periodo = models.ForeignKey(PeriodoAcademico, on_delete=models.CASCADE, related_name="resumenes_notas")
+    curso = models.ForeignKey(Curso, on_delete=models.SET_NULL, null=True, blank=True)
+    promedio_general = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, help_text="Promedio del periodo ponderado por intensidad horaria.")
+    promedio_areas = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, help_text="Promedio simple de los promedios de área del periodo.")
+    promedios_area = models.JSONField(default=dict, help_text="Promedio ponderado de cada área en el periodo, por nombre de área.")
+    definitivas = models.JSONField(default=dict, help_text="Nota del periodo y de nivelación por materia.")
+    acumuladas = models.JSONField(default=dict, help_text="Definitiva acumulada (con nivelaciones) por materia hasta este periodo.")
+    actualizado = models.DateTimeField(auto_now=True)
+    class Meta:
+        unique_together = ('estudiante', 'periodo', 'colegio')
+        verbose_name = "Resumen de Notas por Periodo"; verbose_name_plural = "Resúmenes de Notas por Periodo"
+    def __str__(self): return f"Resumen de {self.estudiante} - {self.periodo}"
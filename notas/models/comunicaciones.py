@@ -92,3 +92,4 @@ class Notificacion(models.Model):
         ordering = ['-fecha_creacion']
         verbose_name = "Notificación"
         verbose_name_plural = "Notificaciones"
+        indexes = [models.Index(fields=['destinatario', 'leido', 'tipo', 'fecha_creacion'])]
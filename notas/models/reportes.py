@@ -0,0 +1,99 @@
+# notas/models/reportes.py
+from django.db import models
+from django.contrib.auth.models import User
+from .perfiles import Colegio
+
+
+class TrabajoReporte(models.Model):
+    """
+    Reporte PDF pendiente de renderizar. La vista arma el HTML y lo deja en
+    esta tabla; el comando `procesar_reportes_pdf` lo convierte a PDF en un
+    proceso aparte y guarda el archivo en REPORTES_GENERADOS_DIR.
+
+    Los lotes (BOLETINES_LOTE: boletines de todos los cursos en un ZIP) no
+    traen HTML sino `parametros`, y los procesa `generar_boletines_colegio`.
+    """
+    TIPO_CHOICES = [
+        ('BOLETIN', 'Boletín'),
+        ('SABANA', 'Sábana de Notas'),
+        ('ESTADISTICAS', 'Reporte Estadístico'),
+        ('OBSERVADOR', 'Observador del Estudiante'),
+        ('CERTIFICADO', 'Certificado de Estudio'),
+        ('BOLETINES_LOTE', 'Boletines de todos los cursos'),
+    ]
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('PROCESANDO', 'Procesando'),
+        ('TERMINADO', 'Terminado'),
+        ('ERROR', 'Error'),
+    ]
+
+    colegio = models.ForeignKey(Colegio, on_delete=models.CASCADE, related_name="trabajos_reporte")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="trabajos_reporte")
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='PENDIENTE')
+    nombre_archivo = models.CharField(max_length=255)
+    html = models.TextField(blank=True, help_text="HTML a renderizar; se vacía al terminar.")
+    base_url = models.CharField(max_length=500, blank=True)
+    ruta_archivo = models.CharField(max_length=500, blank=True, help_text="Ruta relativa a REPORTES_GENERADOS_DIR.")
+    clave_cache = models.CharField(max_length=64, blank=True, help_text="Si se indica, el PDF también se guarda en la caché de reportes.")
+    parametros = models.JSONField(default=dict, blank=True, help_text="Datos de los lotes, p. ej. {'reporte_id': ..., 'total': ...}.")
+    resumen = models.JSONField(default=list, blank=True, help_text="Resultado por curso de los lotes: {'curso', 'archivo', 'segundos', 'desde_cache', 'error'}.")
+    error = models.TextField(blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    trabajador = models.CharField(max_length=255, blank=True, help_text="Proceso que lo está renderizando, como 'host:pid'.")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_latido = models.DateTimeField(null=True, blank=True, help_text="Última señal de vida del proceso que lo renderiza.")
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} ({self.get_estado_display()}) - {self.nombre_archivo}"
+
+    class Meta:
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reportes"
+        ordering = ['-fecha_creacion']
+        indexes = [models.Index(fields=['estado', 'fecha_creacion'])]
+
+
+class TrabajoImportacion(models.Model):
+    """
+    Importación masiva (p. ej. la matrícula de estudiantes desde Excel) que se
+    procesa en segundo plano. El archivo subido queda en REPORTES_GENERADOS_DIR
+    hasta que termina; el avance y el reporte de errores por fila quedan aquí.
+    """
+    TIPO_CHOICES = [
+        ('ESTUDIANTES', 'Estudiantes'),
+    ]
+
+    colegio = models.ForeignKey(Colegio, on_delete=models.CASCADE, related_name="trabajos_importacion")
+    usuario = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name="trabajos_importacion")
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES, default='ESTUDIANTES')
+    estado = models.CharField(max_length=12, choices=TrabajoReporte.ESTADO_CHOICES, default='PENDIENTE')
+    nombre_archivo = models.CharField(max_length=255)
+    ruta_archivo = models.CharField(max_length=500, blank=True, help_text="Archivo subido, relativo a REPORTES_GENERADOS_DIR; se borra al terminar.")
+    total_filas = models.PositiveIntegerField(default=0)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    omitidos = models.PositiveIntegerField(default=0)
+    errores_filas = models.JSONField(default=list, blank=True, help_text="Lista de {'fila', 'error'} con las filas que no se importaron.")
+    error = models.TextField(blank=True)
+    trabajador = models.CharField(max_length=255, blank=True, help_text="Proceso que la está importando, como 'host:pid'.")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_latido = models.DateTimeField(null=True, blank=True, help_text="Última señal de vida del proceso que la importa.")
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    @property
+    def porcentaje(self):
+        return round(100 * self.filas_procesadas / self.total_filas) if self.total_filas else 0
+
+    def __str__(self):
+        return f"Importación de {self.get_tipo_display()} ({self.get_estado_display()}) - {self.nombre_archivo}"
+
+    class Meta:
+        verbose_name = "Trabajo de Importación"
+        verbose_name_plural = "Trabajos de Importación"
+        ordering = ['-fecha_creacion']
+        indexes = [models.Index(fields=['estado', 'fecha_creacion'])]
@@ -1,9 +1,13 @@
 # notas/reportes/base_generator.py
-import os
+from io import BytesIO
 from openpyxl.styles import Font, Alignment
 from openpyxl.drawing.image import Image as OpenpyxlImage
 from django.template.loader import render_to_string
 
+from .logos import logo_png, ESCALA_IMPRESION
+
+ALTO_LOGO_EXCEL = 90
+
 class BaseReportGenerator:
     """
     Clase base para generadores de reportes.
@@ -38,23 +42,14 @@ class BaseReportGenerator:
             worksheet.column_dimensions[ws_col_letter].width = 8
 
         # --- 2. Insertar Logos (en celdas no combinadas) ---
-        try:
-            if self.colegio.logo_izquierdo and os.path.exists(self.colegio.logo_izquierdo.path):
-                img_izq = OpenpyxlImage(self.colegio.logo_izquierdo.path)
-                img_izq.height = 90
-                img_izq.width = 90
-                worksheet.add_image(img_izq, 'A1')
-        except (ValueError, FileNotFoundError) as e:
-            print(f"ADVERTENCIA: No se pudo cargar el logo izquierdo: {e}")
-
-        try:
-            if self.colegio.logo_derecho and os.path.exists(self.colegio.logo_derecho.path):
-                img_der = OpenpyxlImage(self.colegio.logo_derecho.path)
-                img_der.height = 90
-                img_der.width = 90
-                worksheet.add_image(img_der, 'P1')
-        except (ValueError, FileNotFoundError) as e:
-            print(f"ADVERTENCIA: No se pudo cargar el logo derecho: {e}")
+        # Los logos salen de la caché de logos: no se leen del almacenamiento en cada reporte.
+        for campo, celda in (('logo_izquierdo', 'A1'), ('logo_derecho', 'P1')):
+            png = logo_png(self.colegio, campo, alto=ALTO_LOGO_EXCEL * ESCALA_IMPRESION)
+            if png:
+                img = OpenpyxlImage(BytesIO(png))
+                img.height = ALTO_LOGO_EXCEL
+                img.width = ALTO_LOGO_EXCEL
+                worksheet.add_image(img, celda)
 
         # --- 3. Insertar Texto del Encabezado ---
         # --- CORRECCIÓN: Se combina solo el área de texto, sin superponer con los logos ---
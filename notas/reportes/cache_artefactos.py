@@ -0,0 +1,171 @@
+# notas/reportes/cache_artefactos.py
+# Caché en disco de los reportes generados (boletines, sábanas en PDF y Excel).
+# Cada archivo se guarda bajo un nombre que resume el tipo de reporte, sus
+# parámetros y un sello de los datos de los que depende, así que un cambio en
+# las notas produce otra clave y nunca se sirve un reporte desactualizado.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db.models import Count, Max, Q, Sum, F
+from django.db.models.functions import ExtractDay, ExtractMonth
+
+from ..models import (
+    Calificacion, Asistencia, IndicadorLogroPeriodo, Estudiante, AsignacionDocente, Docente,
+    Materia, PonderacionAreaMateria, PeriodoAcademico, ConfiguracionSistema,
+)
+from ..utils.escala_valoracion import get_escala_compilada
+
+TAMANO_MAXIMO_DEFAULT_MB = 500
+
+# Forma parte de todas las claves: al cambiar las plantillas de los reportes
+# basta con incrementarla para que no se sirvan archivos con el diseño anterior.
+VERSION_PLANTILLAS = 1
+
+
+def _directorio():
+    return str(getattr(settings, 'REPORTES_CACHE_DIR', os.path.join(settings.BASE_DIR, 'reportes_cache')))
+
+
+def _tamano_maximo():
+    return int(getattr(settings, 'REPORTES_CACHE_MAX_MB', TAMANO_MAXIMO_DEFAULT_MB)) * 1024 * 1024
+
+
+def _filas(queryset, *campos):
+    """Los valores de `campos` fila por fila, para las tablas pequeñas cuyo texto sale en el reporte."""
+    return list(queryset.order_by('pk').values_list(*campos))
+
+
+def sello_datos(colegio, curso, ano_lectivo):
+    """
+    Huella de todo lo que muestran los reportes de un curso en un año lectivo.
+    Las tablas no tienen fecha de modificación (y los guardados masivos no la
+    actualizarían), así que las grandes (notas y asistencia) se resumen con
+    agregados: cantidad, id máximo y una suma ponderada por id que cambia
+    cuando se crea, borra o modifica una fila. Las pequeñas, con nombres y
+    textos, entran completas con `_filas`.
+    """
+    calificaciones = Calificacion.objects.filter(
+        colegio=colegio, estudiante__curso=curso, periodo__ano_lectivo=ano_lectivo
+    ).aggregate(n=Count('id'), m=Max('id'), s=Sum(F('valor_nota') * F('id')))
+    # Día del año aproximado: distingue las fechas dentro del año lectivo.
+    dia = ExtractMonth('fecha') * 31 + ExtractDay('fecha')
+    asistencia = Asistencia.objects.filter(
+        colegio=colegio, asignacion__curso=curso, fecha__year=ano_lectivo
+    ).aggregate(
+        n=Count('id'), m=Max('id'), j=Count('id', filter=Q(justificada=True)),
+        a=Sum(F('id') * dia, filter=Q(estado='A')), t=Sum(F('id') * dia, filter=Q(estado='T')),
+    )
+    indicadores = _filas(
+        IndicadorLogroPeriodo.objects.filter(colegio=colegio, asignacion__curso=curso, periodo__ano_lectivo=ano_lectivo),
+        'id', 'asignacion_id', 'periodo_id', 'descripcion',
+    )
+    estudiantes = _filas(
+        Estudiante.objects.filter(colegio=colegio, curso=curso, is_active=True),
+        'id', 'user__username', 'user__first_name', 'user__last_name', 'ficha__numero_documento',
+    )
+    asignaciones = _filas(
+        AsignacionDocente.objects.filter(colegio=colegio, curso=curso),
+        'id', 'materia_id', 'intensidad_horaria_semanal', 'docente_id', 'docente__user__first_name', 'docente__user__last_name',
+    )
+    materia_ids = AsignacionDocente.objects.filter(colegio=colegio, curso=curso).values('materia_id')
+    materias = _filas(Materia.objects.filter(colegio=colegio, id__in=materia_ids), 'id', 'nombre', 'abreviatura')
+    ponderaciones = _filas(
+        PonderacionAreaMateria.objects.filter(colegio=colegio, materia_id__in=materia_ids),
+        'id', 'area_id', 'area__nombre', 'materia_id', 'peso_porcentual',
+    )
+    periodos = _filas(PeriodoAcademico.objects.filter(colegio=colegio, ano_lectivo=ano_lectivo), 'id', 'nombre', 'fecha_inicio', 'fecha_fin')
+    configuracion = _filas(ConfiguracionSistema.objects.filter(colegio=colegio), 'max_areas_reprobadas')
+    director = _filas(Docente.objects.filter(id=curso.director_grado_id), 'user__first_name', 'user__last_name')
+    encabezado = {f.attname: getattr(colegio, f.attname) for f in colegio._meta.concrete_fields}
+    datos_curso = {f.attname: getattr(curso, f.attname) for f in curso._meta.concrete_fields}
+
+    datos = [
+        calificaciones, asistencia, indicadores, estudiantes, asignaciones, materias, ponderaciones, periodos,
+        configuracion, director, encabezado, datos_curso, get_escala_compilada(colegio).rangos,
+    ]
+    return hashlib.sha256(json.dumps(datos, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def clave_artefacto(tipo, parametros, sello):
+    contenido = json.dumps({'tipo': tipo, 'parametros': parametros, 'sello': sello, 'version': VERSION_PLANTILLAS}, sort_keys=True, default=str)
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _ruta(clave, extension):
+    return os.path.join(_directorio(), clave[:2], f"{clave}.{extension}")
+
+
+def leer_artefacto(clave, extension):
+    """Devuelve el contenido guardado o None. Marca el archivo como usado (LRU)."""
+    ruta = _ruta(clave, extension)
+    try:
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        os.utime(ruta)
+        return contenido
+    except FileNotFoundError:
+        return None
+
+
+def abrir_artefacto(clave, extension):
+    """Como leer_artefacto, pero devuelve el archivo abierto para enviarlo por partes sin cargarlo en memoria."""
+    ruta = _ruta(clave, extension)
+    try:
+        archivo = open(ruta, 'rb')
+    except FileNotFoundError:
+        return None
+    os.utime(ruta)
+    return archivo
+
+
+def guardar_artefacto(clave, extension, contenido):
+    """Guarda `contenido` (bytes o un archivo abierto, que se copia por bloques y se deja al inicio)."""
+    ruta = _ruta(clave, extension)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    # Escritura atómica: otro proceso nunca lee un archivo a medio escribir.
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        if isinstance(contenido, bytes):
+            archivo.write(contenido)
+        else:
+            shutil.copyfileobj(contenido, archivo)
+            contenido.seek(0)
+    os.replace(temporal, ruta)
+    recortar_cache()
+
+
+def copiar_a_cache(clave, extension, ruta_origen):
+    with open(ruta_origen, 'rb') as archivo:
+        guardar_artefacto(clave, extension, archivo)
+
+
+def recortar_cache(tamano_maximo=None):
+    """Elimina los archivos usados hace más tiempo hasta quedar bajo el límite."""
+    tamano_maximo = _tamano_maximo() if tamano_maximo is None else tamano_maximo
+    archivos, total = [], 0
+    for raiz, _, nombres in os.walk(_directorio()):
+        for nombre in nombres:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                info = os.stat(ruta)
+            except FileNotFoundError:
+                continue
+            archivos.append((info.st_mtime, info.st_size, ruta))
+            total += info.st_size
+
+    eliminados = 0
+    for _, tamano, ruta in sorted(archivos):
+        if total <= tamano_maximo:
+            break
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        eliminados += 1
+    return eliminados
@@ -0,0 +1,188 @@
+# notas/reportes/cola_pdf.py
+# Cola de reportes PDF respaldada por la base de datos. Las vistas encolan el
+# HTML ya renderizado y el comando `procesar_reportes_pdf` lo convierte a PDF
+# en procesos aparte, para no ocupar los workers de gunicorn con WeasyPrint.
+
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from ..models import TrabajoReporte
+from .cache_artefactos import copiar_a_cache
+from .motor_pdf import renderizar_pdf, disponible as pdf_disponible
+
+MAX_INTENTOS = 3
+# El proceso que renderiza renueva `fecha_latido` cada SEGUNDOS_LATIDO; un
+# trabajo sin latido en MINUTOS_TRABAJO_COLGADO se da por abandonado.
+SEGUNDOS_LATIDO = 60
+MINUTOS_TRABAJO_COLGADO = 5
+
+# Trabajos que no traen HTML: los procesa su propio comando (ver boletin/lote.py).
+TIPOS_LOTE = ('BOLETINES_LOTE',)
+
+
+def usar_cola(request):
+    """Indica si el PDF de esta petición debe generarse en segundo plano."""
+    parametro = request.GET.get('asincrono')
+    if parametro is not None:
+        return parametro == '1'
+    return getattr(settings, 'REPORTES_PDF_ASINCRONOS', False)
+
+
+def encolar_pdf(request, tipo, html_string, nombre_archivo, clave_cache=''):
+    """Crea el trabajo y redirige a la página de estado, que se refresca sola."""
+    trabajo = TrabajoReporte.objects.create(
+        colegio=request.colegio, usuario=request.user, tipo=tipo,
+        nombre_archivo=nombre_archivo, html=html_string,
+        base_url=request.build_absolute_uri(), clave_cache=clave_cache or '',
+    )
+    return redirect('estado_trabajo_reporte', trabajo_id=trabajo.id)
+
+
+def ruta_absoluta(trabajo):
+    return os.path.join(settings.REPORTES_GENERADOS_DIR, trabajo.ruta_archivo)
+
+
+def identificador_trabajador():
+    """'host:pid' del proceso actual; queda en el trabajo mientras lo renderiza."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def trabajador_muerto(trabajador):
+    """
+    True solo si el proceso es de esta máquina y ya no existe. Los de otras
+    máquinas no se pueden comprobar: para ellos cuenta el latido.
+    """
+    host, _, pid = trabajador.rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass
+    return False
+
+
+@contextmanager
+def latido(trabajo):
+    """
+    Renueva `fecha_latido` desde un hilo mientras dura el bloque, para que
+    `recuperar_trabajos_colgados` no devuelva a la cola un render largo que
+    sigue en curso. Sirve para cualquier trabajo con `estado` y `fecha_latido`
+    (también las importaciones).
+    """
+    detener = threading.Event()
+    modelo = type(trabajo)
+
+    def latir():
+        try:
+            while not detener.wait(SEGUNDOS_LATIDO):
+                modelo.objects.filter(id=trabajo.id, estado='PROCESANDO').update(fecha_latido=timezone.now())
+        finally:
+            # El hilo abre su propia conexión; se cierra al terminar.
+            connections.close_all()
+
+    hilo = threading.Thread(target=latir, daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def posicion_en_cola(trabajo):
+    """Trabajos pendientes del mismo colegio que se procesarán antes que este (incluido)."""
+    return _trabajos(trabajo.tipo in TIPOS_LOTE).filter(
+        colegio_id=trabajo.colegio_id, estado='PENDIENTE', fecha_creacion__lte=trabajo.fecha_creacion
+    ).count()
+
+
+def _trabajos(lotes):
+    if lotes:
+        return TrabajoReporte.objects.filter(tipo__in=TIPOS_LOTE)
+    return TrabajoReporte.objects.exclude(tipo__in=TIPOS_LOTE)
+
+
+def tomar_trabajo(lotes=False):
+    """
+    Reclama el trabajo pendiente más antiguo (con `lotes`, el lote más antiguo).
+    El UPDATE condicionado al estado garantiza que dos procesos no tomen el
+    mismo trabajo, tanto en PostgreSQL como en SQLite. Devuelve None si no hay
+    trabajos.
+    """
+    candidatos = _trabajos(lotes).filter(estado='PENDIENTE').order_by('fecha_creacion').values_list('id', flat=True)[:10]
+    for trabajo_id in candidatos:
+        ahora = timezone.now()
+        tomados = TrabajoReporte.objects.filter(id=trabajo_id, estado='PENDIENTE').update(
+            estado='PROCESANDO', fecha_inicio=ahora, fecha_latido=ahora,
+            trabajador=identificador_trabajador(), intentos=F('intentos') + 1,
+        )
+        if tomados:
+            return TrabajoReporte.objects.get(id=trabajo_id)
+    return None
+
+
+def procesar_trabajo(trabajo):
+    """Renderiza el PDF de un trabajo ya reclamado y registra el resultado."""
+    try:
+        if not pdf_disponible():
+            raise RuntimeError("La librería WeasyPrint no está disponible en el servidor de reportes.")
+        ruta_relativa = os.path.join(str(trabajo.colegio_id), f"{trabajo.id}.pdf")
+        ruta = os.path.join(settings.REPORTES_GENERADOS_DIR, ruta_relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with latido(trabajo):
+            renderizar_pdf(trabajo.html, base_url=trabajo.base_url, target=ruta)
+        if trabajo.clave_cache:
+            copiar_a_cache(trabajo.clave_cache, 'pdf', ruta)
+    except Exception as e:
+        estado = 'PENDIENTE' if trabajo.intentos < MAX_INTENTOS and pdf_disponible() else 'ERROR'
+        TrabajoReporte.objects.filter(id=trabajo.id).update(estado=estado, error=str(e), fecha_fin=timezone.now())
+        return False
+
+    TrabajoReporte.objects.filter(id=trabajo.id).update(
+        estado='TERMINADO', ruta_archivo=ruta_relativa, html='', error='', fecha_fin=timezone.now()
+    )
+    return True
+
+
+def recuperar_trabajos_colgados(minutos=MINUTOS_TRABAJO_COLGADO, lotes=False):
+    """
+    Devuelve a la cola los trabajos de un proceso que murió a mitad de render:
+    el de esta máquina cuyo PID ya no existe, o el que lleva `minutos` sin
+    latido. Un render largo cuyo proceso sigue vivo no se toca.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    procesando = _trabajos(lotes).filter(estado='PROCESANDO')
+    sin_latido = procesando.annotate(ultimo_latido=Coalesce('fecha_latido', 'fecha_inicio')).filter(ultimo_latido__lt=limite)
+    muertos = [
+        trabajo_id for trabajo_id, trabajador in procesando.exclude(trabajador='').values_list('id', 'trabajador')
+        if trabajador_muerto(trabajador)
+    ]
+    colgados = procesando.filter(Q(id__in=sin_latido.values('id')) | Q(id__in=muertos))
+    reintentables = colgados.filter(intentos__lt=MAX_INTENTOS).update(estado='PENDIENTE', trabajador='')
+    colgados.update(estado='ERROR', error='El proceso de renderizado no terminó.', fecha_fin=timezone.now())
+    return reintentables
+
+
+def limpiar_trabajos(dias):
+    """Elimina los trabajos terminados o fallidos más antiguos que `dias` y sus archivos."""
+    limite = timezone.now() - timedelta(days=dias)
+    viejos = TrabajoReporte.objects.filter(estado__in=['TERMINADO', 'ERROR'], fecha_creacion__lt=limite)
+    for trabajo in viejos.exclude(ruta_archivo=''):
+        try:
+            os.remove(ruta_absoluta(trabajo))
+        except FileNotFoundError:
+            pass
+    return viejos.delete()[0]
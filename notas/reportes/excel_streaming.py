@@ -0,0 +1,90 @@
+# notas/reportes/excel_streaming.py
+# Libros de Excel en modo `write_only`: openpyxl escribe cada fila a disco en
+# cuanto se agrega, así que la memoria no crece con el tamaño del reporte. El
+# archivo terminado se envía por partes con FileResponse (StreamingHttpResponse).
+# Los formatos se registran una vez por libro como estilos con nombre y cada
+# celda solo guarda el nombre del estilo.
+
+import re
+import tempfile
+
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side, PatternFill
+from openpyxl.utils import get_column_letter
+
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_BORDE = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+_CENTRO = Alignment(horizontal='center', vertical='center', wrap_text=True)
+_IZQUIERDA = Alignment(horizontal='left', vertical='center')
+
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+# nombre: atributos del NamedStyle
+ESTILOS = {
+    'titulo': {'font': Font(name='Calibri', bold=True, size=16), 'alignment': _CENTRO},
+    'subtitulo': {'font': Font(name='Calibri', bold=True, size=12), 'alignment': _CENTRO},
+    'centrado': {'alignment': _CENTRO},
+    'encabezado': {'font': Font(name='Calibri', bold=True), 'alignment': _CENTRO, 'fill': _relleno("DDEBF7"), 'border': _BORDE},
+    'encabezado_area': {'font': Font(name='Calibri', bold=True), 'alignment': _CENTRO, 'fill': _relleno("B4C6E7"), 'border': _BORDE},
+    'encabezado_simple': {'font': Font(bold=True)},
+    'celda': {'alignment': _CENTRO, 'border': _BORDE},
+    'celda_izquierda': {'alignment': _IZQUIERDA, 'border': _BORDE},
+    'celda_negrita': {'font': Font(name='Calibri', bold=True), 'border': _BORDE},
+    'acumulado': {'font': Font(name='Calibri', bold=True), 'alignment': _CENTRO, 'fill': _relleno("F2F2F2"), 'border': _BORDE},
+}
+
+
+def crear_libro():
+    """Libro en modo write_only con los estilos con nombre ya registrados."""
+    libro = Workbook(write_only=True)
+    for nombre, atributos in ESTILOS.items():
+        libro.add_named_style(NamedStyle(name=nombre, **atributos))
+    return libro
+
+
+def titulo_hoja(texto):
+    """Título válido para una hoja: sin los caracteres que Excel rechaza y con 31 caracteres como máximo."""
+    return re.sub(r'[\[\]:*?/\\]', '-', str(texto))[:31] or 'Hoja'
+
+
+def celda(hoja, valor=None, estilo=None, comentario=None):
+    """Celda para `hoja.append()`; `estilo` es el nombre de uno de ESTILOS."""
+    nueva = WriteOnlyCell(hoja, value=valor)
+    if estilo:
+        nueva.style = estilo
+    if comentario is not None:
+        nueva.comment = comentario
+    return nueva
+
+
+def combinar(hoja, fila_inicio, columna_inicio, fila_fin, columna_fin):
+    """Combina un rango de celdas (en write_only se registra y se escribe al guardar la hoja)."""
+    if (fila_inicio, columna_inicio) != (fila_fin, columna_fin):
+        hoja.merged_cells.add(f"{get_column_letter(columna_inicio)}{fila_inicio}:{get_column_letter(columna_fin)}{fila_fin}")
+
+
+def guardar_en_temporal(libro):
+    """
+    Guarda el libro en un archivo temporal anónimo y lo devuelve abierto y al
+    inicio. El archivo desaparece al cerrarlo (al terminar la descarga).
+    """
+    archivo = tempfile.TemporaryFile(suffix='.xlsx')
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def respuesta_xlsx(archivo, nombre_archivo, desde_cache=None):
+    """Envía por partes un archivo abierto (o una ruta) como descarga de Excel."""
+    if isinstance(archivo, str):
+        archivo = open(archivo, 'rb')
+    response = FileResponse(archivo, as_attachment=True, filename=nombre_archivo, content_type=TIPO_XLSX)
+    if desde_cache is not None:
+        response['X-Reporte-Cache'] = 'HIT' if desde_cache else 'MISS'
+    return response
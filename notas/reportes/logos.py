@@ -0,0 +1,221 @@
+# notas/reportes/logos.py
+# Caché de los logos que van en los encabezados de los reportes (PDF y Excel).
+# Los logos de los colegios están en el almacenamiento de archivos (Cloudinary
+# en producción), así que leerlos en cada reporte es una descarga por reporte.
+# Aquí cada logo se descarga una sola vez, se guarda en disco ya redimensionado
+# como PNG y se conserva en memoria (también su Data URI en base64). En los
+# PDF el logo va por URL (url_logo) para que se incruste una sola vez.
+#
+# La vista pública `logo_reporte` solo sirve la altura de los PDF del colegio
+# (alto_pdf), así que desde fuera no se pueden crear variantes nuevas.
+#
+# Las variantes se identifican por el nombre del archivo en el almacenamiento:
+# al subir otro logo cambia el nombre y se usa una variante nueva. La señal de
+# Colegio borra las variantes del logo anterior (ver signals.py).
+
+import base64
+import hashlib
+import io
+import os
+import re
+import tempfile
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.urls import Resolver404, resolve, reverse
+from PIL import Image, UnidentifiedImageError
+
+from ..models import Colegio
+
+CAMPOS_LOGO = ('logo_izquierdo', 'logo_derecho', 'escudo')
+
+# Los logos se guardan con más resolución de la que ocupan en pantalla para que
+# se vean nítidos al imprimir: alto en píxeles = alto mostrado × ESCALA_IMPRESION.
+ESCALA_IMPRESION = 3
+ALTO_LOGOS_PDF_DEFAULT = 65
+
+# (origen, alto) -> bytes del PNG. `origen` es el nombre del archivo en el
+# almacenamiento o 'static:<ruta>' para los archivos estáticos.
+_png = {}
+_data_uri = {}
+
+
+def _directorio():
+    return os.path.join(str(getattr(settings, 'REPORTES_CACHE_DIR', os.path.join(settings.BASE_DIR, 'reportes_cache'))), 'logos')
+
+
+def _prefijo(origen):
+    return hashlib.sha256(origen.encode()).hexdigest()[:32]
+
+
+def _ruta(origen, alto):
+    return os.path.join(_directorio(), f"{_prefijo(origen)}_{alto or 'original'}.png")
+
+
+def _redimensionar(contenido, alto):
+    """PNG del logo con `alto` píxeles como máximo (sin agrandarlo). None si no es una imagen válida."""
+    try:
+        with Image.open(io.BytesIO(contenido)) as imagen:
+            imagen = imagen.convert('RGBA')
+            if alto and imagen.height > alto:
+                imagen = imagen.resize((max(round(imagen.width * alto / imagen.height), 1), alto), Image.LANCZOS)
+            salida = io.BytesIO()
+            imagen.save(salida, format='PNG', optimize=True)
+            return salida.getvalue()
+    except (UnidentifiedImageError, OSError, ValueError):
+        return None
+
+
+def _variante(origen, alto, leer):
+    """Busca la variante en memoria, luego en disco; si no existe la genera con `leer()` y la guarda en ambos."""
+    clave = (origen, alto)
+    if clave in _png:
+        return _png[clave]
+
+    ruta = _ruta(origen, alto)
+    try:
+        with open(ruta, 'rb') as archivo:
+            _png[clave] = archivo.read()
+        return _png[clave]
+    except FileNotFoundError:
+        pass
+
+    try:
+        contenido = leer()
+    except Exception as e:
+        # Un logo que no se puede descargar no debe impedir el reporte; se reintenta en el siguiente.
+        print(f"ADVERTENCIA: No se pudo leer el logo '{origen}': {e}")
+        return None
+    png = _redimensionar(contenido, alto)
+    if png is None:
+        return None
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        archivo.write(png)
+    os.replace(temporal, ruta)
+    _png[clave] = png
+    return png
+
+
+def _leer_archivo(campo):
+    with campo.open('rb') as archivo:
+        return archivo.read()
+
+
+def logo_png(colegio, campo, alto=None):
+    """PNG (bytes) del logo `campo` del colegio con `alto` píxeles como máximo, o None si no tiene."""
+    archivo = getattr(colegio, campo, None)
+    if not archivo:
+        return None
+    return _variante(archivo.name, alto, lambda: _leer_archivo(archivo))
+
+
+def estatico_png(ruta, alto=None):
+    """Como logo_png, pero para una imagen de los archivos estáticos (p. ej. 'img/logo_colegio.png')."""
+    absoluta = finders.find(ruta)
+    if not absoluta:
+        return None
+
+    def leer():
+        with open(absoluta, 'rb') as archivo:
+            return archivo.read()
+    return _variante(f'static:{ruta}', alto, leer)
+
+
+def _a_data_uri(clave, png):
+    if png is None:
+        return ''
+    if clave not in _data_uri:
+        _data_uri[clave] = f"data:image/png;base64,{base64.b64encode(png).decode('ascii')}"
+    return _data_uri[clave]
+
+
+def logo_data_uri(colegio, campo, alto=None):
+    """Data URI del logo para incrustarlo en el HTML de un PDF; cadena vacía si no hay logo."""
+    png = logo_png(colegio, campo, alto)
+    return _a_data_uri((getattr(colegio, campo).name, alto), png) if png else ''
+
+
+def estatico_data_uri(ruta, alto=None):
+    return _a_data_uri((f'static:{ruta}', alto), estatico_png(ruta, alto))
+
+
+def version_logo(colegio, campo):
+    """Identifica el archivo actual del logo; cambia al subir otro logo."""
+    archivo = getattr(colegio, campo, None)
+    return _prefijo(archivo.name)[:12] if archivo else ''
+
+
+def alto_pdf(colegio):
+    """Alto en píxeles de los logos en los PDF del colegio, con la resolución de impresión."""
+    return (getattr(colegio, 'alto_logos_pdf', None) or ALTO_LOGOS_PDF_DEFAULT) * ESCALA_IMPRESION
+
+
+def url_logo(colegio, campo):
+    """
+    URL del logo ya redimensionado a alto_pdf (vista `logo_reporte`). Todas las
+    páginas de un PDF usan la misma URL, así que WeasyPrint incrusta el logo una
+    sola vez; motor_pdf la resuelve sin HTTP. Cadena vacía si el logo no se pudo
+    leer.
+    """
+    alto = alto_pdf(colegio)
+    if campo not in CAMPOS_LOGO or logo_png(colegio, campo, alto) is None:
+        return ''
+    return reverse('logo_reporte', kwargs={
+        'colegio_id': colegio.id, 'campo': campo, 'alto': alto, 'version': version_logo(colegio, campo),
+    })
+
+
+def png_de_url(colegio_id, campo, alto, version):
+    """
+    PNG del logo de una URL de url_logo, o None si el logo ya no es esa versión
+    o si `alto` no es el de los PDF del colegio (no se generan otras variantes).
+    """
+    colegio = Colegio.objects.filter(id=colegio_id).first()
+    if colegio is None or campo not in CAMPOS_LOGO or alto != alto_pdf(colegio) or version_logo(colegio, campo) != version:
+        return None
+    return logo_png(colegio, campo, alto)
+
+
+def incrustar_logos(html_string):
+    """
+    Reemplaza en el HTML las URL de url_logo por el Data URI del logo, para un
+    HTML que debe abrirse sin el sitio (y para comparar con los PDF anteriores,
+    que repetían el logo en cada página).
+    """
+    data_uris = {}
+
+    def reemplazar(coincidencia):
+        url = coincidencia[1]
+        if url not in data_uris:
+            try:
+                ruta = resolve(urlsplit(url).path)
+            except Resolver404:
+                ruta = None
+            png = png_de_url(**ruta.kwargs) if ruta and ruta.url_name == 'logo_reporte' else None
+            data_uris[url] = f"data:image/png;base64,{base64.b64encode(png).decode('ascii')}" if png else url
+        return f'src="{data_uris[url]}"'
+    return re.sub(r'src="([^"]+\.png)"', reemplazar, html_string)
+
+
+def invalidar_logos(nombres):
+    """Borra de memoria y de disco todas las variantes de los archivos `nombres`."""
+    prefijos = {_prefijo(nombre) for nombre in nombres if nombre}
+    if not prefijos:
+        return
+    for cache_memoria in (_png, _data_uri):
+        for clave in [c for c in cache_memoria if _prefijo(c[0]) in prefijos]:
+            del cache_memoria[clave]
+    try:
+        archivos = os.listdir(_directorio())
+    except FileNotFoundError:
+        return
+    for nombre_archivo in archivos:
+        if nombre_archivo.split('_', 1)[0] in prefijos:
+            try:
+                os.remove(os.path.join(_directorio(), nombre_archivo))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,243 @@
+# notas/reportes/motor_pdf.py
+# Servicio común de renderizado de PDF con WeasyPrint. Todas las vistas,
+# comandos y procesos de reportes convierten el HTML con `renderizar_pdf`, que
+# reutiliza entre documentos lo que antes se armaba desde cero en cada PDF:
+#
+# - Un FontConfiguration por hilo, que se crea una vez y se conserva, con la
+#   hoja común de fuentes (@font-face de las fuentes de FONT_CHOICES que estén
+#   en static/fonts) ya interpretada como objeto CSS.
+# - Las hojas auxiliares (p. ej. la que oculta la numeración en los PDF por
+#   partes) interpretadas una sola vez.
+# - Los recursos de /static/ y /media/ del propio sitio y los logos de los
+#   encabezados (vista `logo_reporte`) se leen del disco, del almacenamiento o
+#   de la caché de logos en vez de pedirlos por HTTP al mismo servidor, y
+#   quedan en una caché en memoria del proceso, igual que las imágenes ya
+#   decodificadas.
+#
+# Cada imagen distinta se incrusta una vez por PDF (WeasyPrint reutiliza las de
+# la misma URL) y los PDF se escriben con las fuentes reducidas a los glifos
+# usados y las imágenes optimizadas (OPCIONES_PDF).
+#
+# Los estilos propios de cada plantilla van en su <style> y se siguen
+# interpretando con cada documento.
+
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.files.storage import default_storage
+from django.urls import Resolver404, resolve
+
+from ..models import Colegio
+from . import logos
+
+try:
+    from weasyprint import HTML, CSS, default_url_fetcher
+    from weasyprint.text.fonts import FontConfiguration
+except (ImportError, OSError):
+    HTML = CSS = default_url_fetcher = FontConfiguration = None
+
+# Recursos en memoria por proceso. Los más grandes no se guardan: se leen cada vez.
+MAX_RECURSOS = 128
+MAX_BYTES_RECURSO = 5 * 1024 * 1024
+# Entradas de la caché de imágenes de WeasyPrint antes de vaciarla.
+MAX_IMAGENES = 256
+
+EXTENSIONES_FUENTE = ('.ttf', '.otf', '.woff', '.woff2')
+
+# Base para las URL relativas cuando el PDF no viene de una petición (comandos,
+# lotes). El dominio .invalid no existe: esas URL solo se resuelven localmente.
+URL_BASE_LOCAL = 'http://reportes.invalid/'
+
+# Opciones de write_pdf. Las fuentes se incrustan solo con los glifos usados y
+# sin hinting; las imágenes se recomprimen sin pérdida y las fotos se limitan a
+# la resolución de impresión (los JPEG se recomprimen con calidad 85).
+OPCIONES_PDF = {
+    'full_fonts': False,
+    'hinting': False,
+    'optimize_images': True,
+    'dpi': 300,
+    'jpeg_quality': 85,
+}
+
+_recursos = OrderedDict()
+_imagenes = {}
+_candado = threading.Lock()
+_local = threading.local()
+
+
+def disponible():
+    return HTML is not None
+
+
+def css_fuentes():
+    """@font-face de las fuentes de FONT_CHOICES que tienen archivo en static/fonts/<familia>.<ext>."""
+    reglas = []
+    for familia, _ in Colegio.FONT_CHOICES:
+        for extension in EXTENSIONES_FUENTE:
+            ruta_relativa = f"fonts/{familia}{extension}"
+            if finders.find(ruta_relativa):
+                reglas.append(f"@font-face {{ font-family: '{familia}'; src: url('{settings.STATIC_URL}{ruta_relativa}'); }}")
+                break
+    return '\n'.join(reglas)
+
+
+def _contexto():
+    """FontConfiguration y hojas ya interpretadas de este hilo; se crean en el primer render."""
+    contexto = getattr(_local, 'contexto', None)
+    if contexto is None:
+        fuentes = FontConfiguration()
+        comunes = []
+        reglas = css_fuentes()
+        if reglas:
+            comunes.append(CSS(string=reglas, font_config=fuentes, url_fetcher=url_fetcher))
+        contexto = _local.contexto = {'fuentes': fuentes, 'comunes': comunes, 'hojas': {}}
+    return contexto
+
+
+def hoja(css_string):
+    """Objeto CSS de `css_string`, interpretado una vez por hilo."""
+    contexto = _contexto()
+    if css_string not in contexto['hojas']:
+        contexto['hojas'][css_string] = CSS(string=css_string, font_config=contexto['fuentes'], url_fetcher=url_fetcher)
+    return contexto['hojas'][css_string]
+
+
+def _abrir_local(ruta):
+    """Contenido del recurso del sitio en la ruta `ruta` (/static/..., /media/... o un logo), o None."""
+    if ruta.startswith(settings.STATIC_URL):
+        nombre = ruta[len(settings.STATIC_URL):]
+        encontrado = finders.find(nombre)
+        if not encontrado and settings.STATIC_ROOT:
+            encontrado = os.path.join(settings.STATIC_ROOT, nombre)
+        if encontrado and os.path.isfile(encontrado):
+            with open(encontrado, 'rb') as archivo:
+                return archivo.read()
+        return None
+    if ruta.startswith(settings.MEDIA_URL):
+        nombre = ruta[len(settings.MEDIA_URL):]
+        try:
+            with default_storage.open(nombre, 'rb') as archivo:
+                return archivo.read()
+        except (OSError, ValueError):
+            return None
+    try:
+        coincidencia = resolve(ruta)
+    except Resolver404:
+        return None
+    if coincidencia.url_name == 'logo_reporte':
+        return logos.png_de_url(**coincidencia.kwargs)
+    return None
+
+
+def _es_del_sitio(url, base_url):
+    """Las URL sin servidor o con el mismo servidor que `base_url` son del propio sitio."""
+    partes = urlsplit(url)
+    if partes.scheme not in ('', 'http', 'https'):
+        return False
+    return not partes.netloc or partes.netloc == urlsplit(base_url or '').netloc
+
+
+def _recordar(clave, recurso):
+    if len(recurso.get('string', b'')) > MAX_BYTES_RECURSO:
+        return
+    with _candado:
+        _recursos[clave] = recurso
+        _recursos.move_to_end(clave)
+        while len(_recursos) > MAX_RECURSOS:
+            _recursos.popitem(last=False)
+
+
+def buscar_recurso(url, base_url=None, *args, **kwargs):
+    """
+    url_fetcher de WeasyPrint: los /static/ y /media/ del sitio se leen
+    localmente; el resto (otros servidores, file://) con el fetcher por
+    defecto. Ambos quedan en la caché en memoria; los data: no se guardan.
+    """
+    if url.startswith('data:'):
+        return default_url_fetcher(url, *args, **kwargs)
+
+    local = _es_del_sitio(url, base_url)
+    clave = unquote(urlsplit(url).path) if local else url
+    with _candado:
+        recurso = _recursos.get(clave)
+        if recurso is not None:
+            _recursos.move_to_end(clave)
+            return dict(recurso, redirected_url=url)
+
+    contenido = _abrir_local(clave) if local else None
+    if contenido is not None:
+        recurso = {'string': contenido, 'mime_type': mimetypes.guess_type(clave)[0] or 'application/octet-stream',
+                   'filename': os.path.basename(clave)}
+    else:
+        recurso = default_url_fetcher(url, *args, **kwargs)
+        if 'file_obj' in recurso:
+            with recurso.pop('file_obj') as archivo:
+                recurso['string'] = archivo.read()
+    _recordar(clave, recurso)
+    return dict(recurso, redirected_url=url)
+
+
+def recursos_de_logos(html_string):
+    """
+    Los logos de los encabezados (vista `logo_reporte`) que usa el HTML, ya
+    leídos, para pasarlos con `precargar` a un proceso que no debe consultar la
+    base de datos.
+    """
+    recursos = {}
+    for url in set(re.findall(r'src="([^"]+\.png)"', html_string)):
+        ruta = unquote(urlsplit(url).path)
+        try:
+            coincidencia = resolve(ruta)
+        except Resolver404:
+            continue
+        if coincidencia.url_name == 'logo_reporte' and ruta not in recursos:
+            recurso = buscar_recurso(ruta)
+            recurso.pop('redirected_url', None)
+            recursos[ruta] = recurso
+    return recursos
+
+
+def precargar(recursos):
+    """Guarda en la caché de este proceso los recursos de `recursos_de_logos`."""
+    for clave, recurso in recursos.items():
+        _recordar(clave, recurso)
+
+
+def url_fetcher(url, *args, **kwargs):
+    return buscar_recurso(url, None, *args, **kwargs)
+
+
+def _fetcher_para(base_url):
+    return lambda url, *args, **kwargs: buscar_recurso(url, base_url, *args, **kwargs)
+
+
+def vaciar_cache():
+    with _candado:
+        _recursos.clear()
+        _imagenes.clear()
+
+
+def renderizar_pdf(html_string, base_url=None, target=None, stylesheets=()):
+    """
+    Convierte `html_string` a PDF con el contexto de este hilo. `stylesheets`
+    son textos CSS adicionales (se interpretan una vez). Devuelve los bytes
+    del PDF, o None si se escribe en `target` (ruta o archivo).
+    """
+    if HTML is None:
+        raise RuntimeError("La librería WeasyPrint no está disponible.")
+    contexto = _contexto()
+    hojas = contexto['comunes'] + [hoja(css) for css in stylesheets]
+    with _candado:
+        if len(_imagenes) > MAX_IMAGENES:
+            _imagenes.clear()
+    base_url = base_url or URL_BASE_LOCAL
+    documento = HTML(string=html_string, base_url=base_url, url_fetcher=_fetcher_para(base_url))
+    return documento.write_pdf(
+        target=target, stylesheets=hojas, font_config=contexto['fuentes'], cache=_imagenes, **OPCIONES_PDF
+    )
@@ -3,14 +3,9 @@ import datetime
 from django.template.loader import render_to_string
 
 from .base_generator import BaseReportGenerator
-from .utils import get_meses_for_periodo, get_asistencia_data_for_report
+from .motor_pdf import renderizar_pdf, disponible as pdf_disponible
+from ..utils.helpers_reportes import get_meses_for_periodo, get_asistencia_data_for_report
 
-try:
-    from weasyprint import HTML
-    PDF_SUPPORT = True
-except ImportError:
-    HTML = None
-    PDF_SUPPORT = False
 
 class AsistenciaPDFGenerator(BaseReportGenerator):
     """
@@ -18,9 +13,20 @@ class AsistenciaPDFGenerator(BaseReportGenerator):
     y con el estilo exacto de la sábana de notas.
     """
     def generate_report(self, request, asignacion, periodo, mes_seleccionado: str):
-        if not PDF_SUPPORT:
+        if not pdf_disponible():
             return None, "La librería 'WeasyPrint' no está instalada en el servidor."
 
+        final_html, error = self.render_html(request, asignacion, periodo, mes_seleccionado)
+        if error:
+            return None, error
+        pdf_file = renderizar_pdf(final_html, base_url=request.build_absolute_uri('/'))
+        return pdf_file, None
+
+    def render_html(self, request, asignacion, periodo, mes_seleccionado: str):
+        """
+        Renderiza el HTML completo del reporte. Devuelve (html, None) o
+        (None, mensaje de error) si no hay datos de asistencia.
+        """
         reportes_por_mes = []
         meses_a_procesar = []
         
@@ -66,11 +72,7 @@ class AsistenciaPDFGenerator(BaseReportGenerator):
             'reportes_por_mes': reportes_por_mes,
         })
 
-        final_html = self._build_final_html(header_html, body_html)
-        base_url = request.build_absolute_uri('/')
-        pdf_file = HTML(string=final_html, base_url=base_url).write_pdf()
-
-        return pdf_file, None
+        return self._build_final_html(header_html, body_html), None
 
     def _build_final_html(self, header, body):
         """
@@ -0,0 +1,198 @@
+# notas/reportes/pdf_por_partes.py
+# Renderizado por partes de los documentos grandes de un curso (boletines,
+# sábana). WeasyPrint arma en memoria el diseño de todo el documento, así que
+# la memoria y el tiempo crecen con el número de estudiantes. Aquí la lista de
+# estudiantes se divide en partes, cada parte se renderiza en un proceso de un
+# grupo de procesos y los PDF resultantes se unen en uno solo con pypdf.
+#
+# La memoria de cada proceso depende del tamaño de la parte y no del curso.
+# Los números de página que las plantillas ponen con `counter(page)` se
+# reiniciarían en cada parte; por eso se ocultan al renderizar y se estampan
+# después sobre el PDF unido, con la numeración del documento completo.
+#
+# Los procesos del grupo no usan la base de datos: los logos de los
+# encabezados se leen en el proceso de la petición y se les pasan con cada
+# parte. El grupo se crea con las conexiones del padre cerradas y cada proceso
+# descarta (sin cerrarlas) las que pudiera haber heredado.
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import connections
+from django.template.loader import render_to_string
+
+from . import motor_pdf
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    from reportlab.lib.colors import HexColor
+    from reportlab.pdfgen import canvas
+except ImportError:
+    PdfReader = PdfWriter = None
+
+# Estudiantes por parte según el documento. Un boletín ocupa una o dos hojas
+# por estudiante; en la sábana caben unos diez estudiantes por hoja.
+TAMANO_PARTE_BOLETIN = 4
+TAMANO_PARTE_SABANA = 15
+
+# Pie de página de las plantillas: @bottom-right, Helvetica 8px, #555, margen de 1.5cm.
+_MARGEN_PT = 1.5 / 2.54 * 72
+_TAMANO_LETRA_PT = 6
+_SIN_NUMERACION = '@page { @bottom-right { content: none !important; } }'
+
+_grupo = None
+_candado = threading.Lock()
+# Conexiones heredadas del padre en un proceso del grupo. Se conservan para
+# que al liberarlas no se cierre el socket, que sigue siendo del padre.
+_heredadas = []
+
+
+def disponible():
+    return motor_pdf.disponible() and PdfWriter is not None
+
+
+def usar_partes(request, cantidad):
+    """
+    Indica si el documento de `cantidad` estudiantes se renderiza por partes:
+    `?partes=1` o `?partes=0` en la petición o, si no, a partir de
+    REPORTES_PDF_POR_PARTES_DESDE estudiantes (0 lo desactiva).
+    """
+    if not disponible():
+        return False
+    parametro = request.GET.get('partes')
+    if parametro is not None:
+        return parametro == '1'
+    desde = getattr(settings, 'REPORTES_PDF_POR_PARTES_DESDE', 0)
+    return bool(desde) and cantidad >= desde
+
+
+def numero_procesos():
+    return max(1, getattr(settings, 'REPORTES_PDF_PROCESOS', 2))
+
+
+def _inicializar_proceso():
+    """Descarta sin cerrarlas las conexiones heredadas: cerrarlas terminaría la sesión del padre."""
+    for conexion in connections.all():
+        if conexion.connection is not None:
+            _heredadas.append(conexion.connection)
+            conexion.connection = None
+
+
+def _grupo_procesos():
+    """
+    Grupo de procesos de este worker; se crea en el primer uso y se reutiliza.
+    Con 'fork' los procesos nacen en el primer `submit`, que sigue justo
+    después, así que no heredan la conexión abierta de la petición.
+    """
+    global _grupo
+    with _candado:
+        if _grupo is None:
+            connections.close_all()
+            _grupo = ProcessPoolExecutor(max_workers=numero_procesos(), initializer=_inicializar_proceso)
+        return _grupo
+
+
+def cerrar_grupo():
+    global _grupo
+    with _candado:
+        if _grupo is not None:
+            _grupo.shutdown()
+            _grupo = None
+
+
+def partes_html(template_path, context, clave, tamano, request=None):
+    """
+    Genera el HTML de cada parte: la plantilla con `tamano` elementos de
+    `context[clave]`. Cada elemento (si es un diccionario) lleva `numero`, su
+    posición en el documento completo, y el contexto lleva `parte` con
+    `primera` y `ultima` para que la plantilla ponga el encabezado y los
+    totales una sola vez.
+    """
+    elementos = list(context[clave])
+    for inicio in range(0, len(elementos), tamano):
+        parte = [
+            {**elemento, 'numero': inicio + i} if isinstance(elemento, dict) else elemento
+            for i, elemento in enumerate(elementos[inicio:inicio + tamano], 1)
+        ]
+        yield render_to_string(template_path, {
+            **context, clave: parte, 'parte': {'primera': inicio == 0, 'ultima': inicio + tamano >= len(elementos)},
+        }, request=request)
+
+
+def _renderizar(html_string, base_url, ruta, sin_numeracion, recursos):
+    """
+    Se ejecuta en un proceso del grupo: escribe el PDF de una parte en `ruta`.
+    `recursos` trae los logos ya leídos, así que no se consulta la base de datos.
+    """
+    motor_pdf.precargar(recursos)
+    motor_pdf.renderizar_pdf(html_string, base_url=base_url, target=ruta, stylesheets=[_SIN_NUMERACION] if sin_numeracion else ())
+    return ruta
+
+
+def _numerar(escritor, formato):
+    """Estampa `formato` (con {pagina} y {total}) donde las plantillas ponen el número de página."""
+    total = len(escritor.pages)
+    capa = io.BytesIO()
+    lienzo = canvas.Canvas(capa)
+    for numero, pagina in enumerate(escritor.pages, 1):
+        ancho, alto = float(pagina.mediabox.width), float(pagina.mediabox.height)
+        lienzo.setPageSize((ancho, alto))
+        lienzo.setFont('Helvetica', _TAMANO_LETRA_PT)
+        lienzo.setFillColor(HexColor('#555555'))
+        lienzo.drawRightString(ancho - _MARGEN_PT, _MARGEN_PT / 2 - _TAMANO_LETRA_PT / 3, formato.format(pagina=numero, total=total))
+        lienzo.showPage()
+    lienzo.save()
+    for pagina, sello in zip(escritor.pages, PdfReader(capa).pages):
+        pagina.merge_page(sello)
+
+
+def unir_pdfs(rutas, numeracion=None):
+    """Une los PDF de `rutas` en orden y devuelve los bytes; con `numeracion`, además numera las páginas."""
+    escritor = PdfWriter()
+    for ruta in rutas:
+        escritor.append(ruta)
+    if numeracion:
+        _numerar(escritor, numeracion)
+    salida = io.BytesIO()
+    escritor.write(salida)
+    return salida.getvalue()
+
+
+def renderizar_partes(htmls, base_url=None, numeracion=None):
+    """
+    Renderiza en paralelo el HTML de cada parte y devuelve el PDF unido. Se
+    envían al grupo a lo sumo dos partes por proceso a la vez, así que el HTML
+    de las partes se va generando a medida que se necesita.
+    """
+    en_vuelo = 2 * numero_procesos()
+    directorio = tempfile.mkdtemp(prefix='pdf_partes_')
+    try:
+        pendientes, rutas = deque(), []
+        for i, html_string in enumerate(htmls):
+            ruta = os.path.join(directorio, f'{i:05d}.pdf')
+            recursos = motor_pdf.recursos_de_logos(html_string)
+            # El grupo se pide después de generar el HTML (que puede consultar la base de datos).
+            grupo = _grupo_procesos()
+            pendientes.append(grupo.submit(_renderizar, html_string, base_url, ruta, bool(numeracion), recursos))
+            if len(pendientes) >= en_vuelo:
+                rutas.append(pendientes.popleft().result())
+        rutas.extend(futuro.result() for futuro in pendientes)
+        return unir_pdfs(rutas, numeracion)
+    except BrokenProcessPool:
+        # Un proceso murió (p. ej. por memoria): el próximo documento usa un grupo nuevo.
+        cerrar_grupo()
+        raise
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def renderizar_por_partes(template_path, context, clave, tamano, base_url=None, numeracion=None, request=None):
+    """Atajo de partes_html + renderizar_partes para las vistas."""
+    return renderizar_partes(partes_html(template_path, context, clave, tamano, request=request), base_url, numeracion)
@@ -0,0 +1,192 @@
+# notas/resumen_logic.py
+# Mantiene la tabla ResumenNotasPeriodo: los agregados que todos los reportes
+# recalculan a partir de las calificaciones (definitivas, acumulados, promedios
+# por área y promedio general) guardados en una fila por estudiante y periodo.
+#
+# Los leen las estadísticas y el puesto del boletín individual. El boletín y la
+# sábana del curso no: también muestran las notas SER/SABER/HACER, los logros y
+# las nivelaciones de cada materia, así que siguen leyendo las calificaciones.
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+from .models import (
+    Estudiante, Calificacion, AsignacionDocente, PeriodoAcademico,
+    PonderacionAreaMateria, ResumenNotasPeriodo
+)
+
+# Tipos de nota de los que dependen los resúmenes.
+TIPOS_NOTA_RESUMEN = ['PROM_PERIODO', 'NIVELACION']
+
+CAMPOS_RESUMEN = ['curso', 'promedio_general', 'promedio_areas', 'promedios_area', 'definitivas', 'acumuladas', 'actualizado']
+
+
+def asignaciones_con_area(colegio, **filtros):
+    """
+    Asignaciones cuyas materias salen en el boletín (las que tienen área). Solo
+    ellas cuentan para el promedio general y el puesto, aquí y en el boletín.
+    """
+    return AsignacionDocente.objects.filter(
+        colegio=colegio, materia_id__in=PonderacionAreaMateria.objects.filter(colegio=colegio).values('materia_id'), **filtros
+    )
+
+
+def _a_texto(valor):
+    return str(valor) if valor is not None else None
+
+
+def _calcular_resumen(estudiante, periodo, periodos_hasta, notas, ih_por_materia, ponderaciones):
+    """
+    Calcula los agregados de un estudiante para un periodo.
+
+    - `notas`: {(materia_id, periodo_id): {'prom': Decimal, 'niv': Decimal}} del estudiante.
+    - `ih_por_materia`: intensidad horaria de las materias con área del curso del estudiante.
+    - `ponderaciones`: lista de (area_nombre, materia_id, peso) del colegio.
+    """
+    definitivas = {}
+    for (materia_id, periodo_id), cal_data in notas.items():
+        if periodo_id == periodo.id:
+            definitivas[str(materia_id)] = {'prom': _a_texto(cal_data.get('prom')), 'niv': _a_texto(cal_data.get('niv'))}
+
+    # Promedio general del boletín: definitivas del periodo ponderadas por intensidad horaria.
+    suma_ponderada, total_ih = Decimal('0.0'), 0
+    acumuladas = {}
+    for materia_id, ih in ih_por_materia.items():
+        nota_periodo = notas.get((materia_id, periodo.id), {}).get('prom')
+        if nota_periodo is not None:
+            suma_ponderada += Decimal(nota_periodo) * ih
+            total_ih += ih
+
+        notas_acumuladas = []
+        for p in periodos_hasta:
+            cal_data = notas.get((materia_id, p.id), {})
+            nota_final = cal_data.get('niv') or cal_data.get('prom')
+            if nota_final is not None:
+                notas_acumuladas.append(Decimal(nota_final))
+        if notas_acumuladas:
+            acumulada = (sum(notas_acumuladas) / len(notas_acumuladas)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+            acumuladas[str(materia_id)] = str(acumulada)
+
+    promedio_general = (suma_ponderada / total_ih).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if total_ih > 0 else None
+
+    # Promedios por área de las estadísticas: todas las materias calificadas en el periodo.
+    sumas_area = defaultdict(lambda: [Decimal('0.0'), Decimal('0.0')])
+    for area_nombre, materia_id, peso in ponderaciones:
+        nota = notas.get((materia_id, periodo.id), {}).get('prom')
+        if nota is not None:
+            sumas_area[area_nombre][0] += nota * peso
+            sumas_area[area_nombre][1] += peso
+
+    promedios_area = {
+        area_nombre: (suma / pesos).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+        for area_nombre, (suma, pesos) in sumas_area.items() if pesos > 0
+    }
+    promedio_areas = None
+    if promedios_area:
+        promedio_areas = (sum(promedios_area.values()) / Decimal(len(promedios_area))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    return ResumenNotasPeriodo(
+        colegio_id=periodo.colegio_id, estudiante=estudiante, periodo=periodo, curso_id=estudiante.curso_id,
+        promedio_general=promedio_general, promedio_areas=promedio_areas,
+        promedios_area={nombre: str(valor) for nombre, valor in promedios_area.items()},
+        definitivas=definitivas, acumuladas=acumuladas, actualizado=timezone.now(),
+    )
+
+
+def actualizar_resumenes(colegio, periodo, estudiante_ids=None):
+    """
+    Recalcula el resumen de los estudiantes indicados (o de todo el colegio)
+    para `periodo` y para los periodos posteriores del mismo año, cuyos
+    acumulados dependen de él. Usa un número fijo de consultas.
+    """
+    periodos_del_ano = list(PeriodoAcademico.objects.filter(colegio=colegio, ano_lectivo=periodo.ano_lectivo).order_by('fecha_inicio'))
+    periodos_a_actualizar = [p for p in periodos_del_ano if p.fecha_inicio >= periodo.fecha_inicio]
+    if not periodos_a_actualizar:
+        return 0
+
+    estudiantes = Estudiante.objects.filter(colegio=colegio)
+    if estudiante_ids is not None:
+        estudiantes = estudiantes.filter(id__in=list(estudiante_ids))
+    estudiantes = list(estudiantes)
+    if not estudiantes:
+        return 0
+
+    notas_por_estudiante = defaultdict(lambda: defaultdict(dict))
+    for cal in Calificacion.objects.filter(
+        colegio=colegio, estudiante__in=estudiantes, periodo__in=periodos_del_ano,
+        tipo_nota__in=TIPOS_NOTA_RESUMEN
+    ).values('estudiante_id', 'materia_id', 'periodo_id', 'valor_nota', 'tipo_nota'):
+        clave = 'prom' if cal['tipo_nota'] == 'PROM_PERIODO' else 'niv'
+        notas_por_estudiante[cal['estudiante_id']][(cal['materia_id'], cal['periodo_id'])][clave] = cal['valor_nota']
+
+    ih_por_curso = defaultdict(dict)
+    for asignacion in asignaciones_con_area(colegio, curso_id__in={e.curso_id for e in estudiantes}):
+        ih_por_curso[asignacion.curso_id][asignacion.materia_id] = asignacion.intensidad_horaria_semanal
+
+    ponderaciones = [
+        (p.area.nombre, p.materia_id, p.peso_porcentual)
+        for p in PonderacionAreaMateria.objects.filter(colegio=colegio).select_related('area').order_by('id')
+    ]
+
+    resumenes = []
+    for estudiante in estudiantes:
+        notas = notas_por_estudiante.get(estudiante.id, {})
+        for p in periodos_a_actualizar:
+            periodos_hasta = [x for x in periodos_del_ano if x.fecha_inicio <= p.fecha_inicio]
+            resumenes.append(_calcular_resumen(estudiante, p, periodos_hasta, notas, ih_por_curso.get(estudiante.curso_id, {}), ponderaciones))
+
+    ResumenNotasPeriodo.objects.bulk_create(
+        resumenes, batch_size=500, update_conflicts=True,
+        unique_fields=['estudiante', 'periodo', 'colegio'], update_fields=CAMPOS_RESUMEN,
+    )
+    return len(resumenes)
+
+
+def reconstruir_resumenes(colegio, ano_lectivo=None):
+    """Reconstruye desde cero los resúmenes de un colegio (opcionalmente de un solo año)."""
+    primeros_periodos = PeriodoAcademico.objects.filter(colegio=colegio)
+    resumenes = ResumenNotasPeriodo.objects.filter(colegio=colegio)
+    if ano_lectivo:
+        primeros_periodos = primeros_periodos.filter(ano_lectivo=ano_lectivo)
+        resumenes = resumenes.filter(periodo__ano_lectivo=ano_lectivo)
+    resumenes.delete()
+
+    total = 0
+    anos_procesados = set()
+    for periodo in primeros_periodos.order_by('ano_lectivo', 'fecha_inicio'):
+        if periodo.ano_lectivo in anos_procesados:
+            continue
+        anos_procesados.add(periodo.ano_lectivo)
+        total += actualizar_resumenes(colegio, periodo)
+    return total
+
+
+def recalcular_resumenes(colegio_id, estudiante_ids=None, periodo=None):
+    """
+    Recalcula los resúmenes cuando cambia algo de lo que dependen fuera de la
+    planilla (ponderaciones, intensidades, notas editadas en el admin, el curso
+    de un estudiante), para que la tabla siga completa. Con `periodo`, desde
+    ese periodo del año; si no, en los años que ya tienen resúmenes de esos
+    estudiantes (o de todo el colegio). Usa un número fijo de consultas por año.
+    """
+    if estudiante_ids is not None:
+        estudiante_ids = list(estudiante_ids)
+    if periodo is not None:
+        return actualizar_resumenes(colegio_id, periodo, estudiante_ids)
+
+    existentes = ResumenNotasPeriodo.objects.filter(colegio_id=colegio_id)
+    if estudiante_ids is not None:
+        existentes = existentes.filter(estudiante_id__in=estudiante_ids)
+    total = 0
+    for ano_lectivo in existentes.order_by().values_list('periodo__ano_lectivo', flat=True).distinct():
+        primero = PeriodoAcademico.objects.filter(colegio_id=colegio_id, ano_lectivo=ano_lectivo).order_by('fecha_inicio').first()
+        total += actualizar_resumenes(colegio_id, primero, estudiante_ids)
+    return total
+
+
+def recalcular_resumenes_cursos(colegio_id, curso_ids):
+    """Como recalcular_resumenes, para los estudiantes de los cursos indicados."""
+    estudiante_ids = Estudiante.objects.filter(colegio_id=colegio_id, curso_id__in=[c for c in curso_ids if c]).values_list('id', flat=True)
+    return recalcular_resumenes(colegio_id, estudiante_ids)
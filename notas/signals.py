@@ -0,0 +1,106 @@
+# notas/signals.py
+# Receptores de señales que mantienen sincronizadas las cachés derivadas de los modelos.
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Colegio, EscalaValoracion, PonderacionAreaMateria, AsignacionDocente, Notificacion, Calificacion, Estudiante, PeriodoAcademico
+)
+from .middleware import invalidar_colegios_por_host
+from .resumen_logic import TIPOS_NOTA_RESUMEN, recalcular_resumenes, recalcular_resumenes_cursos
+from .utils.escala_valoracion import invalidar_escala
+from .utils.notificaciones import invalidar_contadores
+from .reportes.logos import CAMPOS_LOGO, invalidar_logos
+
+
+@receiver([post_save, post_delete], sender=Colegio)
+def invalidar_cache_colegios(sender, instance, **kwargs):
+    invalidar_colegios_por_host()
+
+
+@receiver(pre_save, sender=Colegio)
+def detectar_cambio_logos(sender, instance, **kwargs):
+    anteriores = sender.objects.filter(pk=instance.pk).values_list(*CAMPOS_LOGO).first() if instance.pk else None
+    actuales = {getattr(instance, campo).name for campo in CAMPOS_LOGO}
+    instance._logos_reemplazados = [nombre for nombre in anteriores or () if nombre and nombre not in actuales]
+
+
+@receiver(post_save, sender=Colegio)
+def invalidar_logos_reemplazados(sender, instance, **kwargs):
+    invalidar_logos(getattr(instance, '_logos_reemplazados', ()))
+
+
+@receiver(post_delete, sender=Colegio)
+def invalidar_logos_colegio_eliminado(sender, instance, **kwargs):
+    invalidar_logos(getattr(instance, campo).name for campo in CAMPOS_LOGO)
+
+
+@receiver([post_save, post_delete], sender=Notificacion)
+def invalidar_contador_notificaciones(sender, instance, **kwargs):
+    invalidar_contadores([instance.destinatario_id])
+
+
+@receiver([post_save, post_delete], sender=EscalaValoracion)
+def invalidar_cache_escala(sender, instance, **kwargs):
+    invalidar_escala(instance.colegio_id)
+
+
+def _al_confirmar(funcion, *args):
+    # Después del commit: el cálculo ve el estado final (p. ej. tras un borrado en cascada).
+    transaction.on_commit(lambda: funcion(*args))
+
+
+@receiver([post_save, post_delete], sender=PonderacionAreaMateria)
+def recalcular_resumenes_por_ponderacion(sender, instance, **kwargs):
+    cursos = set(AsignacionDocente.objects.filter(colegio_id=instance.colegio_id, materia_id=instance.materia_id).values_list('curso_id', flat=True))
+    _al_confirmar(recalcular_resumenes_cursos, instance.colegio_id, cursos)
+
+
+@receiver(pre_save, sender=AsignacionDocente)
+def detectar_cambio_asignacion(sender, instance, **kwargs):
+    # Los porcentajes SER/SABER/HACER no afectan a los resúmenes; solo curso, materia e intensidad.
+    anterior = sender.objects.filter(pk=instance.pk).values('curso_id', 'materia_id', 'intensidad_horaria_semanal').first() if instance.pk else None
+    cambio = anterior != {
+        'curso_id': instance.curso_id, 'materia_id': instance.materia_id,
+        'intensidad_horaria_semanal': instance.intensidad_horaria_semanal,
+    }
+    instance._cursos_afectados = {instance.curso_id, (anterior or {}).get('curso_id')} if cambio else set()
+
+
+@receiver(post_save, sender=AsignacionDocente)
+def recalcular_resumenes_por_asignacion(sender, instance, **kwargs):
+    cursos = getattr(instance, '_cursos_afectados', {instance.curso_id})
+    if cursos:
+        _al_confirmar(recalcular_resumenes_cursos, instance.colegio_id, cursos)
+
+
+@receiver(post_delete, sender=AsignacionDocente)
+def recalcular_resumenes_por_asignacion_eliminada(sender, instance, **kwargs):
+    _al_confirmar(recalcular_resumenes_cursos, instance.colegio_id, {instance.curso_id})
+
+
+@receiver([post_save, post_delete], sender=Calificacion)
+def recalcular_resumenes_por_calificacion(sender, instance, **kwargs):
+    # La planilla guarda con bulk_create/bulk_update (sin señales) y actualiza los resúmenes ella misma.
+    if instance.tipo_nota in TIPOS_NOTA_RESUMEN:
+        _al_confirmar(_recalcular_estudiante, instance.colegio_id, instance.estudiante_id, instance.periodo_id)
+
+
+def _recalcular_estudiante(colegio_id, estudiante_id, periodo_id):
+    periodo = PeriodoAcademico.objects.filter(pk=periodo_id).first()
+    if periodo is not None:
+        recalcular_resumenes(colegio_id, [estudiante_id], periodo)
+
+
+@receiver(pre_save, sender=Estudiante)
+def detectar_cambio_curso(sender, instance, **kwargs):
+    anterior = sender.objects.filter(pk=instance.pk).values_list('curso_id', flat=True).first() if instance.pk else None
+    instance._cambio_curso = anterior is not None and anterior != instance.curso_id
+
+
+@receiver(post_save, sender=Estudiante)
+def recalcular_resumenes_por_cambio_curso(sender, instance, **kwargs):
+    if getattr(instance, '_cambio_curso', False):
+        _al_confirmar(recalcular_resumenes, instance.colegio_id, [instance.pk])
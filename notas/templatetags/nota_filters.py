@@ -7,6 +7,8 @@ import base64
 import mimetypes
 from decimal import Decimal
 
+from ..reportes.logos import url_logo, estatico_data_uri, ESCALA_IMPRESION
+
 register = template.Library()
 
 @register.filter(name='get_item')
@@ -27,12 +29,17 @@ def get_static_path(path):
     return ''
 
 @register.filter(name='get_image_base64')
-def get_image_base64(path: str) -> str:
+def get_image_base64(path: str, alto=None) -> str:
     """
     Encuentra un archivo estático, lo codifica en Base64 y lo devuelve como un
-    Data URI listo para ser incrustado en una etiqueta <img>.
+    Data URI listo para ser incrustado en una etiqueta <img>. Las imágenes se
+    toman de la caché de logos; otros archivos se codifican tal cual. Con
+    `alto` (píxeles mostrados) la imagen se reduce a su tamaño de impresión.
     """
     try:
+        data_uri = estatico_data_uri(path, int(alto) * ESCALA_IMPRESION if alto else None)
+        if data_uri:
+            return data_uri
         absolute_path = finders.find(path)
         if not absolute_path:
             return ""
@@ -45,6 +52,20 @@ def get_image_base64(path: str) -> str:
     except (IOError, TypeError):
         return ""
 
+@register.filter(name='logo_colegio')
+def logo_colegio(colegio, campo):
+    """
+    Logo del colegio (`campo`: 'logo_izquierdo', 'logo_derecho' o 'escudo') para
+    los encabezados de los reportes: URL del logo en la caché de logos, con la
+    resolución justa para imprimirlo a la altura configurada en el colegio. Es
+    la misma en todas las páginas, así que el PDF lo incrusta una sola vez. Si
+    el logo no se pudo leer se devuelve su URL original, como antes.
+    """
+    archivo = getattr(colegio, campo, None)
+    if not archivo:
+        return ""
+    return url_logo(colegio, campo) or archivo.url
+
 @register.filter(name='get_initials')
 def get_initials(user):
     """
@@ -95,7 +116,7 @@ def get_unread_notification_count(user):
         return 0
 
 # ---------------------- NUEVO FILTRO: desempeNO ---------------------------
-from notas.models import EscalaValoracion
+from notas.utils.escala_valoracion import get_escala_compilada
 
 @register.filter(name='desempeno')
 def obtener_desempeno(nota, colegio):
@@ -106,11 +127,6 @@ def obtener_desempeno(nota, colegio):
     if nota is None or colegio is None:
         return ''
     try:
-        escala = EscalaValoracion.objects.filter(colegio=colegio).order_by('-valor_maximo')
-        nota_decimal = Decimal(str(nota))
-        for rango in escala:
-            if rango.valor_minimo <= nota_decimal <= rango.valor_maximo:
-                return rango.nombre_desempeno.upper()
+        return get_escala_compilada(colegio).buscar(nota) or ''
     except Exception:
         return ''
-    return ''
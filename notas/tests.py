@@ -1,9 +1,1503 @@
-from django.urls import path
-from . import views
-
-# Este es el mapa de rutas específico de la aplicación 'notas'
-urlpatterns = [
-    # Cuando alguien visite la URL 'login/', Django ejecutará la función 'login_vista'
-    # que crearemos en el archivo views.py. Le damos el nombre 'login' para identificarla.
-    path('login/', views.login_vista, name='login'),
-]
\ No newline at end of file
+# notas/tests.py
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+import zipfile
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+from PIL import Image as PILImage
+from django.conf import settings
+from django.contrib import admin as admin_site
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, Count
+from django.http import Http404
+from django.template.loader import render_to_string
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .models import (
+    Colegio, Curso, Docente, Estudiante, FichaEstudiante, AreaConocimiento, Materia,
+    PeriodoAcademico, AsignacionDocente, Calificacion, IndicadorLogroPeriodo,
+    Asistencia, PonderacionAreaMateria, EscalaValoracion, NotaDetallada, InasistenciasManualesPeriodo,
+    TrabajoReporte, TrabajoImportacion, Notificacion
+)
+from .models.academicos import ConfiguracionCalificaciones
+from .boletin import acumulado
+from .boletin import lote
+from .boletin.documento import preparar_boletin, clave_cache_boletin
+from .boletin.logic import get_datos_boletin_curso, get_datos_boletin_final, get_puesto_en_curso
+from .utils import escala_valoracion
+from .utils.cache_compartida import cache_compartida
+from .utils.escala_valoracion import EscalaCompilada, get_escala_compilada
+from .models import ResumenNotasPeriodo
+from .resumen_logic import actualizar_resumenes, reconstruir_resumenes
+from . import context_processors, estadisticas_logic, middleware
+from .utils.notificaciones import crear_notificacion, crear_notificaciones_multiples
+from .utils.datos_sinteticos import crear_colegio_sintetico
+from .views.ingreso_notas_views import IngresoNotasView, _cargar_planilla
+from .views import boletin_views, estadisticas_views, import_views, importar_asistencia_views, publicacion_views, reporte_views, reportes_trabajos_views, sabana_views
+from .reportes import cola_pdf, cache_artefactos, logos, motor_pdf, pdf_por_partes
+from .reportes.pdf_generator import AsistenciaPDFGenerator
+
+# La caché compartida es en disco; en las pruebas se usa una en memoria.
+_caches_de_prueba = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'estadisticas': settings.CACHES['estadisticas'],
+    'compartida': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'compartida-pruebas'},
+})
+
+
+def setUpModule():
+    _caches_de_prueba.enable()
+
+
+def tearDownModule():
+    _caches_de_prueba.disable()
+
+
+def limpiar_caches():
+    """Vacía la caché local, la compartida y las copias en memoria de la escala y del colegio por host."""
+    cache.clear()
+    cache_compartida().clear()
+    escala_valoracion._escalas_locales.clear()
+    middleware._colegios_por_host.clear()
+
+
+def crear_colegio_de_prueba(num_estudiantes=3, nombre='Colegio de Prueba'):
+    """
+    Crea un colegio mínimo pero completo (escala, áreas, materias, asignaciones,
+    dos periodos con notas, asistencia e indicadores) para las pruebas.
+    """
+    colegio = Colegio.objects.create(nombre=nombre, domain=f"{nombre.lower().replace(' ', '-')}.test")
+    for nombre_desempeno, minimo, maximo in [('BAJO', '1.0', '2.9'), ('BASICO', '3.0', '3.9'), ('ALTO', '4.0', '4.5'), ('SUPERIOR', '4.6', '5.0')]:
+        EscalaValoracion.objects.create(colegio=colegio, nombre_desempeno=nombre_desempeno, valor_minimo=Decimal(minimo), valor_maximo=Decimal(maximo))
+
+    curso = Curso.objects.create(colegio=colegio, nombre='601')
+    docente = Docente.objects.create(colegio=colegio, user=User.objects.create_user(f'docente_{colegio.slug}', first_name='Ana', last_name='Docente'))
+
+    periodo_1 = PeriodoAcademico.objects.create(colegio=colegio, nombre='PRIMERO', ano_lectivo=2025, fecha_inicio=datetime.date(2025, 2, 1), fecha_fin=datetime.date(2025, 4, 30))
+    periodo_2 = PeriodoAcademico.objects.create(colegio=colegio, nombre='SEGUNDO', ano_lectivo=2025, fecha_inicio=datetime.date(2025, 5, 1), fecha_fin=datetime.date(2025, 7, 31))
+
+    matematicas = AreaConocimiento.objects.create(colegio=colegio, nombre='Matemáticas')
+    humanidades = AreaConocimiento.objects.create(colegio=colegio, nombre='Humanidades')
+    materias = {
+        'ARITMETICA': (matematicas, Decimal('60.00'), 4),
+        'GEOMETRIA': (matematicas, Decimal('40.00'), 2),
+        'ESPAÑOL': (humanidades, Decimal('100.00'), 5),
+    }
+    asignaciones = {}
+    for nombre_materia, (area, peso, ih) in materias.items():
+        materia = Materia.objects.create(colegio=colegio, nombre=nombre_materia)
+        PonderacionAreaMateria.objects.create(colegio=colegio, area=area, materia=materia, peso_porcentual=peso)
+        asignaciones[nombre_materia] = AsignacionDocente.objects.create(colegio=colegio, docente=docente, materia=materia, curso=curso, intensidad_horaria_semanal=ih)
+        IndicadorLogroPeriodo.objects.create(colegio=colegio, asignacion=asignaciones[nombre_materia], periodo=periodo_2, descripcion=f'Comprende {nombre_materia.lower()}')
+
+    estudiantes = []
+    for i in range(num_estudiantes):
+        user = User.objects.create_user(f'est_{colegio.slug}_{i}', first_name=f'Nombre{i}', last_name=f'Apellido{i:03d}')
+        estudiante = Estudiante.objects.create(colegio=colegio, user=user, curso=curso)
+        FichaEstudiante.objects.create(estudiante=estudiante, numero_documento=f'{colegio.pk}{i:06d}')
+        estudiantes.append(estudiante)
+        for j, asignacion in enumerate(asignaciones.values()):
+            for periodo, base in ((periodo_1, Decimal('2.5')), (periodo_2, Decimal('3.1'))):
+                valor = min(base + Decimal(i % 5) * Decimal('0.4') + Decimal(j) * Decimal('0.15'), Decimal('5.0'))
+                for tipo in ('SER', 'SABER', 'HACER', 'PROM_PERIODO'):
+                    Calificacion.objects.create(colegio=colegio, estudiante=estudiante, materia=asignacion.materia, periodo=periodo, docente=docente, tipo_nota=tipo, valor_nota=valor)
+            Asistencia.objects.create(colegio=colegio, estudiante=estudiante, asignacion=asignacion, fecha=datetime.date(2025, 5, 10 + j), estado='A')
+        Calificacion.objects.create(colegio=colegio, estudiante=estudiante, materia=asignaciones['ARITMETICA'].materia, periodo=periodo_1, docente=docente, tipo_nota='NIVELACION', valor_nota=Decimal('3.5'))
+
+    return {
+        'colegio': colegio, 'curso': curso, 'docente': docente, 'estudiantes': estudiantes,
+        'periodos': [periodo_1, periodo_2], 'asignaciones': asignaciones,
+    }
+
+
+class BoletinCursoTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+
+    def test_numero_de_consultas_no_depende_del_tamano_del_curso(self):
+        pequeno = crear_colegio_de_prueba(num_estudiantes=2, nombre='Colegio Pequeno')
+        grande = crear_colegio_de_prueba(num_estudiantes=12, nombre='Colegio Grande')
+
+        with self.assertNumQueries(11):
+            get_datos_boletin_curso(pequeno['colegio'], pequeno['curso'], pequeno['periodos'][1])
+        with self.assertNumQueries(11):
+            boletines = get_datos_boletin_curso(grande['colegio'], grande['curso'], grande['periodos'][1])
+
+        # Renderizar los datos (docente, logros, notas) no debe disparar consultas perezosas.
+        with self.assertNumQueries(0):
+            for boletin in boletines:
+                for area in boletin['areas']:
+                    for materia in area['materias']:
+                        materia['docente'].user.get_full_name()
+                        [logro.descripcion for logro in materia['logros']]
+                        materia['ser'].valor_nota
+
+    def test_calculos_del_boletin_de_periodo(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=3)
+        boletines = get_datos_boletin_curso(datos['colegio'], datos['curso'], datos['periodos'][1])
+
+        self.assertEqual([b['estudiante'] for b in boletines], datos['estudiantes'])
+        primero = boletines[0]
+        self.assertEqual(primero['promedio_general'], Decimal('3.26'))
+        self.assertEqual(primero['puesto'], 3)
+
+        areas = {a['nombre']: a for a in primero['areas']}
+        matematicas = areas['MATEMÁTICAS']
+        self.assertEqual(matematicas['nota_final_area'], Decimal('3.2'))
+        self.assertEqual(matematicas['desempeno_area'], 'BASICO')
+        # Acumulado de aritmética: nivelación del primer periodo (3.5) y 3.1 del segundo.
+        self.assertEqual(matematicas['materias'][0]['def_acumulada'], Decimal('3.3'))
+        self.assertEqual(matematicas['materias'][0]['inasistencias'], 1)
+        self.assertEqual(len(matematicas['materias'][0]['logros']), 1)
+
+    def test_boletin_de_estudiante_especifico(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=3)
+        estudiante = datos['estudiantes'][2]
+        boletines = get_datos_boletin_curso(datos['colegio'], datos['curso'], datos['periodos'][1], estudiante)
+
+        self.assertEqual(len(boletines), 1)
+        self.assertEqual(boletines[0]['estudiante'], estudiante)
+        self.assertEqual(boletines[0]['promedio_general'], Decimal('4.06'))
+
+    def test_boletin_final(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=2)
+        boletines, nombres_periodos = get_datos_boletin_final(datos['colegio'], datos['curso'], 2025)
+
+        self.assertEqual(nombres_periodos, ['Primer Periodo', 'Segundo Periodo'])
+        self.assertEqual(boletines[0]['estado_promocion'], 'PROMOVIDO')
+        self.assertEqual(boletines[0]['puesto_final'], 2)
+
+
+    def _assert_puesto_individual_igual_al_del_curso(self, datos):
+        colegio, curso, periodo = datos['colegio'], datos['curso'], datos['periodos'][1]
+        puestos_curso = {b['estudiante'].id: b['puesto'] for b in get_datos_boletin_curso(colegio, curso, periodo)}
+        finales_curso = {b['estudiante'].id: b['puesto_final'] for b in get_datos_boletin_final(colegio, curso, 2025)[0]}
+        for estudiante in datos['estudiantes']:
+            individual = get_datos_boletin_curso(colegio, curso, periodo, estudiante)
+            self.assertEqual(individual[0]['puesto'], puestos_curso[estudiante.id])
+            final = get_datos_boletin_final(colegio, curso, 2025, estudiante)[0]
+            self.assertEqual(final[0]['puesto_final'], finales_curso[estudiante.id])
+
+    def test_puesto_del_boletin_individual_sin_resumenes(self):
+        # Hay empates de promedio (i % 5): se desempatan igual que en el boletín del curso.
+        self._assert_puesto_individual_igual_al_del_curso(crear_colegio_de_prueba(num_estudiantes=7))
+
+    def test_puesto_del_boletin_individual_desde_resumenes(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=7)
+        reconstruir_resumenes(datos['colegio'])
+        self._assert_puesto_individual_igual_al_del_curso(datos)
+
+        with self.assertNumQueries(1):
+            puesto = get_puesto_en_curso(datos['colegio'], datos['curso'], datos['periodos'][1], datos['estudiantes'][4])
+        self.assertEqual(puesto, 1)
+
+    def test_puesto_desde_resumenes_ignora_materias_sin_area(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=5)
+        colegio, periodo = datos['colegio'], datos['periodos'][1]
+        # Materia sin área con mucha intensidad: no sale en el boletín, así que no
+        # puede invertir el puesto aunque favorezca al de menor promedio.
+        etica = Materia.objects.create(colegio=colegio, nombre='ETICA')
+        AsignacionDocente.objects.create(colegio=colegio, docente=datos['docente'], materia=etica, curso=datos['curso'], intensidad_horaria_semanal=20)
+        for i, estudiante in enumerate(datos['estudiantes']):
+            Calificacion.objects.create(colegio=colegio, estudiante=estudiante, materia=etica, periodo=periodo, docente=datos['docente'],
+                                        tipo_nota='PROM_PERIODO', valor_nota=Decimal('5.0') if i == 0 else Decimal('1.0'))
+        reconstruir_resumenes(colegio)
+
+        self._assert_puesto_individual_igual_al_del_curso(datos)
+        self.assertEqual(get_puesto_en_curso(colegio, datos['curso'], periodo, datos['estudiantes'][4]), 1)
+        self.assertEqual(get_puesto_en_curso(colegio, datos['curso'], periodo, datos['estudiantes'][0]), 5)
+
+
+    def test_renderizar_plantillas_del_boletin_no_hace_consultas(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=3)
+        colegio, curso = datos['colegio'], datos['curso']
+        curso.director_grado = datos['docente']
+        curso.save()
+        FichaEstudiante.objects.filter(estudiante=datos['estudiantes'][1]).delete()
+
+        for nivel in ('BAS', 'PRE'):
+            curso.nivel = nivel
+            curso.save()
+            for reporte_id in (datos['periodos'][1].id, 'FINAL_2025'):
+                for estudiante in (None, datos['estudiantes'][1]):
+                    template_path, context, _ = preparar_boletin(colegio, curso, reporte_id, estudiante)
+                    with self.assertNumQueries(0):
+                        html = render_to_string(template_path, context)
+                    self.assertIn('Ana Docente', html)
+                    self.assertIn(datos['estudiantes'][1].user.username, html)
+                    if estudiante is None:
+                        self.assertIn(f"{colegio.pk}{0:06d}", html)
+
+
+class EscalaValoracionTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+
+    def test_busqueda_en_escala_compilada(self):
+        escala = EscalaCompilada([
+            (Decimal('3.0'), Decimal('3.9'), 'BASICO'), (Decimal('1.0'), Decimal('2.9'), 'BAJO'),
+            (Decimal('4.6'), Decimal('5.0'), 'SUPERIOR'), (Decimal('4.0'), Decimal('4.5'), 'ALTO'),
+        ])
+        self.assertEqual(escala.buscar(Decimal('1.0')), 'BAJO')
+        self.assertEqual(escala.buscar(Decimal('3.95')), None)
+        self.assertEqual(escala.buscar(Decimal('4.5')), 'ALTO')
+        self.assertEqual(escala.valoracion(Decimal('3.95')), 'BASICO')
+        self.assertEqual(escala.valoracion(None), '')
+        self.assertEqual(escala.desempeno(Decimal('0.5')), 'SIN ESCALA')
+        self.assertEqual(escala.nombres_descendentes, ['SUPERIOR', 'ALTO', 'BASICO', 'BAJO'])
+
+    def test_escala_en_cache_se_invalida_al_guardar(self):
+        colegio = Colegio.objects.create(nombre='Colegio Escala')
+        nivel = EscalaValoracion.objects.create(colegio=colegio, nombre_desempeno='bajo', valor_minimo=Decimal('1.0'), valor_maximo=Decimal('2.9'))
+
+        with self.assertNumQueries(1):
+            get_escala_compilada(colegio)
+            get_escala_compilada(colegio)
+
+        nivel.valor_maximo = Decimal('3.4')
+        nivel.save()
+        self.assertEqual(get_escala_compilada(colegio).buscar(Decimal('3.2')), 'BAJO')
+
+        nivel.delete()
+        self.assertFalse(get_escala_compilada(colegio))
+
+    def test_escala_se_comparte_entre_procesos(self):
+        colegio = Colegio.objects.create(nombre='Colegio Escala Compartida')
+        nivel = EscalaValoracion.objects.create(colegio=colegio, nombre_desempeno='bajo', valor_minimo=Decimal('1.0'), valor_maximo=Decimal('2.9'))
+        get_escala_compilada(colegio)
+
+        # Otro proceso (sin la copia en memoria de este) la lee de la caché compartida.
+        escala_valoracion._escalas_locales.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_escala_compilada(colegio).buscar(Decimal('2.0')), 'BAJO')
+
+        # Al guardar se invalida la caché compartida: cuando vence su copia local, el otro proceso ve el cambio.
+        nivel.nombre_desempeno = 'bajo nuevo'
+        nivel.save()
+        self.assertIsNone(cache_compartida().get(escala_valoracion._cache_key(colegio.pk)))
+        escala_valoracion._escalas_locales[colegio.pk] = (0, EscalaCompilada([(Decimal('1.0'), Decimal('2.9'), 'bajo')]))
+        self.assertEqual(get_escala_compilada(colegio).buscar(Decimal('2.0')), 'BAJO NUEVO')
+
+
+class ResumenNotasTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.datos = crear_colegio_de_prueba(num_estudiantes=4)
+        self.colegio = self.datos['colegio']
+        self.periodo = self.datos['periodos'][1]
+
+    def test_resumen_coincide_con_boletin(self):
+        reconstruir_resumenes(self.colegio)
+        boletines = get_datos_boletin_curso(self.colegio, self.datos['curso'], self.periodo)
+        resumenes = {r.estudiante_id: r for r in ResumenNotasPeriodo.objects.filter(periodo=self.periodo)}
+
+        self.assertEqual(len(resumenes), 4)
+        for boletin in boletines:
+            resumen = resumenes[boletin['estudiante'].id]
+            self.assertEqual(resumen.promedio_general, boletin['promedio_general'])
+            aritmetica = {a['nombre']: a for a in boletin['areas']}['MATEMÁTICAS']['materias'][0]
+            self.assertEqual(resumen.acumuladas[str(self.datos['asignaciones']['ARITMETICA'].materia_id)], str(aritmetica['def_acumulada']))
+
+    def test_estadisticas_desde_resumenes_igual_que_recalculadas(self):
+        filtros = {'colegio': self.colegio, 'periodo_id': self.periodo.id}
+        recalculado = estadisticas_logic._get_rendimiento_estudiantes_bulk(filtros)
+        reconstruir_resumenes(self.colegio)
+        desde_resumenes = estadisticas_logic._get_rendimiento_desde_resumenes(
+            self.colegio, Estudiante.objects.filter(curso__colegio=self.colegio, is_active=True),
+            [e.id for e in self.datos['estudiantes']], self.periodo.id
+        )
+        self.assertIsNotNone(desde_resumenes)
+        for estudiante_id, datos in recalculado.items():
+            self.assertEqual(desde_resumenes[estudiante_id]['promedio_general'], datos['promedio_general'])
+            self.assertEqual(desde_resumenes[estudiante_id]['promedios_area'], datos['promedios_area'])
+
+    def test_actualizacion_incremental_propaga_a_periodos_siguientes(self):
+        reconstruir_resumenes(self.colegio)
+        estudiante = self.datos['estudiantes'][0]
+        materia = self.datos['asignaciones']['GEOMETRIA'].materia
+        Calificacion.objects.filter(estudiante=estudiante, materia=materia, periodo=self.datos['periodos'][0], tipo_nota='PROM_PERIODO').update(valor_nota=Decimal('5.0'))
+
+        actualizar_resumenes(self.colegio, self.datos['periodos'][0], [estudiante.id])
+
+        resumen = ResumenNotasPeriodo.objects.get(estudiante=estudiante, periodo=self.periodo)
+        # (5.0 + 3.25) / 2 = 4.125 -> 4.1
+        self.assertEqual(resumen.acumuladas[str(materia.id)], '4.1')
+
+    def _resumen(self, estudiante, periodo=None):
+        return ResumenNotasPeriodo.objects.get(estudiante=estudiante, periodo=periodo or self.periodo)
+
+    def test_cambio_de_ponderacion_recalcula_resumenes(self):
+        reconstruir_resumenes(self.colegio)
+        estudiante = self.datos['estudiantes'][1]
+        anterior = self._resumen(estudiante).promedios_area['MATEMÁTICAS']
+        ponderacion = PonderacionAreaMateria.objects.get(colegio=self.colegio, materia=self.datos['asignaciones']['ARITMETICA'].materia)
+        ponderacion.peso_porcentual = Decimal('100.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            ponderacion.save()
+
+        # La tabla sigue completa (las estadísticas la siguen usando) y con el nuevo peso.
+        self.assertEqual(ResumenNotasPeriodo.objects.filter(colegio=self.colegio).count(), 8)
+        self.assertNotEqual(self._resumen(estudiante).promedios_area['MATEMÁTICAS'], anterior)
+        filtros = {'colegio': self.colegio, 'periodo_id': self.periodo.id}
+        desde_resumenes = estadisticas_logic._get_rendimiento_desde_resumenes(
+            self.colegio, self.datos['estudiantes'], [e.id for e in self.datos['estudiantes']], self.periodo.id
+        )
+        recalculado = estadisticas_logic._get_rendimiento_estudiantes_bulk(filtros)
+        self.assertEqual(desde_resumenes[estudiante.id]['promedios_area'], recalculado[estudiante.id]['promedios_area'])
+
+    def test_cambio_de_intensidad_recalcula_el_curso(self):
+        reconstruir_resumenes(self.colegio)
+        estudiante = self.datos['estudiantes'][1]
+        asignacion = self.datos['asignaciones']['ESPAÑOL']
+        asignacion.intensidad_horaria_semanal = 20
+        with self.captureOnCommitCallbacks(execute=True):
+            asignacion.save()
+
+        boletin = get_datos_boletin_curso(self.colegio, self.datos['curso'], self.periodo, estudiante)[0]
+        self.assertEqual(self._resumen(estudiante).promedio_general, boletin['promedio_general'])
+
+    def test_nota_editada_fuera_de_la_planilla_recalcula_resumenes(self):
+        reconstruir_resumenes(self.colegio)
+        estudiante, otro = self.datos['estudiantes'][:2]
+        resumen_otro = self._resumen(otro)
+        nota = Calificacion.objects.get(estudiante=estudiante, materia=self.datos['asignaciones']['ESPAÑOL'].materia, periodo=self.datos['periodos'][0], tipo_nota='PROM_PERIODO')
+        nota.valor_nota = Decimal('1.0')
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.save()
+
+        # El periodo editado y los siguientes del año se recalculan; los demás estudiantes no cambian.
+        self.assertEqual(self._resumen(estudiante, self.datos['periodos'][0]).promedios_area['HUMANIDADES'], '1.0')
+        self.assertEqual(self._resumen(otro).actualizado, resumen_otro.actualizado)
+        filtros = {'colegio': self.colegio, 'periodo_id': self.datos['periodos'][0].id}
+        desde_resumenes = estadisticas_logic._get_rendimiento_desde_resumenes(
+            self.colegio, self.datos['estudiantes'], [e.id for e in self.datos['estudiantes']], filtros['periodo_id']
+        )
+        self.assertEqual(desde_resumenes[estudiante.id]['promedios_area']['HUMANIDADES'], Decimal('1.0'))
+
+    def test_cambio_de_curso_recalcula_resumenes(self):
+        reconstruir_resumenes(self.colegio)
+        estudiante = self.datos['estudiantes'][0]
+        estudiante.save()
+        self.assertEqual(ResumenNotasPeriodo.objects.filter(estudiante=estudiante).count(), 2)
+
+        estudiante.curso = Curso.objects.create(colegio=self.colegio, nombre='602')
+        with self.captureOnCommitCallbacks(execute=True):
+            estudiante.save()
+        # El curso nuevo no tiene materias: los resúmenes pasan a él y sin promedio general.
+        resumen = self._resumen(estudiante)
+        self.assertEqual((resumen.curso_id, resumen.promedio_general), (estudiante.curso_id, None))
+
+
+class IngresoNotasTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.admin = User.objects.create_superuser('admin_notas', password='x')
+
+    def _guardar(self, datos, planilla, asignacion='ARITMETICA', porcentajes=None):
+        payload = {
+            'asignacion_id': datos['asignaciones'][asignacion].id,
+            'periodo_id': datos['periodos'][1].id,
+            'estudiantes': planilla,
+            'porcentajes': porcentajes,
+        }
+        request = RequestFactory().post('/docente/ingresar-notas/', data=json.dumps(payload), content_type='application/json')
+        request.user, request.colegio = self.admin, datos['colegio']
+        request._dont_enforce_csrf_checks = True
+        response = IngresoNotasView.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    def _planilla(self, estudiantes):
+        return [
+            {'id': e.id, 'notas': {'ser': [{'descripcion': 'Actitud', 'valor': '4,0'}, {'descripcion': 'Participación', 'valor': '5'}],
+                                   'saber': [{'descripcion': 'Examen', 'valor': '3.0'}], 'hacer': []},
+             'inasistencias': str(i)}
+            for i, e in enumerate(estudiantes)
+        ]
+
+    def test_guarda_promedios_detalles_e_inasistencias(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=2)
+        asignacion = datos['asignaciones']['ARITMETICA']
+        estado, respuesta = self._guardar(datos, self._planilla(datos['estudiantes']))
+        self.assertEqual(estado, 200, respuesta)
+
+        estudiante = datos['estudiantes'][1]
+        notas = {c.tipo_nota: c.valor_nota for c in Calificacion.objects.filter(estudiante=estudiante, materia=asignacion.materia, periodo=datos['periodos'][1])}
+        self.assertEqual(notas['SER'], Decimal('4.50'))
+        self.assertEqual(notas['SABER'], Decimal('3.00'))
+        self.assertEqual(notas['HACER'], Decimal('0.00'))
+        esperada = (Decimal('4.50') * asignacion.ser_calc / 100 + Decimal('3.00') * asignacion.saber_calc / 100).quantize(Decimal('0.01'))
+        self.assertEqual(notas['PROM_PERIODO'], esperada)
+        self.assertEqual(NotaDetallada.objects.filter(calificacion_promedio__estudiante=estudiante).count(), 3)
+        self.assertEqual(InasistenciasManualesPeriodo.objects.get(estudiante=estudiante, asignacion=asignacion).cantidad, 1)
+
+    def test_numero_de_consultas_no_depende_del_tamano_de_la_planilla(self):
+        consultas = []
+        for n in (2, 6):
+            datos = crear_colegio_de_prueba(num_estudiantes=n, nombre=f'Colegio Planilla {n}')
+            with CaptureQueriesContext(connection) as contexto:
+                estado, _ = self._guardar(datos, self._planilla(datos['estudiantes']))
+            self.assertEqual(estado, 200)
+            consultas.append(len(contexto))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_guardar_sin_cambios_no_reescribe_notas_detalladas(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=2)
+        planilla = self._planilla(datos['estudiantes'])
+        self._guardar(datos, planilla)
+        ids_antes = set(NotaDetallada.objects.values_list('id', flat=True))
+        self._guardar(datos, planilla)
+        self.assertEqual(set(NotaDetallada.objects.values_list('id', flat=True)), ids_antes)
+
+    def test_errores_por_estudiante_no_guardan_la_planilla(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=3)
+        planilla = self._planilla(datos['estudiantes'])
+        planilla[1]['notas']['saber'] = [{'descripcion': 'Examen', 'valor': '7'}]
+        planilla[2]['notas']['hacer'] = [{'descripcion': 'Taller', 'valor': 'abc'}]
+        planilla.append({'id': 999999, 'notas': {}, 'inasistencias': 0})
+
+        estado, respuesta = self._guardar(datos, planilla)
+        self.assertEqual(estado, 400)
+        self.assertEqual([e['estudiante_id'] for e in respuesta['errores']], [datos['estudiantes'][1].id, datos['estudiantes'][2].id, 999999])
+        self.assertFalse(NotaDetallada.objects.exists())
+
+    def test_porcentajes_solo_se_guardan_con_una_planilla_valida(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=2)
+        ConfiguracionCalificaciones.objects.update_or_create(colegio=datos['colegio'], defaults={'docente_puede_modificar': True})
+        asignacion = datos['asignaciones']['ARITMETICA']
+        porcentajes = {'ser': 20, 'saber': 50, 'hacer': 30}
+        planilla = self._planilla(datos['estudiantes'])
+        planilla[1]['notas']['saber'] = [{'descripcion': 'Examen', 'valor': '7'}]
+
+        estado, _ = self._guardar(datos, planilla, porcentajes=porcentajes)
+        self.assertEqual(estado, 400)
+        asignacion.refresh_from_db()
+        self.assertEqual((asignacion.porcentaje_ser, asignacion.porcentaje_saber, asignacion.porcentaje_hacer), (30, 40, 30))
+
+        estado, _ = self._guardar(datos, self._planilla(datos['estudiantes']), porcentajes=porcentajes)
+        self.assertEqual(estado, 200)
+        asignacion.refresh_from_db()
+        self.assertEqual((asignacion.porcentaje_ser, asignacion.porcentaje_saber, asignacion.porcentaje_hacer), (20, 50, 30))
+
+    def test_carga_de_planilla_con_consultas_fijas_y_sin_escrituras(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=4)
+        asignacion, periodo = datos['asignaciones']['ARITMETICA'], datos['periodos'][1]
+        self._guardar(datos, self._planilla(datos['estudiantes'][:2]))
+        estudiantes = Estudiante.objects.filter(curso=datos['curso']).select_related('user').order_by('user__last_name')
+        inasistencias_antes = InasistenciasManualesPeriodo.objects.count()
+
+        with self.assertNumQueries(4):
+            planilla = _cargar_planilla(datos['colegio'], asignacion, periodo, estudiantes)
+
+        self.assertEqual(InasistenciasManualesPeriodo.objects.count(), inasistencias_antes)
+        self.assertEqual(planilla[0]['notas']['ser'], [{'descripcion': 'Actitud', 'valor': '4.00'}, {'descripcion': 'Participación', 'valor': '5.00'}])
+        self.assertEqual(planilla[0]['notas']['hacer'], [])
+        self.assertEqual([p['inasistencias'] for p in planilla], [0, 1, 0, 0])
+        self.assertEqual(planilla[3]['notas'], {'ser': [], 'saber': [], 'hacer': []})
+
+
+class AcumuladoTests(TestCase):
+
+    def _decimal(self, valor):
+        return None if valor < 0 else Decimal(int(valor)) / 100
+
+    def _promedio_ponderado(self, notas_y_pesos):
+        presentes = [(n, w) for n, w in notas_y_pesos if n is not None and w]
+        if not presentes:
+            return None
+        return (sum(n * w for n, w in presentes) / sum(w for _, w in presentes)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+
+    def test_nucleo_igual_al_calculo_con_decimal(self):
+        azar = random.Random(7)
+        estudiantes, materias, periodos = 6, 4, 3
+        prom = np.array([[[azar.randint(100, 500) if azar.random() > 0.2 else -1 for _ in range(periodos)] for _ in range(materias)] for _ in range(estudiantes)])
+        niv = np.where((prom >= 0) & (prom < 300), 350, -1)
+        pesos_por_par = {(1, 10): Decimal('60.00'), (1, 11): Decimal('40.00'), (2, 12): Decimal('50.00'), (2, 13): Decimal('50.00')}
+        pesos = acumulado.matriz_pesos(pesos_por_par, [10, 11, 12, 13], [1, 2])
+        calculo = acumulado.calcular_acumulado(prom, niv, pesos, ih=[4, 2, 3, 1])
+
+        for sufijo, notas in (('', prom), ('_rec', np.where(niv > 0, niv, prom))):
+            for e in range(estudiantes):
+                acumuladas = []
+                for j in range(materias):
+                    validas = [self._decimal(n) for n in notas[e, j] if n >= 0]
+                    acumuladas.append((sum(validas) / len(validas)).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP) if validas else None)
+                    self.assertEqual(acumulado.a_decimal(calculo['materia_acumulada' + sufijo][e, j]), acumuladas[j])
+                for k, (area, materias_area) in enumerate([(1, (10, 11)), (2, (12, 13))]):
+                    columnas = [m - 10 for m in materias_area]
+                    esperada = self._promedio_ponderado([(acumuladas[j], pesos_por_par[(area, j + 10)]) for j in columnas])
+                    self.assertEqual(acumulado.a_decimal(calculo['area_acumulada' + sufijo][e, k]), esperada)
+                    for p in range(periodos):
+                        esperada = self._promedio_ponderado([(self._decimal(notas[e, j, p]), pesos_por_par[(area, j + 10)]) for j in columnas])
+                        self.assertEqual(acumulado.a_decimal(calculo['area_periodo' + sufijo][e, k, p]), esperada)
+
+            for e in range(estudiantes):
+                finales = [(acumulado.a_decimal(v), ih) for v, ih in zip(calculo['materia_acumulada_rec'][e], [4, 2, 3, 1]) if v >= 0]
+                esperado = (sum(v * ih for v, ih in finales) / sum(ih for _, ih in finales)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                self.assertEqual(acumulado.a_decimal(calculo['promedio_ih_acumulado_rec'][e], 2), esperado)
+
+    def test_puestos(self):
+        valores = [Decimal('3.5'), Decimal('4.1'), Decimal('3.5'), Decimal('2.0')]
+        self.assertEqual(acumulado.puestos(valores), [2, 1, 3, 4])
+        self.assertEqual(acumulado.puestos(valores, compartidos=True), [2, 1, 2, 4])
+
+    def test_sabana_y_boletines_usan_las_mismas_notas(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=4)
+        colegio, curso, periodo = datos['colegio'], datos['curso'], datos['periodos'][1]
+        sabana = sabana_views._get_sabana_acumulada_data(colegio, curso, periodo)[0]
+        boletines = get_datos_boletin_curso(colegio, curso, periodo)
+        finales, _ = get_datos_boletin_final(colegio, curso, 2025)
+
+        for fila, boletin, final in zip(sabana, boletines, finales):
+            self.assertEqual(fila['info'], boletin['estudiante'])
+            areas_acumuladas = [c['nota'] for c in fila['fila_acumulada']['celdas'] if c['is_area']]
+            self.assertEqual(areas_acumuladas, [a['nota_final_area_acumulada'] for a in boletin['areas']])
+            self.assertEqual(areas_acumuladas, [a['nota_final_area'] for a in final['areas']])
+            self.assertEqual([c['nota_original'] for c in fila['filas_notas'][1]['celdas'] if c['is_area']], [a['nota_final_area'] for a in boletin['areas']])
+
+        # La nivelación de aritmética (3.5) sube la nota de Matemáticas del primer periodo: (3.5·60 + 2.65·40) / 100 = 3.16.
+        celdas = sabana[0]['filas_notas'][0]['celdas']
+        self.assertEqual((celdas[4]['nota_original'], celdas[4]['nota_recuperacion']), (Decimal('2.6'), Decimal('3.2')))
+        self.assertIsNone(celdas[1]['nota_recuperacion'])
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'estadisticas': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'estadisticas-pruebas'},
+})
+class EstadisticasTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        caches['estadisticas'].clear()
+        self.datos = crear_colegio_de_prueba(num_estudiantes=6)
+        self.colegio = self.datos['colegio']
+        # Casos en el límite del redondeo: (3.05·60 + 3.05·40) / 100 = 3.05 -> 3.1.
+        estudiante = self.datos['estudiantes'][0]
+        Calificacion.objects.filter(estudiante=estudiante, tipo_nota='PROM_PERIODO', materia__nombre__in=['ARITMETICA', 'GEOMETRIA']).update(valor_nota=Decimal('3.05'))
+        Calificacion.objects.filter(estudiante=self.datos['estudiantes'][1], tipo_nota='PROM_PERIODO', materia__nombre='ESPAÑOL').delete()
+
+    def _rendimiento_con_decimal(self, filtros):
+        """Cálculo de referencia con Decimal, nota por nota."""
+        calificaciones = Calificacion.objects.filter(colegio=self.colegio, tipo_nota='PROM_PERIODO', periodo_id=filtros['periodo_id'])
+        notas = {(c.estudiante_id, c.materia_id): c.valor_nota for c in calificaciones}
+        resultado = {}
+        for estudiante in self.datos['estudiantes']:
+            promedios_area = {}
+            for area in AreaConocimiento.objects.filter(colegio=self.colegio):
+                suma, pesos = Decimal('0'), Decimal('0')
+                for ponderacion in PonderacionAreaMateria.objects.filter(area=area):
+                    nota = notas.get((estudiante.id, ponderacion.materia_id))
+                    if nota is not None:
+                        suma += nota * ponderacion.peso_porcentual
+                        pesos += ponderacion.peso_porcentual
+                if pesos:
+                    promedios_area[area.nombre] = (suma / pesos).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP)
+            general = (sum(promedios_area.values()) / len(promedios_area)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            resultado[estudiante.id] = (general, promedios_area)
+        return resultado
+
+    def test_calculo_vectorizado_igual_al_decimal(self):
+        filtros = {'colegio': self.colegio, 'periodo_id': self.datos['periodos'][1].id}
+        esperado = self._rendimiento_con_decimal(filtros)
+        obtenido = estadisticas_logic._get_rendimiento_estudiantes_bulk(filtros)
+
+        self.assertEqual(obtenido[self.datos['estudiantes'][0].id]['promedios_area']['MATEMÁTICAS'], Decimal('3.1'))
+        self.assertNotIn('HUMANIDADES', obtenido[self.datos['estudiantes'][1].id]['promedios_area'])
+        for estudiante_id, (general, promedios_area) in esperado.items():
+            self.assertEqual(obtenido[estudiante_id]['promedio_general'], general)
+            self.assertEqual(obtenido[estudiante_id]['promedios_area'], promedios_area)
+
+    def test_distribuciones_y_rankings(self):
+        filtros = {'colegio': self.colegio, 'periodo_id': self.datos['periodos'][1].id, 'curso_ids': [self.datos['curso'].id]}
+        rendimiento = estadisticas_logic._get_rendimiento_estudiantes_bulk(filtros)
+        promedios = sorted((d['promedio_general'] for d in rendimiento.values()), reverse=True)
+
+        general = estadisticas_logic.get_rendimiento_general(filtros)
+        self.assertEqual(sum(nivel['total'] for nivel in general['distribucion']), 6)
+        self.assertEqual(general['promedio_general'], round(float(sum(promedios) / 6), 2))
+
+        honor = estadisticas_logic.get_cuadro_honor(filtros)
+        self.assertEqual([h['promedio'] for h in honor], [float(p) for p in promedios[:3]])
+        self.assertEqual(estadisticas_logic.get_ranking_cursos(filtros), ({self.datos['curso'].id: 1}, 1))
+
+        with self.assertNumQueries(1):
+            por_materia = estadisticas_logic.get_distribucion_por_materia(filtros)
+        self.assertEqual([m['materia_nombre'] for m in por_materia], ['ARITMETICA', 'ESPAÑOL', 'GEOMETRIA'])
+        self.assertEqual([m['total_estudiantes'] for m in por_materia], [6, 5, 6])
+
+        notas = Calificacion.objects.filter(colegio=self.colegio, tipo_nota='PROM_PERIODO', periodo=self.datos['periodos'][1])
+        histograma = estadisticas_logic.get_histograma_distribucion(filtros)
+        self.assertEqual(sum(histograma['data']), notas.count())
+        self.assertEqual(histograma['data'][4], notas.filter(valor_nota__gte=Decimal('3.0'), valor_nota__lt=Decimal('3.5')).count())
+
+
+    def test_cache_de_rendimiento_se_invalida_al_cambiar_las_notas(self):
+        filtros = {'colegio': self.colegio, 'periodo_id': self.datos['periodos'][1].id}
+        primero = estadisticas_logic.get_rendimiento_general(filtros)
+        self.assertEqual(estadisticas_logic.get_rendimiento_general(dict(filtros)), primero)
+        self.assertEqual(estadisticas_logic.info_cache_rendimiento(), {'aciertos': 1, 'fallos': 1})
+
+        Calificacion.objects.filter(colegio=self.colegio, periodo=self.datos['periodos'][1], tipo_nota='PROM_PERIODO').update(valor_nota=Decimal('5.0'))
+        despues = estadisticas_logic.get_rendimiento_general(filtros)
+        self.assertEqual(despues['promedio_general'], 5.0)
+        self.assertEqual(estadisticas_logic.info_cache_rendimiento(), {'aciertos': 1, 'fallos': 2})
+
+    def test_graficas_desde_una_sola_lectura_de_notas(self):
+        filtros = {'colegio': self.colegio, 'ano_lectivo': 2025, 'curso_ids': [self.datos['curso'].id]}
+        with self.assertNumQueries(1):
+            notas = estadisticas_logic.NotasFiltradas(filtros)
+        # Solo se consultan aparte los nombres de los docentes y las ponderaciones, una vez cada uno.
+        with self.assertNumQueries(2):
+            por_docente = estadisticas_logic.get_reprobados_por_docente(filtros, notas)
+            por_materia = estadisticas_logic.get_materias_reprobadas(filtros, notas)
+            por_area = estadisticas_logic.get_reprobados_por_area_materia(filtros, notas)
+            por_docente_materia = estadisticas_logic.get_materias_reprobadas_por_docente(filtros, notas)
+            apilado = estadisticas_logic.get_promedios_por_area_apilado(filtros, notas)
+            promedios = estadisticas_logic.get_promedios_por_materia(filtros, notas)
+            histograma = estadisticas_logic.get_histograma_distribucion(filtros, notas)
+
+        notas_db = Calificacion.objects.filter(colegio=self.colegio, tipo_nota='PROM_PERIODO')
+        reprobadas = notas_db.filter(valor_nota__lt=Decimal('3.0'))
+        esperado = dict(reprobadas.values_list('materia__nombre').annotate(total=Count('id')))
+        self.assertEqual(por_docente, [('Ana Docente', reprobadas.count())])
+        self.assertEqual({r['materia__nombre']: r['total_reprobados'] for r in por_materia}, esperado)
+        self.assertEqual([r['total_reprobados'] for r in por_materia], sorted(esperado.values(), reverse=True))
+        self.assertEqual({(r['docente'], r['materia']): r['total_reprobados'] for r in por_docente_materia}, {('Ana Docente', m): t for m, t in esperado.items()})
+        self.assertEqual(por_area['labels'], ['HUMANIDADES', 'MATEMÁTICAS'])
+        self.assertEqual({d['label']: sum(d['data']) for d in por_area['datasets']}, esperado)
+        self.assertEqual(sum(histograma['data']), notas_db.count())
+
+        promedios_db = dict(notas_db.values_list('materia__nombre').annotate(promedio=Avg('valor_nota')))
+        self.assertEqual([p['materia_nombre'] for p in promedios], ['ARITMETICA', 'ESPAÑOL', 'GEOMETRIA'])
+        for item in promedios:
+            self.assertAlmostEqual(item['promedio'], float(promedios_db[item['materia_nombre']]))
+        self.assertEqual(apilado['labels'], ['HUMANIDADES', 'MATEMÁTICAS'])
+        aritmetica = next(d for d in apilado['datasets'] if d['label'] == 'ARITMETICA')
+        self.assertEqual(aritmetica['percentMap'], [0.0, 60.0])
+        self.assertEqual(aritmetica['data'], [0.0, round(float(promedios_db['ARITMETICA']) * 60 / 100, 1)])
+
+        # Sin una lectura compartida, cada función consulta por su cuenta y da lo mismo.
+        self.assertEqual(estadisticas_logic.get_reprobados_por_docente(filtros), por_docente)
+        self.assertEqual(estadisticas_logic.get_materias_reprobadas_por_docente(filtros), por_docente_materia)
+        self.assertEqual(estadisticas_logic.get_promedios_por_materia(filtros), promedios)
+
+        # Con filtro de área, los reprobados solo cuentan en esa área.
+        matematicas = AreaConocimiento.objects.get(colegio=self.colegio, nombre='MATEMÁTICAS')
+        por_area = estadisticas_logic.get_reprobados_por_area_materia(dict(filtros, area_id=str(matematicas.id)))
+        self.assertEqual(por_area['labels'], ['MATEMÁTICAS'])
+        self.assertEqual([d['label'] for d in por_area['datasets']], ['ARITMETICA', 'GEOMETRIA'])
+
+    def test_datos_graficos_dentro_del_presupuesto_de_consultas(self):
+        request = RequestFactory().get('/ajax/datos-graficos/', {
+            'ano_lectivo': 2025, 'periodo_id': self.datos['periodos'][1].id, 'curso_ids[]': [self.datos['curso'].id],
+        })
+        request.user = User.objects.create_superuser('admin_estadisticas', password='x')
+        request.colegio = self.colegio
+
+        with CaptureQueriesContext(connection) as consultas:
+            response = estadisticas_views.datos_graficos_ajax(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(consultas), 22)
+        # Las definitivas filtradas (con los joins de _get_base_query) se leen una sola vez.
+        lecturas = [c['sql'] for c in consultas if c['sql'].split(' FROM ')[1].startswith('"notas_calificacion" INNER JOIN "notas_estudiante"')]
+        self.assertEqual(len(lecturas), 1)
+
+        data = json.loads(response.content)
+        self.assertEqual(data['totalEstudiantes'], 6)
+        self.assertEqual(data['promedios_materia_chart']['labels'], ['ARITMETICA', 'ESPAÑOL', 'GEOMETRIA'])
+        self.assertEqual([m['total_estudiantes'] for m in data['distribucion_materia_chart']], [6, 5, 6])
+
+        # Con el rendimiento ya en la caché, solo quedan el sello y las consultas de las gráficas.
+        with CaptureQueriesContext(connection) as consultas:
+            estadisticas_views.datos_graficos_ajax(request)
+        self.assertLessEqual(len(consultas), 11)
+
+
+class ColegioMiddlewareTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.colegio = Colegio.objects.create(nombre='Colegio Dominio', domain='colegio-dominio.test')
+        self.middleware = middleware.ColegioMiddleware(lambda request: request.colegio)
+
+    def _colegio_de(self, host):
+        return self.middleware(RequestFactory().get('/', HTTP_HOST=host))
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_host_en_cache_no_consulta_la_base_de_datos(self):
+        with CaptureQueriesContext(connection) as primera:
+            self.assertEqual(self._colegio_de('colegio-dominio.test'), self.colegio)
+        self.assertGreater(len(primera), 0)
+        with self.assertNumQueries(0):
+            colegio = self._colegio_de('colegio-dominio.test')
+        self.assertEqual(colegio.nombre, 'Colegio Dominio')
+
+        # La caché compartida también evita la consulta en otro proceso (sin
+        # caché local ni la 'default', que es de cada proceso).
+        middleware._colegios_por_host.clear()
+        cache.clear()
+        with self.assertNumQueries(0):
+            self._colegio_de('colegio-dominio.test')
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_hosts_sin_colegio_tambien_se_guardan(self):
+        self.assertIsNone(self._colegio_de('desconocido.test'))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self._colegio_de('desconocido.test'))
+
+    @override_settings(ALLOWED_HOSTS=['*'])
+    def test_guardar_un_colegio_invalida_la_cache(self):
+        self.assertIsNone(self._colegio_de('nuevo.test'))
+        self._colegio_de('colegio-dominio.test').nombre = 'Modificado sin guardar'
+
+        nuevo = Colegio.objects.create(nombre='Colegio Nuevo', domain='nuevo.test')
+        self.assertEqual(self._colegio_de('nuevo.test'), nuevo)
+        self.assertEqual(self._colegio_de('colegio-dominio.test').nombre, 'Colegio Dominio')
+
+        self.colegio.nombre = 'Colegio Renombrado'
+        self.colegio.save()
+        self.assertEqual(self._colegio_de('colegio-dominio.test').nombre, 'Colegio Renombrado')
+
+
+class NotificacionesTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.colegio = Colegio.objects.create(nombre='Colegio Avisos')
+        self.usuario = User.objects.create_user('usuario_avisos')
+        self.request = RequestFactory().get('/')
+        self.request.user = self.usuario
+
+    def _contador(self):
+        return context_processors.contador_notificaciones(self.request)['contador_notificaciones_no_leidas']
+
+    def test_procesadores_perezosos_y_en_cache(self):
+        with self.assertNumQueries(0):
+            contexto = {**context_processors.contador_notificaciones(self.request), **context_processors.notificaciones_destacadas(self.request)}
+        with self.assertNumQueries(2):
+            self.assertEqual(str(contexto['contador_notificaciones_no_leidas']), '0')
+            self.assertEqual(len(contexto['notificaciones_destacadas']), 0)
+        with self.assertNumQueries(0):
+            self.assertFalse(self._contador() > 0)
+
+        # Otro proceso (con su propia caché 'default') también los lee de la caché compartida.
+        cache.clear()
+        with self.assertNumQueries(0):
+            self.assertFalse(self._contador() > 0)
+
+    def test_contador_se_actualiza_al_crear_y_marcar_leida(self):
+        self.assertEqual(self._contador(), 0)
+        crear_notificacion(self.usuario, 'Hola', 'RENDIMIENTO', self.colegio)
+        self.assertEqual(self._contador(), 1)
+
+        otro = User.objects.create_user('otro_avisos')
+        crear_notificaciones_multiples([self.usuario, otro], 'Aviso', 'GENERAL', self.colegio)
+        self.assertEqual(self._contador(), 2)
+
+        notificacion = Notificacion.objects.filter(destinatario=self.usuario, tipo='RENDIMIENTO').get()
+        destacadas = context_processors.notificaciones_destacadas(self.request)['notificaciones_destacadas']
+        self.assertEqual(list(destacadas), [notificacion])
+        notificacion.leido = True
+        notificacion.save()
+        self.assertEqual(self._contador(), 1)
+        self.assertEqual(len(context_processors.notificaciones_destacadas(self.request)['notificaciones_destacadas']), 0)
+
+
+class DatosSinteticosTests(TestCase):
+
+    def test_colegio_sintetico_consistente(self):
+        datos = crear_colegio_sintetico('Colegio Sintetico', cursos=2, estudiantes_por_curso=3, materias=3, periodos=2, notas_detalladas=2, dias_asistencia=2)
+        self.assertEqual(datos['conteo']['estudiantes'], 6)
+        self.assertEqual(datos['conteo']['calificaciones'], 6 * 3 * 2 * 4)
+        self.assertEqual(datos['conteo']['asistencias'], Asistencia.objects.filter(colegio=datos['colegio']).count())
+
+        calificacion = Calificacion.objects.filter(colegio=datos['colegio'], tipo_nota='SABER').first()
+        detalle = [n.valor_nota for n in calificacion.notas_detalladas.all()]
+        self.assertEqual(calificacion.valor_nota, (sum(detalle) / 2).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+    def test_benchmark_de_indices_revierte_los_datos(self):
+        salida = os.path.join(tempfile.mkdtemp(), 'indices.json')
+        call_command('benchmark_indices', estudiantes=4, por_curso=2, materias=2, periodos=1, dias_asistencia=1, repeticiones=1, salida_json=salida, stdout=io.StringIO())
+        with open(salida, encoding='utf-8') as archivo:
+            resultados = json.load(archivo)
+        self.assertEqual(set(resultados['con_indices']), set(resultados['sin_indices']))
+        self.assertFalse(Colegio.objects.exists())
+
+    def test_generar_datos_sinteticos_crea_varios_colegios(self):
+        call_command('generar_datos_sinteticos', colegios=2, cursos=1, estudiantes_por_curso=2, materias=2, periodos=1, dias_asistencia=1, stdout=io.StringIO())
+        self.assertEqual(Colegio.objects.filter(nombre__startswith='Colegio Sintético').count(), 2)
+        self.assertEqual(Estudiante.objects.count(), 4)
+
+    def test_benchmark_de_carga_mide_todos_los_escenarios_y_revierte(self):
+        salida = os.path.join(tempfile.mkdtemp(), 'carga.json')
+        call_command('benchmark_carga', tamanos='1x2,2x2', materias=2, periodos=1, dias_asistencia=1, repeticiones=1, salida_json=salida, stdout=io.StringIO())
+        with open(salida, encoding='utf-8') as archivo:
+            resultados = json.load(archivo)
+        self.assertEqual([t['conteo']['estudiantes'] for t in resultados['tamanos']], [2, 4])
+        for tamano in resultados['tamanos']:
+            self.assertIn('sabana', tamano['escenarios'])
+            for nombre, medicion in tamano['escenarios'].items():
+                self.assertNotIn('error', medicion, nombre)
+                self.assertGreater(medicion['consultas'], 0, nombre)
+        self.assertFalse(Colegio.objects.exists())
+
+
+@override_settings(REPORTES_GENERADOS_DIR=tempfile.mkdtemp())
+class ColaReportesPDFTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.datos = crear_colegio_de_prueba(num_estudiantes=2)
+        self.admin = User.objects.create_superuser('admin_reportes', password='x')
+
+    def _request(self, url, usuario=None, **params):
+        request = RequestFactory().get(url, params)
+        request.user, request.colegio = usuario or self.admin, self.datos['colegio']
+        return request
+
+    def _crear_trabajo(self, **kwargs):
+        return TrabajoReporte.objects.create(colegio=self.datos['colegio'], usuario=self.admin, tipo='BOLETIN', nombre_archivo='boletin.pdf', html='<p>x</p>', **kwargs)
+
+    def test_boletin_asincrono_se_encola_sin_renderizar(self):
+        request = self._request('/boletines/generar/', curso_id=self.datos['curso'].id, reporte_id=self.datos['periodos'][1].id, asincrono='1')
+        response = boletin_views.generar_boletin_vista(request)
+
+        trabajo = TrabajoReporte.objects.get()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, f'/reportes/trabajos/{trabajo.id}/')
+        self.assertEqual(trabajo.estado, 'PENDIENTE')
+        self.assertIn(self.datos['estudiantes'][0].user.last_name.upper(), trabajo.html.upper())
+
+    def test_un_trabajo_solo_lo_toma_un_proceso(self):
+        trabajo = self._crear_trabajo()
+        tomado = cola_pdf.tomar_trabajo()
+        self.assertEqual(tomado.id, trabajo.id)
+        self.assertEqual((tomado.estado, tomado.intentos), ('PROCESANDO', 1))
+        self.assertIsNone(cola_pdf.tomar_trabajo())
+
+    def test_trabajos_colgados_vuelven_a_la_cola(self):
+        trabajo = self._crear_trabajo(estado='PROCESANDO', intentos=1, fecha_inicio=datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(cola_pdf.recuperar_trabajos_colgados(), 1)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'PENDIENTE')
+
+    def test_solo_se_recuperan_trabajos_de_procesos_muertos(self):
+        hace_una_hora = timezone.now() - datetime.timedelta(hours=1)
+        proceso = subprocess.Popen([sys.executable, '-c', ''])
+        proceso.wait()
+        # Render largo con latido reciente y proceso vivo: sigue en curso.
+        vivo = self._crear_trabajo(estado='PROCESANDO', intentos=1, fecha_inicio=hace_una_hora, fecha_latido=timezone.now(),
+                                   trabajador=cola_pdf.identificador_trabajador())
+        # Latido reciente pero el proceso de esta máquina ya no existe.
+        muerto = self._crear_trabajo(estado='PROCESANDO', intentos=1, fecha_inicio=timezone.now(), fecha_latido=timezone.now(),
+                                     trabajador=f"{socket.gethostname()}:{proceso.pid}")
+
+        self.assertEqual(cola_pdf.recuperar_trabajos_colgados(), 1)
+        vivo.refresh_from_db()
+        muerto.refresh_from_db()
+        self.assertEqual((vivo.estado, muerto.estado), ('PROCESANDO', 'PENDIENTE'))
+
+    def test_posicion_en_cola_solo_cuenta_el_propio_colegio(self):
+        otro = crear_colegio_de_prueba(num_estudiantes=1, nombre='Otro Colegio')
+        TrabajoReporte.objects.create(colegio=otro['colegio'], tipo='BOLETIN', nombre_archivo='otro.pdf', html='<p>x</p>')
+        self._crear_trabajo()
+        trabajo = self._crear_trabajo()
+
+        response = reportes_trabajos_views.estado_trabajo_reporte(self._request('/', formato='json'), trabajo.id)
+        self.assertEqual(json.loads(response.content)['posicion_en_cola'], 2)
+
+    def test_estado_y_descarga_solo_para_el_propietario(self):
+        trabajo = self._crear_trabajo(estado='TERMINADO', ruta_archivo='prueba.pdf')
+        with open(cola_pdf.ruta_absoluta(trabajo), 'wb') as archivo:
+            archivo.write(b'%PDF-1.7 prueba')
+
+        response = reportes_trabajos_views.estado_trabajo_reporte(self._request('/', formato='json'), trabajo.id)
+        self.assertEqual(json.loads(response.content)['url_descarga'], f'/reportes/trabajos/{trabajo.id}/descargar/')
+        response = reportes_trabajos_views.descargar_trabajo_reporte(self._request('/'), trabajo.id)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.7 prueba')
+
+        otro = User.objects.create_user('otro_usuario')
+        with self.assertRaises(Http404):
+            reportes_trabajos_views.descargar_trabajo_reporte(self._request('/', usuario=otro), trabajo.id)
+
+
+@override_settings(REPORTES_CACHE_DIR=tempfile.mkdtemp())
+class CacheReportesTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        shutil.rmtree(cache_artefactos._directorio(), ignore_errors=True)
+        self.datos = crear_colegio_de_prueba(num_estudiantes=2)
+        self.admin = User.objects.create_superuser('admin_cache', password='x')
+
+    def _sello(self):
+        return cache_artefactos.sello_datos(self.datos['colegio'], self.datos['curso'], 2025)
+
+    def test_sello_cambia_solo_cuando_cambian_los_datos(self):
+        sello = self._sello()
+        self.assertEqual(self._sello(), sello)
+        Calificacion.objects.filter(tipo_nota='PROM_PERIODO', estudiante=self.datos['estudiantes'][0]).update(valor_nota=Decimal('4.90'))
+        self.assertNotEqual(self._sello(), sello)
+
+    def _exportar_sabana(self):
+        request = RequestFactory().get('/', {'curso_id': self.datos['curso'].id, 'periodo_id': self.datos['periodos'][1].id})
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        return sabana_views.exportar_sabana_excel(request)
+
+    def test_sabana_excel_se_sirve_desde_cache_hasta_que_cambian_las_notas(self):
+        exportar = self._exportar_sabana
+        primera = exportar()
+        segunda = exportar()
+        self.assertEqual((primera['X-Reporte-Cache'], segunda['X-Reporte-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(b''.join(primera.streaming_content), b''.join(segunda.streaming_content))
+
+        Calificacion.objects.create(colegio=self.datos['colegio'], estudiante=self.datos['estudiantes'][0], materia=self.datos['asignaciones']['ESPAÑOL'].materia,
+                                    periodo=self.datos['periodos'][1], tipo_nota='NIVELACION', valor_nota=Decimal('4.0'))
+        self.assertEqual(exportar()['X-Reporte-Cache'], 'MISS')
+
+    def test_cambios_de_ponderacion_y_nombres_invalidan_la_cache(self):
+        self.assertEqual(self._exportar_sabana()['X-Reporte-Cache'], 'MISS')
+        self.assertEqual(self._exportar_sabana()['X-Reporte-Cache'], 'HIT')
+
+        ponderacion = PonderacionAreaMateria.objects.filter(colegio=self.datos['colegio']).first()
+        ponderacion.peso_porcentual += 10
+        ponderacion.save()
+        self.assertEqual(self._exportar_sabana()['X-Reporte-Cache'], 'MISS')
+
+        usuario = self.datos['estudiantes'][0].user
+        usuario.first_name = 'Renombrado'
+        usuario.save()
+        self.assertEqual(self._exportar_sabana()['X-Reporte-Cache'], 'MISS')
+        self.assertEqual(self._exportar_sabana()['X-Reporte-Cache'], 'HIT')
+
+        # Asistencia que no es una falla y fecha de una falla: también salen en los reportes.
+        asistencia = Asistencia.objects.filter(colegio=self.datos['colegio'], asignacion__curso=self.datos['curso']).first()
+        asistencia.fecha += datetime.timedelta(days=1)
+        asistencia.save()
+        self.assertEqual(self._exportar_sabana()['X-Reporte-Cache'], 'MISS')
+
+    def _libro(self, response):
+        from openpyxl import load_workbook
+        return load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_sabana_de_todo_el_colegio_tiene_una_hoja_por_curso(self):
+        otro = Curso.objects.create(colegio=self.datos['colegio'], nombre='Curso Vacío')
+        request = RequestFactory().get('/', {'periodo_id': self.datos['periodos'][1].id})
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        libro = self._libro(sabana_views.exportar_sabana_colegio_excel(request))
+
+        # El curso sin materias asignadas se omite.
+        self.assertEqual(libro.sheetnames, [f"Sabana {self.datos['curso'].nombre}"[:31]])
+        hoja = libro.worksheets[0]
+        self.assertEqual(hoja.cell(row=7, column=2).value, "Apellidos y Nombres")
+        self.assertIn('A7:A8', {str(rango) for rango in hoja.merged_cells.ranges})
+        nombres = [hoja.cell(row=fila, column=2).value for fila in range(9, hoja.max_row + 1)]
+        self.assertEqual(len([n for n in nombres if n]), len(self.datos['estudiantes']))
+        self.assertNotIn(otro.nombre, libro.sheetnames)
+
+    def test_exportacion_de_estudiantes_incluye_la_ficha(self):
+        from .views import export_views
+        estudiante = self.datos['estudiantes'][0]
+        request = RequestFactory().get('/')
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        filas = list(self._libro(export_views.exportar_estudiantes_excel(request)).active.iter_rows(values_only=True))
+
+        self.assertEqual(filas[0][:2], ('NOMBRES', 'APELLIDOS'))
+        self.assertEqual(len(filas), 1 + len(self.datos['estudiantes']))
+        self.assertIn((estudiante.user.first_name, estudiante.ficha.numero_documento), [(f[0], f[3]) for f in filas[1:]])
+
+    def test_recorte_elimina_los_menos_usados(self):
+        claves = [cache_artefactos.clave_artefacto('PRUEBA', {'n': i}, 'sello') for i in range(3)]
+        for i, clave in enumerate(claves):
+            cache_artefactos.guardar_artefacto(clave, 'pdf', b'x' * 100)
+            ruta = cache_artefactos._ruta(clave, 'pdf')
+            os.utime(ruta, (1000 + i, 1000 + i))
+        cache_artefactos.leer_artefacto(claves[0], 'pdf')  # el más antiguo vuelve a ser reciente
+
+        self.assertEqual(cache_artefactos.recortar_cache(tamano_maximo=200), 1)
+        self.assertIsNone(cache_artefactos.leer_artefacto(claves[1], 'pdf'))
+        self.assertIsNotNone(cache_artefactos.leer_artefacto(claves[0], 'pdf'))
+
+
+@override_settings(REPORTES_CACHE_DIR=tempfile.mkdtemp(), MEDIA_ROOT=tempfile.mkdtemp())
+class LogosTests(TestCase):
+
+    def setUp(self):
+        logos._png.clear()
+        logos._data_uri.clear()
+        self.colegio = crear_colegio_de_prueba(num_estudiantes=1)['colegio']
+        self.colegio.logo_izquierdo.save('escudo.png', ContentFile(self._png(400, 200)))
+
+    def _png(self, ancho, alto):
+        contenido = io.BytesIO()
+        PILImage.new('RGB', (ancho, alto), 'navy').save(contenido, format='PNG')
+        return contenido.getvalue()
+
+    def test_logo_se_lee_una_vez_y_se_redimensiona(self):
+        png = logos.logo_png(self.colegio, 'logo_izquierdo', alto=100)
+        self.assertEqual(PILImage.open(io.BytesIO(png)).size, (200, 100))
+
+        # Sin el archivo original ni la copia en memoria, se sirve desde el disco.
+        self.colegio.logo_izquierdo.storage.delete(self.colegio.logo_izquierdo.name)
+        logos._png.clear()
+        self.assertEqual(logos.logo_png(self.colegio, 'logo_izquierdo', alto=100), png)
+        self.assertTrue(logos.logo_data_uri(self.colegio, 'logo_izquierdo', alto=100).startswith('data:image/png;base64,'))
+        self.assertIsNone(logos.logo_png(self.colegio, 'logo_derecho', alto=100))
+
+    def test_cambiar_el_logo_descarta_las_variantes_anteriores(self):
+        anterior = logos.logo_png(self.colegio, 'logo_izquierdo', alto=100)
+        ruta_anterior = logos._ruta(self.colegio.logo_izquierdo.name, 100)
+        self.assertTrue(os.path.exists(ruta_anterior))
+
+        self.colegio.logo_izquierdo.save('nuevo.png', ContentFile(self._png(100, 300)))
+        self.assertFalse(os.path.exists(ruta_anterior))
+        nuevo = logos.logo_png(self.colegio, 'logo_izquierdo', alto=100)
+        self.assertNotEqual(nuevo, anterior)
+        self.assertEqual(PILImage.open(io.BytesIO(nuevo)).size, (33, 100))
+
+
+@override_settings(REPORTES_GENERADOS_DIR=tempfile.mkdtemp())
+class ImportacionEstudiantesTests(TestCase):
+
+    def setUp(self):
+        self.datos = crear_colegio_de_prueba(num_estudiantes=1)
+        self.admin = User.objects.create_superuser('admin_importacion', password='x')
+        User.objects.create_user('ana.diaz', password='x')
+
+    def _excel(self, filas):
+        from openpyxl import Workbook
+        libro = Workbook()
+        libro.active.append(['NOMBRES', 'APELLIDOS', 'TIPO_DOCUMENTO', 'NUMERO_DOCUMENTO', 'NOMBRE_CURSO', 'FECHA_NACIMIENTO'])
+        for fila in filas:
+            libro.active.append(fila)
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        return SimpleUploadedFile('matricula.xlsx', contenido.getvalue())
+
+    def _filas(self):
+        existente = self.datos['estudiantes'][0].ficha.numero_documento
+        return [
+            ['Ana María', 'Díaz Pérez', 'Tarjeta de Identidad', 1098000001.0, '601', '2012-03-04'],
+            ['Ana', 'Díaz', None, None, '601'],
+            ['Luis', 'Gómez', None, '1098000002', '999'],
+            ['Eva', 'Ruiz', None, existente, '601'],
+            ['Juan', 'Soto', None, '1098000001', '601'],
+            [],
+            ['Carlos', 'Mora', None, 'X' * 30, '601'],
+        ]
+
+    def _subir(self, filas):
+        request = RequestFactory().post('/', {'tipo_importacion': 'estudiantes', 'archivo_importacion': self._excel(filas)})
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        return import_views.importacion_vista(request)
+
+    def test_importacion_valida_todo_el_archivo_y_crea_por_lotes(self):
+        from .utils import importacion_estudiantes
+        # Por defecto la petición solo encola el archivo.
+        response = self._subir(self._filas())
+        trabajo = TrabajoImportacion.objects.get()
+        self.assertEqual(response.url, f'/panel-administrador/importar/{trabajo.id}/')
+        self.assertEqual(trabajo.estado, 'PENDIENTE')
+
+        with CaptureQueriesContext(connection) as consultas:
+            importacion_estudiantes.procesar_trabajo(importacion_estudiantes.tomar_trabajo(), procesos=1)
+
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.total_filas, trabajo.filas_procesadas), ('TERMINADO', 6, 6))
+        # Documento ya registrado y documento repetido en el mismo archivo.
+        self.assertEqual((trabajo.creados, trabajo.omitidos), (2, 2))
+        self.assertEqual([e['fila'] for e in trabajo.errores_filas], [4, 8])
+        self.assertIn("'999'", trabajo.errores_filas[0]['error'])
+        self.assertFalse(os.path.exists(os.path.join(settings.REPORTES_GENERADOS_DIR, trabajo.ruta_archivo)))
+        # Las consultas no dependen del número de filas.
+        self.assertLess(len(consultas), 40)
+
+        ana = Estudiante.objects.select_related('user', 'ficha').get(ficha__numero_documento='1098000001')
+        self.assertEqual((ana.user.username, ana.user.first_name, ana.ficha.tipo_documento), ('ana.diaz1', 'ANA MARÍA', 'TI'))
+        self.assertEqual(ana.ficha.fecha_nacimiento, datetime.date(2012, 3, 4))
+        self.assertTrue(ana.user.check_password('ana.diaz1'))
+        self.assertTrue(ana.user.groups.filter(name='Estudiantes').exists())
+        self.assertTrue(User.objects.filter(username='ana.diaz2', estudiante__curso=self.datos['curso']).exists())
+
+    def test_hashes_en_grupo_de_procesos(self):
+        from .utils import importacion_estudiantes
+        filas = [(2, ['Pedro', 'Pérez', None, None, '601'] + [None] * 15), (3, ['Pablo', 'Pérez', None, None, '601'] + [None] * 15)]
+        resultado = importacion_estudiantes.importar_estudiantes(self.datos['colegio'], filas, procesos=2)
+        self.assertEqual(resultado['creados'], 2)
+        for username in ('pedro.perez', 'pablo.perez'):
+            self.assertTrue(User.objects.get(username=username).check_password(username))
+
+    @override_settings(IMPORTACIONES_ASINCRONAS=False)
+    def test_importacion_en_la_peticion_usa_un_solo_proceso(self):
+        from .utils import importacion_estudiantes
+        llamadas = []
+        original = importacion_estudiantes.importar_estudiantes
+        importacion_estudiantes.importar_estudiantes = lambda *args, **kwargs: llamadas.append(kwargs['procesos']) or original(*args, **kwargs)
+        try:
+            self._subir(self._filas()[:2])
+        finally:
+            importacion_estudiantes.importar_estudiantes = original
+        self.assertEqual(llamadas, [1])
+        self.assertEqual((TrabajoImportacion.objects.get().estado, TrabajoImportacion.objects.get().creados), ('TERMINADO', 2))
+
+    def test_importacion_de_un_proceso_muerto_queda_con_error(self):
+        proceso = subprocess.Popen([sys.executable, '-c', ''])
+        proceso.wait()
+        hace_una_hora = timezone.now() - datetime.timedelta(hours=1)
+        crear = lambda **kwargs: TrabajoImportacion.objects.create(colegio=self.datos['colegio'], usuario=self.admin, nombre_archivo='m.xlsx', estado='PROCESANDO', **kwargs)
+        muerto = crear(fecha_inicio=timezone.now(), fecha_latido=timezone.now(), trabajador=f"{socket.gethostname()}:{proceso.pid}")
+        sin_latido = crear(fecha_inicio=hace_una_hora, fecha_latido=hace_una_hora)
+        vivo = crear(fecha_inicio=hace_una_hora, fecha_latido=timezone.now(), trabajador=cola_pdf.identificador_trabajador())
+
+        request = RequestFactory().get('/', {'formato': 'json'})
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        datos = json.loads(reportes_trabajos_views.estado_importacion(request, muerto.id).content)
+        self.assertEqual(datos['estado'], 'ERROR')
+        self.assertIn('interrumpió', datos['error'])
+
+        call_command('procesar_importaciones', '--una-vez', stdout=io.StringIO())
+        estados = dict(TrabajoImportacion.objects.values_list('id', 'estado'))
+        self.assertEqual((estados[sin_latido.id], estados[vivo.id]), ('ERROR', 'PROCESANDO'))
+
+    def test_estado_de_la_importacion_en_json(self):
+        trabajo = TrabajoImportacion.objects.create(colegio=self.datos['colegio'], usuario=self.admin, nombre_archivo='m.xlsx',
+                                                    estado='PROCESANDO', total_filas=200, filas_procesadas=50)
+        request = RequestFactory().get('/', {'formato': 'json'})
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        datos = json.loads(reportes_trabajos_views.estado_importacion(request, trabajo.id).content)
+        self.assertEqual((datos['estado'], datos['porcentaje']), ('PROCESANDO', 25))
+
+
+class ImportacionAsistenciaTests(TestCase):
+
+    def setUp(self):
+        self.datos = crear_colegio_de_prueba(num_estudiantes=3)
+        self.asignacion = self.datos['asignaciones']['ARITMETICA']
+        self.admin = User.objects.create_superuser('admin_asistencia', password='x')
+
+    def _plantilla(self, estudiantes, fechas, celdas):
+        from openpyxl import Workbook
+        libro = Workbook()
+        hoja = libro.active
+        for col, metadato in enumerate(fechas, 3):
+            hoja.cell(row=9, column=col, value=metadato)
+        for fila, estudiante_id in enumerate(estudiantes, 12):
+            hoja.cell(row=fila, column=2, value=estudiante_id)
+            for col, valor in enumerate(celdas[fila - 12], 3):
+                hoja.cell(row=fila, column=col, value=valor)
+        contenido = io.BytesIO()
+        libro.save(contenido)
+        return SimpleUploadedFile('asistencia.xlsx', contenido.getvalue())
+
+    def _importar(self, archivo):
+        request = RequestFactory().post('/', {'archivo_excel': archivo})
+        request.user, request.colegio = self.admin, self.datos['colegio']
+        request.session = {}
+        request._messages = FallbackStorage(request)
+        with CaptureQueriesContext(connection) as consultas:
+            response = importar_asistencia_views.importar_asistencia_excel_vista(request)
+        self.assertEqual(response.status_code, 302)
+        return [m.message for m in request._messages], len(consultas)
+
+    def test_importacion_por_lotes_con_errores_por_celda(self):
+        e1, e2, e3 = [e.id for e in self.datos['estudiantes']]
+        # Cada estudiante ya tiene una falla de ARITMETICA el 2025-05-10 (ver crear_colegio_de_prueba).
+        fechas = [f'{self.asignacion.id}|2025-05-10', f'{self.asignacion.id}|2025-05-12', '999999|2025-05-13', f'{self.asignacion.id}|mayo']
+        archivo = self._plantilla([e1, e2, e3, 999999], fechas, [
+            ['T', 'X'],
+            ['A', 'aj'],
+            ['Z', None],
+            ['X', 'X'],
+        ])
+        mensajes, consultas = self._importar(archivo)
+
+        self.assertIn("Se crearon 2 y se actualizaron 1", mensajes[0])
+        self.assertIn("(1 sin cambios)", mensajes[0])
+        self.assertTrue(mensajes[1].startswith("4 celda(s) no se importaron"))
+        for celda in ('E9', 'F9', 'C14', 'B15'):
+            self.assertIn(celda, mensajes[1])
+        self.assertLess(consultas, 15)
+
+        registro = lambda e, dia: Asistencia.objects.values_list('estado', 'justificada').get(estudiante_id=e, asignacion=self.asignacion, fecha=datetime.date(2025, 5, dia))
+        self.assertEqual(registro(e1, 10), ('T', False))
+        self.assertEqual(registro(e1, 12), ('A', False))
+        self.assertEqual(registro(e2, 10), ('A', False))
+        self.assertEqual(registro(e2, 12), ('A', True))
+        self.assertEqual(registro(e3, 10), ('A', False))
+        self.assertFalse(Asistencia.objects.filter(estudiante_id=e3, asignacion=self.asignacion, fecha=datetime.date(2025, 5, 12)).exists())
+
+    def test_plantilla_sin_fechas_validas(self):
+        mensajes, _ = self._importar(self._plantilla([self.datos['estudiantes'][0].id], ['sin metadatos'], [['X']]))
+        self.assertIn("no se encontraron fechas", mensajes[0])
+
+
+@override_settings(REPORTES_CACHE_DIR=tempfile.mkdtemp(), REPORTES_GENERADOS_DIR=tempfile.mkdtemp())
+class BoletinesLoteTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.datos = crear_colegio_de_prueba(num_estudiantes=2)
+        self.colegio, self.periodo = self.datos['colegio'], self.datos['periodos'][1]
+        # Un curso sin estudiantes no tiene boletín: debe quedar como error sin detener el lote.
+        self.vacio = Curso.objects.create(colegio=self.colegio, nombre='1102', nivel=self.datos['curso'].nivel)
+        # El PDF del curso con datos ya está en la caché, así el lote no depende de WeasyPrint.
+        clave = clave_cache_boletin(self.colegio, self.datos['curso'], self.periodo.id, self.periodo.ano_lectivo)
+        cache_artefactos.guardar_artefacto(clave, 'pdf', b'%PDF-1.7 boletin')
+
+    def test_lote_genera_un_pdf_por_curso_y_el_zip(self):
+        directorio = tempfile.mkdtemp()
+        avance = []
+        ruta_zip, resultados = lote.generar_boletines_colegio(
+            self.colegio, self.periodo.id, directorio, procesos=1, progreso=lambda r, hechos, total: avance.append((hechos, total)),
+        )
+        self.assertEqual(avance, [(1, 2), (2, 2)])
+        # Primero el curso con más estudiantes.
+        self.assertEqual([r['curso'] for r in resultados], [self.datos['curso'].nombre, '1102'])
+        self.assertTrue(resultados[0]['desde_cache'])
+        self.assertIn("No se encontraron datos", resultados[1]['error'])
+
+        nombre = resultados[0]['archivo']
+        with open(os.path.join(directorio, nombre), 'rb') as pdf:
+            self.assertEqual(pdf.read(), b'%PDF-1.7 boletin')
+        with zipfile.ZipFile(ruta_zip) as paquete:
+            self.assertEqual(paquete.namelist(), [nombre])
+
+    def test_lote_encolado_desde_el_admin(self):
+        admin_user = User.objects.create_superuser('admin_lote', password='x')
+        request = RequestFactory().post('/')
+        request.user, request.session = admin_user, {}
+        request._messages = FallbackStorage(request)
+        modelo_admin = admin_site.site._registry[PeriodoAcademico]
+        modelo_admin.generar_boletines_periodo(request, PeriodoAcademico.objects.filter(id=self.periodo.id))
+
+        trabajo = TrabajoReporte.objects.get()
+        self.assertEqual((trabajo.tipo, trabajo.parametros), ('BOLETINES_LOTE', {'reporte_id': str(self.periodo.id)}))
+        # Los procesos de PDF no toman lotes; los toma generar_boletines_colegio.
+        self.assertIsNone(cola_pdf.tomar_trabajo())
+        trabajo = cola_pdf.tomar_trabajo(lotes=True)
+        self.assertTrue(lote.procesar_lote(trabajo, procesos=1))
+
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.parametros['total'], len(trabajo.resumen)), ('TERMINADO', 2, 2))
+        self.assertIn('1102', trabajo.error)
+        request = RequestFactory().get('/')
+        request.user, request.colegio = admin_user, self.colegio
+        response = reportes_trabajos_views.descargar_trabajo_reporte(request, trabajo.id)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as paquete:
+            self.assertEqual(len(paquete.namelist()), 1)
+
+    def test_publicar_periodo_encola_el_lote_de_boletines(self):
+        admin_user = User.objects.create_superuser('admin_publica', password='x')
+
+        def publicar():
+            request = RequestFactory().post('/', {'tipo_publicacion': 'periodo', 'accion': 'publicar', 'periodo_id': self.periodo.id})
+            request.user, request.colegio, request.session = admin_user, self.colegio, {}
+            request._messages = FallbackStorage(request)
+            return publicacion_views.panel_publicacion_vista(request)
+
+        self.assertEqual(publicar().status_code, 302)
+        trabajo = TrabajoReporte.objects.get()
+        self.assertEqual((trabajo.tipo, trabajo.parametros), ('BOLETINES_LOTE', {'reporte_id': str(self.periodo.id)}))
+        # Volver a publicar mientras el lote sigue pendiente no encola otro.
+        publicar()
+        self.assertEqual(TrabajoReporte.objects.count(), 1)
+
+        self.assertTrue(lote.procesar_lote(cola_pdf.tomar_trabajo(lotes=True), procesos=1))
+        publicar()
+        self.assertEqual(TrabajoReporte.objects.count(), 2)
+
+
+class PDFPorPartesTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        self.datos = crear_colegio_de_prueba(num_estudiantes=3)
+
+    def test_sabana_por_partes_encabezado_y_totales_una_vez(self):
+        periodo = self.datos['periodos'][1]
+        sabana, areas, desempenos, mejores, resumen, _ = sabana_views._get_sabana_acumulada_data(self.datos['colegio'], self.datos['curso'], periodo)
+        context = {
+            'curso': self.datos['curso'], 'periodo': periodo, 'colegio': self.datos['colegio'], 'is_final_report': False,
+            'sabana_data': sabana, 'areas_con_materias': areas, 'desempenos_headers': desempenos,
+            'mejores_estudiantes': mejores, 'resumen_final_celdas': resumen,
+        }
+        primera, segunda = pdf_por_partes.partes_html('notas/sabana/sabana_pdf.html', context, 'sabana_data', 2)
+
+        self.assertIn('SÁBANA DE NOTAS ACUMULATIVA', primera)
+        self.assertNotIn('SÁBANA DE NOTAS ACUMULATIVA', segunda)
+        self.assertNotIn('PROMEDIO FINAL', primera)
+        self.assertIn('PROMEDIO FINAL', segunda)
+        self.assertIn('CUADRO DE HONOR', segunda)
+        # La numeración de estudiantes sigue la del documento completo.
+        ultimo = sabana[2]['info'].user.last_name
+        self.assertRegex(segunda, rf'>3</td>\s*<td[^>]*class="td-nombre">{ultimo}')
+        self.assertNotIn('numero', sabana[0])
+
+    def test_union_de_partes_con_numeracion_continua(self):
+        from pypdf import PdfReader
+        from reportlab.pdfgen import canvas
+        directorio, rutas = tempfile.mkdtemp(), []
+        for parte, hojas in enumerate((2, 1)):
+            rutas.append(os.path.join(directorio, f'{parte}.pdf'))
+            lienzo = canvas.Canvas(rutas[-1])
+            for hoja in range(hojas):
+                lienzo.drawString(100, 700, f'Parte {parte} hoja {hoja}')
+                lienzo.showPage()
+            lienzo.save()
+
+        pdf = PdfReader(io.BytesIO(pdf_por_partes.unir_pdfs(rutas, "Página {pagina} de {total}")))
+        textos = [pagina.extract_text() for pagina in pdf.pages]
+        self.assertEqual(len(textos), 3)
+        self.assertIn('Parte 1 hoja 0', textos[2])
+        self.assertIn('Página 3 de 3', textos[2])
+
+    @override_settings(REPORTES_PDF_POR_PARTES_DESDE=20)
+    def test_modo_por_partes_segun_tamano_o_parametro(self):
+        if not pdf_por_partes.disponible():
+            self.assertFalse(pdf_por_partes.usar_partes(RequestFactory().get('/', {'partes': '1'}), 40))
+            return
+        self.assertTrue(pdf_por_partes.usar_partes(RequestFactory().get('/'), 20))
+        self.assertFalse(pdf_por_partes.usar_partes(RequestFactory().get('/'), 19))
+        self.assertFalse(pdf_por_partes.usar_partes(RequestFactory().get('/', {'partes': '0'}), 40))
+
+
+class MotorPDFTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        motor_pdf.vaciar_cache()
+
+    def test_estaticos_del_sitio_se_leen_localmente_y_quedan_en_memoria(self):
+        with open(os.path.join(settings.BASE_DIR, 'static', 'img', 'logo_colegio.png'), 'rb') as archivo:
+            esperado = archivo.read()
+        base_url = 'https://colegio.example.com/boletines/1/'
+
+        recurso = motor_pdf.buscar_recurso('https://colegio.example.com/static/img/logo_colegio.png', base_url)
+        self.assertEqual(recurso['string'], esperado)
+        self.assertEqual(recurso['mime_type'], 'image/png')
+        # La ruta relativa y la absoluta son el mismo recurso.
+        self.assertIn('/static/img/logo_colegio.png', motor_pdf._recursos)
+        self.assertEqual(motor_pdf.buscar_recurso('/static/img/logo_colegio.png', base_url)['string'], esperado)
+        self.assertEqual(len(motor_pdf._recursos), 1)
+
+    def test_otros_servidores_no_son_del_sitio(self):
+        base_url = 'https://colegio.example.com/'
+        self.assertTrue(motor_pdf._es_del_sitio('/media/fotos/a.png', base_url))
+        self.assertFalse(motor_pdf._es_del_sitio('https://cdn.example.com/static/a.png', base_url))
+        self.assertFalse(motor_pdf._es_del_sitio('file:///etc/passwd', base_url))
+
+    def test_html_del_reporte_de_asistencia(self):
+        datos = crear_colegio_de_prueba(num_estudiantes=2)
+        asignacion = datos['asignaciones']['ARITMETICA']
+        html, error = AsistenciaPDFGenerator(datos['colegio']).render_html(None, asignacion, datos['periodos'][1], 'todos')
+        self.assertIsNone(error)
+        self.assertIn(datos['estudiantes'][0].user.last_name.upper(), html)
+
+
+@override_settings(REPORTES_CACHE_DIR=tempfile.mkdtemp(), MEDIA_ROOT=tempfile.mkdtemp())
+class TamanoPDFTests(TestCase):
+
+    def setUp(self):
+        limpiar_caches()
+        logos._png.clear()
+        logos._data_uri.clear()
+        motor_pdf.vaciar_cache()
+        datos = crear_colegio_sintetico('Colegio Tamaño PDF', cursos=1, estudiantes_por_curso=6, materias=3, periodos=1)
+        self.colegio, self.curso, self.periodo = datos['colegio'], datos['cursos'][0], datos['periodos'][0]
+        # Ruido: un logo que no se comprime bien, como una foto escaneada.
+        contenido = io.BytesIO()
+        PILImage.effect_noise((600, 600), 80).convert('RGB').save(contenido, format='PNG')
+        self.colegio.logo_izquierdo.save('escudo.png', ContentFile(contenido.getvalue()))
+        self.alto = self.colegio.alto_logos_pdf * logos.ESCALA_IMPRESION
+        self.url = logos.url_logo(self.colegio, 'logo_izquierdo')
+
+    def _html_boletin(self):
+        template_path, context, _ = preparar_boletin(self.colegio, self.curso, self.periodo.id)
+        return render_to_string(template_path, context)
+
+    def test_logo_por_url_en_cada_pagina_y_ya_redimensionado(self):
+        html = self._html_boletin()
+        self.assertEqual(html.count(self.url), 6)
+        self.assertNotIn('base64', html)
+
+        png = motor_pdf.buscar_recurso(self.url)['string']
+        self.assertEqual(PILImage.open(io.BytesIO(png)).height, self.alto)
+        # Antes el logo iba como Data URI en la página de cada estudiante.
+        antes = logos.incrustar_logos(html)
+        self.assertEqual(antes.count('data:image/png;base64,'), 6)
+        self.assertGreater(len(antes) - len(html), 6 * len(png))
+
+    def test_vista_del_logo(self):
+        kwargs = {'colegio_id': self.colegio.id, 'campo': 'logo_izquierdo', 'alto': self.alto,
+                  'version': logos.version_logo(self.colegio, 'logo_izquierdo')}
+        response = reporte_views.logo_reporte(RequestFactory().get(self.url), **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertIn('max-age', response['Cache-Control'])
+
+        response = reporte_views.logo_reporte(RequestFactory().get(self.url), **{**kwargs, 'version': 'anterior'})
+        self.assertEqual(response.status_code, 404)
+
+        # Otras alturas no generan variantes nuevas (la vista es pública).
+        variantes = len(logos._png)
+        response = reporte_views.logo_reporte(RequestFactory().get(self.url), **{**kwargs, 'alto': self.alto + 1})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(logos._png), variantes)
+
+    def test_partes_reciben_los_logos_ya_leidos(self):
+        recursos = motor_pdf.recursos_de_logos(self._html_boletin())
+        self.assertEqual(list(recursos), [self.url])
+
+        # Un proceso del grupo, con solo lo precargado, no consulta la base de datos.
+        motor_pdf.vaciar_cache()
+        motor_pdf.precargar(recursos)
+        with self.assertNumQueries(0):
+            recurso = motor_pdf.buscar_recurso(f'http://testserver{self.url}', 'http://testserver/')
+        self.assertEqual(PILImage.open(io.BytesIO(recurso['string'])).height, self.alto)
+
+    @unittest.skipUnless(pdf_por_partes.disponible(), "WeasyPrint o pypdf no están disponibles")
+    def test_renderizar_una_parte_no_consulta_la_base_de_datos(self):
+        html = self._html_boletin()
+        recursos = motor_pdf.recursos_de_logos(html)
+        motor_pdf.vaciar_cache()
+        with tempfile.TemporaryDirectory() as directorio, self.assertNumQueries(0):
+            ruta = pdf_por_partes._renderizar(html, 'http://testserver/', os.path.join(directorio, 'parte.pdf'), True, recursos)
+            self.assertGreater(os.path.getsize(ruta), 0)
+
+    @unittest.skipUnless(motor_pdf.disponible(), "WeasyPrint no está disponible")
+    def test_pdf_mas_liviano_que_con_data_uri(self):
+        from weasyprint import HTML
+        html = self._html_boletin()
+        inicio = time.perf_counter()
+        antes = HTML(string=logos.incrustar_logos(html)).write_pdf()
+        segundos_antes = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        ahora = motor_pdf.renderizar_pdf(html)
+        segundos_ahora = time.perf_counter() - inicio
+
+        self.assertLess(len(ahora), len(antes))
+        self.assertLess(segundos_ahora, segundos_antes * 2)
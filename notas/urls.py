@@ -38,6 +38,7 @@ from .views import (
     gestion_estudiantes_views,
     gestion_academica_views,
     import_export_planillas_views,
+    reportes_trabajos_views,
     carnet_views,
     certificados_views
 )
@@ -117,6 +118,7 @@ urlpatterns = [
     path('docente/selector-sabana/', sabana_views.selector_sabana_vista, name='selector_sabana'),
     path('docente/generar-sabana/', sabana_views.generar_sabana_vista, name='generar_sabana'),
     path('docente/exportar-sabana-excel/', sabana_views.exportar_sabana_excel, name='exportar_sabana_excel'),
+    path('docente/exportar-sabana-colegio-excel/', sabana_views.exportar_sabana_colegio_excel, name='exportar_sabana_colegio_excel'),
     path('docente/generar-sabana-pdf/', sabana_views.generar_sabana_pdf, name='generar_sabana_pdf'),
     path('mensajes/componer/', mensajeria_views.componer_mensaje_vista, name='componer_mensaje'),
     path('mensajes/bandeja-entrada/', mensajeria_views.bandeja_entrada_vista, name='bandeja_entrada'),
@@ -166,6 +168,7 @@ urlpatterns = [
     path('panel-administrador/gestion-areas/eliminar/<int:area_id>/', gestion_academica_views.eliminar_area_vista, name='eliminar_area'),
     path('panel-administrador/gestion-ponderacion-areas/', gestion_academica_views.gestion_ponderacion_areas_vista, name='gestion_ponderacion_areas'),
     path('panel-administrador/importar/', import_views.importacion_vista, name='importacion_datos'),
+    path('panel-administrador/importar/<int:trabajo_id>/', reportes_trabajos_views.estado_importacion, name='estado_importacion'),
     path('panel-administrador/exportar-estudiantes/', export_views.exportar_estudiantes_excel, name='exportar_estudiantes_excel'),
     path('panel-administrador/descargar-plantilla-estudiantes/', export_views.descargar_plantilla_estudiantes, name='descargar_plantilla_estudiantes'),
     path('panel-administrador/exportar-materias/', export_views.exportar_materias_excel, name='exportar_materias_excel'),
@@ -181,7 +184,10 @@ urlpatterns = [
     path('docente/reporte-asistencia/excel/', reporte_views.generar_reporte_individual_excel, name='generar_reporte_individual_excel'),
     path('docente/reporte-asistencia/pdf/', reporte_views.generar_reporte_individual_pdf, name='generar_reporte_individual_pdf'),
 
+    path('reportes/logos/<int:colegio_id>/<str:campo>/<int:alto>/<str:version>.png', reporte_views.logo_reporte, name='logo_reporte'),
     path('reportes/estadisticas-pdf/', estadisticas_views.estadisticas_pdf_vista, name='estadisticas_pdf'),
+    path('reportes/trabajos/<int:trabajo_id>/', reportes_trabajos_views.estado_trabajo_reporte, name='estado_trabajo_reporte'),
+    path('reportes/trabajos/<int:trabajo_id>/descargar/', reportes_trabajos_views.descargar_trabajo_reporte, name='descargar_trabajo_reporte'),
 
     path('reporte-parcial/', reporte_parcial_views.reporte_parcial_vista, name='reporte_parcial'),
     path('reporte-parcial/acta/<int:estudiante_id>/', reporte_parcial_views.acta_reporte_parcial_estudiante, name='acta_reporte_parcial_estudiante'),
@@ -0,0 +1,14 @@
+# notas/utils/cache_compartida.py
+# Caché que comparten todos los procesos del servidor (workers de gunicorn y
+# procesos de reportes). La caché 'default' es LocMemCache, propia de cada
+# proceso: al invalidar una clave ahí, solo se entera el proceso que hizo el
+# cambio. Los valores que se invalidan desde señales van en esta caché.
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_COMPARTIDA = 'compartida'
+
+
+def cache_compartida():
+    return caches[CACHE_COMPARTIDA] if CACHE_COMPARTIDA in settings.CACHES else caches['default']
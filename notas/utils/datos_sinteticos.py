@@ -0,0 +1,142 @@
+# notas/utils/datos_sinteticos.py
+# Genera colegios con datos sintéticos (cursos, estudiantes, notas, asistencia)
+# para pruebas de carga y benchmarks. Todo se inserta con bulk_create, así que
+# no se ejecutan los save() ni las señales de los modelos.
+
+import datetime
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.contrib.auth.models import User
+from django.utils.text import slugify
+
+from ..models import (
+    Colegio, Curso, Docente, Estudiante, FichaEstudiante, AreaConocimiento, Materia,
+    PonderacionAreaMateria, AsignacionDocente, PeriodoAcademico, Calificacion, NotaDetallada,
+    Asistencia, EscalaValoracion, IndicadorLogroPeriodo
+)
+
+NOMBRES = ['Ana', 'Luis', 'María', 'Carlos', 'Sofía', 'Andrés', 'Valentina', 'Juan', 'Camila', 'Diego', 'Laura', 'Mateo']
+APELLIDOS = ['García', 'Rodríguez', 'Martínez', 'López', 'Gómez', 'Pérez', 'Díaz', 'Torres', 'Ramírez', 'Moreno', 'Vargas', 'Rojas']
+NOMBRES_PERIODOS = ['PRIMERO', 'SEGUNDO', 'TERCERO', 'CUARTO']
+COMPONENTES = ['SER', 'SABER', 'HACER']
+LOTE = 2000
+
+
+def _nota(azar):
+    """Nota entre 1.0 y 5.0 con una distribución parecida a la real (media 3.7)."""
+    return Decimal(str(min(max(azar.gauss(3.7, 0.6), 1.0), 5.0))).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _promedio(valores):
+    return (sum(valores) / len(valores)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _usuarios(prefijo, cantidad, azar):
+    usuarios = [
+        User(username=f'{prefijo}_{i}', first_name=azar.choice(NOMBRES), last_name=f'{azar.choice(APELLIDOS)} {i:05d}', password='!')
+        for i in range(cantidad)
+    ]
+    return User.objects.bulk_create(usuarios, batch_size=LOTE)
+
+
+def _dias_habiles(inicio, fin, cantidad):
+    dias = [inicio + datetime.timedelta(days=d) for d in range((fin - inicio).days + 1)]
+    dias = [d for d in dias if d.weekday() < 5]
+    paso = max(len(dias) // max(cantidad, 1), 1)
+    return dias[::paso][:cantidad]
+
+
+def crear_colegio_sintetico(nombre, cursos=10, estudiantes_por_curso=30, materias=10, periodos=4,
+                            notas_detalladas=2, dias_asistencia=5, ano_lectivo=2025, semilla=0):
+    """
+    Crea un colegio completo y devuelve un diccionario con el colegio y la
+    cantidad de filas creadas por tabla. `dias_asistencia` es la cantidad de
+    días con asistencia tomada por asignación en cada periodo.
+    """
+    azar = random.Random(semilla)
+    colegio = Colegio.objects.create(nombre=nombre)
+    prefijo = f'{slugify(nombre)[:40]}_{colegio.pk}'
+    conteo = {}
+
+    for nombre_desempeno, minimo, maximo in [('BAJO', '1.0', '2.9'), ('BASICO', '3.0', '3.9'), ('ALTO', '4.0', '4.5'), ('SUPERIOR', '4.6', '5.0')]:
+        EscalaValoracion.objects.create(colegio=colegio, nombre_desempeno=nombre_desempeno, valor_minimo=Decimal(minimo), valor_maximo=Decimal(maximo))
+
+    duracion = 300 // max(periodos, 1)
+    lista_periodos = PeriodoAcademico.objects.bulk_create([
+        PeriodoAcademico(
+            colegio=colegio, nombre=NOMBRES_PERIODOS[i], ano_lectivo=ano_lectivo,
+            fecha_inicio=datetime.date(ano_lectivo, 2, 1) + datetime.timedelta(days=i * duracion),
+            fecha_fin=datetime.date(ano_lectivo, 2, 1) + datetime.timedelta(days=(i + 1) * duracion - 1),
+        )
+        for i in range(min(periodos, len(NOMBRES_PERIODOS)))
+    ])
+
+    # Áreas de dos materias con pesos 60/40 (o una sola materia al 100%).
+    lista_materias = Materia.objects.bulk_create([Materia(colegio=colegio, nombre=f'MATERIA {j + 1:02d}') for j in range(materias)])
+    lista_areas = AreaConocimiento.objects.bulk_create([AreaConocimiento(colegio=colegio, nombre=f'ÁREA {k + 1:02d}') for k in range((materias + 1) // 2)])
+    ponderaciones = []
+    for j, materia in enumerate(lista_materias):
+        area = lista_areas[j // 2]
+        ultima_sola = j % 2 == 0 and j == materias - 1
+        peso = Decimal('100.00') if ultima_sola else (Decimal('60.00') if j % 2 == 0 else Decimal('40.00'))
+        ponderaciones.append(PonderacionAreaMateria(colegio=colegio, area=area, materia=materia, peso_porcentual=peso))
+    PonderacionAreaMateria.objects.bulk_create(ponderaciones)
+
+    docentes = Docente.objects.bulk_create([Docente(colegio=colegio, user=u) for u in _usuarios(f'{prefijo}_doc', materias, azar)])
+    lista_cursos = Curso.objects.bulk_create([
+        Curso(colegio=colegio, nombre=f'{6 + i // 4}{i % 4 + 1:02d}', director_grado=docentes[i % len(docentes)] if docentes else None)
+        for i in range(cursos)
+    ])
+
+    asignaciones = AsignacionDocente.objects.bulk_create([
+        AsignacionDocente(colegio=colegio, docente=docentes[j], materia=materia, curso=curso, intensidad_horaria_semanal=azar.randint(1, 5))
+        for curso in lista_cursos for j, materia in enumerate(lista_materias)
+    ], batch_size=LOTE)
+    asignaciones_por_curso = {}
+    for asignacion in asignaciones:
+        asignaciones_por_curso.setdefault(asignacion.curso_id, []).append(asignacion)
+
+    IndicadorLogroPeriodo.objects.bulk_create([
+        IndicadorLogroPeriodo(colegio=colegio, asignacion=asignacion, periodo=periodo, descripcion=f'Indicador {n + 1} de {asignacion.materia.nombre.lower()}')
+        for asignacion in asignaciones for periodo in lista_periodos for n in range(2)
+    ], batch_size=LOTE)
+
+    usuarios = _usuarios(f'{prefijo}_est', cursos * estudiantes_por_curso, azar)
+    estudiantes = Estudiante.objects.bulk_create([
+        Estudiante(colegio=colegio, user=u, curso=lista_cursos[i // estudiantes_por_curso]) for i, u in enumerate(usuarios)
+    ], batch_size=LOTE)
+    FichaEstudiante.objects.bulk_create([
+        FichaEstudiante(estudiante=e, numero_documento=f'{colegio.pk}{i:08d}') for i, e in enumerate(estudiantes)
+    ], batch_size=LOTE)
+
+    conteo.update({'cursos': len(lista_cursos), 'estudiantes': len(estudiantes), 'asignaciones': len(asignaciones), 'calificaciones': 0, 'notas_detalladas': 0, 'asistencias': 0})
+
+    for periodo in lista_periodos:
+        dias = _dias_habiles(periodo.fecha_inicio, periodo.fecha_fin, dias_asistencia)
+        calificaciones, detalles_por_calificacion, asistencias = [], [], []
+        for estudiante in estudiantes:
+            for asignacion in asignaciones_por_curso[estudiante.curso_id]:
+                valores = {}
+                for componente in COMPONENTES:
+                    detalle = [_nota(azar) for _ in range(notas_detalladas)]
+                    valores[componente] = _promedio(detalle) if detalle else _nota(azar)
+                    calificaciones.append(Calificacion(colegio=colegio, estudiante=estudiante, materia_id=asignacion.materia_id, periodo=periodo, docente_id=asignacion.docente_id, tipo_nota=componente, valor_nota=valores[componente]))
+                    detalles_por_calificacion.append(detalle)
+                calificaciones.append(Calificacion(colegio=colegio, estudiante=estudiante, materia_id=asignacion.materia_id, periodo=periodo, docente_id=asignacion.docente_id, tipo_nota='PROM_PERIODO', valor_nota=_promedio(list(valores.values()))))
+                detalles_por_calificacion.append([])
+                for dia in dias:
+                    estado = azar.choices(['P', 'A', 'T'], weights=[90, 7, 3])[0]
+                    asistencias.append(Asistencia(colegio=colegio, estudiante=estudiante, asignacion=asignacion, fecha=dia, estado=estado))
+
+        Calificacion.objects.bulk_create(calificaciones, batch_size=LOTE)
+        NotaDetallada.objects.bulk_create([
+            NotaDetallada(colegio=colegio, calificacion_promedio=calificacion, descripcion=f'Nota {n + 1}', valor_nota=valor)
+            for calificacion, detalle in zip(calificaciones, detalles_por_calificacion) for n, valor in enumerate(detalle)
+        ], batch_size=LOTE)
+        Asistencia.objects.bulk_create(asistencias, batch_size=LOTE)
+        conteo['calificaciones'] += len(calificaciones)
+        conteo['notas_detalladas'] += sum(len(d) for d in detalles_por_calificacion)
+        conteo['asistencias'] += len(asistencias)
+
+    return {'colegio': colegio, 'periodos': lista_periodos, 'cursos': lista_cursos, 'conteo': conteo}
@@ -0,0 +1,147 @@
+# notas/utils/escala_valoracion.py
+# Escala de valoración compilada: se carga una vez por colegio y resuelve las
+# notas en memoria con búsqueda binaria en lugar de consultar la base de datos
+# por cada nota.
+
+import time
+from bisect import bisect_right
+from decimal import Decimal
+
+from ..models import EscalaValoracion
+from .cache_compartida import cache_compartida
+
+CACHE_TIMEOUT_ESCALA = 60 * 10
+# Además, cada proceso guarda unos segundos la escala ya compilada: el filtro
+# `desempeno` la pide por cada celda y así no se lee la caché compartida cada vez.
+CACHE_TIMEOUT_LOCAL_ESCALA = 5
+
+_escalas_locales = {}
+
+COLORES_DEFAULT = ['#dc3545', '#ffc107', '#198754', '#0d6efd']
+
+NIVELES_DEFAULT = [
+    {'nombre': 'BAJO', 'min': Decimal('1.0'), 'max': Decimal('2.9'), 'color': '#dc3545'},
+    {'nombre': 'BASICO', 'min': Decimal('3.0'), 'max': Decimal('3.9'), 'color': '#ffc107'},
+    {'nombre': 'ALTO', 'min': Decimal('4.0'), 'max': Decimal('4.5'), 'color': '#198754'},
+    {'nombre': 'SUPERIOR', 'min': Decimal('4.6'), 'max': Decimal('5.0'), 'color': '#0d6efd'},
+]
+
+
+def _valoracion_por_defecto(nota_decimal):
+    if nota_decimal >= Decimal('4.6'): return "SUPERIOR"
+    if nota_decimal >= Decimal('4.0'): return "ALTO"
+    if nota_decimal >= Decimal('3.0'): return "BASICO"
+    return "BAJO"
+
+
+class EscalaCompilada:
+    """
+    Rangos de la escala de un colegio ordenados por valor mínimo.
+
+    `rangos` es una lista de tuplas (valor_minimo, valor_maximo, nombre_desempeno)
+    tal como están guardadas en la base de datos.
+    """
+
+    def __init__(self, rangos):
+        self.rangos = sorted(rangos, key=lambda r: r[0])
+        self.minimos = [r[0] for r in self.rangos]
+        # La validación del modelo impide los solapamientos, pero los datos
+        # importados no pasan por `clean()`; en ese caso se revisan todos.
+        self.sin_solapamientos = all(
+            self.rangos[i][1] < self.rangos[i + 1][0] for i in range(len(self.rangos) - 1)
+        )
+
+    def __bool__(self):
+        return bool(self.rangos)
+
+    def _coincidencias(self, nota_decimal):
+        indice = bisect_right(self.minimos, nota_decimal)
+        if self.sin_solapamientos:
+            candidatos = self.rangos[indice - 1:indice] if indice else []
+        else:
+            candidatos = self.rangos[:indice]
+        return [r for r in candidatos if nota_decimal <= r[1]]
+
+    def buscar(self, nota):
+        """
+        Devuelve el nombre (en mayúsculas) del rango que contiene la nota o None.
+        Si hay rangos solapados gana el de mayor valor máximo.
+        """
+        if nota is None:
+            return None
+        coincidencias = self._coincidencias(Decimal(str(nota)))
+        if not coincidencias:
+            return None
+        return max(coincidencias, key=lambda r: r[1])[2].upper()
+
+    def valoracion(self, nota):
+        """
+        Valoración usada en los boletines: el rango que contiene la nota o, si
+        la nota no cae en exactamente un rango, la escala por defecto.
+        """
+        if nota is None:
+            return ""
+        nota_decimal = Decimal(nota)
+        coincidencias = self._coincidencias(nota_decimal)
+        if len(coincidencias) == 1:
+            return coincidencias[0][2].upper()
+        return _valoracion_por_defecto(nota_decimal)
+
+    def desempeno(self, nota, sin_rango="SIN ESCALA"):
+        """Valoración usada en la sábana: `sin_rango` si ningún rango contiene la nota."""
+        if nota is None:
+            return None
+        return self.buscar(nota) or sin_rango
+
+    @property
+    def nombres_descendentes(self):
+        """Nombres en mayúsculas del desempeño más alto al más bajo."""
+        return [r[2].upper() for r in sorted(self.rangos, key=lambda r: r[1], reverse=True)]
+
+    def niveles(self):
+        """Niveles con color para las gráficas de estadísticas."""
+        if not self.rangos:
+            return [dict(nivel) for nivel in NIVELES_DEFAULT]
+        return [
+            {'nombre': nombre, 'min': minimo, 'max': maximo, 'color': COLORES_DEFAULT[i % len(COLORES_DEFAULT)]}
+            for i, (minimo, maximo, nombre) in enumerate(self.rangos)
+        ]
+
+
+def _cache_key(colegio_id):
+    return f"escala_valoracion:{colegio_id}"
+
+
+def get_escala_compilada(colegio):
+    """
+    Devuelve la escala compilada del colegio, desde la memoria del proceso
+    (unos segundos) o la caché compartida por los workers. Las señales de
+    `EscalaValoracion` invalidan la caché compartida, así que un cambio llega
+    a los demás workers en a lo sumo CACHE_TIMEOUT_LOCAL_ESCALA segundos.
+    """
+    colegio_id = getattr(colegio, 'pk', colegio)
+    if colegio_id is None:
+        return EscalaCompilada([])
+
+    ahora = time.monotonic()
+    local = _escalas_locales.get(colegio_id)
+    if local is not None and local[0] > ahora:
+        return local[1]
+
+    cache = cache_compartida()
+    rangos = cache.get(_cache_key(colegio_id))
+    if rangos is None:
+        rangos = list(
+            EscalaValoracion.objects.filter(colegio_id=colegio_id)
+            .order_by('valor_minimo')
+            .values_list('valor_minimo', 'valor_maximo', 'nombre_desempeno')
+        )
+        cache.set(_cache_key(colegio_id), rangos, CACHE_TIMEOUT_ESCALA)
+    escala = EscalaCompilada(rangos)
+    _escalas_locales[colegio_id] = (ahora + CACHE_TIMEOUT_LOCAL_ESCALA, escala)
+    return escala
+
+
+def invalidar_escala(colegio_id):
+    _escalas_locales.pop(colegio_id, None)
+    cache_compartida().delete(_cache_key(colegio_id))
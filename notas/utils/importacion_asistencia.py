@@ -0,0 +1,162 @@
+# notas/utils/importacion_asistencia.py
+# Importación de la plantilla de asistencia (ver reportes/excel_generator.py).
+#
+# La fila 9 trae en cada columna de fecha el metadato "asignacion_id|AAAA-MM-DD"
+# y desde la fila 12 va un estudiante por fila con su id en la columna B. Las
+# asignaciones y estudiantes se validan contra conjuntos precargados, los
+# registros existentes del rango de fechas se leen en una sola consulta y los
+# cambios se guardan con bulk_create (los nuevos) y bulk_update (los que
+# cambiaron). Las celdas con errores quedan en el reporte y no se importan.
+
+import datetime
+
+from django.db import transaction
+
+from ..models.academicos import Asistencia, AsignacionDocente
+from ..models.perfiles import Estudiante
+
+try:
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter
+except ImportError:
+    load_workbook = None
+
+FILA_METADATOS = 9
+FILA_ESTUDIANTES = 12
+COLUMNA_ESTUDIANTE = 2
+PRIMERA_COLUMNA_FECHA = 3
+TAMANO_LOTE = 500
+
+# Código de la celda -> (estado, justificada). Las celdas vacías no cambian nada.
+CODIGOS = {
+    'X': ('A', False),
+    'A': ('A', False),
+    'AJ': ('A', True),
+    'T': ('T', False),
+    'P': ('P', False),
+}
+
+
+class PlantillaInvalida(ValueError):
+    """El archivo no tiene el formato de la plantilla de asistencia."""
+
+
+def _id_entero(valor):
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    return None
+
+
+def leer_plantilla(archivo):
+    """
+    Lee el Excel y devuelve (columnas, filas): columnas es {número de columna:
+    texto del metadato} y filas, [(número de fila, id del estudiante, valores
+    de la fila)]. Las filas sin un id numérico en la columna B se omiten.
+    """
+    wb = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        columnas = {}
+        for fila in ws.iter_rows(min_row=FILA_METADATOS, max_row=FILA_METADATOS, values_only=True):
+            for col, valor in enumerate(fila, 1):
+                if col >= PRIMERA_COLUMNA_FECHA and valor and '|' in str(valor):
+                    columnas[col] = str(valor)
+        filas = []
+        for i, fila in enumerate(ws.iter_rows(min_row=FILA_ESTUDIANTES, values_only=True), FILA_ESTUDIANTES):
+            estudiante_id = _id_entero(fila[COLUMNA_ESTUDIANTE - 1]) if len(fila) >= COLUMNA_ESTUDIANTE else None
+            if estudiante_id is not None:
+                filas.append((i, estudiante_id, fila))
+        return columnas, filas
+    finally:
+        wb.close()
+
+
+def _validar_columnas(columnas, colegio, errores):
+    """{columna: (asignacion_id, fecha)} de las columnas cuyo metadato es válido y de una asignación del colegio."""
+    leidas = {}
+    for col, texto in columnas.items():
+        try:
+            asignacion_id, fecha = texto.split('|')
+            leidas[col] = (int(asignacion_id), datetime.datetime.strptime(fecha.strip(), '%Y-%m-%d').date())
+        except (ValueError, TypeError):
+            errores.append({'celda': f"{get_column_letter(col)}{FILA_METADATOS}", 'error': f"Metadato de fecha inválido: '{texto}'."})
+
+    asignaciones = set(AsignacionDocente.objects.filter(
+        colegio=colegio, id__in={a for a, _ in leidas.values()}
+    ).values_list('id', flat=True))
+    validas = {}
+    for col, (asignacion_id, fecha) in leidas.items():
+        if asignacion_id in asignaciones:
+            validas[col] = (asignacion_id, fecha)
+        else:
+            errores.append({'celda': f"{get_column_letter(col)}{FILA_METADATOS}", 'error': "La asignación no existe en este colegio."})
+    return validas
+
+
+def importar_asistencia(colegio, columnas, filas):
+    """
+    Importa lo leído con leer_plantilla y devuelve {'creados', 'actualizados',
+    'sin_cambios', 'errores'}; cada error es {'celda', 'error'}. Si ninguna
+    columna de fecha es válida se lanza PlantillaInvalida.
+    """
+    errores = []
+    columnas = _validar_columnas(columnas, colegio, errores)
+    if not columnas:
+        raise PlantillaInvalida("El archivo no es una plantilla válida o está corrupto (no se encontraron fechas).")
+
+    estudiantes = set(Estudiante.objects.filter(
+        colegio=colegio, id__in={estudiante_id for _, estudiante_id, _ in filas}
+    ).values_list('id', flat=True))
+
+    # (estudiante, asignación, fecha) -> (estado, justificada); si una celda se repite gana la última.
+    cambios = {}
+    for i, estudiante_id, valores in filas:
+        if estudiante_id not in estudiantes:
+            errores.append({'celda': f"{get_column_letter(COLUMNA_ESTUDIANTE)}{i}", 'error': f"El estudiante {estudiante_id} no existe en este colegio."})
+            continue
+        for col, (asignacion_id, fecha) in columnas.items():
+            valor = valores[col - 1] if col <= len(valores) else None
+            codigo = str(valor).strip().upper() if valor is not None else ''
+            if not codigo:
+                continue
+            if codigo not in CODIGOS:
+                errores.append({'celda': f"{get_column_letter(col)}{i}", 'error': f"Código de asistencia no reconocido: '{valor}'."})
+                continue
+            cambios[(estudiante_id, asignacion_id, fecha)] = CODIGOS[codigo]
+
+    creados, actualizados, sin_cambios = [], [], 0
+    if cambios:
+        fechas = [fecha for _, fecha in columnas.values()]
+        existentes = {
+            (a.estudiante_id, a.asignacion_id, a.fecha): a
+            for a in Asistencia.objects.filter(
+                colegio=colegio,
+                asignacion_id__in={asignacion_id for asignacion_id, _ in columnas.values()},
+                estudiante_id__in={estudiante_id for estudiante_id, _, _ in cambios},
+                fecha__range=(min(fechas), max(fechas)),
+            ).only('id', 'estudiante_id', 'asignacion_id', 'fecha', 'estado', 'justificada')
+        }
+        for (estudiante_id, asignacion_id, fecha), (estado, justificada) in cambios.items():
+            registro = existentes.get((estudiante_id, asignacion_id, fecha))
+            if registro is None:
+                creados.append(Asistencia(colegio=colegio, estudiante_id=estudiante_id, asignacion_id=asignacion_id,
+                                          fecha=fecha, estado=estado, justificada=justificada))
+            elif (registro.estado, registro.justificada) != (estado, justificada):
+                registro.estado, registro.justificada = estado, justificada
+                actualizados.append(registro)
+            else:
+                sin_cambios += 1
+
+    with transaction.atomic():
+        # update_conflicts cubre los registros que otro usuario haya creado después de la lectura.
+        Asistencia.objects.bulk_create(
+            creados, batch_size=TAMANO_LOTE, update_conflicts=True,
+            unique_fields=['estudiante', 'asignacion', 'fecha', 'colegio'], update_fields=['estado', 'justificada'],
+        )
+        Asistencia.objects.bulk_update(actualizados, ['estado', 'justificada'], batch_size=TAMANO_LOTE)
+
+    return {'creados': len(creados), 'actualizados': len(actualizados), 'sin_cambios': sin_cambios, 'errores': errores}
@@ -0,0 +1,317 @@
+# notas/utils/importacion_estudiantes.py
+# Importación masiva de estudiantes desde el Excel de matrícula.
+#
+# Primero se valida todo el archivo contra datos precargados (usuarios, cursos
+# y documentos existentes) sin consultar fila por fila; las filas con errores
+# quedan en un reporte y no se importan. Luego las filas válidas se crean por
+# lotes con bulk_create. La contraseña inicial de cada estudiante es su nombre
+# de usuario y el hash PBKDF2 (lo más costoso de la importación) se calcula en
+# un grupo de procesos.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User, Group
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.text import slugify
+from unidecode import unidecode
+
+from ..models import Curso, Estudiante, FichaEstudiante, TrabajoImportacion
+from ..reportes.cola_pdf import MINUTOS_TRABAJO_COLGADO, identificador_trabajador, latido, trabajador_muerto
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+TAMANO_LOTE = 300
+COLUMNAS = 20
+
+
+def leer_filas(archivo):
+    """Filas de datos del Excel como (número de fila, 20 valores); se omiten las vacías o sin nombres y apellidos."""
+    wb = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = []
+        for i, row in enumerate(wb.active.iter_rows(min_row=2, values_only=True), 2):
+            if not any(row) or not row[0] or not row[1]:
+                continue
+            filas.append((i, (list(row) + [None] * COLUMNAS)[:COLUMNAS]))
+        return filas
+    finally:
+        wb.close()
+
+
+def _texto(valor):
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    return texto or None
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        try:
+            return datetime.strptime(valor.strip(), '%Y-%m-%d').date()
+        except ValueError:
+            return None
+    return None
+
+
+def _documento(valor):
+    # Excel guarda los números de documento como números: 1098765432.0 -> '1098765432'.
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return _texto(valor)
+
+
+def _mensaje(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f"{campo}: {' '.join(mensajes)}" for campo, mensajes in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def _username_libre(nombres, apellidos, usados):
+    """Mismo formato de siempre (nombre.apellido, luego nombre.apellido1, ...) pero contra un conjunto en memoria."""
+    primer_nombre = unidecode(str(nombres).split(' ')[0].lower())
+    primer_apellido = unidecode(str(apellidos).split(' ')[0].lower())
+    username_base = f"{slugify(primer_nombre)}.{slugify(primer_apellido)}"
+    username_final, counter = username_base, 1
+    while username_final in usados:
+        username_final = f"{username_base}{counter}"
+        counter += 1
+    usados.add(username_final)
+    return username_final
+
+
+def validar_filas(filas, colegio):
+    """
+    Valida todas las filas con tres consultas en total. Devuelve
+    (validas, errores, omitidos): las válidas son diccionarios listos para
+    crear; los errores, {'fila', 'error'}; los omitidos, filas cuyo documento
+    ya está registrado (en la base de datos o más arriba en el mismo archivo).
+    """
+    cursos = {c.nombre.strip().upper(): c for c in Curso.objects.filter(colegio=colegio)}
+    documentos = set(FichaEstudiante.objects.exclude(numero_documento=None).values_list('numero_documento', flat=True))
+    usados = set(User.objects.values_list('username', flat=True).iterator(chunk_size=5000))
+    map_tipo_doc = {v.upper(): k for k, v in FichaEstudiante.TIPO_DOCUMENTO_CHOICES}
+    map_grupo_sang = {v: k for k, v in FichaEstudiante.GRUPO_SANGUINEO_CHOICES}
+
+    validas, errores, omitidos = [], [], 0
+    for i, row_data in filas:
+        (nombres, apellidos, tipo_doc_str, num_doc, nombre_curso, fecha_nac_str,
+         lugar_nac, eps, grupo_sang_str, enfermedades, nombre_padre, cel_padre,
+         nombre_madre, cel_madre, nombre_acud, cel_acud, email_acud,
+         espera_porteria_str, colegio_ant, grado_ant) = row_data
+
+        curso = cursos.get(str(nombre_curso).strip().upper()) if nombre_curso else None
+        if not curso:
+            errores.append({'fila': i, 'error': f"El curso '{nombre_curso}' no existe en este colegio."})
+            continue
+
+        numero_documento = _documento(num_doc)
+        if numero_documento and numero_documento in documentos:
+            omitidos += 1
+            continue
+
+        ficha = FichaEstudiante(
+            tipo_documento=map_tipo_doc.get(str(tipo_doc_str).strip().upper(), 'OT') if tipo_doc_str else 'OT',
+            numero_documento=numero_documento,
+            fecha_nacimiento=_fecha(fecha_nac_str),
+            lugar_nacimiento=_texto(lugar_nac),
+            eps=_texto(eps),
+            grupo_sanguineo=map_grupo_sang.get(str(grupo_sang_str).strip(), None) if grupo_sang_str else None,
+            enfermedades_alergias=_texto(enfermedades),
+            nombre_padre=_texto(nombre_padre),
+            celular_padre=_documento(cel_padre),
+            nombre_madre=_texto(nombre_madre),
+            celular_madre=_documento(cel_madre),
+            nombre_acudiente=_texto(nombre_acud),
+            celular_acudiente=_documento(cel_acud),
+            email_acudiente=_texto(email_acud),
+            espera_en_porteria=True if espera_porteria_str and 'SI' in str(espera_porteria_str).upper() else False,
+            colegio_anterior=_texto(colegio_ant),
+            grado_anterior=_texto(grado_ant),
+        )
+        user = User(first_name=str(nombres or '').strip().upper(), last_name=str(apellidos or '').strip().upper())
+        try:
+            # Largos máximos, correo y opciones; la unicidad ya se revisó contra los conjuntos precargados.
+            ficha.clean_fields(exclude=['estudiante', 'foto'])
+            user.clean_fields(exclude=['username', 'password'])
+        except ValidationError as e:
+            errores.append({'fila': i, 'error': _mensaje(e)})
+            continue
+
+        user.username = _username_libre(nombres, apellidos, usados)
+        if numero_documento:
+            documentos.add(numero_documento)
+        validas.append({'fila': i, 'user': user, 'curso': curso, 'ficha': ficha})
+    return validas, errores, omitidos
+
+
+def _hashear(claves):
+    return [make_password(clave) for clave in claves]
+
+
+def _inicializar_proceso():
+    # Con el método 'spawn' (Windows, macOS) el proceso hijo arranca sin Django configurado.
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def _crear_lote(lote, hashes, colegio, grupo):
+    with transaction.atomic():
+        usuarios = [fila['user'] for fila in lote]
+        for usuario, password in zip(usuarios, hashes):
+            usuario.password = password
+        User.objects.bulk_create(usuarios)
+        # Si la base de datos no devuelve los ids del INSERT masivo se leen por username.
+        if any(u.pk is None for u in usuarios):
+            ids = dict(User.objects.filter(username__in=[u.username for u in usuarios]).values_list('username', 'id'))
+            for usuario in usuarios:
+                usuario.pk = ids[usuario.username]
+        User.groups.through.objects.bulk_create([User.groups.through(user_id=u.pk, group_id=grupo.pk) for u in usuarios])
+
+        estudiantes = Estudiante.objects.bulk_create([Estudiante(user=fila['user'], curso=fila['curso'], colegio=colegio) for fila in lote])
+        if any(e.pk is None for e in estudiantes):
+            ids = dict(Estudiante.objects.filter(user__in=usuarios).values_list('user_id', 'id'))
+            for estudiante in estudiantes:
+                estudiante.pk = ids[estudiante.user_id]
+        for fila, estudiante in zip(lote, estudiantes):
+            fila['ficha'].estudiante = estudiante
+        FichaEstudiante.objects.bulk_create([fila['ficha'] for fila in lote])
+
+
+def importar_estudiantes(colegio, filas, procesos=None, progreso=None):
+    """
+    Importa las filas (de leer_filas) y devuelve {'total', 'creados',
+    'omitidos', 'errores'}. Cada lote de TAMANO_LOTE estudiantes se guarda en
+    su propia transacción y luego se llama a progreso(filas_procesadas). Con
+    procesos=1 los hashes se calculan en este mismo proceso.
+    """
+    validas, errores, omitidos = validar_filas(filas, colegio)
+    procesadas = len(filas) - len(validas)
+    if progreso:
+        progreso(procesadas)
+
+    grupo, _ = Group.objects.get_or_create(name="Estudiantes")
+    procesos = procesos or os.cpu_count() or 1
+    grupo_procesos = ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) if procesos > 1 and len(validas) > 1 else None
+    try:
+        for inicio in range(0, len(validas), TAMANO_LOTE):
+            lote = validas[inicio:inicio + TAMANO_LOTE]
+            claves = [fila['user'].username for fila in lote]
+            if grupo_procesos:
+                tamano = -(-len(claves) // procesos)
+                partes = [claves[j:j + tamano] for j in range(0, len(claves), tamano)]
+                hashes = [h for parte in grupo_procesos.map(_hashear, partes) for h in parte]
+            else:
+                hashes = _hashear(claves)
+            _crear_lote(lote, hashes, colegio, grupo)
+            procesadas += len(lote)
+            if progreso:
+                progreso(procesadas)
+    finally:
+        if grupo_procesos:
+            grupo_procesos.shutdown()
+
+    return {'total': len(filas), 'creados': len(validas), 'omitidos': omitidos, 'errores': errores}
+
+
+# --- Trabajos en segundo plano ---
+
+def _ruta_absoluta(trabajo):
+    return os.path.join(settings.REPORTES_GENERADOS_DIR, trabajo.ruta_archivo)
+
+
+def crear_trabajo(colegio, usuario, archivo):
+    """Guarda el archivo subido en disco y crea el trabajo pendiente."""
+    trabajo = TrabajoImportacion.objects.create(colegio=colegio, usuario=usuario, tipo='ESTUDIANTES', nombre_archivo=archivo.name)
+    trabajo.ruta_archivo = os.path.join('importaciones', str(colegio.id), f"{trabajo.id}.xlsx")
+    ruta = _ruta_absoluta(trabajo)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as destino:
+        for parte in archivo.chunks():
+            destino.write(parte)
+    trabajo.save(update_fields=['ruta_archivo'])
+    return trabajo
+
+
+def tomar_trabajo_por_id(trabajo_id):
+    """Reclama una importación pendiente; None si otro proceso ya la tomó."""
+    ahora = timezone.now()
+    if TrabajoImportacion.objects.filter(id=trabajo_id, estado='PENDIENTE').update(
+        estado='PROCESANDO', fecha_inicio=ahora, fecha_latido=ahora, trabajador=identificador_trabajador(),
+    ):
+        return TrabajoImportacion.objects.get(id=trabajo_id)
+    return None
+
+
+def tomar_trabajo():
+    """Reclama la importación pendiente más antigua (mismo esquema que la cola de PDF)."""
+    candidatos = TrabajoImportacion.objects.filter(estado='PENDIENTE').order_by('fecha_creacion').values_list('id', flat=True)[:10]
+    for trabajo_id in candidatos:
+        trabajo = tomar_trabajo_por_id(trabajo_id)
+        if trabajo is not None:
+            return trabajo
+    return None
+
+
+def procesar_trabajo(trabajo, procesos=None):
+    """
+    Ejecuta una importación ya reclamada. No se reintenta: los lotes ya
+    guardados quedarían duplicados (salvo los estudiantes con documento).
+    """
+    def progreso(procesadas):
+        TrabajoImportacion.objects.filter(id=trabajo.id).update(filas_procesadas=procesadas)
+
+    try:
+        with latido(trabajo):
+            filas = leer_filas(_ruta_absoluta(trabajo))
+            TrabajoImportacion.objects.filter(id=trabajo.id).update(total_filas=len(filas))
+            resultado = importar_estudiantes(trabajo.colegio, filas, procesos=procesos, progreso=progreso)
+    except Exception as e:
+        TrabajoImportacion.objects.filter(id=trabajo.id).update(estado='ERROR', error=str(e), fecha_fin=timezone.now())
+        return False
+    finally:
+        try:
+            os.remove(_ruta_absoluta(trabajo))
+        except FileNotFoundError:
+            pass
+
+    TrabajoImportacion.objects.filter(id=trabajo.id).update(
+        estado='TERMINADO', creados=resultado['creados'], omitidos=resultado['omitidos'],
+        errores_filas=resultado['errores'], filas_procesadas=resultado['total'], fecha_fin=timezone.now(),
+    )
+    return True
+
+
+def recuperar_importaciones_colgadas(minutos=MINUTOS_TRABAJO_COLGADO, trabajos=None):
+    """
+    Marca con ERROR las importaciones en curso cuyo proceso murió (el PID ya no
+    existe en esta máquina o lleva `minutos` sin latido), para que su página de
+    avance no espere para siempre. No se reintentan: los lotes ya guardados se
+    duplicarían. `trabajos` limita la revisión a un queryset.
+    """
+    limite = timezone.now() - timedelta(minutes=minutos)
+    procesando = (trabajos if trabajos is not None else TrabajoImportacion.objects.all()).filter(estado='PROCESANDO')
+    sin_latido = procesando.annotate(ultimo_latido=Coalesce('fecha_latido', 'fecha_inicio')).filter(ultimo_latido__lt=limite)
+    muertos = [
+        trabajo_id for trabajo_id, trabajador in procesando.exclude(trabajador='').values_list('id', 'trabajador')
+        if trabajador_muerto(trabajador)
+    ]
+    return procesando.filter(Q(id__in=sin_latido.values('id')) | Q(id__in=muertos)).update(
+        estado='ERROR', fecha_fin=timezone.now(),
+        error="El proceso de importación se interrumpió. Revise los estudiantes creados antes de volver a importar el archivo.",
+    )
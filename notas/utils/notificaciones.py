@@ -8,6 +8,46 @@ from django.urls import reverse, NoReverseMatch
 # Se cambia de '.' a '..' para subir un nivel desde la carpeta 'utils'
 # y encontrar la carpeta 'models' correctamente.
 from ..models import Notificacion, Colegio 
+from .cache_compartida import cache_compartida
+
+# Contador de no leídas y notificaciones destacadas de cada usuario, que se
+# muestran en todas las páginas. Van en la caché compartida para que todos los
+# workers vean la invalidación: se descartan al crear o marcar como leída una
+# notificación (señales de Notificacion y `crear_notificaciones_multiples`).
+CACHE_TIMEOUT_NOTIFICACIONES = 60 * 15
+TIPOS_DESTACADOS = ['OBSERVADOR', 'RENDIMIENTO']
+
+
+def _clave_no_leidas(usuario_id):
+    return f"notificaciones:no_leidas:{usuario_id}"
+
+
+def _clave_destacadas(usuario_id):
+    return f"notificaciones:destacadas:{usuario_id}"
+
+
+def contar_no_leidas(usuario_id):
+    compartida = cache_compartida()
+    no_leidas = compartida.get(_clave_no_leidas(usuario_id))
+    if no_leidas is None:
+        no_leidas = Notificacion.objects.filter(destinatario_id=usuario_id, leido=False).count()
+        compartida.set(_clave_no_leidas(usuario_id), no_leidas, CACHE_TIMEOUT_NOTIFICACIONES)
+    return no_leidas
+
+
+def obtener_destacadas(usuario_id):
+    """La notificación no leída más reciente de un tipo destacado (lista de cero o un elemento)."""
+    compartida = cache_compartida()
+    destacadas = compartida.get(_clave_destacadas(usuario_id))
+    if destacadas is None:
+        destacadas = list(Notificacion.objects.filter(destinatario_id=usuario_id, leido=False, tipo__in=TIPOS_DESTACADOS)[:1])
+        compartida.set(_clave_destacadas(usuario_id), destacadas, CACHE_TIMEOUT_NOTIFICACIONES)
+    return destacadas
+
+
+def invalidar_contadores(usuario_ids):
+    cache_compartida().delete_many([clave(u) for u in usuario_ids for clave in (_clave_no_leidas, _clave_destacadas)])
+
 
 def crear_notificacion(destinatario: User, mensaje: str, tipo: str, colegio: Colegio, url_name: str = None, kwargs: dict = None):
     """
@@ -54,3 +94,5 @@ def crear_notificaciones_multiples(usuarios: List[User], mensaje: str, tipo: str
 
     if notificaciones_a_crear:
         Notificacion.objects.bulk_create(notificaciones_a_crear)
+        # bulk_create no envía señales.
+        invalidar_contadores([user.id for user in usuarios])
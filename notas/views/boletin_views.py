@@ -6,15 +6,12 @@ from django.contrib import messages
 from django.template.loader import render_to_string
 import datetime
 
-try:
-    from weasyprint import HTML
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
-
-# Se añade FichaEstudiante para poder obtener el número de documento
-from ..models import Curso, PeriodoAcademico, Docente, AsignacionDocente, Estudiante, FichaEstudiante
-from ..boletin.logic import get_datos_boletin_curso, get_datos_boletin_final
+from ..models import Curso, PeriodoAcademico, Docente, AsignacionDocente
+from ..boletin.documento import preparar_boletin, identificar_reporte, clave_cache_boletin, BoletinNoDisponible
+from ..reportes.cola_pdf import usar_cola, encolar_pdf
+from ..reportes.motor_pdf import renderizar_pdf, disponible as pdf_disponible
+from ..reportes.pdf_por_partes import usar_partes, renderizar_por_partes, TAMANO_PARTE_BOLETIN
+from ..reportes.cache_artefactos import leer_artefacto, guardar_artefacto
 
 @login_required
 def selector_boletin_vista(request):
@@ -63,8 +60,6 @@ def generar_boletin_vista(request):
     """
     if not request.colegio:
         return HttpResponseNotFound("<h1>Colegio no configurado</h1>")
-    if not PDF_SUPPORT:
-        return HttpResponse("Error: La librería 'WeasyPrint' no está instalada.", status=500)
 
     curso_id = request.GET.get('curso_id')
     reporte_id = request.GET.get('reporte_id')
@@ -90,89 +85,39 @@ def generar_boletin_vista(request):
 
     estudiante_especifico = user.estudiante if es_estudiante_del_curso and not user.is_superuser else None
 
-    # --- NUEVO: SELECCIÓN DE PLANTILLA SEGÚN NIVEL DEL CURSO ---
-    if curso.nivel == 'PRE':
-        # --- Boletín final ---
-        if reporte_id.startswith('FINAL_'):
-            try:
-                ano_lectivo = int(reporte_id.split('_')[1])
-            except (ValueError, IndexError):
-                return HttpResponse("Error: Formato de reporte final no válido.", status=400)
-            
-            boletines_data, nombres_periodos = get_datos_boletin_final(request.colegio, curso, ano_lectivo, estudiante_especifico)
-            if not boletines_data:
-                return HttpResponse("No se encontraron datos para generar el boletín final de este curso y año.")
-
-            template_path = 'notas/boletin/boletin_prescolar_final_pdf.html'
-            pdf_filename = f'boletin_final_pre_{curso.nombre}_{ano_lectivo}.pdf'
-            context = { "boletines": boletines_data, "nombres_periodos": nombres_periodos, "curso": curso, "ano_lectivo": ano_lectivo, "colegio": request.colegio }
-
-        # --- Boletín de periodo ---
-        else:
-            try:
-                periodo = get_object_or_404(PeriodoAcademico, id=reporte_id, colegio=request.colegio)
-            except (ValueError, PeriodoAcademico.DoesNotExist):
-                return HttpResponse("Error: El periodo seleccionado no es válido.", status=400)
-
-            boletines_data = get_datos_boletin_curso(request.colegio, curso, periodo, estudiante_especifico)
-            if not boletines_data:
-                return HttpResponse("No se encontraron datos para generar el boletín de este periodo.")
-
-            template_path = 'notas/boletin/boletin_prescolar_pdf.html'
-            pdf_filename = f'boletines_pre_{curso.nombre}_{periodo.get_nombre_display()}.pdf'
-            context = { "boletines": boletines_data, "curso": curso, "periodo": periodo, "colegio": request.colegio }
-
-    # --- Cursos normales (primaria, básica, media) ---
-    else:
-        if reporte_id.startswith('FINAL_'):
-            try:
-                ano_lectivo = int(reporte_id.split('_')[1])
-            except (ValueError, IndexError):
-                return HttpResponse("Error: Formato de reporte final no válido.", status=400)
-            
-            boletines_data, nombres_periodos = get_datos_boletin_final(request.colegio, curso, ano_lectivo, estudiante_especifico)
-            if not boletines_data:
-                return HttpResponse("No se encontraron datos para generar el boletín final de este curso y año.")
-
-            template_path = 'notas/boletin/boletin_final_pdf.html'
-            pdf_filename = f'boletin_final_{curso.nombre}_{ano_lectivo}.pdf'
-            context = { "boletines": boletines_data, "nombres_periodos": nombres_periodos, "curso": curso, "ano_lectivo": ano_lectivo, "colegio": request.colegio }
-
-        else:
-            try:
-                periodo = get_object_or_404(PeriodoAcademico, id=reporte_id, colegio=request.colegio)
-            except (ValueError, PeriodoAcademico.DoesNotExist):
-                return HttpResponse("Error: El periodo seleccionado no es válido.", status=400)
-
-            boletines_data = get_datos_boletin_curso(request.colegio, curso, periodo, estudiante_especifico)
-            if not boletines_data:
-                return HttpResponse("No se encontraron datos para generar el boletín de este periodo.")
-
-            template_path = 'notas/boletin/boletin_pdf.html'
-            pdf_filename = f'boletines_{curso.nombre}_{periodo.get_nombre_display()}.pdf'
-            context = { "boletines": boletines_data, "curso": curso, "periodo": periodo, "colegio": request.colegio }
-
-    # --- INICIO: CORRECCIÓN PARA EVITAR EL KEYERROR ---
-    for boletin in boletines_data:
-        # Se verifica si la llave 'estudiante' existe antes de usarla.
-        estudiante_obj = boletin.get('estudiante')
-        if not estudiante_obj:
-            # Si no hay estudiante en este registro, se le asigna una identificación
-            # genérica y se continúa con el siguiente para no detener la ejecución.
-            boletin['identificacion'] = "Estudiante no encontrado"
-            continue
+    # Si los datos del curso no han cambiado, se sirve el PDF ya generado.
+    ano_cache, nombre_cache = identificar_reporte(request.colegio, curso, reporte_id)
+    clave_cache = None
+    if ano_cache:
+        clave_cache = clave_cache_boletin(request.colegio, curso, reporte_id, ano_cache, estudiante_especifico)
+        pdf_file = leer_artefacto(clave_cache, 'pdf')
+        if pdf_file is not None:
+            return _respuesta_pdf(pdf_file, nombre_cache, desde_cache=True)
+
+    try:
+        template_path, context, pdf_filename = preparar_boletin(request.colegio, curso, reporte_id, estudiante_especifico)
+    except BoletinNoDisponible as e:
+        return HttpResponse(e.mensaje, status=e.status)
+
+    if usar_cola(request):
+        return encolar_pdf(request, 'BOLETIN', render_to_string(template_path, context), pdf_filename, clave_cache=clave_cache)
+    if not pdf_disponible():
+        return HttpResponse("Error: La librería 'WeasyPrint' no está instalada.", status=500)
 
-        try:
-            ficha = FichaEstudiante.objects.get(estudiante=estudiante_obj)
-            boletin['identificacion'] = ficha.numero_documento or estudiante_obj.user.username
-        except FichaEstudiante.DoesNotExist:
-            boletin['identificacion'] = estudiante_obj.user.username
-    # --- FIN: CORRECCIÓN ---
+    if usar_partes(request, len(context['boletines'])):
+        pdf_file = renderizar_por_partes(
+            template_path, context, 'boletines', TAMANO_PARTE_BOLETIN,
+            base_url=request.build_absolute_uri(), numeracion="Página {pagina}",
+        )
+    else:
+        pdf_file = renderizar_pdf(render_to_string(template_path, context), base_url=request.build_absolute_uri())
+    if clave_cache:
+        guardar_artefacto(clave_cache, 'pdf', pdf_file)
+    return _respuesta_pdf(pdf_file, pdf_filename)
 
-    html_string = render_to_string(template_path, context)
-    pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
 
+def _respuesta_pdf(pdf_file, pdf_filename, desde_cache=False):
     response = HttpResponse(pdf_file, content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="{pdf_filename}"'
-    
-    return response
\ No newline at end of file
+    response['X-Reporte-Cache'] = 'HIT' if desde_cache else 'MISS'
+    return response
@@ -6,6 +6,7 @@ from django.http import HttpResponse, HttpResponseNotFound
 
 from ..models.perfiles import Estudiante, Curso, Colegio
 from ..reportes.certificado_generator import CertificadoPDFGenerator
+from ..reportes.cola_pdf import usar_cola, encolar_pdf
 
 # Función de permisos para administradores del colegio
 def es_admin_del_colegio(user):
@@ -54,12 +55,15 @@ def generar_certificado_estudio_pdf(request, estudiante_id):
     estudiante = get_object_or_404(Estudiante, id=estudiante_id, colegio=request.colegio)
     
     generator = CertificadoPDFGenerator(colegio=request.colegio)
+    nombre_archivo = f"certificado_{estudiante.user.get_full_name().replace(' ', '_')}.pdf"
+    if usar_cola(request):
+        return encolar_pdf(request, 'CERTIFICADO', generator.render_html(request, estudiante), nombre_archivo)
+
     pdf_file, error_message = generator.generate_report(request, estudiante)
 
     if error_message:
         return HttpResponse(error_message, status=500)
 
-    nombre_archivo = f"certificado_{estudiante.user.get_full_name().replace(' ', '_')}.pdf"
     response = HttpResponse(pdf_file, content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="{nombre_archivo}"'
     return response
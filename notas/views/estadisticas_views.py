@@ -7,12 +7,6 @@ import random
 from decimal import Decimal
 import re # Importamos el módulo de expresiones regulares
 
-# Asegúrate de tener WeasyPrint instalado: pip install WeasyPrint
-try:
-    from weasyprint import HTML
-except ImportError:
-    HTML = None # Manejar el caso si no está instalado
-
 from ..models import (
     Curso, PeriodoAcademico, Docente, AsignacionDocente,
     AreaConocimiento as Area, Estudiante
@@ -24,11 +18,15 @@ from ..estadisticas_logic import (
     get_reprobados_por_docente, get_materias_reprobadas,
     get_reprobados_por_area_materia, get_promedios_por_area_apilado,
     get_materias_reprobadas_por_docente,
-    get_cuadro_honor, _cache_rendimiento,
+    get_cuadro_honor,
     get_distribucion_por_area, get_distribucion_por_materia, # <-- Importamos las nuevas funciones
+    NotasFiltradas,
     _get_escala_valoracion # Importamos para obtener los encabezados de la escala
 )
 
+from ..reportes.cola_pdf import usar_cola, encolar_pdf
+from ..reportes.motor_pdf import renderizar_pdf, disponible as pdf_disponible
+
 import io
 import base64
 import matplotlib
@@ -287,7 +285,6 @@ def panel_estadisticas_vista(request):
 
 @user_passes_test(es_docente_o_superuser)
 def datos_graficos_ajax(request):
-    _cache_rendimiento.clear()
     if not request.colegio:
         return JsonResponse({'error': 'Colegio no identificado'}, status=404)
 
@@ -305,14 +302,16 @@ def datos_graficos_ajax(request):
     if filtros.get('periodo_id') == 'CONSOLIDADO':
         filtros['periodo_id'] = None
 
+    # Todas las gráficas de notas salen de una sola lectura de las definitivas filtradas.
+    notas = NotasFiltradas(filtros)
     datos_rendimiento = get_rendimiento_general(filtros)
-    datos_por_materia = get_promedios_por_materia(filtros)
-    datos_histograma = get_histograma_distribucion(filtros)
-    datos_reprobados_docente = get_reprobados_por_docente(filtros)
-    datos_materias_reprobadas = get_materias_reprobadas(filtros)
-    datos_reprobados_area_materia = get_reprobados_por_area_materia(filtros)
-    datos_promedios_area_apilado = get_promedios_por_area_apilado(filtros)
-    datos_materias_reprobadas_por_docente = get_materias_reprobadas_por_docente(filtros)
+    datos_por_materia = get_promedios_por_materia(filtros, notas)
+    datos_histograma = get_histograma_distribucion(filtros, notas)
+    datos_reprobados_docente = get_reprobados_por_docente(filtros, notas)
+    datos_materias_reprobadas = get_materias_reprobadas(filtros, notas)
+    datos_reprobados_area_materia = get_reprobados_por_area_materia(filtros, notas)
+    datos_promedios_area_apilado = get_promedios_por_area_apilado(filtros, notas)
+    datos_materias_reprobadas_por_docente = get_materias_reprobadas_por_docente(filtros, notas)
     datos_cuadro_honor = get_cuadro_honor(filtros)
 
     total_estudiantes = sum(nivel['total'] for nivel in datos_rendimiento['distribucion'])
@@ -346,15 +345,12 @@ def datos_graficos_ajax(request):
     docentes_unicos = list(sorted(set(item['docente'] for item in datos_materias_reprobadas_por_docente)))
     materias_unicas = list(sorted(set(item['materia'] for item in datos_materias_reprobadas_por_docente)))
     materias_colores = [f'rgba({random.randint(50,200)},{random.randint(50,200)},{random.randint(50,200)},0.8)' for _ in materias_unicas]
+    reprobados_por_par = {(item['docente'], item['materia']): item['total_reprobados'] for item in datos_materias_reprobadas_por_docente}
     datasets_materias_reprobadas_docente = []
     for idx, materia in enumerate(materias_unicas):
-        data_reprobados = []
-        for docente in docentes_unicos:
-            found = next((item for item in datos_materias_reprobadas_por_docente if item['docente'] == docente and item['materia'] == materia), None)
-            data_reprobados.append(found['total_reprobados'] if found else 0)
         datasets_materias_reprobadas_docente.append({
             'label': materia,
-            'data': data_reprobados,
+            'data': [reprobados_por_par.get((docente, materia), 0) for docente in docentes_unicos],
             'backgroundColor': materias_colores[idx],
         })
 
@@ -371,7 +367,7 @@ def datos_graficos_ajax(request):
             'labels': [item['materia_nombre'] for item in datos_por_materia],
             'datasets': [{'label': 'Promedio', 'data': [item['promedio'] for item in datos_por_materia], 'backgroundColor': colores_bg}]
         },
-        'distribucion_materia_chart': get_distribucion_por_materia(filtros), # Actualizado para AJAX si es necesario
+        'distribucion_materia_chart': get_distribucion_por_materia(filtros, notas), # Actualizado para AJAX si es necesario
         'histograma_chart': {
             'labels': datos_histograma['labels'],
             'datasets': [{'label': 'Frecuencia', 'data': datos_histograma['data'], 'backgroundColor': datos_histograma['colors']}]
@@ -396,7 +392,8 @@ def datos_graficos_ajax(request):
 def estadisticas_pdf_vista(request):
     if not request.colegio:
         return HttpResponse("Colegio no identificado", status=404)
-    if HTML is None:
+    asincrono = usar_cola(request)
+    if not pdf_disponible() and not asincrono:
         return HttpResponse("La librería WeasyPrint no está instalada.", status=500)
 
     filtros = {
@@ -410,8 +407,6 @@ def estadisticas_pdf_vista(request):
         if filtros[key] == 'todos' or not filtros[key]: filtros[key] = None
     if filtros.get('periodo_id') == 'CONSOLIDADO': filtros['periodo_id'] = None
 
-    _cache_rendimiento.clear()
-
     tipo_reporte = request.GET.get('tipo_grafico', 'general')
     datos_reporte = {}
     grafico_base64 = None
@@ -419,9 +414,10 @@ def estadisticas_pdf_vista(request):
     conclusiones_texto = []
 
     if tipo_reporte == 'general':
+        notas = NotasFiltradas(filtros)
         datos_rendimiento = get_rendimiento_general(filtros)
         total_estudiantes = sum(n['total'] for n in datos_rendimiento.get('distribucion', []))
-        datos_promedios_area_apilado = get_promedios_por_area_apilado(filtros)
+        datos_promedios_area_apilado = get_promedios_por_area_apilado(filtros, notas)
         
         filtros_ranking = {k: v for k, v in filtros.items() if k != 'curso_ids'}
         ranking, total_cursos = get_ranking_cursos(filtros_ranking)
@@ -444,13 +440,13 @@ def estadisticas_pdf_vista(request):
             "cuadro_honor": get_cuadro_honor(filtros),
             "distribucion_rendimiento": datos_rendimiento.get('distribucion'),
             "distribucion_area": get_distribucion_por_area(filtros),
-            "distribucion_materia": get_distribucion_por_materia(filtros),
+            "distribucion_materia": get_distribucion_por_materia(filtros, notas),
             "escala_valoracion": _get_escala_valoracion(request.colegio)
         }
         grafico_base64 = generar_grafico_distribucion(datos_rendimiento.get('distribucion'))
         grafico_promedios_area_base64 = generar_grafico_promedios_area_apilado(datos_promedios_area_apilado)
         conclusiones_texto = generar_conclusiones_texto(
-            datos_rendimiento, get_promedios_por_materia(filtros), total_estudiantes,
+            datos_rendimiento, get_promedios_por_materia(filtros, notas), total_estudiantes,
             tipo_grafico='general', datos_promedios_area_apilado=datos_promedios_area_apilado,
             colegio=request.colegio
         )
@@ -497,7 +493,9 @@ def estadisticas_pdf_vista(request):
     }
 
     html_string = render_to_string('notas/estadisticas/estadisticas_pdf.html', context)
-    pdf = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
+    if asincrono:
+        return encolar_pdf(request, 'ESTADISTICAS', html_string, f"reporte_estadistico_{tipo_reporte}.pdf")
+    pdf = renderizar_pdf(html_string, base_url=request.build_absolute_uri())
 
     response = HttpResponse(pdf, content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="reporte_estadistico_{tipo_reporte}.pdf"'
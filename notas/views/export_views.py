@@ -10,6 +10,7 @@ try:
     from openpyxl import Workbook
     from openpyxl.styles import Font, Alignment, PatternFill
     from openpyxl.utils import get_column_letter
+    from ..reportes.excel_streaming import crear_libro, celda, guardar_en_temporal, respuesta_xlsx
     EXCEL_SUPPORT = True
 except ImportError:
     EXCEL_SUPPORT = False
@@ -80,14 +81,12 @@ def exportar_estudiantes_excel(request):
         return HttpResponse("La librería 'openpyxl' es necesaria.", status=500)
 
     # CORRECCIÓN: Filtrar estudiantes por el colegio actual.
-    estudiantes_qs = Estudiante.objects.filter(colegio=request.colegio).select_related('user', 'curso').prefetch_related('ficha').order_by('curso__nombre', 'user__last_name')
-    
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="exportacion_estudiantes_{request.colegio.slug}.xlsx"'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Estudiantes Exportados"
+    # La ficha se trae en el mismo JOIN y las filas se leen por bloques (iterator),
+    # así que ni los objetos ni el libro (write_only) se acumulan en memoria.
+    estudiantes_qs = Estudiante.objects.filter(colegio=request.colegio).select_related('user', 'curso', 'ficha').order_by('curso__nombre', 'user__last_name')
+
+    wb = crear_libro()
+    ws = wb.create_sheet("Estudiantes Exportados")
 
     headers = [
         'NOMBRES', 'APELLIDOS', 'TIPO_DOCUMENTO', 'NUMERO_DOCUMENTO', 'NOMBRE_CURSO', 
@@ -97,40 +96,25 @@ def exportar_estudiantes_excel(request):
         'ESPERA_EN_PORTERIA', 'COLEGIO_ANTERIOR', 'GRADO_ANTERIOR'
     ]
     
-    header_font = Font(bold=True)
-    for col_num, header_title in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num, value=header_title)
-        cell.font = header_font
+    for col_num in range(1, len(headers) + 1):
         ws.column_dimensions[get_column_letter(col_num)].width = 22
+    ws.append([celda(ws, header_title, 'encabezado_simple') for header_title in headers])
 
-    for row_num, estudiante in enumerate(estudiantes_qs, 2):
+    for estudiante in estudiantes_qs.iterator(chunk_size=2000):
         ficha = getattr(estudiante, 'ficha', None)
-
-        ws.cell(row=row_num, column=1, value=estudiante.user.first_name)
-        ws.cell(row=row_num, column=2, value=estudiante.user.last_name)
-        ws.cell(row=row_num, column=5, value=estudiante.curso.nombre if estudiante.curso else '')
+        fila = [estudiante.user.first_name, estudiante.user.last_name, None, None, estudiante.curso.nombre if estudiante.curso else '']
         
         if ficha:
-            ws.cell(row=row_num, column=3, value=ficha.get_tipo_documento_display())
-            ws.cell(row=row_num, column=4, value=ficha.numero_documento)
-            ws.cell(row=row_num, column=6, value=ficha.fecha_nacimiento)
-            ws.cell(row=row_num, column=7, value=ficha.lugar_nacimiento)
-            ws.cell(row=row_num, column=8, value=ficha.eps)
-            ws.cell(row=row_num, column=9, value=ficha.get_grupo_sanguineo_display())
-            ws.cell(row=row_num, column=10, value=ficha.enfermedades_alergias)
-            ws.cell(row=row_num, column=11, value=ficha.nombre_padre)
-            ws.cell(row=row_num, column=12, value=ficha.celular_padre)
-            ws.cell(row=row_num, column=13, value=ficha.nombre_madre)
-            ws.cell(row=row_num, column=14, value=ficha.celular_madre)
-            ws.cell(row=row_num, column=15, value=ficha.nombre_acudiente)
-            ws.cell(row=row_num, column=16, value=ficha.celular_acudiente)
-            ws.cell(row=row_num, column=17, value=ficha.email_acudiente)
-            ws.cell(row=row_num, column=18, value="SI" if ficha.espera_en_porteria else "NO")
-            ws.cell(row=row_num, column=19, value=ficha.colegio_anterior)
-            ws.cell(row=row_num, column=20, value=ficha.grado_anterior)
-
-    wb.save(response)
-    return response
+            fila[2:4] = [ficha.get_tipo_documento_display(), ficha.numero_documento]
+            fila += [
+                ficha.fecha_nacimiento, ficha.lugar_nacimiento, ficha.eps, ficha.get_grupo_sanguineo_display(),
+                ficha.enfermedades_alergias, ficha.nombre_padre, ficha.celular_padre, ficha.nombre_madre,
+                ficha.celular_madre, ficha.nombre_acudiente, ficha.celular_acudiente, ficha.email_acudiente,
+                "SI" if ficha.espera_en_porteria else "NO", ficha.colegio_anterior, ficha.grado_anterior,
+            ]
+        ws.append(fila)
+
+    return respuesta_xlsx(guardar_en_temporal(wb), f"exportacion_estudiantes_{request.colegio.slug}.xlsx")
 
 # ===============================================================
 # VISTAS PARA GESTIÓN DE MATERIAS
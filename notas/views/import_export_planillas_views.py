@@ -7,10 +7,10 @@ from openpyxl.drawing.image import Image as OpenpyxlImage
 from django.http import HttpResponse, HttpResponseNotFound
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404
-from django.conf import settings
-import os
+from io import BytesIO
 
 from ..models import AsignacionDocente, PeriodoAcademico, Estudiante, Docente
+from ..reportes.logos import logo_png, estatico_png, ESCALA_IMPRESION
 
 @login_required
 def exportar_planillas_docente(request, docente_id, periodo_id):
@@ -39,26 +39,12 @@ def exportar_planillas_docente(request, docente_id, periodo_id):
     if "Sheet" in workbook.sheetnames:
         workbook.remove(workbook["Sheet"])
 
-    # MEJORA A FUTURO: Los logos deberían cargarse desde el objeto `request.colegio`
-    # en lugar de una ruta estática para permitir personalización.
-    # Por ahora, se mantiene la lógica original.
-    try:
-        # Usamos el logo del modelo Colegio si existe, si no, el de por defecto.
-        if request.colegio.logo:
-            logo_colegio_path = request.colegio.logo.path
-        else:
-            logo_colegio_path = os.path.join(settings.STATICFILES_DIRS[0], 'img', 'logo_colegio.png')
-        
-        logo_gob_path = os.path.join(settings.STATICFILES_DIRS[0], 'img', 'Logo_govtolima.png')
-        logo_colegio_img = OpenpyxlImage(logo_colegio_path)
-        logo_gob_img = OpenpyxlImage(logo_gob_path)
-        logo_colegio_img.height = 65
-        logo_colegio_img.width = 65
-        logo_gob_img.height = 65
-        logo_gob_img.width = 65
-        logos_cargados = True
-    except (FileNotFoundError, IndexError, AttributeError):
-        logos_cargados = False
+    # Logos desde la caché de logos: el del colegio si lo tiene (si no, el de por
+    # defecto de los estáticos) y el de la gobernación. Se leen una sola vez.
+    logo_colegio_png = logo_png(request.colegio, 'logo_izquierdo', alto=65 * ESCALA_IMPRESION) or estatico_png('img/logo_colegio.png', alto=65 * ESCALA_IMPRESION)
+    logo_gob_png = estatico_png('img/Logo_govtolima.png', alto=65 * ESCALA_IMPRESION)
+    logos_cargados = bool(logo_colegio_png and logo_gob_png)
+    if not logos_cargados:
         print("ADVERTENCIA: No se encontraron los archivos de logo. El Excel se generará sin ellos.")
 
     for asignacion in asignaciones:
@@ -93,8 +79,11 @@ def exportar_planillas_docente(request, docente_id, periodo_id):
         cell_titulo.alignment = center_align
         
         if logos_cargados:
-            sheet.add_image(logo_gob_img, 'A1')
-            sheet.add_image(logo_colegio_img, 'D1')
+            for png, celda_logo in ((logo_gob_png, 'A1'), (logo_colegio_png, 'D1')):
+                imagen = OpenpyxlImage(BytesIO(png))
+                imagen.height = 65
+                imagen.width = 65
+                sheet.add_image(imagen, celda_logo)
         
         info_row_start = 6
         info_data = {
@@ -3,18 +3,14 @@
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.db import transaction
-import datetime
 
-try:
-    from openpyxl import load_workbook
-    EXCEL_SUPPORT = True
-except ImportError:
-    EXCEL_SUPPORT = False
+from ..utils import importacion_asistencia
+from ..utils.importacion_asistencia import leer_plantilla, importar_asistencia
 
-# Se importan los modelos necesarios para las validaciones
-from ..models.academicos import Asistencia, AsignacionDocente
-from ..models.perfiles import Estudiante
+EXCEL_SUPPORT = importacion_asistencia.load_workbook is not None
+
+# Cuántos errores de celda se muestran en el mensaje después de importar.
+MAX_ERRORES_MENSAJE = 10
 
 def es_docente_o_superuser(user):
     """Decorador para asegurar que solo los docentes o superusuarios puedan acceder."""
@@ -22,10 +18,11 @@ def es_docente_o_superuser(user):
 
 @login_required
 @user_passes_test(es_docente_o_superuser)
-@transaction.atomic # MEJORA 1: Asegura que toda la importación sea una única transacción.
 def importar_asistencia_excel_vista(request):
     """
     Procesa el archivo Excel de plantilla de asistencia subido por un docente.
+    La validación y el guardado por lotes están en utils/importacion_asistencia.py;
+    las celdas que no se pudieron importar se informan en un mensaje aparte.
     """
     if request.method != 'POST':
         messages.error(request, "Método no permitido.")
@@ -46,75 +43,22 @@ def importar_asistencia_excel_vista(request):
         return redirect('consulta_asistencia')
 
     try:
-        wb = load_workbook(archivo_excel, data_only=True)
-        ws = wb.active # Se asume que los datos están en la primera hoja activa
-
-        # Paso 1: Leer los metadatos de la fila 9 para obtener las fechas y la asignación
-        metadatos_columnas = {}
-        for col in range(3, ws.max_column + 1): # Columnas C, D, E...
-            valor_meta = ws.cell(row=9, column=col).value
-            if valor_meta and '|' in str(valor_meta):
-                try:
-                    asignacion_id, fecha_str = str(valor_meta).split('|')
-                    # Se valida que la asignación pertenezca al colegio actual
-                    if AsignacionDocente.objects.filter(id=int(asignacion_id), colegio=request.colegio).exists():
-                        metadatos_columnas[col] = {
-                            'asignacion_id': int(asignacion_id),
-                            'fecha': datetime.datetime.strptime(fecha_str, '%Y-%m-%d').date()
-                        }
-                except (ValueError, TypeError):
-                    continue # Ignorar columnas con metadatos malformados
-        
-        if not metadatos_columnas:
-            raise ValueError("El archivo no es una plantilla válida o está corrupto (no se encontraron fechas).")
-
-        registros_creados = 0
-        registros_actualizados = 0
-        
-        # Paso 2: Procesar las filas de estudiantes a partir de la fila 12
-        for row in range(12, ws.max_row + 1):
-            estudiante_id = ws.cell(row=row, column=2).value # Columna B (oculta)
-            if not isinstance(estudiante_id, int):
-                continue
-
-            # Se valida que el estudiante pertenezca al colegio actual
-            if not Estudiante.objects.filter(id=estudiante_id, colegio=request.colegio).exists():
-                continue
-
-            # Paso 3: Iterar sobre las columnas de fechas para registrar las fallas
-            for col, meta in metadatos_columnas.items():
-                estado_str = ws.cell(row=row, column=col).value
-                
-                estado_final = None
-                justificada = False
-                
-                if estado_str: # Solo procesamos si la celda no está vacía
-                    estado_str = str(estado_str).strip().upper()
-                    if estado_str in ('X', 'A'):
-                        estado_final = 'A' # Ausente
-                    elif estado_str == 'T':
-                        estado_final = 'T' # Tarde
-                    elif estado_str == 'AJ':
-                        estado_final = 'A' # Ausente pero justificada
-                        justificada = True
-                
-                if estado_final:
-                    # Se usa update_or_create para manejar registros nuevos y existentes
-                    obj, created = Asistencia.objects.update_or_create(
-                        colegio=request.colegio, # MEJORA 3: Se asegura que el registro pertenezca al colegio
-                        estudiante_id=estudiante_id,
-                        asignacion_id=meta['asignacion_id'],
-                        fecha=meta['fecha'],
-                        defaults={'estado': estado_final, 'justificada': justificada}
-                    )
-                    if created:
-                        registros_creados += 1
-                    else:
-                        registros_actualizados += 1
-        
-        messages.success(request, f"Importación completada. Se crearon {registros_creados} y se actualizaron {registros_actualizados} registros de asistencia.")
-
+        columnas, filas = leer_plantilla(archivo_excel)
+        resultado = importar_asistencia(request.colegio, columnas, filas)
     except Exception as e:
         messages.error(request, f"Ocurrió un error al procesar el archivo: {e}. Asegúrese de que es la plantilla correcta y no ha sido modificada.")
+        return redirect('consulta_asistencia')
+
+    messages.success(
+        request,
+        f"Importación completada. Se crearon {resultado['creados']} y se actualizaron {resultado['actualizados']} registros de asistencia"
+        f" ({resultado['sin_cambios']} sin cambios)."
+    )
+    errores = resultado['errores']
+    if errores:
+        detalle = "; ".join(f"{e['celda']}: {e['error']}" for e in errores[:MAX_ERRORES_MENSAJE])
+        if len(errores) > MAX_ERRORES_MENSAJE:
+            detalle += f"; y {len(errores) - MAX_ERRORES_MENSAJE} más"
+        messages.warning(request, f"{len(errores)} celda(s) no se importaron: {detalle}.")
 
     return redirect('consulta_asistencia')
@@ -1,11 +1,12 @@
 # notas/views/ingreso_notas_views.py
 
 import json
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
+from django.db.models import Prefetch
 from django.http import JsonResponse, HttpResponseNotFound
 from django.shortcuts import get_object_or_404, render
 from django.views import View
@@ -18,6 +19,7 @@ from ..models.academicos import (
     ConfiguracionCalificaciones, EscalaValoracion # Importación necesaria
 )
 from ..models.perfiles import Docente
+from ..resumen_logic import actualizar_resumenes
 
 class IngresoNotasView(LoginRequiredMixin, View):
     template_name = 'notas/docente/ingresar_notas_periodo.html'
@@ -70,26 +72,11 @@ class IngresoNotasView(LoginRequiredMixin, View):
             periodo_seleccionado = get_object_or_404(PeriodoAcademico, id=periodo_id, colegio=request.colegio)
             
             estudiantes_del_curso = Estudiante.objects.filter(curso=asignacion_seleccionada.curso, colegio=request.colegio, is_active=True).select_related('user').order_by('user__last_name', 'user__first_name')
+            estudiantes_data = _cargar_planilla(request.colegio, asignacion_seleccionada, periodo_seleccionado, estudiantes_del_curso)
             
-            estudiantes_data = []
-            for estudiante in estudiantes_del_curso:
-                nombre_completo = f"{estudiante.user.last_name}, {estudiante.user.first_name}".strip()
-                data = {'id': estudiante.id, 'nombre_completo': nombre_completo, 'notas': {'ser': [], 'saber': [], 'hacer': []}, 'inasistencias': 0}
-                
-                calificaciones = Calificacion.objects.filter(estudiante=estudiante, materia=asignacion_seleccionada.materia, periodo=periodo_seleccionado, colegio=request.colegio).prefetch_related('notas_detalladas')
-                for cal in calificaciones:
-                    tipo_map = {'SER': 'ser', 'SABER': 'saber', 'HACER': 'hacer'}
-                    if cal.tipo_nota in tipo_map:
-                        key = tipo_map[cal.tipo_nota]
-                        data['notas'][key] = [{'descripcion': n.descripcion, 'valor': str(n.valor_nota)} for n in cal.notas_detalladas.all()]
-                
-                inasistencia_manual, _ = InasistenciasManualesPeriodo.objects.get_or_create(estudiante=estudiante, asignacion=asignacion_seleccionada, periodo=periodo_seleccionado, colegio=request.colegio, defaults={'cantidad': 0})
-                data['inasistencias'] = inasistencia_manual.cantidad
-                estudiantes_data.append(data)
+            indicadores = list(IndicadorLogroPeriodo.objects.filter(asignacion=asignacion_seleccionada, periodo=periodo_seleccionado, colegio=request.colegio).order_by('id'))
             
-            indicadores = IndicadorLogroPeriodo.objects.filter(asignacion=asignacion_seleccionada, periodo=periodo_seleccionado, colegio=request.colegio).order_by('id')
-            
-            context.update({'asignacion_seleccionada': asignacion_seleccionada, 'periodo_seleccionado': periodo_seleccionado, 'estudiantes_data_json': json.dumps(estudiantes_data), 'periodo_cerrado': not periodo_seleccionado.esta_activo, 'indicadores': indicadores, 'hay_indicadores': indicadores.exists()})
+            context.update({'asignacion_seleccionada': asignacion_seleccionada, 'periodo_seleccionado': periodo_seleccionado, 'estudiantes_data_json': json.dumps(estudiantes_data), 'periodo_cerrado': not periodo_seleccionado.esta_activo, 'indicadores': indicadores, 'hay_indicadores': bool(indicadores)})
 
         # --- INICIO: CÓDIGO AÑADIDO PARA LA ESCALA DE VALORACIÓN ---
         # Obtiene la escala de valoración del colegio actual
@@ -106,7 +93,6 @@ class IngresoNotasView(LoginRequiredMixin, View):
 
         return render(request, self.template_name, context)
 
-    @transaction.atomic
     def post(self, request, *args, **kwargs):
         if not request.colegio:
             return JsonResponse({'status': 'error', 'message': 'Colegio no identificado'}, status=404)
@@ -133,80 +119,236 @@ class IngresoNotasView(LoginRequiredMixin, View):
             if not IndicadorLogroPeriodo.objects.filter(asignacion=asignacion, periodo=periodo, colegio=request.colegio).exists():
                 return JsonResponse({'status': 'error', 'message': 'No hay indicadores de logro definidos.'}, status=403)
 
+            # Los porcentajes nuevos se validan aquí y se guardan junto con la planilla, solo si esta es válida.
             config, _ = ConfiguracionCalificaciones.objects.get_or_create(colegio=request.colegio)
-            if config.docente_puede_modificar and porcentajes_nuevos:
+            guardar_porcentajes = bool(config.docente_puede_modificar and porcentajes_nuevos)
+            if guardar_porcentajes:
                 try:
                     asignacion.porcentaje_saber = int(porcentajes_nuevos.get('saber'))
                     asignacion.porcentaje_hacer = int(porcentajes_nuevos.get('hacer'))
                     asignacion.porcentaje_ser = int(porcentajes_nuevos.get('ser'))
                     asignacion.usar_ponderacion_equitativa = False
                     asignacion.full_clean()
-                    asignacion.save()
                 except (ValidationError, ValueError, TypeError) as e:
                     mensaje_error = e.messages[0] if hasattr(e, 'messages') else str(e)
                     return JsonResponse({'status': 'error', 'message': f"Error en porcentajes: {mensaje_error}"}, status=400)
             
             pesos = {
-                'ser': asignacion.ser_calc / Decimal(100),
-                'saber': asignacion.saber_calc / Decimal(100),
-                'hacer': asignacion.hacer_calc / Decimal(100),
+                'SER': asignacion.ser_calc / Decimal(100),
+                'SABER': asignacion.saber_calc / Decimal(100),
+                'HACER': asignacion.hacer_calc / Decimal(100),
             }
 
+            estudiantes_por_id = {
+                e.id: e for e in Estudiante.objects.filter(
+                    id__in=[i for i in (_entero(d.get('id')) for d in estudiantes_data if isinstance(d, dict)) if i is not None],
+                    colegio=request.colegio
+                ).select_related('user')
+            }
+
+            # 1. Validación completa de la planilla antes de escribir nada.
+            planilla, errores = [], []
             for est_data in estudiantes_data:
-                estudiante = get_object_or_404(Estudiante, id=est_data['id'], colegio=request.colegio)
-                
-                promedio_ser = self.calcular_promedio_componente(request.colegio, estudiante, asignacion, periodo, 'SER', est_data['notas']['ser'])
-                promedio_saber = self.calcular_promedio_componente(request.colegio, estudiante, asignacion, periodo, 'SABER', est_data['notas']['saber'])
-                promedio_hacer = self.calcular_promedio_componente(request.colegio, estudiante, asignacion, periodo, 'HACER', est_data['notas']['hacer'])
-
-                definitiva_periodo = (promedio_ser * pesos['ser']) + (promedio_saber * pesos['saber']) + (promedio_hacer * pesos['hacer'])
-
-                Calificacion.objects.update_or_create(
-                    colegio=request.colegio, estudiante=estudiante, materia=asignacion.materia, periodo=periodo, tipo_nota='PROM_PERIODO',
-                    defaults={'valor_nota': definitiva_periodo.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP), 'docente': asignacion.docente}
-                )
-                
-                InasistenciasManualesPeriodo.objects.update_or_create(
-                    colegio=request.colegio, estudiante=estudiante, asignacion=asignacion, periodo=periodo,
-                    defaults={'cantidad': int(est_data.get('inasistencias', 0))}
-                )
+                estudiante = estudiantes_por_id.get(_entero(est_data.get('id'))) if isinstance(est_data, dict) else None
+                if estudiante is None:
+                    errores.append({'estudiante_id': est_data.get('id') if isinstance(est_data, dict) else None, 'estudiante': '', 'errores': ['El estudiante no existe en este colegio.']})
+                    continue
+                componentes, inasistencias, errores_estudiante = _validar_datos_estudiante(est_data)
+                if errores_estudiante:
+                    nombre = f"{estudiante.user.last_name}, {estudiante.user.first_name}".strip()
+                    errores.append({'estudiante_id': estudiante.id, 'estudiante': nombre, 'errores': errores_estudiante})
+                    continue
+                planilla.append((estudiante, componentes, inasistencias))
+
+            if errores:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': f'No se guardó la planilla: hay errores en {len(errores)} estudiante(s).',
+                    'errores': errores,
+                }, status=400)
+
+            # 2. Escritura: porcentajes, notas y resúmenes en una sola transacción.
+            with transaction.atomic():
+                if guardar_porcentajes:
+                    asignacion.save()
+                _guardar_planilla(request.colegio, asignacion, periodo, planilla, pesos)
+                actualizar_resumenes(request.colegio, periodo, [estudiante.id for estudiante, _, _ in planilla])
 
             return JsonResponse({'status': 'success', 'message': 'Calificaciones guardadas correctamente.'})
         
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': f'Ocurrió un error inesperado: {e}'}, status=500)
 
-    def calcular_promedio_componente(self, colegio, estudiante, asignacion, periodo, tipo_componente, notas_data):
-        cal_prom, _ = Calificacion.objects.get_or_create(
-            colegio=colegio, estudiante=estudiante, materia=asignacion.materia, periodo=periodo, tipo_nota=tipo_componente,
-            defaults={'valor_nota': Decimal('0.0'), 'docente': asignacion.docente}
-        )
-        cal_prom.notas_detalladas.all().delete()
-        
-        notas_detalladas_list = []
-        total_notas = Decimal('0.0')
-        
-        for nota_det_data in notas_data:
+
+COMPONENTES = {'ser': 'SER', 'saber': 'SABER', 'hacer': 'HACER'}
+
+
+def _cargar_planilla(colegio, asignacion, periodo, estudiantes):
+    """
+    Arma los datos de la planilla con tres consultas fijas: estudiantes,
+    calificaciones por componente (con sus notas detalladas) e inasistencias.
+    No crea registros: las inasistencias que no existen se muestran en cero.
+    """
+    estudiantes = list(estudiantes)
+    calificaciones = Calificacion.objects.filter(
+        colegio=colegio, materia=asignacion.materia, periodo=periodo,
+        estudiante__in=estudiantes, tipo_nota__in=COMPONENTES.values()
+    ).prefetch_related(Prefetch('notas_detalladas', queryset=NotaDetallada.objects.order_by('id')))
+
+    notas_por_estudiante = {}
+    for cal in calificaciones:
+        notas_por_estudiante.setdefault(cal.estudiante_id, {})[cal.tipo_nota.lower()] = [
+            {'descripcion': n.descripcion, 'valor': str(n.valor_nota)} for n in cal.notas_detalladas.all()
+        ]
+
+    inasistencias = dict(
+        InasistenciasManualesPeriodo.objects.filter(
+            colegio=colegio, asignacion=asignacion, periodo=periodo, estudiante__in=estudiantes
+        ).values_list('estudiante_id', 'cantidad')
+    )
+
+    estudiantes_data = []
+    for estudiante in estudiantes:
+        notas = {'ser': [], 'saber': [], 'hacer': []}
+        notas.update(notas_por_estudiante.get(estudiante.id, {}))
+        estudiantes_data.append({
+            'id': estudiante.id,
+            'nombre_completo': f"{estudiante.user.last_name}, {estudiante.user.first_name}".strip(),
+            'notas': notas,
+            'inasistencias': inasistencias.get(estudiante.id, 0),
+        })
+    return estudiantes_data
+
+
+def _entero(valor):
+    try:
+        return int(valor)
+    except (ValueError, TypeError):
+        return None
+
+
+def _validar_datos_estudiante(est_data):
+    """
+    Valida las notas e inasistencias enviadas para un estudiante.
+    Devuelve ({'SER': [(descripcion, valor)], ...}, inasistencias, errores).
+    """
+    errores = []
+    componentes = {}
+    notas = est_data.get('notas') or {}
+    for clave, tipo in COMPONENTES.items():
+        componentes[tipo] = []
+        for nota_det_data in notas.get(clave) or []:
+            descripcion = str(nota_det_data.get('descripcion') or '').strip()
             try:
-                valor = Decimal(str(nota_det_data['valor']).replace(',', '.'))
-                if valor >= 1 and valor <= 5:
-                    notas_detalladas_list.append(NotaDetallada(
-                        colegio=colegio, calificacion_promedio=cal_prom, descripcion=nota_det_data['descripcion'], valor_nota=valor
-                    ))
-                    total_notas += valor
-            except (ValueError, TypeError):
+                valor = Decimal(str(nota_det_data.get('valor')).replace(',', '.'))
+            except (InvalidOperation, ValueError, TypeError):
+                errores.append(f"{tipo}: la nota '{nota_det_data.get('valor')}' no es un número válido.")
+                continue
+            if not (Decimal('1') <= valor <= Decimal('5')):
+                errores.append(f"{tipo}: la nota {valor} está fuera del rango 1.0 - 5.0.")
+                continue
+            if len(descripcion) > 100:
+                errores.append(f"{tipo}: la descripción '{descripcion[:20]}...' supera los 100 caracteres.")
                 continue
+            componentes[tipo].append((descripcion, valor.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)))
 
-        if notas_detalladas_list:
-            NotaDetallada.objects.bulk_create(notas_detalladas_list)
-            promedio = total_notas / len(notas_detalladas_list)
-        else:
-            promedio = Decimal('0.0')
+    inasistencias = est_data.get('inasistencias')
+    inasistencias = 0 if inasistencias in (None, '') else _entero(inasistencias)
+    if inasistencias is None or inasistencias < 0:
+        errores.append('Las inasistencias deben ser un número entero mayor o igual a cero.')
+    return componentes, inasistencias, errores
+
+
+def _promedio(valores):
+    if not valores:
+        return Decimal('0.00')
+    return (sum(valores) / len(valores)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _guardar_planilla(colegio, asignacion, periodo, planilla, pesos):
+    """
+    Aplica una planilla ya validada con un número fijo de consultas: carga lo
+    existente, compara en memoria y escribe solo las diferencias en bloque.
+    `planilla` es una lista de (estudiante, componentes, inasistencias).
+    """
+    estudiantes = [estudiante for estudiante, _, _ in planilla]
+    tipos = list(COMPONENTES.values()) + ['PROM_PERIODO']
+
+    existentes = {
+        (cal.estudiante_id, cal.tipo_nota): cal
+        for cal in Calificacion.objects.filter(
+            colegio=colegio, materia=asignacion.materia, periodo=periodo,
+            estudiante__in=estudiantes, tipo_nota__in=tipos
+        )
+    }
+    detalladas_existentes = {}
+    for nota in NotaDetallada.objects.filter(calificacion_promedio__in=[c.id for c in existentes.values() if c.tipo_nota != 'PROM_PERIODO']).order_by('id'):
+        detalladas_existentes.setdefault(nota.calificacion_promedio_id, []).append((nota.descripcion, nota.valor_nota))
+    inasistencias_existentes = {
+        i.estudiante_id: i for i in InasistenciasManualesPeriodo.objects.filter(
+            colegio=colegio, asignacion=asignacion, periodo=periodo, estudiante__in=estudiantes
+        )
+    }
+
+    cal_nuevas, cal_modificadas, cal_prom_modificadas = [], [], []
+    detalladas_pendientes = []  # (calificacion, [(descripcion, valor)])
+    inasistencias_nuevas, inasistencias_modificadas = [], []
+
+    for estudiante, componentes, inasistencias in planilla:
+        definitiva = Decimal('0.0')
+        for tipo, notas in componentes.items():
+            promedio = _promedio([valor for _, valor in notas])
+            definitiva += promedio * pesos[tipo]
+
+            cal = existentes.get((estudiante.id, tipo))
+            if cal is None:
+                cal = Calificacion(colegio=colegio, estudiante=estudiante, materia=asignacion.materia, periodo=periodo, tipo_nota=tipo, valor_nota=promedio, docente=asignacion.docente)
+                cal_nuevas.append(cal)
+                if notas:
+                    detalladas_pendientes.append((cal, notas))
+                continue
+            if cal.valor_nota != promedio:
+                cal.valor_nota = promedio
+                cal_modificadas.append(cal)
+            if detalladas_existentes.get(cal.id, []) != notas:
+                detalladas_pendientes.append((cal, notas))
+
+        definitiva = definitiva.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        cal = existentes.get((estudiante.id, 'PROM_PERIODO'))
+        if cal is None:
+            cal_nuevas.append(Calificacion(colegio=colegio, estudiante=estudiante, materia=asignacion.materia, periodo=periodo, tipo_nota='PROM_PERIODO', valor_nota=definitiva, docente=asignacion.docente))
+        elif cal.valor_nota != definitiva or cal.docente_id != asignacion.docente_id:
+            cal.valor_nota, cal.docente_id = definitiva, asignacion.docente_id
+            cal_prom_modificadas.append(cal)
+
+        inasistencia = inasistencias_existentes.get(estudiante.id)
+        if inasistencia is None:
+            inasistencias_nuevas.append(InasistenciasManualesPeriodo(colegio=colegio, estudiante=estudiante, asignacion=asignacion, periodo=periodo, cantidad=inasistencias))
+        elif inasistencia.cantidad != inasistencias:
+            inasistencia.cantidad = inasistencias
+            inasistencias_modificadas.append(inasistencia)
+
+    if cal_nuevas:
+        Calificacion.objects.bulk_create(cal_nuevas, batch_size=500)
+    if cal_modificadas:
+        Calificacion.objects.bulk_update(cal_modificadas, ['valor_nota'], batch_size=500)
+    if cal_prom_modificadas:
+        Calificacion.objects.bulk_update(cal_prom_modificadas, ['valor_nota', 'docente'], batch_size=500)
+
+    if detalladas_pendientes:
+        ids_a_reemplazar = [cal.id for cal, _ in detalladas_pendientes if cal.id in detalladas_existentes]
+        if ids_a_reemplazar:
+            NotaDetallada.objects.filter(calificacion_promedio_id__in=ids_a_reemplazar).delete()
+        NotaDetallada.objects.bulk_create([
+            NotaDetallada(colegio=colegio, calificacion_promedio=cal, descripcion=descripcion, valor_nota=valor)
+            for cal, notas in detalladas_pendientes for descripcion, valor in notas
+        ], batch_size=500)
+
+    if inasistencias_nuevas:
+        InasistenciasManualesPeriodo.objects.bulk_create(inasistencias_nuevas, batch_size=500)
+    if inasistencias_modificadas:
+        InasistenciasManualesPeriodo.objects.bulk_update(inasistencias_modificadas, ['cantidad'], batch_size=500)
 
-        promedio_final = promedio.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-        cal_prom.valor_nota = promedio_final
-        cal_prom.save()
-        return promedio_final
 
 @login_required
 def ajax_get_inasistencias_auto(request):
@@ -7,6 +7,7 @@ from django.template.loader import render_to_string
 from django.views.decorators.http import require_POST
 
 from ..models import Notificacion
+from ..utils.notificaciones import contar_no_leidas
 
 @login_required
 def obtener_notificaciones_dropdown_ajax(request):
@@ -30,7 +31,7 @@ def obtener_notificaciones_dropdown_ajax(request):
         )
         
         # Obtenemos el contador total de notificaciones no leídas
-        contador = Notificacion.objects.filter(destinatario=request.user, leido=False).count()
+        contador = contar_no_leidas(request.user.id)
 
         return JsonResponse({'html': html_content, 'contador': contador})
     
@@ -7,17 +7,13 @@ from django.http import HttpResponse, HttpResponseNotFound
 from django.template.loader import render_to_string
 from django.urls import reverse
 
-try:
-    from weasyprint import HTML
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
-
 from ..forms import RegistroObservadorForm, FichaEstudianteForm
 from ..models import (
     Docente, Estudiante, Curso, FichaEstudiante, 
     AsignacionDocente, RegistroObservador, Notificacion
 )
+from ..reportes.cola_pdf import usar_cola, encolar_pdf
+from ..reportes.motor_pdf import renderizar_pdf, disponible as pdf_disponible
 
 def es_docente_o_superuser(user):
     return user.is_superuser or user.groups.filter(name='Docentes').exists()
@@ -156,7 +152,8 @@ def editar_ficha_vista(request, estudiante_id):
 def generar_observador_pdf_vista(request, estudiante_id):
     if not request.colegio:
         return HttpResponseNotFound("<h1>Colegio no configurado</h1>")
-    if not PDF_SUPPORT:
+    asincrono = usar_cola(request)
+    if not pdf_disponible() and not asincrono:
         return HttpResponse("Error: WeasyPrint no está instalado.", status=500)
             
     estudiante = get_object_or_404(Estudiante, id=estudiante_id, colegio=request.colegio)
@@ -171,8 +168,10 @@ def generar_observador_pdf_vista(request, estudiante_id):
     }
     
     html_string = render_to_string('notas/observador/observador_pdf.html', context)
+    if asincrono:
+        return encolar_pdf(request, 'OBSERVADOR', html_string, f"observador_{estudiante.user.username}.pdf")
     base_url = request.build_absolute_uri()
-    pdf_file = HTML(string=html_string, base_url=base_url).write_pdf()
+    pdf_file = renderizar_pdf(html_string, base_url=base_url)
 
     response = HttpResponse(pdf_file, content_type='application/pdf')
     response['Content-Disposition'] = f'inline; filename="observador_{estudiante.user.username}.pdf"'
@@ -10,6 +10,7 @@ from ..models import (
     Docente, AsignacionDocente, PeriodoAcademico, Estudiante,
     Calificacion, PlanDeMejoramiento, Observacion, EscalaValoracion
 )
+from ..resumen_logic import actualizar_resumenes
 
 @login_required
 def plan_mejoramiento_vista(request):
@@ -163,6 +164,8 @@ def plan_mejoramiento_vista(request):
                     if calificacion_original:
                         calificacion_original.es_recuperada = False
                         calificacion_original.save()
+
+            actualizar_resumenes(request.colegio, periodo, estudiantes_en_formulario)
             
             messages.success(request, "Nivelaciones guardadas y registros actualizados exitosamente.")
         except Exception as e:
@@ -9,6 +9,7 @@ from itertools import groupby
 from django.http import HttpResponseNotFound
 
 from ..models import PeriodoAcademico, PublicacionBoletin, Notificacion, Estudiante, PublicacionBoletinFinal
+from ..boletin.lote import precalentar_periodo
 
 def es_admin(user):
     return user.is_superuser
@@ -44,6 +45,8 @@ def panel_publicacion_vista(request):
                     publicacion.publicado_por = request.user
                     publicacion.save()
                     messages.success(request, f"Los boletines del '{periodo}' han sido publicados.")
+                    # Los PDF se generan en segundo plano (comando generar_boletines_colegio) y quedan en la caché.
+                    precalentar_periodo(periodo, request.user)
                 elif accion == 'ocultar':
                     publicacion.esta_visible = False
                     publicacion.save()
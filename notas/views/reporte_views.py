@@ -2,6 +2,7 @@
 from django.http import HttpResponse, HttpResponseNotFound, JsonResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
 import datetime
 
 
@@ -107,3 +108,17 @@ def obtener_meses_periodo_ajax(request):
         return JsonResponse({'meses': meses})
     except PeriodoAcademico.DoesNotExist:
         return JsonResponse({'error': 'Periodo no encontrado'}, status=404)
+
+
+@cache_control(public=True, max_age=60 * 60 * 24 * 365)
+def logo_reporte(request, colegio_id, campo, alto, version):
+    """
+    Logo del encabezado de los reportes, ya redimensionado (ver reportes/logos.py).
+    La URL lleva la versión del archivo, así que puede guardarse en caché sin límite.
+    """
+    from ..reportes.logos import png_de_url
+
+    png = png_de_url(colegio_id, campo, alto, version)
+    if png is None:
+        return HttpResponseNotFound()
+    return HttpResponse(png, content_type='image/png')
@@ -0,0 +1,82 @@
+# notas/views/reportes_trabajos_views.py
+import os
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponseNotFound, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.urls import reverse
+
+from ..models import TrabajoReporte, TrabajoImportacion
+from ..reportes.cola_pdf import ruta_absoluta, posicion_en_cola
+from ..utils.importacion_estudiantes import recuperar_importaciones_colgadas
+
+
+def _get_trabajo_del_usuario(request, trabajo_id):
+    trabajo = get_object_or_404(TrabajoReporte, id=trabajo_id, colegio=request.colegio)
+    if not request.user.is_superuser and trabajo.usuario_id != request.user.id:
+        raise Http404("Reporte no encontrado.")
+    return trabajo
+
+
+@login_required
+def estado_trabajo_reporte(request, trabajo_id):
+    """
+    Estado de un reporte en cola. Responde JSON con `?formato=json` (para
+    consultarlo por AJAX) y, si no, una página que se recarga hasta que el PDF
+    está listo.
+    """
+    if not request.colegio:
+        return HttpResponseNotFound("<h1>Colegio no configurado</h1>")
+    trabajo = _get_trabajo_del_usuario(request, trabajo_id)
+
+    url_descarga = reverse('descargar_trabajo_reporte', args=[trabajo.id]) if trabajo.estado == 'TERMINADO' else None
+    if request.GET.get('formato') == 'json':
+        posicion = posicion_en_cola(trabajo) if trabajo.estado == 'PENDIENTE' else None
+        return JsonResponse({
+            'status': 'success', 'estado': trabajo.estado, 'posicion_en_cola': posicion,
+            'url_descarga': url_descarga, 'error': trabajo.error if trabajo.estado == 'ERROR' else '',
+            # Avance de los lotes (boletines de todos los cursos).
+            'terminados': len(trabajo.resumen), 'total': trabajo.parametros.get('total'),
+        })
+
+    return render(request, 'notas/reportes/estado_trabajo.html', {'trabajo': trabajo, 'url_descarga': url_descarga})
+
+
+@login_required
+def descargar_trabajo_reporte(request, trabajo_id):
+    if not request.colegio:
+        return HttpResponseNotFound("<h1>Colegio no configurado</h1>")
+    trabajo = _get_trabajo_del_usuario(request, trabajo_id)
+    if trabajo.estado != 'TERMINADO' or not os.path.exists(ruta_absoluta(trabajo)):
+        raise Http404("El reporte todavía no está disponible.")
+
+    if trabajo.ruta_archivo.endswith('.zip'):
+        return FileResponse(open(ruta_absoluta(trabajo), 'rb'), as_attachment=True, filename=trabajo.nombre_archivo, content_type='application/zip')
+    response = FileResponse(open(ruta_absoluta(trabajo), 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{trabajo.nombre_archivo}"'
+    return response
+
+
+@login_required
+def estado_importacion(request, trabajo_id):
+    """
+    Avance de una importación masiva y, al terminar, su reporte por fila.
+    Con `?formato=json` responde solo el avance, para consultarlo por AJAX.
+    """
+    if not request.colegio:
+        return HttpResponseNotFound("<h1>Colegio no configurado</h1>")
+    trabajo = get_object_or_404(TrabajoImportacion, id=trabajo_id, colegio=request.colegio)
+    if not request.user.is_superuser and trabajo.usuario_id != request.user.id:
+        raise Http404("Importación no encontrada.")
+    # Si el proceso que la importaba murió, la página deja de esperar.
+    if trabajo.estado == 'PROCESANDO' and recuperar_importaciones_colgadas(trabajos=TrabajoImportacion.objects.filter(id=trabajo.id)):
+        trabajo.refresh_from_db()
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'status': 'success', 'estado': trabajo.estado, 'total_filas': trabajo.total_filas,
+            'filas_procesadas': trabajo.filas_procesadas, 'porcentaje': trabajo.porcentaje,
+            'creados': trabajo.creados, 'omitidos': trabajo.omitidos, 'errores': len(trabajo.errores_filas),
+            'error': trabajo.error if trabajo.estado == 'ERROR' else '',
+        })
+    return render(request, 'notas/reportes/estado_importacion.html', {'trabajo': trabajo})
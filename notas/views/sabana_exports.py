@@ -1,182 +1,145 @@
 # notas/views/sabana_exports.py
 
-import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
 from openpyxl.drawing.image import Image
-import requests
+from openpyxl.comments import Comment
+from openpyxl.utils import get_column_letter
 from io import BytesIO
-from decimal import Decimal
 
-from django.http import HttpResponse
-from django.utils import timezone
+from ..reportes.excel_streaming import crear_libro, titulo_hoja, celda, combinar, guardar_en_temporal
+from ..reportes.logos import logo_png, ESCALA_IMPRESION
+
+ALTO_LOGO = 60
+
+
+def _logo(colegio):
+    """PNG del logo izquierdo desde la caché de logos (None si no hay o no se pudo leer)."""
+    return logo_png(colegio, 'logo_izquierdo', alto=ALTO_LOGO * ESCALA_IMPRESION)
 
-def generar_excel_sabana(curso, periodo, sabana_data, areas_con_materias, desempenos_headers, resumen_final_celdas, colegio, is_final_report, **kwargs):
+
+def _texto_con_recuperacion(original, recuperado):
+    texto = f"{original}"
+    if recuperado is not None:
+        texto += f" ({recuperado})"
+    return texto
+
+
+def escribir_hoja_sabana(wb, curso, periodo, sabana_data, areas_con_materias, desempenos_headers, colegio, is_final_report, logo=None, **kwargs):
     """
-    Genera un archivo Excel con la Sábana de Notas, con un diseño profesional
-    y mostrando las notas originales junto a las de recuperación.
+    Agrega al libro (en modo write_only) una hoja con la Sábana de Notas de un
+    curso, mostrando las notas originales junto a las de recuperación. Las filas
+    se escriben en orden y openpyxl las pasa a disco a medida que se agregan.
     """
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Sabana {curso.nombre}"
-
-    # --- Definición de Estilos ---
-    title_font = Font(name='Calibri', bold=True, size=16)
-    subtitle_font = Font(name='Calibri', bold=True, size=12)
-    bold_font = Font(name='Calibri', bold=True)
-    header_fill = PatternFill(start_color="DDEBF7", end_color="DDEBF7", fill_type="solid")
-    area_header_fill = PatternFill(start_color="B4C6E7", end_color="B4C6E7", fill_type="solid")
-    acumulado_fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-    center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    left_align = Alignment(horizontal='left', vertical='center')
-    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-    
+    ws = wb.create_sheet(titulo_hoja(f"Sabana {curso.nombre}"))
+
+    # --- Columnas: N°, nombre, periodo, materias y definitivas de área, promedio, desempeños y puesto ---
+    prom_col = 4 + sum(len(a.materias_del_curso_ordenadas) + 1 for a in areas_con_materias)
+    puesto_col = prom_col + len(desempenos_headers) + 1
+
+    # En write_only los anchos deben fijarse antes de escribir la primera fila.
+    ws.column_dimensions['B'].width = 35
+    for c in range(3, puesto_col + 1):
+        ws.column_dimensions[get_column_letter(c)].width = 10
+
+    if logo:
+        img = Image(BytesIO(logo))
+        img.height = ALTO_LOGO
+        img.width = ALTO_LOGO
+        ws.add_image(img, 'A1')
+
     # --- Encabezado del Reporte (similar al PDF) ---
-    # Se calcula el número total de columnas para poder centrar el encabezado
-    total_cols = 3 + sum(len(a.materias_del_curso_ordenadas) + 1 for a in areas_con_materias) + 1 + len(desempenos_headers) + 1
-    
-    # Insertar logo si existe
-    if colegio.logo:
-        try:
-            response = requests.get(colegio.logo.url, stream=True)
-            response.raise_for_status()
-            img = Image(BytesIO(response.content))
-            img.height = 60
-            img.width = 60
-            ws.add_image(img, 'A1')
-        except requests.exceptions.RequestException:
-            pass # Si falla la descarga del logo, simplemente no se añade.
-    
-    # Información del colegio
-    ws.merge_cells(start_row=1, start_column=2, end_row=1, end_column=total_cols -1)
-    cell = ws.cell(row=1, column=2, value=colegio.nombre.upper())
-    cell.font = title_font
-    cell.alignment = center_align
-
-    ws.merge_cells(start_row=2, start_column=2, end_row=2, end_column=total_cols -1)
-    info_text = f"REGISTRO DANE: {colegio.dane or 'N/A'} | RESOLUCIÓN {colegio.resolucion or 'N/A'}"
-    cell = ws.cell(row=2, column=2, value=info_text)
-    cell.alignment = center_align
-
-    # Título de la sábana
-    ws.merge_cells(start_row=4, start_column=1, end_row=4, end_column=total_cols)
-    title_text = f"SÁBANA DE NOTAS FINAL - {periodo.ano_lectivo}" if is_final_report else f"SÁBANA DE NOTAS ACUMULATIVA AL {periodo.get_nombre_display().upper()} - {periodo.ano_lectivo}"
-    cell = ws.cell(row=4, column=1, value=title_text)
-    cell.font = subtitle_font
-    cell.alignment = center_align
+    ws.append([None, celda(ws, colegio.nombre.upper(), 'titulo')])
+    combinar(ws, 1, 2, 1, puesto_col - 1)
+    info_text = f"REGISTRO DANE: {colegio.dane or 'N/A'} | RESOLUCIÓN {colegio.resolucion_aprobacion or 'N/A'}"
+    ws.append([None, celda(ws, info_text, 'centrado')])
+    combinar(ws, 2, 2, 2, puesto_col - 1)
+    ws.append([])
 
-    ws.merge_cells(start_row=5, start_column=1, end_row=5, end_column=total_cols)
+    title_text = f"SÁBANA DE NOTAS FINAL - {periodo.ano_lectivo}" if is_final_report else f"SÁBANA DE NOTAS ACUMULATIVA AL {periodo.get_nombre_display().upper()} - {periodo.ano_lectivo}"
+    ws.append([celda(ws, title_text, 'subtitulo')])
+    combinar(ws, 4, 1, 4, puesto_col)
     director = curso.director_grado.user.get_full_name() if curso.director_grado else "No asignado"
-    cell = ws.cell(row=5, column=1, value=f"CURSO: {curso.nombre} | DIRECTOR: {director}")
-    cell.alignment = center_align
+    ws.append([celda(ws, f"CURSO: {curso.nombre} | DIRECTOR: {director}", 'centrado')])
+    combinar(ws, 5, 1, 5, puesto_col)
+    ws.append([])
 
-    # --- Encabezados de la Tabla ---
+    # --- Encabezados de la Tabla (filas 7 y 8) ---
     row_h1, row_h2 = 7, 8
-    ws.cell(row=row_h1, column=1, value="N°")
-    ws.cell(row=row_h1, column=2, value="Apellidos y Nombres")
-    ws.cell(row=row_h1, column=3, value="P.")
-    ws.merge_cells(start_row=row_h1, start_column=1, end_row=row_h2, end_column=1)
-    ws.merge_cells(start_row=row_h1, start_column=2, end_row=row_h2, end_column=2)
-    ws.merge_cells(start_row=row_h1, start_column=3, end_row=row_h2, end_column=3)
-
-    col_idx = 4
+    fila_1 = [celda(ws, "N°", 'encabezado'), celda(ws, "Apellidos y Nombres", 'encabezado'), celda(ws, "P.", 'encabezado')]
+    fila_2 = [celda(ws, None, 'encabezado') for _ in range(3)]
+    for c in (1, 2, 3):
+        combinar(ws, row_h1, c, row_h2, c)
+
     for area in areas_con_materias:
+        col_idx = len(fila_1) + 1
         num_materias = len(area.materias_del_curso_ordenadas)
-        ws.cell(row=row_h1, column=col_idx, value=area.nombre).fill = area_header_fill
+        fila_1.append(celda(ws, area.nombre, 'encabezado_area'))
+        fila_1.extend(celda(ws, None, 'encabezado') for _ in range(num_materias))
         if num_materias > 0:
-            ws.merge_cells(start_row=row_h1, start_column=col_idx, end_row=row_h1, end_column=col_idx + num_materias)
-        
-        for materia in area.materias_del_curso_ordenadas:
-            ws.cell(row=row_h2, column=col_idx, value=materia.abreviatura or materia.nombre)
-            col_idx += 1
-        ws.cell(row=row_h2, column=col_idx, value="DEF. ÁREA").fill = area_header_fill
-        col_idx += 1
-    
-    prom_col = col_idx
-    ws.cell(row=row_h1, column=prom_col, value="Prom.")
-    ws.merge_cells(start_row=row_h1, start_column=prom_col, end_row=row_h2, end_column=prom_col)
-    col_idx += 1
-
-    for d in desempenos_headers:
-        ws.cell(row=row_h1, column=col_idx, value=d[:3] + ".").tool_tip = d
-        ws.merge_cells(start_row=row_h1, start_column=col_idx, end_row=row_h2, end_column=col_idx)
-        col_idx += 1
-
-    puesto_col = col_idx
-    ws.cell(row=row_h1, column=puesto_col, value="Puesto")
-    ws.merge_cells(start_row=row_h1, start_column=puesto_col, end_row=row_h2, end_column=puesto_col)
-    
-    for c in range(1, puesto_col + 1):
-        for r in [row_h1, row_h2]:
-            ws.cell(row=r, column=c).font = bold_font
-            ws.cell(row=r, column=c).alignment = center_align
-            ws.cell(row=r, column=c).fill = header_fill
-            ws.cell(row=r, column=c).border = thin_border
+            combinar(ws, row_h1, col_idx, row_h1, col_idx + num_materias)
+        fila_2.extend(celda(ws, materia.abreviatura or materia.nombre, 'encabezado') for materia in area.materias_del_curso_ordenadas)
+        fila_2.append(celda(ws, "DEF. ÁREA", 'encabezado_area'))
+
+    fila_1.append(celda(ws, "Prom.", 'encabezado'))
+    fila_1.extend(celda(ws, d[:3] + ".", 'encabezado', comentario=Comment(d, colegio.nombre)) for d in desempenos_headers)
+    fila_1.append(celda(ws, "Puesto", 'encabezado'))
+    fila_2.extend(celda(ws, None, 'encabezado') for _ in range(prom_col, puesto_col + 1))
+    for c in range(prom_col, puesto_col + 1):
+        combinar(ws, row_h1, c, row_h2, c)
+    ws.append(fila_1)
+    ws.append(fila_2)
 
     # --- Cuerpo de la Tabla ---
-    current_row = row_h2 + 1
     for i, data in enumerate(sabana_data, 1):
-        num_filas_estudiante = len(data['filas_notas']) + 1
-        start_merge_row = current_row
-        
-        # Fila de N°, Nombre y Puesto
-        ws.cell(row=start_merge_row, column=1, value=i).alignment = center_align
-        ws.cell(row=start_merge_row, column=2, value=f"{data['info'].user.last_name} {data['info'].user.first_name}").alignment = left_align
-        ws.cell(row=start_merge_row, column=puesto_col, value=data.get('puesto_final')).alignment = center_align
-
-        # Filas de Periodos
+        filas = []
         for fila_periodo in data['filas_notas']:
-            ws.cell(row=current_row, column=3, value=fila_periodo['periodo_nombre']).font = bold_font
-            col_idx = 4
-            for celda in fila_periodo['celdas']:
-                nota_str = f"{celda['nota_original'] or '-'}"
-                if celda.get('nota_recuperacion') is not None:
-                    nota_str += f" ({celda['nota_recuperacion']})"
-                ws.cell(row=current_row, column=col_idx, value=nota_str).alignment = center_align
-                col_idx += 1
-            
-            prom_str = f"{fila_periodo['promedio_periodo_original']}"
-            if fila_periodo.get('promedio_periodo_recuperado') is not None:
-                prom_str += f" ({fila_periodo['promedio_periodo_recuperado']})"
-            ws.cell(row=current_row, column=prom_col, value=prom_str).alignment = center_align
-
-            for j, count in enumerate(fila_periodo['resumen_desempeno_periodo_list']):
-                ws.cell(row=current_row, column=prom_col + 1 + j, value=count).alignment = center_align
-            current_row += 1
+            filas.append(
+                [celda(ws, fila_periodo['periodo_nombre'], 'celda_negrita')]
+                + [celda(ws, _texto_con_recuperacion(c['nota_original'] or '-', c.get('nota_recuperacion')), 'celda') for c in fila_periodo['celdas']]
+                + [celda(ws, _texto_con_recuperacion(fila_periodo['promedio_periodo_original'], fila_periodo.get('promedio_periodo_recuperado')), 'celda')]
+                + [celda(ws, count, 'celda') for count in fila_periodo['resumen_desempeno_periodo_list']]
+            )
 
         # Fila Acumulada
         fila_ac = data['fila_acumulada']
-        ws.cell(row=current_row, column=3, value=fila_ac['periodo_nombre'])
-        col_idx = 4
-        for celda in fila_ac['celdas']:
-            ws.cell(row=current_row, column=col_idx, value=celda['nota']).alignment = center_align
-            col_idx += 1
-        
-        prom_ac_str = f"{fila_ac['promedio_display_original']}"
-        if fila_ac.get('promedio_display_recuperado') is not None:
-            prom_ac_str += f" ({fila_ac['promedio_display_recuperado']})"
-        ws.cell(row=current_row, column=prom_col, value=prom_ac_str).alignment = center_align
-
-        for j, count in enumerate(data['resumen_desempeno_acumulado_list']):
-            ws.cell(row=current_row, column=prom_col + 1 + j, value=count).alignment = center_align
-        
-        for c in range(1, puesto_col + 1):
-            for r in range(start_merge_row, current_row + 1):
-                ws.cell(row=r, column=c).border = thin_border
-            ws.cell(row=current_row, column=c).fill = acumulado_fill
-            ws.cell(row=current_row, column=c).font = bold_font
-        
-        current_row += 1
-
-    # --- Ajuste de Ancho de Columnas ---
-    ws.column_dimensions['B'].width = 35
-    for col_letter in [get_column_letter(c) for c in range(3, puesto_col + 1)]:
-        ws.column_dimensions[col_letter].width = 10
-    
-    # --- Respuesta HTTP ---
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"Sabana_{curso.nombre}_{periodo.get_nombre_display()}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    wb.save(response)
-
-    return response
+        filas.append(
+            [celda(ws, fila_ac['periodo_nombre'], 'acumulado')]
+            + [celda(ws, c['nota'], 'acumulado') for c in fila_ac['celdas']]
+            + [celda(ws, _texto_con_recuperacion(fila_ac['promedio_display_original'], fila_ac.get('promedio_display_recuperado')), 'acumulado')]
+            + [celda(ws, count, 'acumulado') for count in data['resumen_desempeno_acumulado_list']]
+        )
+
+        # N°, nombre y puesto van en la primera fila del estudiante; las demás celdas quedan con borde.
+        for numero, fila in enumerate(filas):
+            estilo = 'acumulado' if numero == len(filas) - 1 else 'celda'
+            if numero == 0:
+                inicio = [celda(ws, i, estilo), celda(ws, f"{data['info'].user.last_name} {data['info'].user.first_name}", 'acumulado' if estilo == 'acumulado' else 'celda_izquierda')]
+                final = celda(ws, data.get('puesto_final'), estilo)
+            else:
+                inicio = [celda(ws, None, estilo), celda(ws, None, estilo)]
+                final = celda(ws, None, estilo)
+            relleno = [celda(ws, None, estilo) for _ in range(puesto_col - 3 - len(fila))]
+            ws.append(inicio + fila + relleno + [final])
+    return ws
+
+
+def generar_excel_sabana(curso, periodo, colegio, is_final_report, **datos_sabana):
+    """Genera el Excel de la Sábana de un curso. Devuelve el archivo temporal abierto y al inicio."""
+    wb = crear_libro()
+    escribir_hoja_sabana(wb, curso, periodo, colegio=colegio, is_final_report=is_final_report, logo=_logo(colegio), **datos_sabana)
+    return guardar_en_temporal(wb)
+
+
+def generar_excel_sabana_colegio(colegio, periodo, is_final_report, hojas):
+    """
+    Genera un solo Excel con la Sábana de cada curso del colegio, una hoja por
+    curso. `hojas` es un iterable de (curso, datos_sabana) que se consume de a
+    uno: los datos de cada curso se descartan apenas se escribe su hoja, así que
+    la memoria no depende del número de cursos.
+    """
+    wb = crear_libro()
+    logo = _logo(colegio)
+    for curso, datos_sabana in hojas:
+        escribir_hoja_sabana(wb, curso, periodo, colegio=colegio, is_final_report=is_final_report, logo=logo, **datos_sabana)
+    if not wb.worksheets:
+        wb.create_sheet("Sin cursos")
+    return guardar_en_temporal(wb)
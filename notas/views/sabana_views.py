@@ -4,287 +4,211 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, HttpResponseNotFound
 from django.contrib import messages
-from decimal import Decimal, ROUND_HALF_UP
+from decimal import Decimal
 from django.template.loader import render_to_string
 from django.utils import timezone
-from itertools import groupby
 from django.db.models import Prefetch
-from collections import defaultdict
-
-try:
-    from weasyprint import HTML
-    PDF_SUPPORT = True
-except ImportError:
-    PDF_SUPPORT = False
-
-from ..models import Curso, PeriodoAcademico, Docente, AsignacionDocente, Estudiante, Materia, Calificacion, AreaConocimiento, PonderacionAreaMateria, EscalaValoracion
-from .sabana_exports import generar_excel_sabana
+import numpy as np
+
+from ..models import Curso, PeriodoAcademico, Docente, AsignacionDocente, Estudiante, Materia, Calificacion, AreaConocimiento, PonderacionAreaMateria
+from ..utils.escala_valoracion import get_escala_compilada
+from ..boletin.acumulado import (
+    pivotar_notas, matriz_pesos, calcular_acumulado, a_decimal, puestos,
+    desempenos_por_decima, contar_desempenos, resumen_columnas
+)
+from .sabana_exports import generar_excel_sabana, generar_excel_sabana_colegio
+from ..reportes.cola_pdf import usar_cola, encolar_pdf
+from ..reportes.motor_pdf import renderizar_pdf, disponible as pdf_disponible
+from ..reportes.pdf_por_partes import usar_partes, renderizar_por_partes, TAMANO_PARTE_SABANA
+from ..reportes.cache_artefactos import sello_datos, clave_artefacto, leer_artefacto, abrir_artefacto, guardar_artefacto
+from ..reportes.excel_streaming import respuesta_xlsx
 
 def _get_sabana_acumulada_data(colegio, curso, periodo_actual):
     """
     Lógica de negocio final para la sábana de notas.
     - Ranking y Cuadro de Honor se basan en notas ORIGINALES.
     - Muestra el formato 'original (recuperado)' para notas, promedios de área y promedios de periodo.
+    Los cálculos se hacen con el núcleo de notas acumuladas (boletin/acumulado.py),
+    el mismo de los boletines; aquí solo se arman las filas para las plantillas.
     """
     # --- 1. OBTENCIÓN DE DATOS INICIALES Y CONFIGURACIÓN ---
-    escala_valoracion_qs = EscalaValoracion.objects.filter(colegio=colegio).order_by('-valor_maximo')
-    if not escala_valoracion_qs.exists():
+    escala = get_escala_compilada(colegio)
+    if not escala:
         raise ValueError("No hay una escala de valoración configurada para este colegio.")
 
-    DESEMPENOS_NOMBRES = [e.nombre_desempeno.upper() for e in escala_valoracion_qs]
+    DESEMPENOS_NOMBRES = escala.nombres_descendentes
     DESEMPENOS_CON_DEFAULT = DESEMPENOS_NOMBRES + ["SIN ESCALA"]
+    tabla_desempenos = desempenos_por_decima(escala.desempeno)
 
-    def get_valoracion_desempeno(nota):
-        if nota is None: return None
-        nota_decimal = Decimal(nota)
-        for escala in escala_valoracion_qs:
-            if escala.valor_minimo <= nota_decimal <= escala.valor_maximo:
-                return escala.nombre_desempeno.upper()
-        return "SIN ESCALA"
+    periodos_transcurridos = list(PeriodoAcademico.objects.filter(
+        colegio=colegio, ano_lectivo=periodo_actual.ano_lectivo, fecha_inicio__lte=periodo_actual.fecha_inicio
+    ).order_by('fecha_inicio'))
 
-    periodos_del_ano = PeriodoAcademico.objects.filter(colegio=colegio, ano_lectivo=periodo_actual.ano_lectivo).order_by('fecha_inicio')
-    periodos_transcurridos = periodos_del_ano.filter(fecha_inicio__lte=periodo_actual.fecha_inicio)
-    
     materias_del_curso = Materia.objects.filter(colegio=colegio, asignaciondocente__curso=curso).distinct().order_by('nombre')
-    
-    areas_con_materias = AreaConocimiento.objects.filter(colegio=colegio, materias__in=materias_del_curso).prefetch_related(
+    materia_ids = list(materias_del_curso.values_list('id', flat=True))
+
+    areas_con_materias = list(AreaConocimiento.objects.filter(colegio=colegio, materias__in=materias_del_curso).prefetch_related(
         Prefetch('materias', queryset=materias_del_curso, to_attr='materias_del_curso_ordenadas')
-    ).distinct().order_by('nombre')
-    
-    ponderaciones_map = {(p.area_id, p.materia_id): p.peso_porcentual for p in PonderacionAreaMateria.objects.filter(colegio=colegio, materia__in=materias_del_curso)}
+    ).distinct().order_by('nombre'))
 
-    estudiantes = Estudiante.objects.filter(curso=curso, is_active=True, colegio=colegio).select_related('user')
-    
-    calificaciones = Calificacion.objects.filter(
-        colegio=colegio, estudiante__in=estudiantes, materia__in=materias_del_curso,
-        periodo__in=periodos_transcurridos, tipo_nota__in=['PROM_PERIODO', 'NIVELACION']
-    ).select_related('estudiante', 'materia', 'periodo')
+    ponderaciones_map = {(p.area_id, p.materia_id): p.peso_porcentual for p in PonderacionAreaMateria.objects.filter(colegio=colegio, materia_id__in=materia_ids)}
 
-    calificaciones_pivot = defaultdict(lambda: {'prom': None, 'niv': None})
-    for cal in calificaciones:
-        key = (cal.estudiante_id, cal.materia_id, cal.periodo.id)
-        if cal.tipo_nota == 'PROM_PERIODO': calificaciones_pivot[key]['prom'] = cal.valor_nota
-        elif cal.tipo_nota == 'NIVELACION': calificaciones_pivot[key]['niv'] = cal.valor_nota
-    
-    sabana_data = []
-    CERO = Decimal('0.0')
-    
-    notas_acumuladas_materias = defaultdict(list)
-    notas_acumuladas_areas = defaultdict(list)
-
-    # --- 2. PROCESAMIENTO DE NOTAS POR ESTUDIANTE ---
-    for est in estudiantes:
-        estudiante_data = {'info': est, 'filas_notas': [], 'fila_acumulada': {}, 'resumen_desempeno_acumulado': {d: 0 for d in DESEMPENOS_CON_DEFAULT}}
-        
-        # --- INICIO: CAMBIO para calcular promedios de periodo con y sin recuperación ---
-        for p in periodos_transcurridos:
-            fila_periodo = {
-                'periodo_nombre': str(p.nombre.replace("PRIMERO", "1").replace("SEGUNDO", "2").replace("TERCERO", "3").replace("CUARTO", "4")),
-                'celdas': [], 'resumen_desempeno_periodo': {d: 0 for d in DESEMPENOS_CON_DEFAULT}
-            }
-            
-            def calcular_promedios_fila(usar_recuperacion):
-                notas_area_para_promedio = []
-                celdas_fila = []
-                for area in areas_con_materias:
-                    suma_ponderada_area, suma_pesos_area = CERO, CERO
-                    for materia in area.materias_del_curso_ordenadas:
-                        cal_data = calificaciones_pivot.get((est.id, materia.id, p.id), {})
-                        nota_original = cal_data.get('prom')
-                        nota_recuperacion = cal_data.get('niv')
-                        
-                        nota_para_calculo = (nota_recuperacion if usar_recuperacion else None) or nota_original
-
-                        if not usar_recuperacion: # Solo construimos la celda una vez
-                           celdas_fila.append({'is_area': False, 'nota_original': nota_original, 'nota_recuperacion': nota_recuperacion})
-
-                        if nota_para_calculo is not None:
-                            peso = ponderaciones_map.get((area.id, materia.id))
-                            if peso is not None:
-                                suma_ponderada_area += (Decimal(nota_para_calculo) * peso)
-                                suma_pesos_area += peso
-                    
-                    nota_area = (suma_ponderada_area / suma_pesos_area).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP) if suma_pesos_area > 0 else None
-                    if not usar_recuperacion:
-                        celdas_fila.append({'is_area': True, 'nota_original': nota_area}) # Guardamos la original
-                    else:
-                        # Buscamos la celda del área y le añadimos la nota recuperada si es diferente
-                        for celda in celdas_fila:
-                            if celda.get('is_area') and celda.get('nota_original') != nota_area:
-                                celda['nota_recuperacion'] = nota_area
-                                break
-                    
-                    if nota_area: notas_area_para_promedio.append(nota_area)
-                
-                promedio_fila = (sum(notas_area_para_promedio) / len(notas_area_para_promedio)).quantize(Decimal('0.2'), rounding=ROUND_HALF_UP) if notas_area_para_promedio else CERO
-                return promedio_fila, celdas_fila
-
-            promedio_periodo_original, celdas_periodo = calcular_promedios_fila(usar_recuperacion=False)
-            promedio_periodo_recuperado, _ = calcular_promedios_fila(usar_recuperacion=True)
-
-            fila_periodo['celdas'] = celdas_periodo
-            fila_periodo['promedio_periodo_original'] = promedio_periodo_original
-            if promedio_periodo_original != promedio_periodo_recuperado:
-                fila_periodo['promedio_periodo_recuperado'] = promedio_periodo_recuperado
-            else:
-                fila_periodo['promedio_periodo_recuperado'] = None
-            # --- FIN: CAMBIO ---
-
-            # El resumen de desempeño se calcula con la nota final (recuperada)
-            for celda in celdas_periodo:
-                if celda.get('is_area'):
-                    nota_final_area = celda.get('nota_recuperacion') or celda.get('nota_original')
-                    desempeno_area = get_valoracion_desempeno(nota_final_area)
-                    if desempeno_area: fila_periodo['resumen_desempeno_periodo'][desempeno_area] += 1
-            
-            fila_periodo['resumen_desempeno_periodo_list'] = [fila_periodo['resumen_desempeno_periodo'][d] for d in DESEMPENOS_NOMBRES]
-            estudiante_data['filas_notas'].append(fila_periodo)
-
-        # --- Lógica para Fila Acumulada ---
-        def calcular_promedio_acumulado(usar_recuperacion):
-            notas_finales_areas_para_promedio = []
-            celdas_acumuladas = []
-            for area in areas_con_materias:
-                suma_ponderada_area_final, suma_pesos_area_final = CERO, CERO
-                for materia in area.materias_del_curso_ordenadas:
-                    suma_notas_materia, num_periodos_validos = CERO, 0
-                    for p_inner in periodos_transcurridos:
-                        cal_data = calificaciones_pivot.get((est.id, materia.id, p_inner.id), {})
-                        nota_valida = (cal_data.get('niv') if usar_recuperacion else None) or cal_data.get('prom')
-                        if nota_valida is not None:
-                            suma_notas_materia += nota_valida
-                            num_periodos_validos += 1
-                    
-                    promedio_final_materia = (suma_notas_materia / num_periodos_validos).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP) if num_periodos_validos > 0 else None
-                    celdas_acumuladas.append({'is_area': False, 'nota': promedio_final_materia})
-
-                    if promedio_final_materia is not None:
-                        if usar_recuperacion: notas_acumuladas_materias[materia.id].append(promedio_final_materia)
-                        peso = ponderaciones_map.get((area.id, materia.id))
-                        if peso is not None:
-                            suma_ponderada_area_final += (promedio_final_materia * peso)
-                            suma_pesos_area_final += peso
-                
-                nota_area_final = (suma_ponderada_area_final / suma_pesos_area_final).quantize(Decimal('0.1'), rounding=ROUND_HALF_UP) if suma_pesos_area_final > 0 else None
-                celdas_acumuladas.append({'is_area': True, 'nota': nota_area_final})
-                
-                if nota_area_final is not None:
-                    notas_finales_areas_para_promedio.append(nota_area_final)
-                    if usar_recuperacion:
-                        notas_acumuladas_areas[area.id].append(nota_area_final)
-                        desempeno_area_acumulado = get_valoracion_desempeno(nota_area_final)
-                        if desempeno_area_acumulado: estudiante_data['resumen_desempeno_acumulado'][desempeno_area_acumulado] += 1
-            
-            promedio_final = (sum(notas_finales_areas_para_promedio) / len(notas_finales_areas_para_promedio)).quantize(Decimal('0.2'), rounding=ROUND_HALF_UP) if notas_finales_areas_para_promedio else CERO
-            return promedio_final, celdas_acumuladas
+    estudiantes = list(Estudiante.objects.filter(curso=curso, is_active=True, colegio=colegio).select_related('user'))
 
-        promedio_final_con_rec, celdas_con_rec = calcular_promedio_acumulado(usar_recuperacion=True)
-        promedio_final_sin_rec, _ = calcular_promedio_acumulado(usar_recuperacion=False)
-        
-        fila_acumulada = {'periodo_nombre': 'Ac', 'celdas': celdas_con_rec}
-        fila_acumulada['promedio_final_ranking'] = promedio_final_sin_rec # Para el ranking
-        fila_acumulada['promedio_display_original'] = promedio_final_sin_rec
-        
-        if promedio_final_con_rec != promedio_final_sin_rec:
-            fila_acumulada['promedio_display_recuperado'] = promedio_final_con_rec
-        else:
-            fila_acumulada['promedio_display_recuperado'] = None
+    filas = Calificacion.objects.filter(
+        colegio=colegio, estudiante_id__in=[e.id for e in estudiantes], materia_id__in=materia_ids,
+        periodo__in=periodos_transcurridos, tipo_nota__in=['PROM_PERIODO', 'NIVELACION']
+    ).values_list('estudiante_id', 'materia_id', 'periodo_id', 'tipo_nota', 'valor_nota')
+    prom, niv = pivotar_notas(filas, [e.id for e in estudiantes], materia_ids, [p.id for p in periodos_transcurridos])
+    calculo = calcular_acumulado(prom, niv, matriz_pesos(ponderaciones_map, materia_ids, [a.id for a in areas_con_materias]))
+
+    # Columnas de la sábana: las materias de cada área seguidas del área. (índice, es_área)
+    indice_materia = {materia_id: j for j, materia_id in enumerate(materia_ids)}
+    columnas = [
+        columna for k, area in enumerate(areas_con_materias)
+        for columna in [(indice_materia[m.id], False) for m in area.materias_del_curso_ordenadas] + [(k, True)]
+    ]
+
+    # Todo a listas de Python una sola vez: leer celda por celda de numpy es lento.
+    prom_l, niv_l = prom.tolist(), niv.tolist()
+    area_periodo, area_periodo_rec = calculo['area_periodo'].tolist(), calculo['area_periodo_rec'].tolist()
+    promedio_periodo, promedio_periodo_rec = calculo['promedio_periodo'].tolist(), calculo['promedio_periodo_rec'].tolist()
+    materia_acumulada_rec, area_acumulada_rec = calculo['materia_acumulada_rec'].tolist(), calculo['area_acumulada_rec'].tolist()
+    promedio_acumulado, promedio_acumulado_rec = calculo['promedio_acumulado'].tolist(), calculo['promedio_acumulado_rec'].tolist()
+    resumen_areas_periodo = [[contar_desempenos(calculo['area_periodo_rec'][i, :, p], tabla_desempenos) for p in range(len(periodos_transcurridos))] for i in range(len(estudiantes))]
+
+    nombres_periodos = [p.nombre.replace("PRIMERO", "1").replace("SEGUNDO", "2").replace("TERCERO", "3").replace("CUARTO", "4") for p in periodos_transcurridos]
+    CERO = Decimal('0.0')
+    sabana_data = []
 
-        estudiante_data['resumen_desempeno_acumulado_list'] = [estudiante_data['resumen_desempeno_acumulado'][d] for d in DESEMPENOS_NOMBRES]
-        estudiante_data['fila_acumulada'] = fila_acumulada
+    # --- 2. FILAS POR ESTUDIANTE ---
+    for i, est in enumerate(estudiantes):
+        estudiante_data = {'info': est, 'filas_notas': []}
+
+        for p, nombre_periodo in enumerate(nombres_periodos):
+            celdas = []
+            for indice, es_area in columnas:
+                if es_area:
+                    original, recuperada = area_periodo[i][indice][p], area_periodo_rec[i][indice][p]
+                    celdas.append({'is_area': True, 'nota_original': a_decimal(original), 'nota_recuperacion': a_decimal(recuperada) if recuperada != original else None})
+                else:
+                    celdas.append({'is_area': False, 'nota_original': a_decimal(prom_l[i][indice][p], 2), 'nota_recuperacion': a_decimal(niv_l[i][indice][p], 2)})
+
+            # El resumen de desempeño se calcula con la nota final (recuperada) de cada área.
+            resumen = {d: 0 for d in DESEMPENOS_CON_DEFAULT}
+            resumen.update(resumen_areas_periodo[i][p])
+            original, recuperado = promedio_periodo[i][p], promedio_periodo_rec[i][p]
+            estudiante_data['filas_notas'].append({
+                'periodo_nombre': nombre_periodo, 'celdas': celdas,
+                'promedio_periodo_original': a_decimal(original) or CERO,
+                'promedio_periodo_recuperado': a_decimal(recuperado) if recuperado != original else None,
+                'resumen_desempeno_periodo': resumen,
+                'resumen_desempeno_periodo_list': [resumen[d] for d in DESEMPENOS_NOMBRES],
+            })
+
+        # --- Fila acumulada (con recuperaciones); el ranking usa el promedio sin ellas ---
+        celdas_acumuladas = [
+            {'is_area': es_area, 'nota': a_decimal((area_acumulada_rec if es_area else materia_acumulada_rec)[i][indice])}
+            for indice, es_area in columnas
+        ]
+        resumen_acumulado = {d: 0 for d in DESEMPENOS_CON_DEFAULT}
+        resumen_acumulado.update(contar_desempenos(calculo['area_acumulada_rec'][i], tabla_desempenos))
+        original, recuperado = promedio_acumulado[i], promedio_acumulado_rec[i]
+        promedio_final_sin_rec = a_decimal(original) or CERO
+        estudiante_data['fila_acumulada'] = {
+            'periodo_nombre': 'Ac', 'celdas': celdas_acumuladas,
+            'promedio_final_ranking': promedio_final_sin_rec,
+            'promedio_display_original': promedio_final_sin_rec,
+            'promedio_display_recuperado': (a_decimal(recuperado) or CERO) if recuperado != original else None,
+        }
+        estudiante_data['resumen_desempeno_acumulado'] = resumen_acumulado
+        estudiante_data['resumen_desempeno_acumulado_list'] = [resumen_acumulado[d] for d in DESEMPENOS_NOMBRES]
         sabana_data.append(estudiante_data)
 
     # --- 3. CÁLCULO DE PUESTO Y PODIO (BASADO EN NOTAS ORIGINALES) ---
-    sabana_data.sort(key=lambda x: x['fila_acumulada']['promedio_final_ranking'] or CERO, reverse=True)
-    mejores_estudiantes = sabana_data[:3]
-    rank_counter = 1
-    for k, group in groupby(sabana_data, key=lambda x: x['fila_acumulada']['promedio_final_ranking']):
-        group_list = list(group)
-        for item in group_list:
-            item.update({'puesto_final': rank_counter})
-        rank_counter += len(group_list)
+    promedios_ranking = [d['fila_acumulada']['promedio_final_ranking'] for d in sabana_data]
+    for estudiante_data, puesto in zip(sabana_data, puestos(promedios_ranking, compartidos=True)):
+        estudiante_data['puesto_final'] = puesto
+    mejores_estudiantes = sorted(sabana_data, key=lambda x: x['fila_acumulada']['promedio_final_ranking'], reverse=True)[:3]
     sabana_data.sort(key=lambda x: (x['info'].user.last_name, x['info'].user.first_name))
-        
-    # El resto de la función no necesita cambios...
-    # --- 4. CÁLCULO DEL RESUMEN FINAL (CONTEOS Y PORCENTAJES) ---
-    resumen_final_celdas = []
-    
-    def calcular_resumen_columna(notas):
-        notas_validas = [n for n in notas if n is not None]
-        total_validos = len(notas_validas)
-        promedio = sum(notas_validas) / total_validos if total_validos > 0 else CERO
-        desempenos_map = {d: {'count': 0, 'percentage': 0.0} for d in DESEMPENOS_NOMBRES}
-        for nota in notas_validas:
-            des = get_valoracion_desempeno(nota)
-            if des and des in desempenos_map:
-                desempenos_map[des]['count'] += 1
-        if total_validos > 0:
-            for d_nombre in DESEMPENOS_NOMBRES:
-                count = desempenos_map[d_nombre]['count']
-                desempenos_map[d_nombre]['percentage'] = (count / total_validos) * 100
-        return {'promedio': promedio, 'desempenos': desempenos_map}
 
-    for area in areas_con_materias:
-        for materia in area.materias_del_curso_ordenadas:
-            resumen_final_celdas.append(calcular_resumen_columna(notas_acumuladas_materias.get(materia.id, [])))
-        resumen_final_celdas.append(calcular_resumen_columna(notas_acumuladas_areas.get(area.id, [])))
+    # --- 4. CÁLCULO DEL RESUMEN FINAL (CONTEOS Y PORCENTAJES) ---
+    # Una columna por materia y por área, con el acumulado recuperado de cada estudiante.
+    acumulado_por_columna = np.stack([
+        (calculo['area_acumulada_rec'] if es_area else calculo['materia_acumulada_rec'])[:, indice] for indice, es_area in columnas
+    ], axis=1) if columnas else np.zeros((len(estudiantes), 0), dtype=np.int64)
+    resumen_final_celdas = resumen_columnas(acumulado_por_columna, tabla_desempenos, DESEMPENOS_NOMBRES)
 
     resumen_global_niveles = []
-    idx = 0
+    celdas_resumen = iter(resumen_final_celdas)
     for area in areas_con_materias:
         for materia in area.materias_del_curso_ordenadas:
-            celda = resumen_final_celdas[idx]
-            item = {'tipo': 'materia', 'area': area.nombre, 'materia': materia.nombre, 'desempenos': {k: v['count'] for k, v in celda['desempenos'].items()}}
-            resumen_global_niveles.append(item)
-            idx += 1
-        celda = resumen_final_celdas[idx]
-        item = {'tipo': 'area', 'area': area.nombre, 'materia': 'TOTAL ÁREA', 'desempenos': {k: v['count'] for k, v in celda['desempenos'].items()}}
-        resumen_global_niveles.append(item)
-        idx += 1
-
-    return (sabana_data, areas_con_materias, DESEMPENOS_NOMBRES, 
+            celda = next(celdas_resumen)
+            resumen_global_niveles.append({'tipo': 'materia', 'area': area.nombre, 'materia': materia.nombre, 'desempenos': {k: v['count'] for k, v in celda['desempenos'].items()}})
+        celda = next(celdas_resumen)
+        resumen_global_niveles.append({'tipo': 'area', 'area': area.nombre, 'materia': 'TOTAL ÁREA', 'desempenos': {k: v['count'] for k, v in celda['desempenos'].items()}})
+
+    return (sabana_data, areas_con_materias, DESEMPENOS_NOMBRES,
             mejores_estudiantes, resumen_final_celdas, resumen_global_niveles)
 
 # El resto del archivo (las vistas) no necesita cambios, ya que solo llaman a la función principal.
-def _preparar_y_validar_sabana(request):
-    if not request.colegio:
-        return None, None, None, "Colegio no identificado.", False
-
-    curso_id = request.GET.get('curso_id')
-    if not curso_id:
-        return None, None, None, "Debe seleccionar un curso.", False
-    
-    curso = get_object_or_404(Curso, id=curso_id, colegio=request.colegio)
-    periodo_ref = None
-    is_final_report = False
+def _periodo_sabana(request):
+    """Periodo de referencia según el tipo de reporte. Devuelve (periodo_ref, error, is_final_report)."""
     tipo_reporte = request.GET.get('tipo_reporte', 'periodo')
 
     if tipo_reporte == 'anual':
         ano_lectivo_str = request.GET.get('ano_lectivo')
         if not ano_lectivo_str:
-            return None, None, None, "Debe proporcionar un año lectivo para el reporte final.", False
+            return None, "Debe proporcionar un año lectivo para el reporte final.", False
         
         periodo_ref = PeriodoAcademico.objects.filter(
             colegio=request.colegio, ano_lectivo=int(ano_lectivo_str)
         ).order_by('-fecha_fin').first()
         
         if not periodo_ref:
-            return None, None, None, f"No se encontraron periodos para el año lectivo {ano_lectivo_str}.", False
-        is_final_report = True
+            return None, f"No se encontraron periodos para el año lectivo {ano_lectivo_str}.", False
+        return periodo_ref, None, True
 
-    else:
-        periodo_id = request.GET.get('periodo_id')
-        if not periodo_id:
-            return None, None, None, "Debe seleccionar un periodo.", False
-        periodo_ref = get_object_or_404(PeriodoAcademico, id=periodo_id, colegio=request.colegio)
+    periodo_id = request.GET.get('periodo_id')
+    if not periodo_id:
+        return None, "Debe seleccionar un periodo.", False
+    return get_object_or_404(PeriodoAcademico, id=periodo_id, colegio=request.colegio), None, False
+
+
+def _validar_sabana(request):
+    """Valida parámetros y permisos. Devuelve (curso, periodo_ref, error, is_final_report)."""
+    if not request.colegio:
+        return None, None, "Colegio no identificado.", False
+
+    curso_id = request.GET.get('curso_id')
+    if not curso_id:
+        return None, None, "Debe seleccionar un curso.", False
+    
+    curso = get_object_or_404(Curso, id=curso_id, colegio=request.colegio)
+    periodo_ref, error, is_final_report = _periodo_sabana(request)
+    if error:
+        return None, None, error, False
 
     if not request.user.is_superuser:
         try:
             docente = Docente.objects.get(user=request.user, colegio=request.colegio)
             if not (docente.es_director_de_grupo(curso) or AsignacionDocente.objects.filter(docente=docente, curso=curso).exists()):
-                return None, None, None, "No tiene permisos para ver la sábana de este curso.", False
+                return None, None, "No tiene permisos para ver la sábana de este curso.", False
         except Docente.DoesNotExist:
-            return None, None, None, "Acceso denegado. Su usuario no está registrado como docente.", False
+            return None, None, "Acceso denegado. Su usuario no está registrado como docente.", False
+
+    return curso, periodo_ref, None, is_final_report
+
+
+def _clave_cache_sabana(request, tipo, curso, periodo_ref, is_final_report):
+    parametros = {'curso_id': curso.id, 'periodo_id': periodo_ref.id, 'final': is_final_report}
+    return clave_artefacto(tipo, parametros, sello_datos(request.colegio, curso, periodo_ref.ano_lectivo))
+
+
+def _preparar_y_validar_sabana(request, validacion=None):
+    curso, periodo_ref, error, is_final_report = validacion or _validar_sabana(request)
+    if error:
+        return None, None, None, error, False
 
     try:
         (sabana, areas, desempenos, mejores, resumen_celdas, resumen_global_niveles) = _get_sabana_acumulada_data(request.colegio, curso, periodo_ref)
@@ -318,11 +242,24 @@ def generar_sabana_vista(request):
 
 @login_required
 def generar_sabana_pdf(request):
-    if not PDF_SUPPORT:
+    asincrono = usar_cola(request)
+    if not pdf_disponible() and not asincrono:
         messages.error(request, "La funcionalidad de PDF no está disponible. Contacte al administrador.")
         return redirect('selector_sabana')
         
-    curso, periodo_ref, datos_completos, error, is_final_report = _preparar_y_validar_sabana(request)
+    validacion = _validar_sabana(request)
+    curso, periodo_ref, error, is_final_report = validacion
+    if error:
+        return HttpResponse(f"Error al generar el PDF: {error}", status=400)
+
+    # Si los datos del curso no han cambiado, se sirve el PDF ya generado.
+    clave_cache = _clave_cache_sabana(request, 'SABANA_PDF', curso, periodo_ref, is_final_report)
+    nombre_archivo = f"Sabana_{curso.nombre}_{periodo_ref.get_nombre_display()}.pdf"
+    pdf_file = leer_artefacto(clave_cache, 'pdf')
+    if pdf_file is not None:
+        return _respuesta_archivo(pdf_file, 'application/pdf', f'inline; filename="{nombre_archivo}"', desde_cache=True)
+
+    curso, periodo_ref, datos_completos, error, is_final_report = _preparar_y_validar_sabana(request, validacion)
     if error:
         return HttpResponse(f"Error al generar el PDF: {error}", status=400)
     
@@ -333,23 +270,80 @@ def generar_sabana_pdf(request):
         'is_final_report': is_final_report,
         **datos_completos
     }
-    html_string = render_to_string('notas/sabana/sabana_pdf.html', context, request=request)
-    
+    template_path = 'notas/sabana/sabana_pdf.html'
+    if asincrono:
+        return encolar_pdf(request, 'SABANA', render_to_string(template_path, context, request=request), nombre_archivo, clave_cache=clave_cache)
+
     try:
-        pdf_file = HTML(string=html_string, base_url=request.build_absolute_uri()).write_pdf()
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = f'inline; filename="Sabana_{curso.nombre}_{periodo_ref.get_nombre_display()}.pdf"'
-        return response
+        if usar_partes(request, len(context['sabana_data'])):
+            pdf_file = renderizar_por_partes(
+                template_path, context, 'sabana_data', TAMANO_PARTE_SABANA, base_url=request.build_absolute_uri(),
+                numeracion="Página {pagina} de {total}", request=request,
+            )
+        else:
+            pdf_file = renderizar_pdf(render_to_string(template_path, context, request=request), base_url=request.build_absolute_uri())
     except Exception as e:
         return HttpResponse(f"No se pudo generar el PDF. Error: {e}", status=500)
+    guardar_artefacto(clave_cache, 'pdf', pdf_file)
+    return _respuesta_archivo(pdf_file, 'application/pdf', f'inline; filename="{nombre_archivo}"')
 
 @login_required
 def exportar_sabana_excel(request):
-    curso, periodo_ref, datos_completos, error, _ = _preparar_y_validar_sabana(request)
+    validacion = _validar_sabana(request)
+    curso, periodo_ref, error, is_final_report = validacion
     if error:
         messages.error(request, error)
         return redirect('selector_sabana')
-    return generar_excel_sabana(curso=curso, periodo=periodo_ref, **datos_completos)
+
+    # El Excel se guarda y se sirve como archivo: nunca se carga completo en memoria.
+    clave_cache = _clave_cache_sabana(request, 'SABANA_EXCEL', curso, periodo_ref, is_final_report)
+    nombre_archivo = f"Sabana_{curso.nombre}_{periodo_ref.get_nombre_display()}.xlsx"
+    archivo = abrir_artefacto(clave_cache, 'xlsx')
+    if archivo is not None:
+        return respuesta_xlsx(archivo, nombre_archivo, desde_cache=True)
+
+    curso, periodo_ref, datos_completos, error, _ = _preparar_y_validar_sabana(request, validacion)
+    if error:
+        messages.error(request, error)
+        return redirect('selector_sabana')
+    archivo = generar_excel_sabana(curso=curso, periodo=periodo_ref, colegio=request.colegio, is_final_report=is_final_report, **datos_completos)
+    guardar_artefacto(clave_cache, 'xlsx', archivo)
+    return respuesta_xlsx(archivo, nombre_archivo, desde_cache=False)
+
+def _sabanas_del_colegio(colegio, cursos, periodo_ref):
+    """Genera (curso, datos) de a un curso; los cursos sin materias se omiten."""
+    for curso in cursos:
+        (sabana, areas, desempenos, *_resto) = _get_sabana_acumulada_data(colegio, curso, periodo_ref)
+        if areas:
+            yield curso, {'sabana_data': sabana, 'areas_con_materias': areas, 'desempenos_headers': desempenos}
+
+@login_required
+def exportar_sabana_colegio_excel(request):
+    """Sábana de todos los cursos del colegio en un solo Excel, una hoja por curso. Solo administradores."""
+    if not request.colegio:
+        return HttpResponseNotFound("<h1>Colegio no configurado para este dominio.</h1>")
+    if not request.user.is_superuser:
+        messages.error(request, "Solo los administradores pueden exportar la sábana de todo el colegio.")
+        return redirect('selector_sabana')
+
+    periodo_ref, error, is_final_report = _periodo_sabana(request)
+    if error:
+        messages.error(request, error)
+        return redirect('selector_sabana')
+
+    cursos = Curso.objects.filter(colegio=request.colegio).select_related('director_grado__user').order_by('nombre')
+    try:
+        archivo = generar_excel_sabana_colegio(request.colegio, periodo_ref, is_final_report, _sabanas_del_colegio(request.colegio, cursos, periodo_ref))
+    except ValueError as ve:
+        messages.error(request, str(ve))
+        return redirect('selector_sabana')
+    return respuesta_xlsx(archivo, f"Sabana_Colegio_{periodo_ref.get_nombre_display()}_{periodo_ref.ano_lectivo}.xlsx")
+
+def _respuesta_archivo(contenido, content_type, disposicion, desde_cache=False):
+    response = HttpResponse(contenido, content_type=content_type)
+    response['Content-Disposition'] = disposicion
+    response['X-Reporte-Cache'] = 'HIT' if desde_cache else 'MISS'
+    return response
 
 @login_required
 def selector_sabana_vista(request):
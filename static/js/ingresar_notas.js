@@ -360,7 +360,13 @@ document.addEventListener('DOMContentLoaded', function () {
                 body: JSON.stringify(payload)
             });
             const result = await response.json();
-            if (!response.ok) throw new Error(result.message || 'Error del servidor');
+            if (!response.ok) {
+                let mensaje = result.message || 'Error del servidor';
+                if (Array.isArray(result.errores)) {
+                    mensaje += '\n' + result.errores.map(e => `- ${e.estudiante || e.estudiante_id}: ${e.errores.join(' ')}`).join('\n');
+                }
+                throw new Error(mensaje);
+            }
             actualizarStatus('saved');
             alert('¡Guardado con éxito!');
         } catch (error) {